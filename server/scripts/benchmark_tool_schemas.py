@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Measure the build cost of function tools generated from stored json_schemas
+
+Generates tool schemas of increasing size (flat properties, enums, nested
+objects and arrays, loosely spelled types as the tool generator produces them)
+and reports, per tool, how long compiling the schema takes cold and from the
+cache, and how long building the whole function tool takes.
+
+    uv run python scripts/benchmark_tool_schemas.py --properties 2 8 32 --iterations 2000
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents import tool_schema  # noqa: E402
+from src.agents.tool_schema import compile_parameters, schema_tool  # noqa: E402
+
+
+def make_schema(properties: int, seed: int = 0) -> dict:
+    """A tool schema with ``properties`` top-level parameters of mixed shapes"""
+    schema = {"type": "object", "properties": {}, "required": []}
+    for index in range(properties):
+        name = f"param_{seed}_{index}"
+        shape = index % 5
+        if shape == 0:
+            schema["properties"][name] = {"type": "str", "description": f"Free text {index}"}
+        elif shape == 1:
+            schema["properties"][name] = {"type": "int", "minimum": 1, "maximum": 20}
+        elif shape == 2:
+            schema["properties"][name] = {"type": "string", "enum": ["small", "medium", "large", "small"]}
+        elif shape == 3:
+            schema["properties"][name] = {"type": "array"}
+        else:
+            schema["properties"][name] = {
+                "type": "object",
+                "properties": {
+                    "street": {"type": "string"},
+                    "postal_code": {"type": "string|number"},
+                    "notes": {"type": "list", "items": {"type": "str"}},
+                },
+                "required": ["street", "missing"],
+            }
+        if index % 2 == 0:
+            schema["required"].append(name)
+    schema["required"].append("not_a_property")
+    return schema
+
+
+async def _handler(context, params):
+    return params
+
+
+def timed(fn, iterations: int) -> float:
+    """Median microseconds per call over ``iterations`` calls"""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(samples)
+
+
+def benchmark(properties: int, iterations: int):
+    schemas = [make_schema(properties, seed) for seed in range(iterations)]
+    schema_iter = iter(schemas)
+
+    # Every call compiles a schema not seen before
+    tool_schema._compiled.clear()
+    cold = timed(lambda: compile_parameters(next(schema_iter)), iterations)
+
+    # The same schema, as for every call after an agent's first
+    warm_schema = schemas[0]
+    compile_parameters(warm_schema)
+    cached = timed(lambda: compile_parameters(warm_schema), iterations)
+
+    build = timed(lambda: schema_tool("benchmark_tool", "Benchmark tool", warm_schema, _handler), iterations)
+
+    compiled = compile_parameters(warm_schema)
+    print(
+        f"{properties:>10} {cold:>12.1f} {cached:>12.1f} {build:>12.1f}"
+        f"   required={len(compiled['required'])}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--properties", type=int, nargs="+", default=[2, 8, 32, 128])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'properties':>10} {'cold (µs)':>12} {'cached (µs)':>12} {'tool (µs)':>12}")
+    for properties in args.properties:
+        benchmark(properties, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Exercise email delivery against a local SMTP sink
+
+Starts a minimal SMTP server that accepts and counts every message, queues a
+batch of emails for several tenants through the email service (with a
+throwaway outbox) and reports enqueue latency, delivery time per tenant and
+how many SMTP connections were opened.
+
+    uv run python scripts/email_sink_test.py --messages 30 --tenants 3 --rate 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.email_service import EMAIL_TOPIC, EmailService, SmtpConnectionPool  # noqa: E402
+from src.services.outbox import Outbox  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SmtpSink:
+    """Just enough SMTP to accept mail from smtplib"""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        writer.write(b"220 sink ESMTP\r\n")
+        recipients = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                writer.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif verb in ("HELO", "MAIL", "NOOP"):
+                recipients = [] if verb == "MAIL" else recipients
+                writer.write(b"250 OK\r\n")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                writer.write(b"250 OK\r\n")
+            elif verb == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                data = []
+                while True:
+                    data_line = await reader.readline()
+                    if data_line in (b".\r\n", b".\n", b""):
+                        break
+                    data.append(data_line)
+                self.messages.append((recipients, time.perf_counter(), b"".join(data)))
+                writer.write(b"250 Queued\r\n")
+            elif verb == "RSET":
+                recipients = []
+                writer.write(b"250 OK\r\n")
+            elif verb == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"502 Not implemented\r\n")
+            await writer.drain()
+        writer.close()
+
+
+async def run(args):
+    sink = SmtpSink()
+    server = await asyncio.start_server(sink.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    logger.info(f"SMTP sink listening on 127.0.0.1:{port}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        service = EmailService(
+            Outbox(os.path.join(directory, "outbox.sqlite3")),
+            SmtpConnectionPool("127.0.0.1", port, use_tls=False, size=args.pool_size),
+            from_email="bookings@example.com",
+            messages_per_second_per_tenant=args.rate,
+        )
+
+        started = time.perf_counter()
+        enqueue_times = []
+        for index in range(args.messages):
+            tenant = f"tenant-{index % args.tenants}"
+            enqueue_started = time.perf_counter()
+            await service.enqueue(tenant, {
+                "to": [f"customer{index}@example.com"],
+                "subject": f"Booking confirmation #{index}",
+                "text": f"Hi, your booking #{index} with {tenant} is confirmed.",
+                "from_name": tenant,
+            })
+            enqueue_times.append(time.perf_counter() - enqueue_started)
+
+        while await service.outbox.pending_count(EMAIL_TOPIC):
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        await service.stop()
+
+    server.close()
+    await server.wait_closed()
+
+    enqueue_times.sort()
+    per_tenant = Counter(message[2].split(b"From: ", 1)[1].split(b" <", 1)[0].decode() for message in sink.messages)
+    print(f"Enqueue latency: p50 {enqueue_times[len(enqueue_times) // 2] * 1000:.2f} ms, "
+          f"max {enqueue_times[-1] * 1000:.2f} ms")
+    print(f"Delivered {len(sink.messages)}/{args.messages} in {elapsed:.2f}s over {sink.connections} SMTP connections")
+    # Each tenant may burst up to one second's worth of messages before the limit applies
+    minimum = max(0.0, args.messages / args.tenants - max(1.0, args.rate)) / args.rate
+    print(f"Per tenant: {dict(per_tenant)} (limit {args.rate}/s each, expected >= {minimum:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=30)
+    parser.add_argument("--tenants", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=5.0, help="Messages per second per tenant")
+    parser.add_argument("--pool-size", type=int, default=2)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+"""
+Measure the accuracy and decision latency of answering machine detection
+
+Runs the detector the agent worker screens outbound calls with over a recorded
+test set: a directory with ``human`` and ``machine`` subdirectories of 16-bit
+WAV files, each the callee's audio from the moment the call was answered. A
+``.txt`` file next to a recording holds its transcript, delivered to the
+detector ``--stt-latency`` seconds after speech starts, like a streaming STT's
+first transcript.
+
+Reports the confusion matrix, accuracy (only transcript-confirmed machines are
+not greeted, so likely machines and undecided calls count as human), precision
+and recall for machines, and how many seconds of audio it took to decide. ``--generate`` first writes a synthetic test set with
+easy and hard cases, for trying the script and thresholds without recordings.
+
+    uv run python scripts/evaluate_amd.py data/amd-test-set
+    uv run python scripts/evaluate_amd.py /tmp/amd-synthetic --generate 200
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import wave
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents.answering_machine import (  # noqa: E402
+    HUMAN,
+    LIKELY_MACHINE,
+    MACHINE,
+    UNKNOWN,
+    AnsweringMachineDetector,
+)
+
+FRAME_MS = 10
+LABELS = (HUMAN, MACHINE)
+
+
+def read_wav(path: Path):
+    """Mono 16-bit samples of a WAV file and its sample rate"""
+    with wave.open(str(path), "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        channels = wav.getnchannels()
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return samples, wav.getframerate()
+
+
+def evaluate(samples: np.ndarray, sample_rate: int, transcript: str, args):
+    """Feed a recording to the detector frame by frame, as the call would"""
+    detector = AnsweringMachineDetector(
+        timeout=args.timeout,
+        transcribed=not args.no_transcript,
+        initial_silence=args.initial_silence,
+        greeting=args.greeting,
+        after_greeting_silence=args.after_greeting_silence,
+        silence_threshold=args.silence_threshold,
+    )
+    frame = sample_rate * FRAME_MS // 1000
+    delivered = not transcript
+    for offset in range(0, len(samples), frame):
+        started_at = detector.cadence.speech_started_at
+        if not delivered and started_at is not None and detector.elapsed >= started_at + args.stt_latency:
+            delivered = True
+            if detector.push_transcript(transcript):
+                break
+        if detector.push_audio(samples[offset:offset + frame], sample_rate):
+            break
+    if detector.result is None:
+        # The recording ended before the detector decided: silence until the timeout
+        silence = np.zeros(frame, dtype=np.int16)
+        while not detector.push_audio(silence, sample_rate):
+            pass
+    return detector.result
+
+
+# Synthetic test set
+
+
+def _speech(rng: random.Random, seconds: float, sample_rate: int) -> np.ndarray:
+    """A voiced, word-like sound: harmonics of a drifting pitch under a syllable envelope"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = rng.uniform(95, 230) * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 8))
+    envelope = np.clip(np.sin(np.pi * t / max(seconds, 1e-3)), 0, 1) ** 0.3
+    envelope *= 0.6 + 0.4 * np.abs(np.sin(np.pi * rng.uniform(3, 6) * t))
+    return voice * envelope * rng.uniform(2500, 7000) / 2
+
+
+def _utterance(rng: random.Random, words: int, sample_rate: int, pause=(0.05, 0.2)) -> list:
+    parts = []
+    for index in range(words):
+        if index:
+            parts.append(np.zeros(int(rng.uniform(*pause) * sample_rate)))
+        parts.append(_speech(rng, rng.uniform(0.18, 0.45), sample_rate))
+    return parts
+
+
+def _silence(seconds: float, sample_rate: int) -> np.ndarray:
+    return np.zeros(int(seconds * sample_rate))
+
+
+def _beep(sample_rate: int) -> np.ndarray:
+    t = np.arange(int(0.5 * sample_rate)) / sample_rate
+    return 6000 * np.sin(2 * np.pi * 1000 * t)
+
+
+def _human(rng: random.Random, sample_rate: int):
+    kind = rng.random()
+    if kind < 0.1:
+        # Hard: a long self-introduction
+        parts = [_silence(rng.uniform(0.2, 1.0), sample_rate)] + _utterance(rng, rng.randint(6, 8), sample_rate)
+        transcript = "hello this is dana speaking how can I help you"
+    elif kind < 0.15:
+        # Hard: a slow pickup
+        parts = [_silence(rng.uniform(2.6, 3.5), sample_rate)] + _utterance(rng, 1, sample_rate)
+        transcript = "hello"
+    elif kind < 0.55:
+        parts = [_silence(rng.uniform(0.2, 1.5), sample_rate)] + _utterance(rng, rng.randint(1, 2), sample_rate)
+        transcript = "hello"
+    else:
+        parts = [_silence(rng.uniform(0.2, 1.2), sample_rate)] + _utterance(rng, 3, sample_rate)
+        transcript = "hello who's this"
+    # Waiting for an answer, then speaking again
+    parts += [_silence(rng.uniform(1.5, 2.5), sample_rate)] + _utterance(rng, 2, sample_rate)
+    return parts, transcript
+
+
+def _machine(rng: random.Random, sample_rate: int):
+    kind = rng.random()
+    if kind < 0.1:
+        # Hard: a greeting that starts like a person answering
+        parts = [_silence(rng.uniform(0.3, 0.8), sample_rate)] + _utterance(rng, 1, sample_rate)
+        parts += [_silence(rng.uniform(0.9, 1.3), sample_rate)] + _utterance(rng, 10, sample_rate)
+        transcript = "hello sorry I can't take your call right now please leave a message"
+    elif kind < 0.2:
+        # Silence before the greeting
+        parts = [_silence(rng.uniform(2.6, 4.0), sample_rate)] + _utterance(rng, 12, sample_rate)
+        transcript = "the person you are calling is not available"
+    else:
+        parts = [_silence(rng.uniform(0.1, 1.0), sample_rate)]
+        for sentence in range(rng.randint(2, 3)):
+            if sentence:
+                parts.append(_silence(rng.uniform(0.35, 0.7), sample_rate))
+            parts += _utterance(rng, rng.randint(4, 8), sample_rate)
+        transcript = "hi you've reached sam please leave a message after the tone"
+    parts += [_silence(0.3, sample_rate), _beep(sample_rate), _silence(1.0, sample_rate)]
+    return parts, transcript
+
+
+def generate(directory: Path, count: int, seed: int, sample_rate: int = 8000):
+    """Write ``count`` synthetic recordings, half of each label, with line noise and transcripts"""
+    rng = random.Random(seed)
+    noise = np.random.default_rng(seed)
+    for index in range(count):
+        label = LABELS[index % 2]
+        parts, transcript = (_human if label == HUMAN else _machine)(rng, sample_rate)
+        audio = np.concatenate(parts)
+        audio += noise.normal(0, rng.uniform(20, 80), len(audio))
+        path = directory / label / f"synthetic-{index:04d}.wav"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with wave.open(str(path), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(np.clip(audio, -32768, 32767).astype(np.int16).tobytes())
+        path.with_suffix(".txt").write_text(transcript)
+    print(f"Wrote {count} synthetic recordings to {directory}")
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("test_set", type=Path, help="Directory with human/ and machine/ WAV recordings")
+    parser.add_argument("--generate", type=int, metavar="COUNT", help="Write COUNT synthetic recordings first")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=5.0, help="AMD_TIMEOUT")
+    parser.add_argument("--initial-silence", type=float, default=2.5)
+    parser.add_argument("--greeting", type=float, default=1.5)
+    parser.add_argument("--after-greeting-silence", type=float, default=0.8)
+    parser.add_argument("--silence-threshold", type=float, default=300.0)
+    parser.add_argument("--stt-latency", type=float, default=1.2, help="Seconds from speech start to the first transcript")
+    parser.add_argument("--no-transcript", action="store_true", help="Decide from the cadence alone")
+    parser.add_argument("--verbose", action="store_true", help="Print every recording's verdict")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.test_set, args.generate, args.seed)
+
+    confusion = {label: Counter() for label in LABELS}
+    latencies = {label: [] for label in LABELS}
+    reasons = Counter()
+    processing = []
+    for label in LABELS:
+        for path in sorted((args.test_set / label).glob("*.wav")):
+            samples, sample_rate = read_wav(path)
+            sidecar = path.with_suffix(".txt")
+            transcript = "" if args.no_transcript or not sidecar.exists() else sidecar.read_text().strip()
+            started = time.perf_counter()
+            result = evaluate(samples, sample_rate, transcript, args)
+            processing.append(time.perf_counter() - started)
+            confusion[label][result.verdict] += 1
+            latencies[label].append(result.decision_seconds)
+            reasons[(label, result.verdict, result.reason)] += 1
+            if args.verbose:
+                print(f"{label:8} {result.verdict:14} {result.reason:24} {result.decision_seconds:5.2f}s  {path.name}")
+
+    total = sum(sum(counts.values()) for counts in confusion.values())
+    if not total:
+        sys.exit(f"No recordings in {args.test_set}/human or {args.test_set}/machine")
+
+    print(f"\n{total} recordings ({'cadence only' if args.no_transcript else 'cadence and transcript'})")
+    print(f"{'':10}{'-> human':>10}{'-> machine':>12}{'-> likely machine':>19}{'-> unknown':>12}")
+    for label in LABELS:
+        counts = confusion[label]
+        print(f"{label:10}{counts[HUMAN]:>10}{counts[MACHINE]:>12}{counts[LIKELY_MACHINE]:>19}{counts[UNKNOWN]:>12}")
+
+    machines_found = confusion[MACHINE][MACHINE]
+    called_machine = machines_found + confusion[HUMAN][MACHINE]
+    correct = machines_found + sum(confusion[HUMAN].values()) - confusion[HUMAN][MACHINE]
+    print(f"\nAccuracy:          {correct / total:.1%} (likely machines and undecided calls greeted, counted as human)")
+    print(f"Machine precision: {machines_found / called_machine:.1%}" if called_machine else "Machine precision: -")
+    machines = sum(confusion[MACHINE].values())
+    print(f"Machine recall:    {machines_found / machines:.1%}" if machines else "Machine recall:    -")
+    print(f"Humans hung up on: {confusion[HUMAN][MACHINE]}")
+
+    print("\nSeconds of audio to decide:")
+    for label in LABELS:
+        if latencies[label]:
+            values = latencies[label]
+            print(
+                f"  {label:8} median {statistics.median(values):.2f}  p90 {percentile(values, 0.9):.2f}  "
+                f"max {max(values):.2f}"
+            )
+    print(f"Processing time: {statistics.mean(processing) * 1000:.1f} ms per recording")
+
+    print("\nVerdicts by reason:")
+    for (label, verdict, reason), count in sorted(reasons.items()):
+        print(f"  {label:8} -> {verdict:14} {reason:24} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Exercise the SMS sender against a local mock of the Twilio Messages API
+
+Starts a mock server that throttles (429 + Retry-After) and fails (503) a share
+of requests, sends a batch through SmsService and reports throughput, retries
+and how many connections were opened.
+
+    uv run python scripts/sms_mock_test.py --messages 50 --rate 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.sms_service import SmsService  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class MockTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        stats = self.server.stats
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+
+        with self.server.lock:
+            stats["requests"] += 1
+            stats["connections"].add(self.client_address)
+            request_number = stats["requests"]
+
+        if self.server.throttle_every and request_number % self.server.throttle_every == 0:
+            stats["throttled"] += 1
+            self._reply(429, {"code": 20429, "message": "Too Many Requests"}, {"Retry-After": "1"})
+        elif self.server.fail_every and request_number % self.server.fail_every == 0:
+            stats["failed"] += 1
+            self._reply(503, {"code": 20503, "message": "Service Unavailable"})
+        else:
+            stats["accepted"] += 1
+            self._reply(201, {
+                "sid": f"SM{uuid.uuid4().hex}",
+                "status": "queued",
+                "to": form.get("To", [""])[0],
+                "from": form.get("From", [""])[0],
+                "body": form.get("Body", [""])[0],
+            })
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(throttle_every: int, fail_every: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockTwilioHandler)
+    server.stats = {"requests": 0, "accepted": 0, "throttled": 0, "failed": 0, "connections": set()}
+    server.lock = threading.Lock()
+    server.throttle_every = throttle_every
+    server.fail_every = fail_every
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run(args):
+    server = start_mock_server(args.throttle_every, args.fail_every)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    logger.info(f"Mock Twilio API listening on {base_url}")
+
+    service = SmsService(
+        account_sid="ACmock",
+        auth_token="mock",
+        from_number="+15550000000",
+        base_url=base_url,
+        messages_per_second=args.rate,
+        max_concurrency=args.concurrency,
+        max_retries=args.retries,
+    )
+
+    messages = [{"to": f"+1555{index:07d}", "body": f"Test message {index}"} for index in range(args.messages)]
+
+    started = time.perf_counter()
+    queued = await service.send(messages[0]["to"], messages[0]["body"], wait=False)
+    queued_after = time.perf_counter() - started
+    results = await service.send_batch(messages[1:])
+    elapsed = time.perf_counter() - started
+
+    await service.close()
+    server.shutdown()
+
+    stats = server.stats
+    sent = sum(1 for result in results if result.get("success"))
+    print(f"Fire-and-forget send returned {queued['status']!r} in {queued_after * 1000:.1f} ms")
+    print(f"Batch: {sent}/{len(results)} sent in {elapsed:.2f}s ({len(results) / elapsed:.1f} msg/s, limit {args.rate}/s)")
+    print(f"Server: {stats['requests']} requests, {stats['throttled']} throttled, {stats['failed']} failed, "
+          f"{len(stats['connections'])} connections")
+    for result in results:
+        if not result.get("success"):
+            print(f"  failed {result['to']}: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=10.0, help="Messages per second")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--throttle-every", type=int, default=17, help="Answer every Nth request with 429")
+    parser.add_argument("--fail-every", type=int, default=23, help="Answer every Nth request with 503")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
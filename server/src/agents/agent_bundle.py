@@ -0,0 +1,286 @@
+"""
+Compiled agent bundles.
+
+A call used to assemble its runtime configuration from the agent document, one
+document per tool, prompt concatenation and voice mapping, all at call start.
+Publishing an agent compiles all of it once into a single bundle: the final
+system prompts, the tools with their compiled parameter schemas, the results
+of tools that only return stored data, and the resolved voice, STT and LLM
+settings. The bundle is stored as one JSON document named by its content hash;
+workers read that one document per call.
+
+Each call runs in its own job process, which parses the bundle once and
+compiles its function tools when the call starts.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from ..models import Agent as AgentModel, Tool
+from .cached_tts import resolve_tts_voice
+from .tool_definitions import CompiledTool, compile_tools, tool_description
+from .tool_schema import compile_parameters
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the layout changes; bundles of another format are recompiled
+BUNDLE_FORMAT = 1
+# Firestore documents are limited to 1 MiB
+MAX_BUNDLE_BYTES = 1_000_000
+
+REALTIME_MODEL = "gpt-4o-realtime-preview"
+PIPELINE_LLM_MODEL = "gpt-4o-mini"
+STT_MODEL = "nova-3"
+
+DEFAULT_INSTRUCTIONS = "You are a helpful AI assistant."
+DEFAULT_GREETING = "Hello! How can I help you today?"
+
+REALTIME_TOOL_INSTRUCTIONS = """
+
+CRITICAL INSTRUCTIONS FOR TOOL USAGE:
+
+1. NEVER call tools proactively or automatically - ONLY call tools when the user specifically asks for information
+2. DO NOT call tools during greetings or initial conversation
+3. ONLY call tools when the user explicitly requests specific information like menu, hours, location, etc.
+4. When a user asks for information, respond conversationally first, then call the appropriate tool
+5. Examples:
+   - User: "What's on your menu?" → You: "Let me get our menu for you..." [then call menu tool]
+   - User: "What are your hours?" → You: "Let me check our hours..." [then call hours tool]
+   - Initial greeting: Just greet - DO NOT call any tools
+6. Wait for the user to speak and ask questions before using any tools
+"""
+
+MULTIMODAL_TOOL_INSTRUCTIONS = """
+
+CRITICAL INSTRUCTIONS FOR TOOL USAGE AND NATURAL RESPONSES:
+
+1. ONLY use tools when the customer EXPLICITLY asks for specific information.
+2. DO NOT proactively provide information that wasn't requested.
+3. NEVER call tools during greetings or unless directly asked.
+
+4. Examples of when to use tools:
+   - Customer asks: "What are your hours?" → Use suitable tool
+   - Customer asks: "What's on the menu?" → Use suitable tool
+   - Customer asks: "How much is a pizza?" → Use suitable tool
+
+5. Examples of when NOT to use tools:
+   - Initial greeting
+   - Customer says: "Hello" or "Hi"
+   - Customer says: "I'd like to order" (wait for them to ask about specific items)
+
+6. CONVERSATIONAL RESPONSE STYLE:
+   - When you receive data from a tool, DO NOT just read it robotically
+   - Introduce the information naturally: "Great question! Let me tell you about our menu..."
+   - Use conversational transitions: "We have...", "Our most popular items are...", "You might enjoy..."
+   - Add helpful context: "Our customers really love the...", "A popular choice is..."
+   - Be warm and engaging, not just informative
+   - Speak like a friendly restaurant employee, not a computer
+
+7. Example natural responses:
+   - Instead of: "Here's our menu: Pizza $12.99, Pasta $10.99"
+   - Say: "We have some delicious options today! Our pizzas start at $12.99, and we also have fresh pasta dishes from $10.99. What sounds good to you?"
+
+8. NEVER make up information. If asked about something you don't have a tool for, say "Let me check on that for you" or "I'll need to verify that information."
+"""
+
+PIPELINE_TOOL_INSTRUCTIONS = """
+
+CRITICAL INSTRUCTIONS FOR TOOL USAGE:
+1. ONLY use tools when the customer EXPLICITLY asks for specific information.
+2. DO NOT proactively provide information that wasn't requested.
+3. NEVER call tools during greetings or unless directly asked.
+4. Examples of when to use tools:
+   - Customer asks: "What are your hours?" → Use suitable tool
+   - Customer asks: "What's on the menu?" → Use suitable tool
+   - Customer asks: "How much is a pizza?" → Use suitable tool
+5. Examples of when NOT to use tools:
+   - Initial greeting
+   - Customer says: "Hello" or "Hi"
+   - Customer says: "I'd like to order" (wait for them to ask about specific items)
+6. NEVER make up information. If asked about something you don't have a tool for, say you'll need to check.
+"""
+
+LANGUAGE_NAMES = {
+    "en-US": "English",
+    "es-ES": "Spanish",
+    "fr-FR": "French",
+    "de-DE": "German",
+    "it-IT": "Italian",
+    "pt-BR": "Portuguese",
+    "ja-JP": "Japanese",
+    "ko-KR": "Korean",
+    "zh-CN": "Chinese"
+}
+
+# Map voices to OpenAI Realtime voices (new voices from 2024)
+REALTIME_VOICES = {
+    # New expressive voices with better emotion control
+    "ash": "ash",
+    "ballad": "ballad",
+    "coral": "coral",
+    "sage": "sage",
+    "verse": "verse"
+}
+
+# Volatile fields left out of bundles, so publishing an unchanged agent keeps its version
+_AGENT_EXCLUDE = {"analytics", "created_at", "updated_at"}
+_TOOL_EXCLUDE = {"usage_count", "failure_count", "last_used", "created_at", "updated_at"}
+
+
+class AgentBundle:
+    """A published agent: everything a call needs, compiled from the agent and its tools"""
+
+    def __init__(self, data: Dict[str, Any], version: str, content: Optional[str] = None):
+        self.version = version
+        self.agent = AgentModel(**data["agent"])
+        self.tools = {tool_id: Tool(**tool) for tool_id, tool in data["tools"].items()}
+        self.prompts: Dict[str, str] = data["prompts"]
+        self.greeting: str = data["greeting"]
+        self.voice: Dict[str, Dict[str, str]] = data["voice"]
+        self.static_results: Dict[str, Any] = data["staticResults"]
+        # Canonical JSON of a freshly compiled bundle, until it is stored
+        self.content = content
+        self._tool_definitions: Optional[List[CompiledTool]] = None
+
+    def tool_definitions(self) -> List[CompiledTool]:
+        """The agent's function tools, compiled when first needed"""
+        if self._tool_definitions is None:
+            self._tool_definitions = compile_tools(self.agent, self.tools)
+        return self._tool_definitions
+
+
+def _canonical_json(data: Dict[str, Any]) -> str:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def build_prompts(agent: AgentModel) -> Dict[str, str]:
+    """Final system prompt of each way of running the agent: realtime, multimodal and pipeline"""
+    instructions = agent.instructions or DEFAULT_INSTRUCTIONS
+
+    # Force English language for OpenAI Realtime API
+    realtime = f"{instructions}{REALTIME_TOOL_INSTRUCTIONS}"
+    realtime = f"{realtime}\n\nIMPORTANT: Always respond in English only. Do not use any other language."
+
+    multimodal = f"{instructions}{MULTIMODAL_TOOL_INSTRUCTIONS}"
+    pipeline = f"{instructions}{PIPELINE_TOOL_INSTRUCTIONS}"
+    # Add language instruction to system prompt if language is specified
+    if agent.language:
+        language_name = LANGUAGE_NAMES.get(agent.language, "English")
+        multimodal = f"{multimodal}\n\nIMPORTANT: Always respond in {language_name} only."
+        pipeline = f"{pipeline}\n\nIMPORTANT: Always respond in {language_name} only."
+
+    return {"realtime": realtime, "multimodal": multimodal, "pipeline": pipeline}
+
+
+def resolve_voice(agent: AgentModel) -> Dict[str, Dict[str, str]]:
+    """Models and voices the agent's calls run with"""
+    return {
+        "realtime": {"model": REALTIME_MODEL, "voice": REALTIME_VOICES.get(agent.voice, "ash")},
+        "tts": resolve_tts_voice(agent),
+        # Use multi for all non-English languages as Deepgram supports automatic detection;
+        # the realtime model is always spoken to in English
+        "stt": {
+            "model": STT_MODEL,
+            "language": "en" if agent.language == "en-US" else "multi",
+            "realtimeLanguage": "en",
+        },
+        "llm": {"model": PIPELINE_LLM_MODEL},
+    }
+
+
+def _compile_tool(tool_id: str, tool: Tool) -> Dict[str, Any]:
+    compiled = tool.model_dump(mode="json", exclude=_TOOL_EXCLUDE)
+    compiled["description"] = tool_description(tool_id, tool)
+    if tool.json_schema:
+        compiled["json_schema"] = compile_parameters(tool.json_schema)
+    return compiled
+
+
+async def compile_bundle(agent: AgentModel, tools: Dict[str, Tool]) -> AgentBundle:
+    """
+    Compile an agent and its tools (regular and AI-generated, by ID) into a bundle
+
+    Its version is the hash of its content, so compiling an unchanged agent gives the same version.
+    """
+    from ..services.tool_executor import tool_executor
+
+    static_results = {}
+    for tool_id, tool in tools.items():
+        if not tool.enabled or not tool_executor.is_static(tool):
+            continue
+        try:
+            static_results[tool_id] = await tool_executor.render_static(tool)
+        except Exception as e:
+            logger.warning(f"Could not render static result of tool {tool.name} ({tool_id}): {e}")
+
+    data = {
+        "format": BUNDLE_FORMAT,
+        "agent": agent.model_dump(mode="json", exclude=_AGENT_EXCLUDE),
+        "tools": {tool_id: _compile_tool(tool_id, tool) for tool_id, tool in tools.items()},
+        "prompts": build_prompts(agent),
+        "greeting": agent.first_message or agent.greeting or DEFAULT_GREETING,
+        "voice": resolve_voice(agent),
+        # Round-tripped so they look the same freshly compiled as loaded
+        "staticResults": json.loads(_canonical_json(static_results)),
+    }
+    content = _canonical_json(data)
+    version = hashlib.sha256(content.encode()).hexdigest()[:32]
+    return AgentBundle(data, version, content=content)
+
+
+def is_generated_tool(agent_id: str, tool: Tool) -> bool:
+    """Whether one of the agent's tools was generated for it rather than listed in ``agent.tools``"""
+    return bool(getattr(tool, 'ai_generated', False)) or tool.id.startswith(f"{agent_id}_")
+
+
+async def publish_agent(agent_id: str, db) -> Optional[AgentBundle]:
+    """
+    Compile the agent's current configuration and store it as its published bundle
+
+    Returns:
+        The bundle, or None when the agent does not exist
+    """
+    agent = await db.get_agent(agent_id)
+    if not agent:
+        return None
+
+    tools = dict(await db.get_tools(agent.tools)) if agent.tools else {}
+    for tool in await db.get_tools_by_agent(agent_id):
+        if is_generated_tool(agent_id, tool) and tool.id not in tools:
+            tools[tool.id] = tool
+
+    bundle = await compile_bundle(agent, tools)
+    await store_bundle(agent_id, bundle, db)
+    return bundle
+
+
+async def store_bundle(agent_id: str, bundle: AgentBundle, db) -> bool:
+    """Store a freshly compiled bundle as the agent's published one; False when it is too large for a document"""
+    content = bundle.content
+    size = len(content.encode())
+    if size > MAX_BUNDLE_BYTES:
+        # Calls load the agent and its tools one document at a time instead of an outdated bundle
+        logger.warning(f"Bundle of agent {agent_id} is too large to publish ({size} bytes)")
+        await asyncio.to_thread(db.delete_agent_bundle_sync, agent_id)
+        bundle.content = None
+        return False
+
+    await asyncio.to_thread(db.save_agent_bundle_sync, agent_id, bundle.version, content)
+    bundle.content = None
+    logger.info(f"Published agent {agent_id} bundle {bundle.version} ({len(bundle.tools)} tools, {size} bytes)")
+    return True
+
+
+def load_bundle(document: Dict[str, Any]) -> Optional[AgentBundle]:
+    """
+    The bundle of a published bundle document
+
+    Returns:
+        None when the document holds a bundle of another format
+    """
+    data = json.loads(document["bundle"])
+    if data.get("format") != BUNDLE_FORMAT:
+        return None
+    return AgentBundle(data, document["version"])
@@ -0,0 +1,391 @@
+"""
+Answering machine detection (AMD) at the start of outbound calls.
+
+Before the agent greets, the first seconds of the callee's audio are screened
+locally. People answer with a word or two and wait for a reply ("Hello?");
+answering machines start with a long greeting, or with silence before it. The
+cadence rules are those of Asterisk's AMD(): initial silence, greeting length,
+silence after the greeting and number of words, read from the audio's loudness.
+The first speech-to-text transcript is matched against voicemail phrases as
+well, in the agent's language when there are phrases for it.
+
+Only a voicemail phrase in the transcript makes a machine: a cadence that sounds
+like one (a person answering "Hello, this is Dana speaking, how can I help?"
+does) is ``LIKELY_MACHINE`` and greeted like any callee not decided in time.
+A machine is left the agent's voicemail message after its beep, or hung up on,
+within seconds instead of the several billed turns it takes the model to call
+``detected_answering_machine``. Detection runs in the call's job process, so
+its metrics go through the metrics spool.
+"""
+import asyncio
+import logging
+import re
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import stt as agents_stt
+
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+from .audio_readiness import audio_track
+
+logger = logging.getLogger(__name__)
+
+HUMAN = "human"
+MACHINE = "machine"
+# The cadence of a machine, not confirmed by the transcript: greeted
+LIKELY_MACHINE = "likely_machine"
+UNKNOWN = "unknown"
+
+SAMPLE_RATE = 16000
+
+_decision_seconds = metrics.histogram("amd_decision_seconds", "Time from answer to the answering machine verdict")
+_verdicts = metrics.counter("amd_verdicts_total", "Answering machine detection verdicts")
+
+# Voicemail greetings by language: "please leave a message after the tone", "I can't take your call"...
+_MACHINE_PHRASES = {
+    "en": (
+        r"leave (me |us )?(a |your )?(brief |short )?(message|name|number)"
+        r"|(after|at) the (tone|beep)"
+        r"|voice ?mail|mailbox|answering machine"
+        r"|(not|isn't|is not) available|unavailable"
+        r"|(can't|cannot|can not|unable to) (come to the phone|take your call|answer)"
+        r"|record (your|a) message"
+        r"|get back to you"
+    ),
+    "es": (
+        r"deje (su |un )?(breve )?mensaje"
+        r"|(despu[eé]s de|al o[ií]r) (la se[ñn]al|el tono|el pitido)"
+        r"|buz[oó]n de voz|contestador"
+        r"|no (est[aá]|se encuentra) disponible"
+        r"|no (puedo|podemos) (atender|contestar)"
+    ),
+    "fr": (
+        r"laiss(ez|er) (un |votre )?(court )?message"
+        r"|apr[eè]s le (bip|signal)( sonore)?"
+        r"|messagerie( vocale)?|r[ée]pondeur"
+        r"|(pas|plus) disponible|indisponible|absente? pour le moment"
+    ),
+    "de": (
+        r"hinterlassen sie|nachricht hinterlassen"
+        r"|nach dem (signalton|piepton|ton)"
+        r"|mailbox|anrufbeantworter|sprachnachricht"
+        r"|(nicht|zurzeit nicht|im moment nicht) erreichbar"
+    ),
+}
+_MACHINE_PATTERNS = {
+    language: re.compile(rf"\b({phrases})\b", re.IGNORECASE) for language, phrases in _MACHINE_PHRASES.items()
+}
+
+
+def transcript_language(language: Optional[str]) -> Optional[str]:
+    """The code voicemail phrases are matched in for an agent's language ("es-ES"), None when there are none"""
+    code = (language or "").split("-")[0].lower()
+    return code if code in _MACHINE_PATTERNS else None
+
+
+def machine_phrase(transcript: str, language: str = "en") -> Optional[str]:
+    """The voicemail phrase in a transcript, if it has one"""
+    match = _MACHINE_PATTERNS[language].search(transcript or "")
+    return match.group(0) if match else None
+
+
+def rms(samples: np.ndarray) -> float:
+    """Loudness of 16-bit samples"""
+    if not len(samples):
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+
+
+def is_tone(samples: np.ndarray, sample_rate: int, silence_threshold: float) -> bool:
+    """Whether the samples are a loud pure tone, like a voicemail beep"""
+    if len(samples) < 64 or rms(samples) < silence_threshold:
+        return False
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples)))) ** 2
+    peak = int(np.argmax(spectrum))
+    frequency = peak * sample_rate / len(samples)
+    # A tone's energy is in its bin and the two next to it; speech spreads over harmonics
+    return 300 <= frequency <= 3000 and spectrum[max(0, peak - 1):peak + 2].sum() > 0.7 * spectrum.sum()
+
+
+class CadenceDetector:
+    """
+    Tells a live answer from a recorded greeting by the loudness of the audio over time
+
+    Times are in seconds of audio. Speech shorter than ``min_word_length`` is noise,
+    and gaps shorter than ``between_words_silence`` do not end a word.
+    """
+
+    def __init__(
+        self,
+        initial_silence: float = 2.5,
+        greeting: float = 1.5,
+        after_greeting_silence: float = 0.8,
+        total_time: float = 5.0,
+        min_word_length: float = 0.1,
+        between_words_silence: float = 0.05,
+        maximum_words: int = 3,
+        silence_threshold: float = 300.0,
+    ):
+        self.initial_silence = initial_silence
+        self.greeting = greeting
+        self.after_greeting_silence = after_greeting_silence
+        self.total_time = total_time
+        self.min_word_length = min_word_length
+        self.between_words_silence = between_words_silence
+        self.maximum_words = maximum_words
+        self.silence_threshold = silence_threshold
+
+        self.elapsed = 0.0
+        self.words = 0
+        self.speech_started_at: Optional[float] = None
+        self.verdict: Optional[str] = None
+        self.reason: Optional[str] = None
+        self._in_word = False
+        self._voice_run = 0.0
+        self._silence_run = 0.0
+
+    def _decide(self, verdict: str, reason: str) -> str:
+        self.verdict, self.reason = verdict, reason
+        return verdict
+
+    def push(self, samples: np.ndarray, sample_rate: int) -> Optional[str]:
+        """Analyse the next samples; returns the verdict once there is one"""
+        if self.verdict:
+            return self.verdict
+        duration = len(samples) / sample_rate
+        self.elapsed += duration
+
+        if rms(samples) < self.silence_threshold:
+            self._silence_run += duration
+            if self._silence_run >= self.between_words_silence:
+                self._in_word = False
+                self._voice_run = 0.0
+            if not self.words and self.elapsed >= self.initial_silence:
+                return self._decide(MACHINE, "initial_silence")
+            if self.words and self._silence_run >= self.after_greeting_silence:
+                return self._decide(HUMAN, "after_greeting_silence")
+        else:
+            self._voice_run += duration
+            self._silence_run = 0.0
+            if not self._in_word and self._voice_run >= self.min_word_length:
+                self._in_word = True
+                self.words += 1
+                if self.speech_started_at is None:
+                    self.speech_started_at = self.elapsed - self._voice_run
+                if self.words > self.maximum_words:
+                    return self._decide(MACHINE, "maximum_words")
+            if self.speech_started_at is not None and self.elapsed - self.speech_started_at >= self.greeting:
+                return self._decide(MACHINE, "long_greeting")
+
+        if self.elapsed >= self.total_time:
+            return self._decide(UNKNOWN, "timeout")
+        return None
+
+
+class AmdResult:
+    """The verdict on who answered an outbound call"""
+
+    def __init__(self, verdict: str, reason: str, decision_seconds: float, transcript: str = ""):
+        self.verdict = verdict
+        self.reason = reason
+        # Seconds of the callee's audio it took to decide
+        self.decision_seconds = decision_seconds
+        self.transcript = transcript
+        self.voicemail_left = False
+
+    @property
+    def machine(self) -> bool:
+        """Whether the transcript confirmed a machine, the only verdict not greeted"""
+        return self.verdict == MACHINE
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "verdict": self.verdict,
+            "reason": self.reason,
+            "decisionSeconds": round(self.decision_seconds, 3),
+            "transcript": self.transcript,
+            "voicemailLeft": self.voicemail_left,
+        }
+
+
+class AnsweringMachineDetector:
+    """
+    Cadence and transcript combined
+
+    A voicemail phrase in the transcript decides a machine at once. A human or
+    undecided cadence decides as it is; a machine's cadence waits for the
+    transcript until ``timeout`` and ends ``LIKELY_MACHINE`` without it, at once
+    when ``transcribed`` is False (no transcripts will be pushed).
+    """
+
+    def __init__(self, timeout: float = 5.0, language: str = "en", transcribed: bool = True, **cadence_options):
+        self.cadence = CadenceDetector(total_time=timeout, **cadence_options)
+        self.timeout = timeout
+        self.language = language
+        self.transcribed = transcribed
+        # Seconds of audio pushed, the cadence's verdict included
+        self.elapsed = 0.0
+        self.transcript = ""
+        self.result: Optional[AmdResult] = None
+
+    def push_audio(self, samples: np.ndarray, sample_rate: int) -> Optional[AmdResult]:
+        if self.result is not None:
+            return self.result
+        self.elapsed += len(samples) / sample_rate
+        verdict = self.cadence.push(samples, sample_rate)
+        if verdict in (HUMAN, UNKNOWN):
+            self.result = AmdResult(verdict, self.cadence.reason, self.cadence.elapsed, self.transcript)
+        elif verdict == MACHINE and (not self.transcribed or self.elapsed >= self.timeout):
+            self.result = AmdResult(LIKELY_MACHINE, self.cadence.reason, self.elapsed, self.transcript)
+        return self.result
+
+    def push_transcript(self, text: str) -> Optional[AmdResult]:
+        if self.result is None and text:
+            self.transcript = text
+            if machine_phrase(text, self.language):
+                self.result = AmdResult(MACHINE, "transcript", self.elapsed, text)
+        return self.result
+
+
+class AnsweringMachineListener:
+    """
+    Screens the callee's audio in the room, and afterwards listens for the end of a machine's greeting
+
+    ``stt`` transcribes in ``language``, one of those with voicemail phrases.
+    Without it nothing confirms a machine: the cadence is recorded, and the
+    callee greeted.
+    """
+
+    def __init__(
+        self,
+        room: rtc.Room,
+        participant: rtc.RemoteParticipant,
+        timeout: float,
+        stt: Optional[agents_stt.STT] = None,
+        language: str = "en",
+    ):
+        self.room = room
+        self.participant = participant
+        self.timeout = timeout
+        self.stt = stt
+        self.detector = AnsweringMachineDetector(timeout=timeout, language=language, transcribed=stt is not None)
+        self._stream: Optional[rtc.AudioStream] = None
+        self._stt_stream: Optional[agents_stt.RecognizeStream] = None
+        self._stt_task: Optional[asyncio.Task] = None
+
+    async def _samples(self):
+        async for event in self._stream:
+            if self._stt_stream is not None:
+                self._stt_stream.push_frame(event.frame)
+            yield np.frombuffer(event.frame.data, dtype=np.int16)
+
+    async def _read_transcripts(self):
+        try:
+            async for event in self._stt_stream:
+                if event.type in (agents_stt.SpeechEventType.INTERIM_TRANSCRIPT, agents_stt.SpeechEventType.FINAL_TRANSCRIPT):
+                    if event.alternatives and event.alternatives[0].text:
+                        self.detector.push_transcript(event.alternatives[0].text)
+        except Exception as e:
+            logger.warning(f"Transcription for answering machine detection failed: {e}")
+
+    async def _screen(self) -> AmdResult:
+        track = await audio_track(self.room, self.participant)
+        self._stream = rtc.AudioStream(track, sample_rate=SAMPLE_RATE, num_channels=1)
+        if self.stt is not None:
+            try:
+                self._stt_stream = self.stt.stream()
+                self._stt_task = asyncio.create_task(self._read_transcripts())
+            except Exception as e:
+                logger.warning(f"Could not start transcription for answering machine detection: {e}")
+                self.detector.transcribed = False
+        async for samples in self._samples():
+            # Also set by a transcript in the meantime
+            if self.detector.push_audio(samples, SAMPLE_RATE):
+                break
+        return self.detector.result
+
+    async def detect(self) -> AmdResult:
+        """Decide who answered within ``timeout`` seconds; UNKNOWN when undecided"""
+        started = perf_counter()
+        try:
+            # Bounded in wall time as well, for audio that arrives late or not at all
+            result = await asyncio.wait_for(self._screen(), timeout=self.timeout + 1.0)
+        except asyncio.TimeoutError:
+            result = None
+        if result is None:
+            result = self.detector.result or AmdResult(UNKNOWN, "no_audio", self.detector.elapsed, self.detector.transcript)
+        self.detector.result = result
+
+        elapsed = perf_counter() - started
+        metrics_spool.observe(_decision_seconds.name, elapsed, verdict=result.verdict)
+        metrics_spool.inc(_verdicts.name, verdict=result.verdict, reason=result.reason)
+        logger.info(
+            f"Answering machine detection: {result.verdict} ({result.reason}) after {elapsed * 1000:.0f} ms"
+            + (f", transcript {result.transcript!r}" if result.transcript else "")
+        )
+        return result
+
+    async def wait_for_beep(self, max_wait: float, end_silence: float = 2.0) -> bool:
+        """
+        Wait until a machine's greeting is over: its beep ended, or ``end_silence`` seconds of silence
+
+        Returns:
+            False when ``max_wait`` seconds passed first
+        """
+        if self._stream is None:
+            return False
+        threshold = self.detector.cadence.silence_threshold
+
+        async def greeting_over():
+            tone = 0.0
+            silence = 0.0
+            async for samples in self._samples():
+                duration = len(samples) / SAMPLE_RATE
+                if is_tone(samples, SAMPLE_RATE, threshold):
+                    tone += duration
+                    silence = 0.0
+                    continue
+                if tone >= 0.1:
+                    # The beep just ended
+                    return
+                tone = 0.0
+                silence = silence + duration if rms(samples) < threshold else 0.0
+                if silence >= end_silence:
+                    return
+
+        try:
+            await asyncio.wait_for(greeting_over(), timeout=max_wait)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def aclose(self):
+        if self._stt_stream is not None:
+            try:
+                self._stt_stream.end_input()
+                await self._stt_stream.aclose()
+            except Exception as e:
+                logger.debug(f"Error closing the answering machine transcription: {e}")
+        if self._stt_task is not None:
+            self._stt_task.cancel()
+        if self._stream is not None:
+            await self._stream.aclose()
+
+
+async def leave_voicemail(room: rtc.Room, audio):
+    """Play pre-synthesized audio (a ``GreetingAudio``) into the room on a track of its own, until it has been heard"""
+    source = rtc.AudioSource(audio.sample_rate, audio.num_channels)
+    track = rtc.LocalAudioTrack.create_audio_track("voicemail", source)
+    publication = await room.local_participant.publish_track(
+        track, rtc.TrackPublishOptions(source=rtc.TrackSource.SOURCE_MICROPHONE)
+    )
+    try:
+        async for frame in audio.frames():
+            await source.capture_frame(frame)
+        await source.wait_for_playout()
+    finally:
+        await room.local_participant.unpublish_track(publication.sid)
+        await source.aclose()
@@ -0,0 +1,106 @@
+"""
+Event-driven readiness checks for the start of a call.
+
+Instead of sleeping a fixed time before greeting, wait for the caller's audio to
+actually be flowing: their audio track subscribed and a first frame received.
+The wait is bounded, so a caller who stays silent on a muted line is still
+greeted promptly. Calls run in job processes, so timings go through the
+metrics spool.
+"""
+import asyncio
+import logging
+from time import perf_counter
+from typing import Optional
+
+from livekit import rtc
+from livekit.agents import AgentSession
+
+from ..core.call_setup import CallSetupTrace
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+
+logger = logging.getLogger(__name__)
+
+_ready_seconds = metrics.histogram("call_audio_ready_seconds", "Time spent waiting for the caller's audio before greeting")
+_first_audio_seconds = metrics.histogram("call_first_audio_seconds", "Time from call answer to the agent's first audio")
+
+
+def _subscribed_audio_track(participant: rtc.RemoteParticipant) -> Optional[rtc.RemoteAudioTrack]:
+    for publication in participant.track_publications.values():
+        if publication.kind == rtc.TrackKind.KIND_AUDIO and publication.subscribed and publication.track:
+            return publication.track
+    return None
+
+
+async def audio_track(room: rtc.Room, participant: rtc.RemoteParticipant) -> rtc.RemoteAudioTrack:
+    """The participant's audio track, once it is subscribed"""
+    track = _subscribed_audio_track(participant)
+    if track is not None:
+        return track
+
+    subscribed: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def on_track_subscribed(track: rtc.Track, publication: rtc.RemoteTrackPublication, remote: rtc.RemoteParticipant):
+        if remote.identity == participant.identity and track.kind == rtc.TrackKind.KIND_AUDIO and not subscribed.done():
+            subscribed.set_result(track)
+
+    room.on("track_subscribed", on_track_subscribed)
+    try:
+        # It may have been subscribed between the first check and registering the handler
+        track = _subscribed_audio_track(participant)
+        return track if track is not None else await subscribed
+    finally:
+        room.off("track_subscribed", on_track_subscribed)
+
+
+async def _first_frame(track: rtc.RemoteAudioTrack):
+    stream = rtc.AudioStream(track)
+    try:
+        async for _ in stream:
+            return
+    finally:
+        await stream.aclose()
+
+
+async def wait_for_audio_ready(room: rtc.Room, participant: rtc.RemoteParticipant, timeout: float) -> bool:
+    """
+    Wait until the caller's audio track is subscribed and delivering frames
+
+    Returns:
+        True when audio is flowing, False when ``timeout`` seconds passed first
+    """
+    started = perf_counter()
+
+    async def ready():
+        await _first_frame(await audio_track(room, participant))
+
+    try:
+        await asyncio.wait_for(ready(), timeout=timeout)
+        ok = True
+    except asyncio.TimeoutError:
+        ok = False
+    elapsed = perf_counter() - started
+    metrics_spool.observe(_ready_seconds.name, elapsed, ready=str(ok).lower())
+    if ok:
+        logger.info(f"Caller audio ready after {elapsed * 1000:.0f} ms")
+    else:
+        logger.warning(f"Caller audio not ready after {timeout:.1f}s, greeting anyway")
+    return ok
+
+
+def track_first_audio(session: AgentSession, answered_at: float, setup_trace: Optional[CallSetupTrace] = None):
+    """Log and record the time from call answer to the agent first speaking, and finish the setup trace"""
+
+    def on_agent_state_changed(event):
+        if event.new_state != "speaking":
+            return
+        session.off("agent_state_changed", on_agent_state_changed)
+        elapsed = perf_counter() - answered_at
+        metrics_spool.observe(_first_audio_seconds.name, elapsed)
+        logger.info(f"Call answer to first agent audio: {elapsed * 1000:.0f} ms")
+        if setup_trace is not None:
+            # Greeting generation: from the end of the last setup step to the first audio
+            setup_trace.record("first_audio", setup_trace.end())
+            setup_trace.finish()
+
+    session.on("agent_state_changed", on_agent_state_changed)
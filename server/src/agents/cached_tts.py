@@ -0,0 +1,307 @@
+"""
+TTS with a phrase cache in front of it
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import aiohttp
+from livekit.agents import tokenize, tts as agents_tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+from livekit.plugins import cartesia, openai
+
+from ..core.config import settings
+from ..core.voice_config import OPENAI_TO_CARTESIA_MAPPING, get_cartesia_voice, get_cartesia_language_code
+from ..models import Agent as AgentModel
+from ..services.greeting_cache import GreetingAudio, greeting_cache, synthesize
+from ..services.tts_cache import admit_phrase, is_cacheable, phrase_key, record_lookup, tool_phrases, tts_cache
+
+logger = logging.getLogger(__name__)
+
+# The wrapped TTS retries on its own
+_NO_RETRY = APIConnectOptions(max_retry=0, timeout=DEFAULT_API_CONNECT_OPTIONS.timeout)
+
+
+class CachedTTS(agents_tts.TTS):
+    """
+    Serves short recurring phrases from the TTS phrase cache and synthesizes the rest
+
+    Text is looked up one sentence at a time. Sentences that miss are
+    synthesized by the wrapped TTS, through its own streaming API when it has
+    one (e.g. the Cartesia websocket), so audio still starts before the whole
+    sentence is synthesized. Audio is only stored for phrases spoken in several
+    calls, so what one caller is told (names, order details) is never kept.
+    """
+
+    def __init__(self, tts: agents_tts.TTS, voice: str, language: str, call_id: str = ""):
+        super().__init__(
+            capabilities=agents_tts.TTSCapabilities(streaming=tts.capabilities.streaming),
+            sample_rate=tts.sample_rate,
+            num_channels=tts.num_channels,
+        )
+        self.wrapped = tts
+        self.voice = voice
+        self.language = language
+        self.call_id = call_id
+
+        @tts.on("metrics_collected")
+        def forward_metrics(*args, **kwargs):
+            self.emit("metrics_collected", *args, **kwargs)
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> agents_tts.ChunkedStream:
+        return _CachedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> agents_tts.SynthesizeStream:
+        return _CachedSynthesizeStream(tts=self, conn_options=conn_options)
+
+    def prewarm(self):
+        self.wrapped.prewarm()
+
+    async def aclose(self):
+        await self.wrapped.aclose()
+
+    async def speak(self, text: str, push: Callable[[bytes], None], conn_options: APIConnectOptions):
+        """Push the audio of one sentence, from the cache or the wrapped TTS"""
+        key = phrase_key(self.voice, self.language, text) if is_cacheable(text) else None
+        if key is not None:
+            audio = await tts_cache.get(key)
+            if audio is not None and (audio.sample_rate, audio.num_channels) == (self.sample_rate, self.num_channels):
+                record_lookup("hit")
+                push(audio.pcm)
+                return
+            record_lookup("miss")
+        else:
+            record_lookup("skip")
+
+        chunks = []
+        if self.wrapped.capabilities.streaming:
+            stream = self.wrapped.stream(conn_options=conn_options)
+            try:
+                stream.push_text(text)
+                stream.end_input()
+                async for event in stream:
+                    data = event.frame.data.tobytes()
+                    push(data)
+                    chunks.append(data)
+            finally:
+                await stream.aclose()
+        else:
+            async with self.wrapped.synthesize(text, conn_options=conn_options) as stream:
+                async for event in stream:
+                    data = event.frame.data.tobytes()
+                    push(data)
+                    chunks.append(data)
+        if key is not None and chunks and await admit_phrase(key, self.call_id):
+            await tts_cache.put(key, GreetingAudio(b"".join(chunks), self.sample_rate, self.num_channels))
+
+
+class _CachedChunkedStream(agents_tts.ChunkedStream):
+    def __init__(self, *, tts: CachedTTS, input_text: str, conn_options: APIConnectOptions):
+        super().__init__(tts=tts, input_text=input_text, conn_options=_NO_RETRY)
+        self._cached_tts = tts
+        self._wrapped_conn_options = conn_options
+
+    async def _run(self, output_emitter: agents_tts.AudioEmitter):
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._cached_tts.sample_rate,
+            num_channels=self._cached_tts.num_channels,
+            mime_type="audio/pcm",
+        )
+        await self._cached_tts.speak(self.input_text, output_emitter.push, self._wrapped_conn_options)
+
+
+class _CachedSynthesizeStream(agents_tts.SynthesizeStream):
+    """Splits streamed text into sentences and speaks them in order"""
+
+    def __init__(self, *, tts: CachedTTS, conn_options: APIConnectOptions):
+        super().__init__(tts=tts, conn_options=_NO_RETRY)
+        self._cached_tts = tts
+        self._wrapped_conn_options = conn_options
+        self._sentences = tokenize.blingfire.SentenceTokenizer(retain_format=True).stream()
+
+    async def _metrics_monitor_task(self, event_aiter):
+        pass  # The wrapped TTS reports its own metrics
+
+    async def _run(self, output_emitter: agents_tts.AudioEmitter):
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._cached_tts.sample_rate,
+            num_channels=self._cached_tts.num_channels,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+
+        async def forward_input():
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    self._sentences.flush()
+                    continue
+                self._sentences.push_text(data)
+            self._sentences.end_input()
+
+        async def speak_sentences():
+            async for event in self._sentences:
+                text = event.token.strip()
+                if text:
+                    await self._cached_tts.speak(text, output_emitter.push, self._wrapped_conn_options)
+                    output_emitter.flush()
+
+        tasks = [asyncio.create_task(forward_input()), asyncio.create_task(speak_sentences())]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await utils.aio.cancel_and_wait(*tasks)
+
+
+def resolve_tts_voice(agent_config: AgentModel) -> Dict[str, str]:
+    """
+    Voices a pipeline agent speaks with
+
+    Returns:
+        ``cartesiaVoice`` and ``cartesiaLanguage`` for Cartesia, ``openaiVoice`` for the OpenAI fallback
+    """
+    # Get appropriate voice for the language
+    if agent_config.voice and isinstance(agent_config.voice, str) and agent_config.voice.startswith(("794", "a0e", "f78", "c79")):
+        # If a specific Cartesia voice ID is provided, use it
+        voice_type = "custom"
+        voice_id = agent_config.voice
+    else:
+        # Map OpenAI voices to Cartesia voice types
+        if agent_config.voice in OPENAI_TO_CARTESIA_MAPPING:
+            voice_type = OPENAI_TO_CARTESIA_MAPPING[agent_config.voice]
+        elif agent_config.voice in ["male", "female", "professional"]:
+            voice_type = agent_config.voice
+        else:
+            voice_type = "default"
+
+        voice_id = get_cartesia_voice(agent_config.language or "en-US", voice_type)
+
+    logger.info(f"Selected Cartesia voice: {voice_id} (type: {voice_type}) for language: {agent_config.language}")
+    return {
+        "cartesiaVoice": voice_id,
+        "cartesiaLanguage": get_cartesia_language_code(agent_config.language or "en-US"),
+        "openaiVoice": agent_config.voice or "ash",
+    }
+
+
+def create_tts(
+    agent_config: AgentModel,
+    http_session: Optional[aiohttp.ClientSession] = None,
+    voice_settings: Optional[Dict[str, str]] = None,
+    call_id: str = "",
+) -> Tuple[agents_tts.TTS, str]:
+    """
+    Create the TTS of a pipeline agent: Cartesia with the agent's voice, OpenAI when Cartesia is unavailable
+
+    Args:
+        voice_settings: Voices already resolved by ``resolve_tts_voice``, e.g. from a published agent bundle
+        call_id: The call the TTS speaks in; phrases are admitted to the cache once spoken in enough calls
+
+    Returns:
+        The TTS, wrapped in ``CachedTTS`` when the phrase cache is enabled, and the voice
+        it speaks with as ``provider:voice``
+    """
+    voice_settings = voice_settings or resolve_tts_voice(agent_config)
+    voice_id = voice_settings["cartesiaVoice"]
+    openai_voice = voice_settings["openaiVoice"]
+
+    try:
+        # Check if Cartesia API key is available
+        if not settings.cartesia_api_key:
+            logger.warning("Cartesia API key not found, falling back to OpenAI TTS")
+            tts = openai.TTS(model="tts-1", voice=openai_voice)
+            voice = f"openai:{openai_voice}"
+            logger.info(f"Using OpenAI TTS with voice: {openai_voice}")
+        else:
+            tts = cartesia.TTS(
+                model="sonic-2",
+                voice=voice_id,
+                language=voice_settings["cartesiaLanguage"],
+                http_session=http_session,
+            )
+            voice = f"cartesia:{voice_id}"
+            logger.info("Cartesia TTS created successfully")
+    except Exception as e:
+        logger.error(f"Failed to create TTS: {e}")
+        # Try OpenAI as fallback
+        logger.info("Falling back to OpenAI TTS due to Cartesia error")
+        tts = openai.TTS(model="tts-1", voice=openai_voice)
+        voice = f"openai:{openai_voice}"
+
+    if settings.tts_cache_enabled:
+        tts = CachedTTS(tts, voice, agent_config.language or "", call_id=call_id)
+    return tts, voice
+
+
+async def precompute_tool_phrases(agent_config: AgentModel, tools: Iterable[Dict[str, Any]]) -> int:
+    """
+    Synthesize the static tool responses of an agent into the phrase cache
+
+    Returns:
+        How many phrases were synthesized
+    """
+    if not settings.tts_cache_enabled:
+        return 0
+    phrases = tool_phrases(tools)
+    if not phrases:
+        return 0
+
+    synthesized = 0
+    async with aiohttp.ClientSession() as http_session:
+        tts, voice = create_tts(agent_config, http_session=http_session)
+        wrapped = tts.wrapped if isinstance(tts, CachedTTS) else tts
+        try:
+            for phrase in phrases:
+                key = phrase_key(voice, agent_config.language or "", phrase)
+                if await tts_cache.get(key) is not None:
+                    continue
+                try:
+                    audio = await synthesize(wrapped, phrase)
+                except Exception as e:
+                    logger.warning(f"Could not precompute TTS for {phrase!r}: {e}")
+                    continue
+                if audio.pcm:
+                    await tts_cache.put(key, audio)
+                    synthesized += 1
+        finally:
+            await tts.aclose()
+    logger.info(f"Precomputed {synthesized} of {len(phrases)} tool phrases for agent {agent_config.id}")
+    return synthesized
+
+
+async def voicemail_audio(
+    agent_config: AgentModel,
+    voice_settings: Optional[Dict[str, str]] = None,
+    http_session: Optional[aiohttp.ClientSession] = None,
+) -> Optional[GreetingAudio]:
+    """
+    The agent's voicemail message as audio, from the greeting audio cache
+
+    Synthesized and cached on a miss, so it is ready for the next call; the API
+    synthesizes it ahead of time whenever the message changes.
+
+    Returns:
+        None when the agent has no voicemail message or it could not be synthesized
+    """
+    text = agent_config.voicemail_message
+    if not text:
+        return None
+    tts, voice = create_tts(agent_config, http_session=http_session, voice_settings=voice_settings)
+    key = greeting_cache.key(agent_config.id, voice, agent_config.language or "", text)
+    try:
+        audio = await greeting_cache.get(key)
+        if audio is not None:
+            return audio
+        audio = await synthesize(tts.wrapped if isinstance(tts, CachedTTS) else tts, text)
+        if not audio.pcm:
+            return None
+        await greeting_cache.put(key, audio)
+        logger.info(f"Cached voicemail audio of agent {agent_config.id} ({audio.duration:.1f}s)")
+        return audio
+    except Exception as e:
+        logger.warning(f"Could not synthesize the voicemail message of agent {agent_config.id}: {e}")
+        return None
+    finally:
+        await tts.aclose()
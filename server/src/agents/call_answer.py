@@ -0,0 +1,183 @@
+"""
+Event-driven answer detection for outbound calls.
+
+After dialing, the SIP participant's ``sip.callStatus`` attribute moves from
+``dialing`` through ``ringing`` to ``active`` once the callee picks up, and the
+participant leaves the room when the call fails, its disconnect reason telling
+busy from unanswered. Instead of polling the attribute, ``AnswerDetector``
+listens to the room's events, subscribing before the dial so nothing is missed,
+and resolves on the first event that decides the call, bounded by the ring
+timeout.
+
+Audio published before the answer is early media: ringback tones and carrier
+announcements. By default it does not answer the call; trunks that never
+signal the answer can be configured to take it as one. Dialing runs in the
+call's job process, so ring times go through the metrics spool.
+"""
+import asyncio
+import logging
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+from livekit import rtc
+
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+from ..models import CallStatus
+
+logger = logging.getLogger(__name__)
+
+# What audio before the answer means, see OUTBOUND_EARLY_MEDIA
+EARLY_MEDIA_RING = "ring"
+EARLY_MEDIA_ANSWER = "answer"
+
+_ring_seconds = metrics.histogram("outbound_ring_seconds", "Time from dialing to an outbound call being answered or given up")
+
+# Participant disconnect reasons of calls that never got answered
+_DISCONNECT_OUTCOMES = {
+    rtc.DisconnectReason.USER_REJECTED: CallStatus.BUSY,
+    rtc.DisconnectReason.USER_UNAVAILABLE: CallStatus.NO_ANSWER,
+    rtc.DisconnectReason.SIP_TRUNK_FAILURE: CallStatus.FAILED,
+    rtc.DisconnectReason.JOIN_FAILURE: CallStatus.FAILED,
+    rtc.DisconnectReason.MEDIA_FAILURE: CallStatus.FAILED,
+}
+
+# SIP response codes of a dial request that failed outright
+_SIP_STATUS_OUTCOMES = {
+    "486": CallStatus.BUSY,
+    "600": CallStatus.BUSY,
+    "603": CallStatus.BUSY,
+    "408": CallStatus.NO_ANSWER,
+    "480": CallStatus.NO_ANSWER,
+    "487": CallStatus.NO_ANSWER,
+}
+
+
+class DialOutcome:
+    """How dialing an outbound call ended"""
+
+    def __init__(
+        self,
+        status: CallStatus,
+        ring_seconds: float,
+        early_media: bool = False,
+        sip_status: Optional[str] = None,
+    ):
+        self.status = status
+        self.ring_seconds = ring_seconds
+        self.early_media = early_media
+        self.sip_status = sip_status
+
+    @property
+    def answered(self) -> bool:
+        return self.status == CallStatus.ACTIVE
+
+    @classmethod
+    def dial_failed(cls, error: Exception, ring_seconds: float) -> "DialOutcome":
+        """The outcome of a dial request the SIP service rejected"""
+        sip_status = str((getattr(error, "metadata", None) or {}).get("sip_status_code") or "") or None
+        return cls(_SIP_STATUS_OUTCOMES.get(sip_status, CallStatus.FAILED), ring_seconds, sip_status=sip_status)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "outcome": self.status.value,
+            "ringSeconds": round(self.ring_seconds, 3),
+            "earlyMedia": self.early_media,
+            "sipStatus": self.sip_status,
+        }
+
+
+class AnswerDetector:
+    """
+    Waits for the SIP participant ``identity`` to answer, from room events
+
+    Create it before dialing, then ``await wait(ring_timeout)``.
+    """
+
+    def __init__(self, room: rtc.Room, identity: str, early_media: str = EARLY_MEDIA_RING):
+        self.room = room
+        self.identity = identity
+        self.early_media_answers = early_media == EARLY_MEDIA_ANSWER
+        self.early_media = False
+        self.started = perf_counter()
+        self._outcome: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._resolved_at: Optional[float] = None
+        self._handlers = {
+            "participant_connected": self._on_participant_connected,
+            "participant_attributes_changed": self._on_attributes_changed,
+            "track_published": self._on_track_published,
+            "participant_disconnected": self._on_participant_disconnected,
+        }
+        for event, handler in self._handlers.items():
+            room.on(event, handler)
+
+    async def wait(self, ring_timeout: float) -> DialOutcome:
+        """How the call ended up: answered (ACTIVE), BUSY, NO_ANSWER, HANGUP or FAILED"""
+        # The participant may have joined, or even answered, before this
+        participant = self.room.remote_participants.get(self.identity)
+        if participant is not None:
+            self._on_participant_connected(participant)
+
+        try:
+            status = await asyncio.wait_for(self._outcome, timeout=ring_timeout)
+        except asyncio.TimeoutError:
+            status = CallStatus.NO_ANSWER
+            logger.info(f"call to {self.identity} not answered within {ring_timeout:.0f}s")
+        finally:
+            self.close()
+        return self._finish(status)
+
+    def cancelled(self, error: Exception) -> DialOutcome:
+        """Stop listening after the dial request itself failed"""
+        self.close()
+        outcome = DialOutcome.dial_failed(error, perf_counter() - self.started)
+        metrics_spool.observe(_ring_seconds.name, outcome.ring_seconds, outcome=outcome.status.value)
+        return outcome
+
+    def close(self):
+        for event, handler in self._handlers.items():
+            self.room.off(event, handler)
+
+    def _finish(self, status: CallStatus) -> DialOutcome:
+        outcome = DialOutcome(status, (self._resolved_at or perf_counter()) - self.started, early_media=self.early_media)
+        metrics_spool.observe(_ring_seconds.name, outcome.ring_seconds, outcome=status.value)
+        logger.info(f"call to {self.identity}: {status.value} after {outcome.ring_seconds:.1f}s")
+        return outcome
+
+    def _resolve(self, status: CallStatus):
+        if not self._outcome.done():
+            self._resolved_at = perf_counter()
+            self._outcome.set_result(status)
+
+    def _on_call_status(self, participant: rtc.RemoteParticipant, call_status: Optional[str]):
+        if call_status == "active":
+            self._resolve(CallStatus.ACTIVE)
+        elif call_status == "hangup":
+            self._resolve(_DISCONNECT_OUTCOMES.get(participant.disconnect_reason, CallStatus.HANGUP))
+        # "dialing", "ringing" and "automation" (DTMF dialing) keep waiting
+
+    def _on_participant_connected(self, participant: rtc.RemoteParticipant):
+        if participant.identity != self.identity:
+            return
+        self._on_call_status(participant, participant.attributes.get("sip.callStatus"))
+        for publication in participant.track_publications.values():
+            self._on_track_published(publication, participant)
+
+    def _on_attributes_changed(self, changed_attributes: Dict[str, str], participant: rtc.Participant):
+        if participant.identity == self.identity and "sip.callStatus" in changed_attributes:
+            self._on_call_status(participant, changed_attributes["sip.callStatus"])
+
+    def _on_track_published(self, publication: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
+        if participant.identity != self.identity or publication.kind != rtc.TrackKind.KIND_AUDIO:
+            return
+        if participant.attributes.get("sip.callStatus") == "active" or self._outcome.done():
+            return
+        if not self.early_media:
+            self.early_media = True
+            logger.info(f"early media from {self.identity} before the answer")
+        if self.early_media_answers:
+            self._resolve(CallStatus.ACTIVE)
+
+    def _on_participant_disconnected(self, participant: rtc.RemoteParticipant):
+        if participant.identity == self.identity:
+            self._resolve(_DISCONNECT_OUTCOMES.get(participant.disconnect_reason, CallStatus.HANGUP))
@@ -4,19 +4,37 @@ import logging
 from typing import Optional, Dict, Any, Annotated
 from time import perf_counter
 
+from google.protobuf.duration_pb2 import Duration
 from livekit import agents, rtc, api
-from livekit.agents import llm, AutoSubscribe, JobContext, WorkerOptions, cli, AgentSession, Agent, RoomInputOptions, function_tool, RunContext
-from livekit.plugins import openai, deepgram, cartesia, silero, noise_cancellation
+from livekit.agents import llm, AutoSubscribe, JobContext, JobExecutorType, JobProcess, WorkerOptions, cli, AgentSession, Agent, RoomInputOptions
+from livekit.plugins import openai, deepgram, silero, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 from ..core.config import settings
-from ..core.voice_config import get_cartesia_voice, get_cartesia_language_code
-from ..models import Agent as AgentModel, Tool
+from ..models import Agent as AgentModel, CallStatus, Tool, ToolExecutionResponse
 from ..services.tool_executor import ToolExecutor
+from ..services.sms_service import sms_service
+from ..services.usage_recorder import usage_recorder
+from ..services.order_parser import OrderParser, get_order_parser, format_order_lines
+from ..services.appointment_service import get_appointment_book
+from ..services.greeting_cache import greeting_cache
+from ..core.call_setup import CallSetupTrace
+from ..core.metrics_spool import metrics_spool
+from .agent_bundle import STT_MODEL, AgentBundle, compile_bundle, is_generated_tool, load_bundle, store_bundle
+from .answering_machine import AmdResult, AnsweringMachineListener, leave_voicemail, transcript_language
+from .audio_readiness import track_first_audio, wait_for_audio_ready
+from .call_answer import AnswerDetector, DialOutcome
+from .cached_tts import create_tts, voicemail_audio
+from .turn_metrics import TurnMetrics
 # from .custom_tts import PreprocessedTTS  # TODO: Fix this to properly inherit from TTS
 
 logger = logging.getLogger(__name__)
 
+_background_tasks = set()
+
+# Participant identity of the callee of outbound calls
+OUTBOUND_IDENTITY = "phone_user"
+
 
 class CallActions(llm.ToolContext):
     """Function context for handling call actions and tools"""
@@ -27,38 +45,30 @@ class CallActions(llm.ToolContext):
         api: api.LiveKitAPI,
         participant: rtc.RemoteParticipant,
         room: rtc.Room,
-        agent_config: AgentModel,
+        bundle: AgentBundle,
         tool_executor: ToolExecutor,
-        preloaded_tools: Optional[Dict[str, Any]] = None,
     ):
         # Store instance variables first
         self.api = api
         self.participant = participant
         self.room = room
-        self.agent_config = agent_config
+        self.bundle = bundle
+        self.agent_config = bundle.agent
         self.tool_executor = tool_executor
-        self.preloaded_tools = preloaded_tools or {}
+        self.preloaded_tools = bundle.tools
+        self.order_parser = self._load_order_parser()
+        self.appointment_book = get_appointment_book(self.agent_config)
         
-        # Build custom tools from agent configuration (loaded from DB)
-        tools = []
-        
-        if agent_config.tools:
-            logger.info(f"Loading {len(agent_config.tools)} tools for agent {agent_config.name}")
-            for tool_id in agent_config.tools:
-                # Create a dynamic tool function for each configured tool from DB
-                tool_info = self.preloaded_tools.get(tool_id)
-                dynamic_tool = self._create_dynamic_tool(tool_id, tool_info)
-                if dynamic_tool:
-                    tools.append(dynamic_tool)
-                    tool_name = tool_info.name if tool_info else tool_id
-                    logger.info(f"✓ Loaded tool: {tool_name} ({tool_id})")
-                else:
-                    logger.warning(f"✗ Failed to load tool: {tool_id}")
-        else:
-            logger.warning(f"No tools configured for agent {agent_config.name}")
+        # Tools compiled once per bundle; they reach this call through the session's userdata
+        tools = list(bundle.tool_definitions())
         
         # Initialize parent with tools
         super().__init__(tools=tools)
+        
+        # Built-in methods are not part of _tools, so expose the booking tools explicitly
+        if self.appointment_book:
+            self._tools.extend([self.look_up_availability, self.confirm_appointment])
+            logger.info(f"✓ Loaded appointment tools for staff: {', '.join(self.appointment_book.resources)}")
 
     async def hangup(self):
         """End the call"""
@@ -81,29 +91,37 @@ class CallActions(llm.ToolContext):
     @llm.function_tool
     async def look_up_availability(
         self,
-        date: Annotated[str, "The date of the appointment to check availability for"],
+        date: Annotated[str, "The date to check, e.g. 'tomorrow', 'Friday' or '2025-07-05'"],
+        staff: Annotated[str, "Stylist or doctor the caller asked for, empty for anyone"] = "",
+        duration_minutes: Annotated[int, "Length of the appointment in minutes, 0 for the standard length"] = 0,
     ):
-        """Called when the user asks about alternative appointment availability"""
-        logger.info(f"looking up availability for {self.participant.identity} on {date}")
-        await asyncio.sleep(1)  # Simulate API call
-        return json.dumps(
-            {
-                "available_times": ["10:00 AM", "2:00 PM", "4:00 PM"],
-                "date": date,
-            }
-        )
+        """Called when the user asks which appointment times are available"""
+        logger.info(f"looking up availability for {self.participant.identity} on {date} (staff: {staff or 'any'})")
+        result = await self.appointment_book.availability(date, staff, duration_minutes)
+        return json.dumps(result)
 
     @llm.function_tool
     async def confirm_appointment(
         self,
         date: Annotated[str, "date of the appointment"],
-        time: Annotated[str, "time of the appointment"],
+        time: Annotated[str, "time of the appointment, e.g. '2:30 PM'"],
+        customer_name: Annotated[str, "name the appointment is booked under"] = "",
+        staff: Annotated[str, "Stylist or doctor the caller asked for, empty for anyone"] = "",
+        duration_minutes: Annotated[int, "Length of the appointment in minutes, 0 for the standard length"] = 0,
     ):
         """Called when the user confirms their appointment on a specific date"""
         logger.info(
             f"confirming appointment for {self.participant.identity} on {date} at {time}"
         )
-        return "Appointment confirmed successfully"
+        result = await self.appointment_book.book(
+            date,
+            time,
+            customer_name=customer_name or None,
+            customer_phone=self.participant.attributes.get('sip.phoneNumber') or self.participant.identity,
+            staff=staff,
+            duration_minutes=duration_minutes,
+        )
+        return json.dumps(result)
 
     @llm.function_tool
     async def detected_answering_machine(self):
@@ -111,196 +129,68 @@ class CallActions(llm.ToolContext):
         logger.info(f"detected answering machine for {self.participant.identity}")
         await self.hangup()
 
-    def _create_dynamic_tool(self, tool_id: str, tool_info: Optional[Any] = None):
-        """Create a dynamic tool function from tool configuration loaded from DB"""
-        try:
-            logger.debug(f"Creating dynamic tool for ID: {tool_id}")
-            
-            # Create a closure to capture tool_id
-            def make_tool_func(captured_tool_id: str):
-                async def tool_func(context: RunContext):
-                    """Execute a custom tool with RunContext"""
-                    logger.info(f"🔧 TOOL CALLED: {captured_tool_id} - Starting execution...")
-                    logger.info(f"🔧 RunContext type: {type(context)}")
-                    logger.info(f"🔧 RunContext attributes: {dir(context)}")
-                    
-                    try:
-                        # No parameters needed for menu tools
-                        params = {}
-                        logger.info(f"🔧 Tool parameters prepared: {params}")
-                        
-                        # Get tool info
-                        logger.info(f"🔧 Fetching tool from database: {captured_tool_id}")
-                        tool = await self.tool_executor.get_tool(captured_tool_id)
-                        if not tool:
-                            logger.error(f"🔧 ERROR: Tool {captured_tool_id} not found in database")
-                            return {"error": f"Tool {captured_tool_id} not found"}
-                        
-                        logger.info(f"🔧 Tool found - Name: {tool.name}, Type: {tool.type}")
-                        logger.info(f"🔧 Tool description: {tool.description or 'No description provided'}")
-                        logger.info(f"🔧 Tool enabled: {tool.enabled}")
-                        logger.info(f"🔧 Tool configuration keys: {list(tool.configuration.keys()) if tool.configuration else 'None'}")
-                        if tool.configuration:
-                            logger.info(f"🔧 Tool configuration full content: {tool.configuration}")
-                            if 'menuItems' in tool.configuration:
-                                logger.info(f"🔧 Menu items count: {len(tool.configuration['menuItems'])}")
-                                for i, item in enumerate(tool.configuration['menuItems'][:3]):  # Show first 3
-                                    logger.info(f"🔧 Menu item {i+1}: {item}")
-                        else:
-                            logger.error(f"🔧 ERROR: Tool {tool.name} has NO configuration data!")
-                        
-                        # Execute the tool
-                        logger.info(f"🔧 Executing tool via ToolExecutor...")
-                        result = await self.tool_executor.execute(captured_tool_id, params)
-                        logger.info(f"🔧 Tool executor returned result - Success: {result.success}")
-                        
-                        if result.success:
-                            logger.info(f"🔧 SUCCESS: Tool {tool.name} executed successfully")
-                            logger.info(f"🔧 Result type: {type(result.result)}")
-                            logger.info(f"🔧 Result preview: {str(result.result)[:200]}...")
-                            return result.result
-                        else:
-                            logger.error(f"🔧 FAILED: Tool {tool.name} execution failed")
-                            logger.error(f"🔧 Error details: {result.error}")
-                            return {"error": result.error}
-                            
-                    except Exception as e:
-                        logger.error(f"🔧 EXCEPTION: Error executing tool {captured_tool_id}")
-                        logger.error(f"🔧 Exception type: {type(e).__name__}")
-                        logger.error(f"🔧 Exception message: {str(e)}")
-                        import traceback
-                        logger.error(f"🔧 Exception traceback: {traceback.format_exc()}")
-                        return {"error": f"Tool execution failed: {str(e)}"}
-                
-                # Set unique function name before returning
-                func_name = f"tool_{captured_tool_id.replace('-', '_')}"
-                tool_func.__name__ = func_name
-                # Create a more descriptive docstring
-                tool_func.__doc__ = f"Execute tool {captured_tool_id}. Call this tool to retrieve information."
-                
-                return tool_func
-            
-            # Create the function with unique name
-            dynamic_func = make_tool_func(tool_id)
-            
-            # Apply the decorator with proper name and description using current function_tool
-            if tool_info:
-                # Create a clear, unambiguous description using proper function_tool
-                logger.info(f"🔧 REGISTERING TOOL: {tool_info.name} (ID: {tool_id})")
-                
-                # Provide default description if empty/None
-                description = tool_info.description or ""
-                if not description.strip():
-                    default_descriptions = {
-                        "menu": "Returns the complete restaurant menu with all items and prices. USE THIS TOOL ONLY WHEN: customer asks 'What's on the menu?', 'What food do you have?', 'What can I order?', 'Do you have pizza?', 'How much does X cost?', 'What are your prices?'. DO NOT USE THIS TOOL WHEN: customer wants to place an order.",
-                        "faq": "Answer frequently asked questions about the business. USE THIS TOOL ONLY WHEN: customer asks common questions about hours, location, policies, services, etc.",
-                        "order": "Processes a customer's order after they have decided what to purchase. USE THIS TOOL ONLY WHEN: customer says 'I want to order X', 'I'll have the X', 'Can I get X', or explicitly states they want to place an order."
-                    }
-                    description = default_descriptions.get(tool_id, f"Execute {tool_info.name} tool to retrieve information.")
-                
-                logger.info(f"🔧 Tool description: {description}")
-                logger.info(f"🔧 Checking for JSON schema - hasattr: {hasattr(tool_info, 'json_schema')}")
-                if hasattr(tool_info, 'json_schema'):
-                    logger.info(f"🔧 JSON schema value: {tool_info.json_schema}")
-                
-                # Special handling for order tools to create proper parameter extraction
-                if tool_info.name.lower() == 'order' and tool_info.type in ['ai_generated', 'reference']:
-                    logger.info(f"🔧 Creating typed order function for proper parameter extraction")
-                    from typing import Annotated
-                    
-                    async def order_tool_func(
-                        customer_name: Annotated[str, "Full name of the customer placing the order"],
-                        items: Annotated[str, "Complete list of items being ordered with quantities (e.g. '2 Pepperoni Passion pizzas, 1 Caesar Salad')"],
-                        phone_number: Annotated[str, "Customer's phone number for contact"] = "",
-                        total_amount: Annotated[str, "Total cost of the order if mentioned"] = "",
-                        delivery_address: Annotated[str, "Delivery address if this is a delivery order"] = "",
-                        notes: Annotated[str, "Any special instructions or notes for the order"] = ""
-                    ):
-                        logger.info(f"🔧 Order tool called with: customer_name={customer_name}, items={items}")
-                        params = {
-                            'customer_name': customer_name,
-                            'items': items,
-                            'phone_number': phone_number,
-                            'total_amount': total_amount,
-                            'delivery_address': delivery_address,
-                            'notes': notes
-                        }
-                        # Remove empty string parameters to keep the data clean
-                        params = {k: v for k, v in params.items() if (v.strip() if isinstance(v, str) else True)}
-                        logger.info(f"🔧 Cleaned parameters: {params}")
-                        return await self.execute_custom_tool(tool_info.name, params)
-                    
-                    tool_func = function_tool(
-                        name=tool_info.name,
-                        description=description
-                    )(order_tool_func)
-                    logger.info(f"🔧 Order tool registered with typed parameters")
-                    return tool_func
-                
-                # Use JSON schema if available for proper parameter extraction
-                elif hasattr(tool_info, 'json_schema') and tool_info.json_schema:
-                    logger.info(f"🔧 Using JSON schema for tool: {tool_info.name}")
-                    logger.info(f"🔧 JSON schema: {tool_info.json_schema}")
-                    
-                    # For order tools, create function with specific parameters based on schema
-                    if tool_info.name == 'order' and tool_info.json_schema.get('properties'):
-                        from typing import Annotated
-                        
-                        async def order_tool_func(
-                            customer_name: Annotated[str, "Full name of the customer placing the order"],
-                            items: Annotated[str, "Complete list of items being ordered with quantities"],
-                            phone_number: Annotated[str, "Customer's phone number for contact"] = "",
-                            total_amount: Annotated[str, "Total cost of the order if mentioned"] = "",
-                            delivery_address: Annotated[str, "Delivery address if this is a delivery order"] = "",
-                            notes: Annotated[str, "Any special instructions or notes for the order"] = ""
-                        ):
-                            logger.info(f"🔧 Order tool called with: customer_name={customer_name}, items={items}")
-                            params = {
-                                'customer_name': customer_name,
-                                'items': items,
-                                'phone_number': phone_number,
-                                'total_amount': total_amount,
-                                'delivery_address': delivery_address,
-                                'notes': notes
-                            }
-                            return await self.execute_custom_tool(tool_info.name, params)
-                        
-                        tool_func = function_tool(
-                            name=tool_info.name,
-                            description=description
-                        )(order_tool_func)
-                    else:
-                        # Generic schema-based function for other tools
-                        async def schema_based_func(**kwargs):
-                            logger.info(f"🔧 Executing {tool_info.name} with parameters: {kwargs}")
-                            return await self.execute_custom_tool(tool_info.name, kwargs)
-                        
-                        tool_func = function_tool(
-                            name=tool_info.name or f"tool_{tool_id}",
-                            description=description
-                        )(schema_based_func)
-                else:
-                    # Fallback to original approach
-                    tool_func = function_tool(
-                        name=tool_info.name or f"tool_{tool_id}",
-                        description=description
-                    )(dynamic_func)
-                logger.info(f"🔧 Tool registered successfully: {tool_func}")
-                return tool_func
-            else:
-                logger.info(f"🔧 REGISTERING TOOL: {tool_id} (no tool_info)")
-                return function_tool()(dynamic_func)
-            
-        except Exception as e:
-            logger.error(f"Error creating dynamic tool for {tool_id}: {e}")
+    def _load_order_parser(self) -> Optional[OrderParser]:
+        """Build the order parser from the agent's menu tool, if it has one"""
+        for tool in self.preloaded_tools.values():
+            if tool.name.lower() == 'menu' and tool.configuration and tool.configuration.get('menuItems'):
+                return get_order_parser(tool.configuration)
+        return None
+    
+    def _price_order(self, params: Dict[str, Any]) -> Optional[str]:
+        """
+        Match ordered items against the menu and compute the total locally
+        
+        Rewrites ``items``/``total_amount`` in place from the recognised lines. Phrases
+        that are ambiguous or not on the menu stay in the order as the customer said
+        them, and the returned warning tells the agent what to confirm with the customer.
+        """
+        if not self.order_parser or not params.get('items'):
             return None
+        
+        parsed = self.order_parser.parse(params['items'])
+        logger.info(f"🔧 Parsed order: lines={parsed['lines']}, ambiguous={parsed['ambiguous']}, unmatched={parsed['unmatched']}")
+        
+        if not parsed['lines']:
+            # Nothing to price: place the order as written rather than refusing it
+            return "None of the items were found on the menu, so the order total was not checked. Confirm the order with the customer."
+        
+        unrecognised = [f"{entry['quantity']} x {entry['phrase']}" for entry in parsed['ambiguous'] + parsed['unmatched']]
+        params['items'] = ", ".join([format_order_lines(parsed['lines'])] + unrecognised)
+        params['line_items'] = parsed['lines']
+        if parsed['complete']:
+            params['total_amount'] = f"${parsed['total']:.2f}"
+            return None
+        
+        params['total_amount'] = f"${parsed['total']:.2f} plus unconfirmed items"
+        questions = []
+        for entry in parsed['ambiguous']:
+            options = " or ".join(
+                f"{candidate['name']} ({candidate['price']})" if candidate['price'] else candidate['name']
+                for candidate in entry['candidates']
+            )
+            questions.append(f"By '{entry['phrase']}', did the customer mean {options}?")
+        for entry in parsed['unmatched']:
+            questions.append(f"'{entry['phrase']}' is not on the menu.")
+        
+        return "The order was placed, but some items were not recognised and are not in the total. Confirm them with the customer: " + " ".join(questions)
+    
+    async def execute_tool(self, tool_id: str, parameters: Dict[str, Any]) -> ToolExecutionResponse:
+        """Execute one of the agent's tools, answering tools that only return stored data from the bundle"""
+        if tool_id in self.bundle.static_results:
+            result = self.bundle.static_results[tool_id]
+            usage_recorder.record(tool_id=tool_id, success=True, parameters=parameters, result={"success": True, "result": result})
+            return ToolExecutionResponse(success=True, result=result)
+        tool = self.preloaded_tools.get(tool_id)
+        if tool:
+            return await self.tool_executor.execute_tool(tool, parameters)
+        return await self.tool_executor.execute(tool_id, parameters)
     
     async def execute_custom_tool(self, tool_name: str, parameters: Dict[str, Any]):
         """Execute a custom tool defined by the agent"""
         for tool_id in self.agent_config.tools:
-            tool = await self.tool_executor.get_tool(tool_id)
+            tool = self.preloaded_tools.get(tool_id) or await self.tool_executor.get_tool(tool_id)
             if tool and tool.name == tool_name:
-                response = await self.tool_executor.execute(tool_id, parameters)
+                response = await self.execute_tool(tool_id, parameters)
                 
                 # Extract the actual result from the ToolExecutionResponse
                 if hasattr(response, 'success') and response.success:
@@ -314,14 +204,74 @@ class CallActions(llm.ToolContext):
         return {"error": f"Tool '{tool_name}' not found"}
 
 
+def prewarm(proc: JobProcess):
+    """
+    Load the VAD model once per worker process, shared by every call it runs
+
+    The turn detector needs no prewarming here: its model is loaded once by the
+    worker's shared inference process, and ``MultilingualModel()`` only binds a
+    session to it (it needs the job context, so it is created per call).
+    """
+    if not settings.agent_prewarm:
+        logger.info("Model prewarming is disabled, the VAD loads during each process's first call")
+        return
+    started = perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+    logger.info(f"Prewarmed worker process: VAD loaded in {perf_counter() - started:.2f}s")
+
+
+def get_vad(ctx: JobContext) -> silero.VAD:
+    """The VAD prewarmed in this job's process, or loaded now when the process was not prewarmed"""
+    vad = ctx.proc.userdata.get("vad")
+    if vad is not None:
+        return vad
+    started = perf_counter()
+    vad = ctx.proc.userdata["vad"] = silero.VAD.load()
+    logger.warning(f"VAD was not prewarmed, loaded it in {perf_counter() - started:.2f}s during call setup")
+    return vad
+
+
+async def play_cached_greeting(
+    session: AgentSession,
+    agent_config: AgentModel,
+    text: str,
+    voice: str,
+    make_tts,
+) -> bool:
+    """
+    Play the agent's greeting from the greeting audio cache
+
+    Only for STT-LLM-TTS sessions, whose chat context ``say`` adds the greeting
+    to and whose TTS produced the cached audio.
+
+    Returns:
+        False on a cache miss; the audio is then synthesized in the background for the next call
+    """
+    key = greeting_cache.key(agent_config.id, voice, agent_config.language or "", text)
+    try:
+        audio = await greeting_cache.get(key)
+    except Exception as e:
+        logger.warning(f"Could not read cached greeting audio: {e}")
+        return False
+    if audio is None:
+        greeting_cache.warm(key, make_tts(), text)
+        return False
+    session.say(text, audio=audio.frames())
+    logger.info(f"Playing cached greeting audio ({audio.duration:.1f}s)")
+    return True
+
+
 async def run_realtime_agent(
     ctx: JobContext,
     participant: rtc.RemoteParticipant,
-    agent_config: AgentModel,
+    bundle: AgentBundle,
     tool_executor: ToolExecutor,
-    preloaded_tools: Dict[str, Any],
+    answered_at: Optional[float] = None,
+    setup_trace: Optional[CallSetupTrace] = None,
 ):
     """Run the agent using OpenAI Realtime API with MultimodalAgent"""
+    build_started = perf_counter()
+    agent_config = bundle.agent
     
     logger.info("starting agent with OpenAI Realtime API")
     logger.info(f"Agent config: name={agent_config.name}, language={agent_config.language}, voice={agent_config.voice}")
@@ -330,53 +280,17 @@ async def run_realtime_agent(
         api=ctx.api,
         participant=participant,
         room=ctx.room,
-        agent_config=agent_config,
+        bundle=bundle,
         tool_executor=tool_executor,
-        preloaded_tools=preloaded_tools,
     )
 
-    # Get instructions and initial message
-    instructions = agent_config.instructions or "You are a helpful AI assistant."
-    
-    # Add tool usage instructions
-    tool_instructions = """
-
-CRITICAL INSTRUCTIONS FOR TOOL USAGE:
-
-1. NEVER call tools proactively or automatically - ONLY call tools when the user specifically asks for information
-2. DO NOT call tools during greetings or initial conversation
-3. ONLY call tools when the user explicitly requests specific information like menu, hours, location, etc.
-4. When a user asks for information, respond conversationally first, then call the appropriate tool
-5. Examples:
-   - User: "What's on your menu?" → You: "Let me get our menu for you..." [then call menu tool]
-   - User: "What are your hours?" → You: "Let me check our hours..." [then call hours tool]
-   - Initial greeting: Just greet - DO NOT call any tools
-6. Wait for the user to speak and ask questions before using any tools
-"""
-    instructions = f"{instructions}{tool_instructions}"
-    
-    # Force English language for OpenAI Realtime API
-    instructions = f"{instructions}\n\nIMPORTANT: Always respond in English only. Do not use any other language."
-    
-    initial_message = agent_config.first_message or agent_config.greeting or "Hello! How can I help you today?"
-    
-    # Map voices to OpenAI Realtime voices (new voices from 2024)
-    voice_mapping = {
-        # New expressive voices with better emotion control
-        "ash": "ash",
-        "ballad": "ballad",
-        "coral": "coral",
-        "sage": "sage",
-        "verse": "verse"
-    }
-    
-    # Get the appropriate voice for OpenAI Realtime
-    realtime_voice = voice_mapping.get(agent_config.voice, "ash")
+    # Prompt, greeting and voice were compiled when the agent was published
+    instructions = bundle.prompts["realtime"]
+    initial_message = bundle.greeting
+    realtime_voice = bundle.voice["realtime"]["voice"]
+    realtime_model = bundle.voice["realtime"]["model"]
     logger.info(f"Using OpenAI Realtime voice: {realtime_voice}")
     
-    # Connect to room first
-    await ctx.connect()
-    
     # Create and start the AgentSession with OpenAI Realtime API (v1.0 approach)
     logger.info("Starting AgentSession with OpenAI Realtime API...")
     try:
@@ -399,16 +313,17 @@ CRITICAL INSTRUCTIONS FOR TOOL USAGE:
         logger.info(f"🔧 Agent created successfully")
         
         # Force English for Deepgram STT with OpenAI Realtime API
-        deepgram_language = "en"
+        stt_settings = bundle.voice["stt"]
         
         # Import TurnDetection for proper configuration
         from openai.types.beta.realtime.session import TurnDetection
         
         # Create the session with OpenAI Realtime API + proper turn detection
         session = AgentSession(
+            userdata=fnc_ctx,
             llm=openai.realtime.RealtimeModel(
                 voice=realtime_voice,
-                model="gpt-4o-realtime-preview",
+                model=realtime_model,
                 modalities=["text", "audio"],
                 turn_detection=TurnDetection(
                     type="server_vad",
@@ -419,20 +334,28 @@ CRITICAL INSTRUCTIONS FOR TOOL USAGE:
                     interrupt_response=True,
                 ),
             ),
-            stt=deepgram.STT(model="nova-3", language=deepgram_language),
-            vad=silero.VAD.load(),
+            stt=deepgram.STT(model=stt_settings["model"], language=stt_settings["realtimeLanguage"]),
+            vad=get_vad(ctx),
         )
         
+        setup_trace = setup_trace or CallSetupTrace()
+        setup_trace.record("agent_build", build_started)
+        track_first_audio(session, answered_at or perf_counter(), setup_trace)
+        TurnMetrics(session, agent_config.id, model=realtime_model, voice=f"openai-realtime:{realtime_voice}")
+        
         # Start the session
-        await session.start(
-            room=ctx.room,
-            agent=agent,
-        )
+        with setup_trace.span("session_start"):
+            await session.start(
+                room=ctx.room,
+                agent=agent,
+            )
         
-        # Wait longer for audio session to be fully established
-        logger.info(f"Waiting for audio session to be ready...")
-        await asyncio.sleep(3.0)  # Increased delay to ensure audio is ready
+        # Greet as soon as the caller's audio is flowing, rather than after a fixed delay
+        with setup_trace.span("audio_ready"):
+            await wait_for_audio_ready(ctx.room, participant, settings.greeting_audio_ready_timeout)
         
+        # The realtime model speaks the greeting itself: cached audio would come from
+        # another TTS voice, and the model's server-side conversation would not contain it
         logger.info(f"Sending initial greeting: {initial_message}")
         await session.generate_reply(
             instructions=f"Greet the user by saying: '{initial_message}'"
@@ -449,11 +372,14 @@ CRITICAL INSTRUCTIONS FOR TOOL USAGE:
 async def run_multimodal_agent(
     ctx: JobContext,
     participant: rtc.RemoteParticipant,
-    agent_config: AgentModel,
+    bundle: AgentBundle,
     tool_executor: ToolExecutor,
-    preloaded_tools: Dict[str, Any],
+    answered_at: Optional[float] = None,
+    setup_trace: Optional[CallSetupTrace] = None,
 ):
     """Run the multimodal agent using STT-LLM-TTS pipeline"""
+    build_started = perf_counter()
+    agent_config = bundle.agent
     
     logger.info("starting multimodal agent with STT-LLM-TTS pipeline")
     logger.info(f"Agent config: name={agent_config.name}, language={agent_config.language}, voice={agent_config.voice}")
@@ -462,65 +388,13 @@ async def run_multimodal_agent(
         api=ctx.api,
         participant=participant,
         room=ctx.room,
-        agent_config=agent_config,
+        bundle=bundle,
         tool_executor=tool_executor,
-        preloaded_tools=preloaded_tools,
     )
 
-    # Get instructions and initial message
-    instructions = agent_config.instructions or "You are a helpful AI assistant."
-    
-    # Add tool usage instructions to reduce hallucination
-    tool_instructions = """
-
-CRITICAL INSTRUCTIONS FOR TOOL USAGE AND NATURAL RESPONSES:
-
-1. ONLY use tools when the customer EXPLICITLY asks for specific information.
-2. DO NOT proactively provide information that wasn't requested.
-3. NEVER call tools during greetings or unless directly asked.
-
-4. Examples of when to use tools:
-   - Customer asks: "What are your hours?" → Use suitable tool
-   - Customer asks: "What's on the menu?" → Use suitable tool
-   - Customer asks: "How much is a pizza?" → Use suitable tool
-
-5. Examples of when NOT to use tools:
-   - Initial greeting
-   - Customer says: "Hello" or "Hi"
-   - Customer says: "I'd like to order" (wait for them to ask about specific items)
-
-6. CONVERSATIONAL RESPONSE STYLE:
-   - When you receive data from a tool, DO NOT just read it robotically
-   - Introduce the information naturally: "Great question! Let me tell you about our menu..."
-   - Use conversational transitions: "We have...", "Our most popular items are...", "You might enjoy..."
-   - Add helpful context: "Our customers really love the...", "A popular choice is..."
-   - Be warm and engaging, not just informative
-   - Speak like a friendly restaurant employee, not a computer
-
-7. Example natural responses:
-   - Instead of: "Here's our menu: Pizza $12.99, Pasta $10.99"
-   - Say: "We have some delicious options today! Our pizzas start at $12.99, and we also have fresh pasta dishes from $10.99. What sounds good to you?"
-
-8. NEVER make up information. If asked about something you don't have a tool for, say "Let me check on that for you" or "I'll need to verify that information."
-"""
-    instructions = f"{instructions}{tool_instructions}"
-    
-    # Add language instruction to system prompt if language is specified
-    if agent_config.language:
-        language_name = {
-            "en-US": "English",
-            "es-ES": "Spanish",
-            "fr-FR": "French",
-            "de-DE": "German",
-            "it-IT": "Italian",
-            "pt-BR": "Portuguese",
-            "ja-JP": "Japanese",
-            "ko-KR": "Korean",
-            "zh-CN": "Chinese"
-        }.get(agent_config.language, "English")
-        instructions = f"{instructions}\n\nIMPORTANT: Always respond in {language_name} only."
-    
-    initial_message = agent_config.first_message or agent_config.greeting or "Hello! How can I help you today?"
+    # Prompt and greeting were compiled when the agent was published
+    instructions = bundle.prompts["multimodal"]
+    initial_message = bundle.greeting
     
     # Create the agent with instructions
     agent = Agent(
@@ -528,71 +402,27 @@ CRITICAL INSTRUCTIONS FOR TOOL USAGE AND NATURAL RESPONSES:
         tools=fnc_ctx._tools if hasattr(fnc_ctx, '_tools') else []
     )
     
-    # Use multi for all non-English languages as Deepgram supports automatic detection
-    deepgram_language = "en" if agent_config.language == "en-US" else "multi"
-    
-    # Get appropriate voice for the language
-    if agent_config.voice and isinstance(agent_config.voice, str) and agent_config.voice.startswith(("794", "a0e", "f78", "c79")):
-        # If a specific Cartesia voice ID is provided, use it
-        voice_id = agent_config.voice
-    else:
-        # Import the mapping
-        from ..core.voice_config import OPENAI_TO_CARTESIA_MAPPING
-        
-        # Map OpenAI voices to Cartesia voice types
-        if agent_config.voice in OPENAI_TO_CARTESIA_MAPPING:
-            voice_type = OPENAI_TO_CARTESIA_MAPPING[agent_config.voice]
-        elif agent_config.voice in ["male", "female", "professional"]:
-            voice_type = agent_config.voice
-        else:
-            voice_type = "default"
-        
-        voice_id = get_cartesia_voice(agent_config.language or "en-US", voice_type)
-    
-    logger.info(f"Selected Cartesia voice: {voice_id} (type: {voice_type}) for language: {agent_config.language}")
-    
-    # Create TTS directly without preprocessing wrapper for now
-    # TODO: Fix PreprocessedTTS to properly inherit from TTS
-    try:
-        # Check if Cartesia API key is available
-        if not settings.cartesia_api_key:
-            logger.warning("Cartesia API key not found, falling back to OpenAI TTS")
-            tts = openai.TTS(
-                model="tts-1",
-                voice=agent_config.voice or "ash"
-            )
-            logger.info(f"Using OpenAI TTS with voice: {agent_config.voice or 'ash'}")
-        else:
-            tts = cartesia.TTS(
-                model="sonic-2", 
-                voice=voice_id,
-                language=get_cartesia_language_code(agent_config.language or "en-US")
-            )
-            logger.info("Cartesia TTS created successfully")
-    except Exception as e:
-        logger.error(f"Failed to create TTS: {e}")
-        # Try OpenAI as fallback
-        try:
-            logger.info("Falling back to OpenAI TTS due to Cartesia error")
-            tts = openai.TTS(
-                model="tts-1",
-                voice=agent_config.voice or "ash"
-            )
-        except Exception as e2:
-            logger.error(f"Failed to create OpenAI TTS as well: {e2}")
-            raise
+    stt_settings = bundle.voice["stt"]
+    llm_model = bundle.voice["llm"]["model"]
+    tts, voice = create_tts(agent_config, voice_settings=bundle.voice["tts"], call_id=ctx.room.name)
     
     # Create the session with STT-LLM-TTS pipeline
     session = AgentSession(
-        stt=deepgram.STT(model="nova-3", language=deepgram_language),
-        llm=openai.LLM(model="gpt-4o-mini"),
+        userdata=fnc_ctx,
+        stt=deepgram.STT(model=stt_settings["model"], language=stt_settings["language"]),
+        llm=openai.LLM(model=llm_model),
         tts=tts,
-        vad=silero.VAD.load(),
+        vad=get_vad(ctx),
         turn_detection=MultilingualModel(),
     )
+    setup_trace = setup_trace or CallSetupTrace()
+    setup_trace.record("agent_build", build_started)
+    track_first_audio(session, answered_at or perf_counter(), setup_trace)
+    TurnMetrics(session, agent_config.id, model=llm_model, voice=voice)
     
     # Start the session with noise cancellation if available
     logger.info("Starting agent session...")
+    session_started = perf_counter()
     try:
         await session.start(
             room=ctx.room,
@@ -615,11 +445,16 @@ CRITICAL INSTRUCTIONS FOR TOOL USAGE AND NATURAL RESPONSES:
             except Exception as e2:
                 logger.error(f"Failed to start session: {e2}")
                 raise
+    setup_trace.record("session_start", session_started)
     
     # Send initial greeting
     logger.info(f"Sending initial greeting: {initial_message}")
     try:
-        await session.generate_reply(instructions=initial_message)
+        greeting_played = await play_cached_greeting(
+            session, agent_config, initial_message, voice=voice, make_tts=lambda: tts
+        )
+        if not greeting_played:
+            await session.generate_reply(instructions=initial_message)
         logger.info("Initial greeting sent successfully")
     except Exception as e:
         logger.error(f"Failed to send initial greeting: {e}")
@@ -630,11 +465,14 @@ CRITICAL INSTRUCTIONS FOR TOOL USAGE AND NATURAL RESPONSES:
 async def run_voice_pipeline_agent(
     ctx: JobContext,
     participant: rtc.RemoteParticipant,
-    agent_config: AgentModel,
+    bundle: AgentBundle,
     tool_executor: ToolExecutor,
-    preloaded_tools: Dict[str, Any],
+    answered_at: Optional[float] = None,
+    setup_trace: Optional[CallSetupTrace] = None,
 ):
     """Run the voice pipeline agent using STT-LLM-TTS with turn detection"""
+    build_started = perf_counter()
+    agent_config = bundle.agent
     
     logger.info("starting voice pipeline agent with STT-LLM-TTS")
 
@@ -642,49 +480,13 @@ async def run_voice_pipeline_agent(
         api=ctx.api,
         participant=participant,
         room=ctx.room,
-        agent_config=agent_config,
+        bundle=bundle,
         tool_executor=tool_executor,
-        preloaded_tools=preloaded_tools,
     )
 
-    # Get instructions and initial message
-    instructions = agent_config.instructions or "You are a helpful AI assistant."
-    
-    # Add tool usage instructions to reduce hallucination
-    tool_instructions = """
-
-CRITICAL INSTRUCTIONS FOR TOOL USAGE:
-1. ONLY use tools when the customer EXPLICITLY asks for specific information.
-2. DO NOT proactively provide information that wasn't requested.
-3. NEVER call tools during greetings or unless directly asked.
-4. Examples of when to use tools:
-   - Customer asks: "What are your hours?" → Use suitable tool
-   - Customer asks: "What's on the menu?" → Use suitable tool
-   - Customer asks: "How much is a pizza?" → Use suitable tool
-5. Examples of when NOT to use tools:
-   - Initial greeting
-   - Customer says: "Hello" or "Hi"
-   - Customer says: "I'd like to order" (wait for them to ask about specific items)
-6. NEVER make up information. If asked about something you don't have a tool for, say you'll need to check.
-"""
-    instructions = f"{instructions}{tool_instructions}"
-    
-    # Add language instruction to system prompt if language is specified
-    if agent_config.language:
-        language_name = {
-            "en-US": "English",
-            "es-ES": "Spanish",
-            "fr-FR": "French",
-            "de-DE": "German",
-            "it-IT": "Italian",
-            "pt-BR": "Portuguese",
-            "ja-JP": "Japanese",
-            "ko-KR": "Korean",
-            "zh-CN": "Chinese"
-        }.get(agent_config.language, "English")
-        instructions = f"{instructions}\n\nIMPORTANT: Always respond in {language_name} only."
-    
-    initial_message = agent_config.first_message or agent_config.greeting or "Hello! How can I help you today?"
+    # Prompt and greeting were compiled when the agent was published
+    instructions = bundle.prompts["pipeline"]
+    initial_message = bundle.greeting
     
     # Create the agent with instructions
     agent = Agent(
@@ -692,70 +494,26 @@ CRITICAL INSTRUCTIONS FOR TOOL USAGE:
         tools=fnc_ctx._tools if hasattr(fnc_ctx, '_tools') else []
     )
     
-    # Use multi for all non-English languages as Deepgram supports automatic detection
-    deepgram_language = "en" if agent_config.language == "en-US" else "multi"
-    
-    # Get appropriate voice for the language
-    if agent_config.voice and isinstance(agent_config.voice, str) and agent_config.voice.startswith(("794", "a0e", "f78", "c79")):
-        # If a specific Cartesia voice ID is provided, use it
-        voice_id = agent_config.voice
-    else:
-        # Import the mapping
-        from ..core.voice_config import OPENAI_TO_CARTESIA_MAPPING
-        
-        # Map OpenAI voices to Cartesia voice types
-        if agent_config.voice in OPENAI_TO_CARTESIA_MAPPING:
-            voice_type = OPENAI_TO_CARTESIA_MAPPING[agent_config.voice]
-        elif agent_config.voice in ["male", "female", "professional"]:
-            voice_type = agent_config.voice
-        else:
-            voice_type = "default"
-        
-        voice_id = get_cartesia_voice(agent_config.language or "en-US", voice_type)
-    
-    logger.info(f"Selected Cartesia voice: {voice_id} (type: {voice_type}) for language: {agent_config.language}")
-    
-    # Create TTS directly without preprocessing wrapper for now
-    # TODO: Fix PreprocessedTTS to properly inherit from TTS
-    try:
-        # Check if Cartesia API key is available
-        if not settings.cartesia_api_key:
-            logger.warning("Cartesia API key not found, falling back to OpenAI TTS")
-            tts = openai.TTS(
-                model="tts-1",
-                voice=agent_config.voice or "ash"
-            )
-            logger.info(f"Using OpenAI TTS with voice: {agent_config.voice or 'ash'}")
-        else:
-            tts = cartesia.TTS(
-                model="sonic-2", 
-                voice=voice_id,
-                language=get_cartesia_language_code(agent_config.language or "en-US")
-            )
-            logger.info("Cartesia TTS created successfully")
-    except Exception as e:
-        logger.error(f"Failed to create TTS: {e}")
-        # Try OpenAI as fallback
-        try:
-            logger.info("Falling back to OpenAI TTS due to Cartesia error")
-            tts = openai.TTS(
-                model="tts-1",
-                voice=agent_config.voice or "ash"
-            )
-        except Exception as e2:
-            logger.error(f"Failed to create OpenAI TTS as well: {e2}")
-            raise
+    stt_settings = bundle.voice["stt"]
+    llm_model = bundle.voice["llm"]["model"]
+    tts, voice = create_tts(agent_config, voice_settings=bundle.voice["tts"], call_id=ctx.room.name)
     
     # Create the session with STT-LLM-TTS pipeline
     session = AgentSession(
-        stt=deepgram.STT(model="nova-3", language=deepgram_language),
-        llm=openai.LLM(model="gpt-4o-mini"),
+        userdata=fnc_ctx,
+        stt=deepgram.STT(model=stt_settings["model"], language=stt_settings["language"]),
+        llm=openai.LLM(model=llm_model),
         tts=tts,
-        vad=silero.VAD.load(),
+        vad=get_vad(ctx),
         turn_detection=MultilingualModel(),
     )
+    setup_trace = setup_trace or CallSetupTrace()
+    setup_trace.record("agent_build", build_started)
+    track_first_audio(session, answered_at or perf_counter(), setup_trace)
+    TurnMetrics(session, agent_config.id, model=llm_model, voice=voice)
     
     # Start the session with noise cancellation
+    session_started = perf_counter()
     try:
         await session.start(
             room=ctx.room,
@@ -778,193 +536,391 @@ CRITICAL INSTRUCTIONS FOR TOOL USAGE:
             except Exception as e2:
                 logger.error(f"Failed to start session: {e2}")
                 raise
-    
-    await ctx.connect()
+    setup_trace.record("session_start", session_started)
     
     # Send initial greeting
-    await session.generate_reply(instructions=initial_message)
+    greeting_played = await play_cached_greeting(
+        session, agent_config, initial_message, voice=voice, make_tts=lambda: tts
+    )
+    if not greeting_played:
+        await session.generate_reply(instructions=initial_message)
     
     logger.info(f"Voice pipeline agent started with instructions: {instructions[:100]}...")
 
 
-async def wait_for_participant_answer(
-    participant: rtc.RemoteParticipant, ctx: JobContext, timeout: int = 30
-) -> bool:
-    """Wait for participant to answer the call"""
-    start_time = perf_counter()
-    
-    while perf_counter() - start_time < timeout:
-        call_status = participant.attributes.get("sip.callStatus")
-        
-        if call_status == "active":
-            logger.info("user has picked up")
-            return True
-        elif call_status == "automation":
-            # During DTMF dialing
-            pass
-        elif call_status == "hangup":
-            logger.info("user hung up, exiting job")
-            return False
-        
-        await asyncio.sleep(0.1)
-    
-    logger.info("call timed out")
-    return False
+def _parse_metadata(metadata) -> Dict[str, Any]:
+    """Participant or job metadata as a dict; empty when missing or not JSON"""
+    if isinstance(metadata, dict):
+        return metadata
+    if not metadata:
+        return {}
+    try:
+        parsed = json.loads(metadata)
+    except (json.JSONDecodeError, TypeError) as e:
+        logger.error(f"Failed to parse metadata: {e}")
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
 
 
-async def entrypoint(ctx: JobContext):
-    """Main entrypoint for the phone agent"""
-    
-    logger.info(f"connecting to room {ctx.room.name}")
-    await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+async def load_agent_setup(agent_id: str, setup_trace: CallSetupTrace):
+    """
+    Load an agent's configuration and its tools
 
-    # Get agent configuration from participant metadata
-    # Wait for the first participant to join
-    participant = await ctx.wait_for_participant()
-    
-    # Try to get agent_id from participant metadata
-    agent_id = None
-    if participant and participant.metadata:
-        logger.info(f"Participant metadata: {participant.metadata}")
-        try:
-            import json
-            metadata = json.loads(participant.metadata)
-            agent_id = metadata.get("agent_id")
-            logger.info(f"Extracted agent_id from participant metadata: {agent_id}")
-        except (json.JSONDecodeError, TypeError) as e:
-            logger.error(f"Failed to parse participant metadata: {e}")
-    
-    # Fallback to job metadata if no agent_id in participant metadata
-    if not agent_id and ctx.job.metadata:
-        metadata = ctx.job.metadata
-        logger.info(f"Checking job metadata: {metadata}, type: {type(metadata)}")
-        
-        if isinstance(metadata, str):
-            try:
-                import json
-                metadata = json.loads(metadata)
-            except (json.JSONDecodeError, TypeError):
-                metadata = {}
-        
-        agent_id = metadata.get("agent_id") if isinstance(metadata, dict) else None
-        logger.info(f"Extracted agent_id from job metadata: {agent_id}")
-    
-    if not agent_id:
-        logger.error("No agent_id provided in metadata")
-        ctx.shutdown()
-        return
-    
-    # Load agent configuration from database
+    The agent and its AI-generated tools are fetched concurrently, the agent's
+    regular tools in one batch once their IDs are known.
+
+    Returns:
+        (agent_config, preloaded_tools); agent_config is None when the agent does not exist
+    """
     from ..services.database import db_service
-    agent_config = await db_service.get_agent(agent_id)
-    
+
+    started = perf_counter()
+
+    async def ai_generated_tools():
+        try:
+            agent_tools = await asyncio.to_thread(db_service.get_tools_by_agent_sync, agent_id)
+        except Exception as e:
+            logger.warning(f"Could not load AI-generated tools: {e}")
+            return []
+        return [tool for tool in agent_tools if is_generated_tool(agent_id, tool)]
+
+    ai_tools_task = asyncio.create_task(ai_generated_tools())
+    try:
+        agent_config = await asyncio.to_thread(db_service.get_agent_sync, agent_id)
+    except BaseException:
+        ai_tools_task.cancel()
+        raise
+    setup_trace.record("agent_config", started)
     if not agent_config:
-        logger.error(f"Agent {agent_id} not found in database")
-        ctx.shutdown()
-        return
-    
+        ai_tools_task.cancel()
+        return None, {}
+
     logger.info(f"Agent config loaded: name={agent_config.name}, instructions={agent_config.instructions[:50] if agent_config.instructions else 'None'}...")
 
-    # Initialize tool executor
-    tool_executor = ToolExecutor()
-    
-    # Preload tools for the agent
-    preloaded_tools = {}
-    
     # Load regular tools from agent.tools
+    tools_started = perf_counter()
+    preloaded_tools = {}
     if agent_config.tools:
         logger.info(f"Preloading {len(agent_config.tools)} regular tools for agent {agent_config.name}")
+        tools = await asyncio.to_thread(db_service.get_tools_sync, agent_config.tools)
         for tool_id in agent_config.tools:
-            tool = await db_service.get_tool(tool_id)
+            tool = tools.get(tool_id)
             if tool:
                 preloaded_tools[tool_id] = tool
                 logger.info(f"✓ Preloaded tool: {tool.name} ({tool_id})")
             else:
                 logger.warning(f"✗ Tool {tool_id} not found in database during preload")
-    
+
     # Also load AI-generated tools for this agent
+    ai_tools = await ai_tools_task
+    if ai_tools:
+        logger.info(f"Found {len(ai_tools)} AI-generated tools for agent {agent_config.name}")
+        for tool in ai_tools:
+            if tool.id not in preloaded_tools:  # Avoid duplicates
+                preloaded_tools[tool.id] = tool
+                logger.info(f"✓ Preloaded AI tool: {tool.name} ({tool.id})")
+
+    logger.info(f"Total preloaded tools: {len(preloaded_tools)}")
+    setup_trace.record("tools", tools_started)
+    return agent_config, preloaded_tools
+
+
+async def load_agent_bundle(agent_id: str, setup_trace: CallSetupTrace) -> Optional[AgentBundle]:
+    """
+    Load the agent's published bundle, one document
+
+    Agents not published yet (or published in another bundle format) are
+    compiled from their documents, and the result is published for later calls.
+
+    Returns:
+        The bundle, or None when the agent does not exist
+    """
+    from ..services.database import db_service
+
+    started = perf_counter()
     try:
-        # Get all tools for this agent (including AI-generated ones)
-        agent_tools = await db_service.get_tools_by_agent(agent_id)
-        ai_generated_tools = [tool for tool in agent_tools if getattr(tool, 'ai_generated', False) or tool.id.startswith(f"{agent_id}_")]
-        
-        if ai_generated_tools:
-            logger.info(f"Found {len(ai_generated_tools)} AI-generated tools for agent {agent_config.name}")
-            for tool in ai_generated_tools:
-                if tool.id not in preloaded_tools:  # Avoid duplicates
-                    preloaded_tools[tool.id] = tool
-                    logger.info(f"✓ Preloaded AI tool: {tool.name} ({tool.id})")
+        document = await asyncio.to_thread(db_service.get_agent_bundle_sync, agent_id)
+        bundle = load_bundle(document) if document else None
     except Exception as e:
-        logger.warning(f"Could not load AI-generated tools: {e}")
-    
-    logger.info(f"Total preloaded tools: {len(preloaded_tools)}")
+        logger.warning(f"Could not load the published bundle of agent {agent_id}: {e}")
+        bundle = None
+    if bundle:
+        setup_trace.record("agent_bundle", started)
+        logger.info(f"Loaded agent {agent_id} bundle {bundle.version}")
+        return bundle
+
+    agent_config, preloaded_tools = await load_agent_setup(agent_id, setup_trace)
+    if not agent_config:
+        return None
+    bundle = await compile_bundle(agent_config, preloaded_tools)
+    logger.info(f"Agent {agent_id} has no published bundle, compiled {bundle.version}")
 
-    # Check if this is an outbound call from job metadata
-    is_outbound = False
-    phone_number = None
-    
-    if not agent_id and ctx.job.metadata:
-        # Check job metadata for outbound call info
-        job_metadata = ctx.job.metadata
-        if isinstance(job_metadata, str):
-            try:
-                import json
-                job_metadata = json.loads(job_metadata)
-            except:
-                job_metadata = {}
-        
-        if isinstance(job_metadata, dict) and job_metadata.get("phone_number"):
-            is_outbound = True
-            phone_number = job_metadata["phone_number"]
-            outbound_trunk_id = job_metadata.get("trunk_id", getattr(settings, 'twilio_trunk_id', None))
-    
-    # Handle outbound calls
-    if is_outbound and phone_number:
-        logger.info(f"dialing {phone_number} to room {ctx.room.name}")
-        
-        # Create SIP participant
+    task = asyncio.create_task(store_bundle(agent_id, bundle, db_service))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return bundle
+
+
+async def _store_setup_trace(room_name: str, setup_trace: CallSetupTrace):
+    """Attach the finished setup trace to the call record of the room"""
+    from ..services.database import db_service
+
+    try:
+        calls = await asyncio.to_thread(db_service.get_calls_by_room_sync, room_name)
+        for call in calls:
+            await asyncio.to_thread(db_service.update_call_sync, call.id, {'analytics.setup': setup_trace.to_dict()})
+    except Exception as e:
+        logger.warning(f"Could not store call setup trace for room {room_name}: {e}")
+
+
+async def _report_dial_outcome(room_name: str, outcome: DialOutcome):
+    """Record how dialing an outbound call ended on the call record of the room"""
+    from ..services.database import db_service
+
+    try:
+        calls = await asyncio.to_thread(db_service.get_calls_by_room_sync, room_name)
+        for call in calls:
+            await asyncio.to_thread(db_service.update_call_sync, call.id, {
+                'status': outcome.status.value,
+                'analytics.dial': outcome.to_dict(),
+            })
+    except Exception as e:
+        logger.warning(f"Could not store dial outcome for room {room_name}: {e}")
+
+
+async def dial_outbound(ctx: JobContext, phone_number: str, job_metadata: Dict[str, Any]) -> DialOutcome:
+    """Dial the callee into the room and wait, from room events, until they answer or the call fails"""
+    outbound_trunk_id = job_metadata.get("trunk_id", getattr(settings, 'twilio_trunk_id', None))
+    ring_timeout = float(job_metadata.get("ring_timeout") or settings.outbound_ring_timeout)
+    logger.info(f"dialing {phone_number} to room {ctx.room.name}")
+
+    # Listening starts before the dial, so no status change is missed
+    detector = AnswerDetector(ctx.room, OUTBOUND_IDENTITY, early_media=settings.outbound_early_media)
+    try:
         await ctx.api.sip.create_sip_participant(
             api.CreateSIPParticipantRequest(
                 room_name=ctx.room.name,
                 sip_trunk_id=outbound_trunk_id,
                 sip_call_to=phone_number,
-                participant_identity="phone_user",
+                participant_identity=OUTBOUND_IDENTITY,
+                # The SIP service stops ringing at the same time
+                ringing_timeout=Duration(seconds=int(ring_timeout)),
             )
         )
-        
-        # Wait for participant
-        participant = await ctx.wait_for_participant(identity="phone_user")
-        
-        # Wait for answer
-        if not await wait_for_participant_answer(participant, ctx):
+    except Exception as e:
+        logger.warning(f"dialing {phone_number} failed: {e}")
+        return detector.cancelled(e)
+
+    outcome = await detector.wait(ring_timeout)
+    if not outcome.answered and OUTBOUND_IDENTITY in ctx.room.remote_participants:
+        # Still ringing: hang up
+        try:
+            await ctx.api.room.remove_participant(
+                api.RoomParticipantIdentity(room=ctx.room.name, identity=OUTBOUND_IDENTITY)
+            )
+        except Exception as e:
+            logger.warning(f"Could not hang up the call to {phone_number}: {e}")
+    return outcome
+
+
+async def _report_amd(room_name: str, result: AmdResult):
+    """Record the answering machine verdict on the call record of the room; machines mark the call voicemail"""
+    from ..services.database import db_service
+
+    update = {'analytics.amd': result.to_dict()}
+    if result.machine:
+        update['status'] = CallStatus.VOICEMAIL.value
+    try:
+        calls = await asyncio.to_thread(db_service.get_calls_by_room_sync, room_name)
+        for call in calls:
+            await asyncio.to_thread(db_service.update_call_sync, call.id, update)
+    except Exception as e:
+        logger.warning(f"Could not store answering machine verdict for room {room_name}: {e}")
+
+
+def answering_machine_listener(ctx: JobContext, participant: rtc.RemoteParticipant, setup_task=None) -> AnsweringMachineListener:
+    """
+    Screens an answered outbound call, with the first transcript when Deepgram is configured
+
+    Transcripts are matched in the agent's language, known once its bundle has
+    loaded (usually while the phone rang). Without phrases for the language, or
+    the bundle, only the cadence is screened and the callee is always greeted.
+    """
+    language = None
+    if setup_task and setup_task.done() and not setup_task.cancelled() and not setup_task.exception():
+        language = transcript_language(setup_task.result().agent.language)
+    stt = None
+    if language and settings.amd_transcript and settings.deepgram_api_key:
+        stt = deepgram.STT(model=STT_MODEL, language=language)
+    return AnsweringMachineListener(ctx.room, participant, timeout=settings.amd_timeout, stt=stt, language=language or "en")
+
+
+async def handle_answering_machine(ctx: JobContext, listener: AnsweringMachineListener, result: AmdResult, setup_task):
+    """Leave the agent's voicemail message after the beep, or just hang up when it has none"""
+    bundle = None
+    if setup_task:
+        try:
+            bundle = await setup_task
+        except Exception as e:
+            logger.warning(f"Could not load the agent for its voicemail message: {e}")
+
+    if bundle and bundle.agent.voicemail_message:
+        # Usually cached already; synthesized while the greeting plays otherwise
+        audio = asyncio.create_task(voicemail_audio(bundle.agent, voice_settings=bundle.voice["tts"]))
+        if not await listener.wait_for_beep(settings.amd_voicemail_wait):
+            logger.info("Did not hear the voicemail greeting end, leaving the message anyway")
+        voicemail = await audio
+        if voicemail is not None:
+            await leave_voicemail(ctx.room, voicemail)
+            result.voicemail_left = True
+            logger.info(f"Left a {voicemail.duration:.1f}s voicemail message")
+
+    try:
+        await ctx.api.room.remove_participant(
+            api.RoomParticipantIdentity(room=ctx.room.name, identity=listener.participant.identity)
+        )
+    except Exception as e:
+        logger.warning(f"Could not hang up on the answering machine: {e}")
+
+
+async def entrypoint(ctx: JobContext):
+    """Main entrypoint for the phone agent"""
+    
+    setup_started = perf_counter()
+    prewarmed = "vad" in ctx.proc.userdata
+    setup_trace = CallSetupTrace.from_metadata(ctx.job.room.metadata)
+    background_tasks = set()
+
+    def store_setup_trace(trace: CallSetupTrace):
+        task = asyncio.create_task(_store_setup_trace(ctx.room.name, trace))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+    setup_trace.on_finish = store_setup_trace
+    # Metrics of this job process are spooled for the API's /metrics endpoint
+    metrics_spool.enabled = True
+    ctx.add_shutdown_callback(metrics_spool.flush)
+    # Tool usage recorded during the call is written before the job process exits
+    ctx.add_shutdown_callback(usage_recorder.flush)
+    # Messages nobody waits for are in the outbox already; this closes the Twilio connections
+    ctx.add_shutdown_callback(sms_service.close)
+    job_metadata = _parse_metadata(ctx.job.metadata)
+    # Outbound calls name the number to dial
+    phone_number = job_metadata.get("phone_number")
+
+    # When the job names the agent, load its published bundle while the room
+    # connects and the caller joins instead of afterwards
+    job_agent_id = job_metadata.get("agent_id")
+    setup_task = asyncio.create_task(load_agent_bundle(job_agent_id, setup_trace)) if job_agent_id else None
+
+    try:
+        logger.info(f"connecting to room {ctx.room.name}")
+        with setup_trace.span("connect"):
+            await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+
+        if phone_number:
+            # Outbound call: the agent's bundle keeps loading while the phone rings
+            with setup_trace.span("answer"):
+                outcome = await dial_outbound(ctx, phone_number, job_metadata)
+            answered_at = perf_counter()
+            report = asyncio.create_task(_report_dial_outcome(ctx.room.name, outcome))
+            background_tasks.add(report)
+            report.add_done_callback(background_tasks.discard)
+            if not outcome.answered:
+                if setup_task:
+                    setup_task.cancel()
+                await report
+                ctx.shutdown()
+                return
+            participant = ctx.room.remote_participants[OUTBOUND_IDENTITY]
+
+            if job_metadata.get("amd", settings.amd_enabled):
+                # Confirmed answering machines get the voicemail message or a hangup instead of the agent
+                listener = answering_machine_listener(ctx, participant, setup_task)
+                try:
+                    with setup_trace.span("amd"):
+                        amd = await listener.detect()
+                    if amd.machine:
+                        await handle_answering_machine(ctx, listener, amd, setup_task)
+                finally:
+                    await listener.aclose()
+                if amd.machine:
+                    # After the dial outcome, whose status it replaces
+                    await report
+                    await _report_amd(ctx.room.name, amd)
+                    ctx.shutdown()
+                    return
+                amd_report = asyncio.create_task(_report_amd(ctx.room.name, amd))
+                background_tasks.add(amd_report)
+                amd_report.add_done_callback(background_tasks.discard)
+        else:
+            # Wait for the first participant to join
+            with setup_trace.span("participant"):
+                participant = await ctx.wait_for_participant()
+            answered_at = perf_counter()
+
+        # The participant's metadata takes precedence over the job's
+        agent_id = None
+        if participant and participant.metadata:
+            logger.info(f"Participant metadata: {participant.metadata}")
+            agent_id = _parse_metadata(participant.metadata).get("agent_id")
+            logger.info(f"Extracted agent_id from participant metadata: {agent_id}")
+        if not agent_id:
+            agent_id = job_agent_id
+            logger.info(f"Extracted agent_id from job metadata: {agent_id}")
+
+        if not agent_id:
+            logger.error("No agent_id provided in metadata")
             ctx.shutdown()
             return
 
+        if agent_id != job_agent_id:
+            if setup_task:
+                setup_task.cancel()
+            setup_task = asyncio.create_task(load_agent_bundle(agent_id, setup_trace))
+        bundle = await setup_task
+    except BaseException:
+        if setup_task:
+            setup_task.cancel()
+        raise
+
+    if not bundle:
+        logger.error(f"Agent {agent_id} not found in database")
+        ctx.shutdown()
+        return
+
+    # Initialize tool executor
+    tool_executor = ToolExecutor()
+
     # Choose agent type based on configuration
     # Check if we should use voice pipeline from any metadata source
-    use_voice_pipeline = False
-    if ctx.job.metadata:
-        job_metadata = ctx.job.metadata
-        if isinstance(job_metadata, str):
-            try:
-                import json
-                job_metadata = json.loads(job_metadata)
-            except:
-                job_metadata = {}
-        if isinstance(job_metadata, dict):
-            use_voice_pipeline = job_metadata.get("use_voice_pipeline", False)
+    use_voice_pipeline = job_metadata.get("use_voice_pipeline", False)
     
     if use_voice_pipeline:
-        await run_voice_pipeline_agent(ctx, participant, agent_config, tool_executor, preloaded_tools)
+        await run_voice_pipeline_agent(
+            ctx, participant, bundle, tool_executor,
+            answered_at=answered_at, setup_trace=setup_trace,
+        )
     else:
         # Use OpenAI Realtime API instead of STT-LLM-TTS pipeline
-        await run_realtime_agent(ctx, participant, agent_config, tool_executor, preloaded_tools)
+        await run_realtime_agent(
+            ctx, participant, bundle, tool_executor,
+            answered_at=answered_at, setup_trace=setup_trace,
+        )
+    
+    logger.info(
+        f"Call setup took {perf_counter() - setup_started:.2f}s "
+        f"({'prewarmed' if prewarmed else 'not prewarmed'} process): {setup_trace.summary()}"
+    )
 
 
 if __name__ == "__main__":
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
             agent_name=settings.agent_name,
+            # Calls must not share a process, see AgentWorkerService
+            job_executor_type=JobExecutorType.PROCESS,
         )
     )
\ No newline at end of file
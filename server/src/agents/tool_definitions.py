@@ -0,0 +1,234 @@
+"""
+Compiled tool definitions of agents.
+
+Turning an agent's tool configurations into function tools (signatures,
+descriptions, the menu query schema) only depends on the tools themselves, so
+it is done once per agent bundle instead of once per call. The compiled tools
+find the call they run in through ``RunContext.userdata``, which every session
+sets to its ``CallActions``.
+"""
+import logging
+import traceback
+from typing import Annotated, Any, Dict, List, Optional, Union
+
+from livekit.agents import RunContext, function_tool
+from livekit.agents.llm import FunctionTool, RawFunctionTool
+
+from ..models import Agent as AgentModel, Tool
+from ..services.menu_index import get_menu_index
+from .tool_schema import schema_tool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DESCRIPTIONS = {
+    "menu": "Searches the restaurant menu for items and prices. Pass what the customer asked about as the query, category or price range instead of fetching the whole menu. USE THIS TOOL ONLY WHEN: customer asks 'What's on the menu?', 'What food do you have?', 'What can I order?', 'Do you have pizza?', 'How much does X cost?', 'What are your prices?'. DO NOT USE THIS TOOL WHEN: customer wants to place an order.",
+    "faq": "Answer frequently asked questions about the business. USE THIS TOOL ONLY WHEN: customer asks common questions about hours, location, policies, services, etc.",
+    "order": "Processes a customer's order after they have decided what to purchase. USE THIS TOOL ONLY WHEN: customer says 'I want to order X', 'I'll have the X', 'Can I get X', or explicitly states they want to place an order."
+}
+
+CompiledTool = Union[FunctionTool, RawFunctionTool]
+
+
+def compile_tools(agent_config: AgentModel, preloaded_tools: Dict[str, Tool]) -> List[CompiledTool]:
+    """Function tools of an agent's configured tools"""
+    tools = []
+    if agent_config.tools:
+        logger.info(f"Compiling {len(agent_config.tools)} tools for agent {agent_config.name}")
+        for tool_id in agent_config.tools:
+            tool_info = preloaded_tools.get(tool_id)
+            compiled_tool = compile_tool(tool_id, tool_info)
+            if compiled_tool:
+                tools.append(compiled_tool)
+                tool_name = tool_info.name if tool_info else tool_id
+                logger.info(f"✓ Loaded tool: {tool_name} ({tool_id})")
+            else:
+                logger.warning(f"✗ Failed to load tool: {tool_id}")
+    else:
+        logger.warning(f"No tools configured for agent {agent_config.name}")
+    return tools
+
+
+def tool_description(tool_id: str, tool_info: Tool) -> str:
+    """The tool's description, or a default one when it has none"""
+    description = tool_info.description or ""
+    if not description.strip():
+        description = DEFAULT_DESCRIPTIONS.get(tool_id, f"Execute {tool_info.name} tool to retrieve information.")
+    return description
+
+
+def _call_actions(context: RunContext):
+    """The ``CallActions`` of the call a tool runs in"""
+    return context.userdata
+
+
+def _with_warning(result: Any, warning: Optional[str]) -> Any:
+    """Add a warning for the model to a tool result"""
+    if not warning:
+        return result
+    if isinstance(result, dict):
+        return {**result, "warning": warning}
+    return {"result": result, "warning": warning}
+
+
+def compile_tool(tool_id: str, tool_info: Optional[Tool] = None) -> Optional[CompiledTool]:
+    """Create a function tool from a tool configuration loaded from DB"""
+    try:
+        logger.debug(f"Creating dynamic tool for ID: {tool_id}")
+
+        # Create a closure to capture tool_id
+        def make_tool_func(captured_tool_id: str):
+            async def tool_func(context: RunContext):
+                """Execute a custom tool with RunContext"""
+                logger.info(f"🔧 TOOL CALLED: {captured_tool_id} - Starting execution...")
+
+                try:
+                    # No parameters needed for menu tools
+                    params = {}
+
+                    # Execute the tool
+                    result = await _call_actions(context).execute_tool(captured_tool_id, params)
+                    logger.info(f"🔧 Tool executor returned result - Success: {result.success}")
+
+                    if result.success:
+                        logger.info(f"🔧 Result preview: {str(result.result)[:200]}...")
+                        return result.result
+                    else:
+                        logger.error(f"🔧 FAILED: Tool {captured_tool_id} execution failed")
+                        logger.error(f"🔧 Error details: {result.error}")
+                        return {"error": result.error}
+
+                except Exception as e:
+                    logger.error(f"🔧 EXCEPTION: Error executing tool {captured_tool_id}")
+                    logger.error(f"🔧 Exception type: {type(e).__name__}")
+                    logger.error(f"🔧 Exception message: {str(e)}")
+                    logger.error(f"🔧 Exception traceback: {traceback.format_exc()}")
+                    return {"error": f"Tool execution failed: {str(e)}"}
+
+            # Set unique function name before returning
+            tool_func.__name__ = f"tool_{captured_tool_id.replace('-', '_')}"
+            # Create a more descriptive docstring
+            tool_func.__doc__ = f"Execute tool {captured_tool_id}. Call this tool to retrieve information."
+
+            return tool_func
+
+        # Create the function with unique name
+        dynamic_func = make_tool_func(tool_id)
+
+        if not tool_info:
+            logger.info(f"🔧 REGISTERING TOOL: {tool_id} (no tool_info)")
+            return function_tool()(dynamic_func)
+
+        logger.info(f"🔧 REGISTERING TOOL: {tool_info.name} (ID: {tool_id})")
+
+        description = tool_description(tool_id, tool_info)
+
+        # Menu tools query an index of the menu with a schema generated from its categories
+        if tool_info.name.lower() == 'menu' and tool_info.configuration and 'menuItems' in tool_info.configuration:
+            menu_index = get_menu_index(tool_info.configuration)
+
+            async def menu_query_func(raw_arguments: Dict[str, Any], context: RunContext):
+                params = {k: v for k, v in raw_arguments.items() if v not in (None, "")}
+                logger.info(f"🔧 Menu tool called with: {params}")
+                return await _call_actions(context).execute_custom_tool(tool_info.name, params)
+
+            tool_func = function_tool(
+                menu_query_func,
+                raw_schema={
+                    "name": tool_info.name,
+                    "description": description,
+                    "parameters": menu_index.json_schema(),
+                },
+            )
+            logger.info(f"🔧 Menu tool registered with query schema ({len(menu_index.categories)} categories)")
+            return tool_func
+
+        # Special handling for order tools to create proper parameter extraction
+        elif tool_info.name.lower() == 'order' and tool_info.type in ['ai_generated', 'reference']:
+            async def order_tool_func(
+                context: RunContext,
+                customer_name: Annotated[str, "Full name of the customer placing the order"],
+                items: Annotated[str, "Complete list of items being ordered with quantities (e.g. '2 Pepperoni Passion pizzas, 1 Caesar Salad')"],
+                phone_number: Annotated[str, "Customer's phone number for contact"] = "",
+                total_amount: Annotated[str, "Total cost of the order if mentioned"] = "",
+                delivery_address: Annotated[str, "Delivery address if this is a delivery order"] = "",
+                notes: Annotated[str, "Any special instructions or notes for the order"] = ""
+            ):
+                logger.info(f"🔧 Order tool called with: customer_name={customer_name}, items={items}")
+                params = {
+                    'customer_name': customer_name,
+                    'items': items,
+                    'phone_number': phone_number,
+                    'total_amount': total_amount,
+                    'delivery_address': delivery_address,
+                    'notes': notes
+                }
+                # Remove empty string parameters to keep the data clean
+                params = {k: v for k, v in params.items() if (v.strip() if isinstance(v, str) else True)}
+                logger.info(f"🔧 Cleaned parameters: {params}")
+                actions = _call_actions(context)
+                warning = actions._price_order(params)
+                return _with_warning(await actions.execute_custom_tool(tool_info.name, params), warning)
+
+            tool_func = function_tool(
+                name=tool_info.name,
+                description=description
+            )(order_tool_func)
+            logger.info("🔧 Order tool registered with typed parameters")
+            return tool_func
+
+        # Use JSON schema if available for proper parameter extraction
+        elif tool_info.json_schema:
+            logger.info(f"🔧 Using JSON schema for tool: {tool_info.name}")
+
+            # For order tools, create function with specific parameters based on schema
+            if tool_info.name == 'order' and tool_info.json_schema.get('properties'):
+                async def order_tool_func(
+                    context: RunContext,
+                    customer_name: Annotated[str, "Full name of the customer placing the order"],
+                    items: Annotated[str, "Complete list of items being ordered with quantities"],
+                    phone_number: Annotated[str, "Customer's phone number for contact"] = "",
+                    total_amount: Annotated[str, "Total cost of the order if mentioned"] = "",
+                    delivery_address: Annotated[str, "Delivery address if this is a delivery order"] = "",
+                    notes: Annotated[str, "Any special instructions or notes for the order"] = ""
+                ):
+                    logger.info(f"🔧 Order tool called with: customer_name={customer_name}, items={items}")
+                    params = {
+                        'customer_name': customer_name,
+                        'items': items,
+                        'phone_number': phone_number,
+                        'total_amount': total_amount,
+                        'delivery_address': delivery_address,
+                        'notes': notes
+                    }
+                    actions = _call_actions(context)
+                    warning = actions._price_order(params)
+                    return _with_warning(await actions.execute_custom_tool(tool_info.name, params), warning)
+
+                tool_func = function_tool(
+                    name=tool_info.name,
+                    description=description
+                )(order_tool_func)
+            else:
+                # Other tools take the parameters of their schema, types, enums and nesting included
+                async def execute_with_params(context: RunContext, params: Dict[str, Any]):
+                    logger.info(f"🔧 Executing {tool_info.name} with parameters: {params}")
+                    return await _call_actions(context).execute_custom_tool(tool_info.name, params)
+
+                tool_func = schema_tool(
+                    tool_info.name or f"tool_{tool_id}",
+                    description,
+                    tool_info.json_schema,
+                    execute_with_params,
+                )
+        else:
+            # Fallback to original approach
+            tool_func = function_tool(
+                name=tool_info.name or f"tool_{tool_id}",
+                description=description
+            )(dynamic_func)
+        logger.info(f"🔧 Tool registered successfully: {tool_func}")
+        return tool_func
+
+    except Exception as e:
+        logger.error(f"Error creating dynamic tool for {tool_id}: {e}")
+        return None
@@ -0,0 +1,179 @@
+"""
+Function tools generated from the ``json_schema`` stored with a tool.
+
+The schemas come from the tool generator (an LLM) or from users, so they are
+not always valid for the model's function calling: types are spelled
+``int`` or ``string|number``, arrays lack ``items``, ``required`` names
+properties that do not exist. ``compile_parameters`` normalises a schema,
+keeping its types, enums, required fields and nested objects, and the tool is
+registered with it as its raw schema, so the model sees exactly the
+parameters the tool takes. Compiled schemas are cached by content hash.
+"""
+import copy
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from livekit.agents import RunContext, function_tool
+from livekit.agents.llm import RawFunctionTool
+
+logger = logging.getLogger(__name__)
+
+# Compiled parameter schemas kept per process
+CACHE_SIZE = 256
+
+_TYPE_ALIASES = {
+    "str": "string",
+    "text": "string",
+    "date": "string",
+    "time": "string",
+    "datetime": "string",
+    "int": "integer",
+    "float": "number",
+    "double": "number",
+    "decimal": "number",
+    "bool": "boolean",
+    "list": "array",
+    "dict": "object",
+    "map": "object",
+}
+_TYPES = {"string", "integer", "number", "boolean", "array", "object", "null"}
+
+# Keywords passed on to the model; anything else (titles, UI hints, $schema) is dropped
+_KEYWORDS = {
+    "type", "description", "enum", "default", "format", "pattern",
+    "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf",
+    "minLength", "maxLength", "minItems", "maxItems", "uniqueItems",
+    "items", "properties", "required", "additionalProperties", "anyOf", "oneOf",
+}
+
+_compiled: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+ToolHandler = Callable[[RunContext, Dict[str, Any]], Awaitable[Any]]
+
+
+def schema_hash(json_schema: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(json_schema, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def compile_parameters(json_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return the (process-wide cached) parameters schema compiled from a stored ``json_schema``"""
+    key = schema_hash(json_schema or {})
+    compiled = _compiled.get(key)
+    if compiled is not None:
+        _compiled.move_to_end(key)
+        return compiled
+
+    compiled = _compile_object(json_schema if isinstance(json_schema, dict) else {})
+    _compiled[key] = compiled
+    if len(_compiled) > CACHE_SIZE:
+        _compiled.popitem(last=False)
+    return compiled
+
+
+def _compile_object(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """An object schema with every property compiled and ``required`` limited to known properties"""
+    compiled = _compile(schema)
+    compiled["type"] = "object"
+    properties = compiled.setdefault("properties", {})
+    compiled["required"] = [name for name in compiled.get("required") or [] if name in properties]
+    compiled.setdefault("additionalProperties", False)
+    return compiled
+
+
+def _compile(schema: Any) -> Dict[str, Any]:
+    if not isinstance(schema, dict):
+        # e.g. {"items": "string"}
+        return {"type": _normalize_type(schema) or "string"}
+
+    compiled = {key: copy.deepcopy(value) for key, value in schema.items() if key in _KEYWORDS}
+    for combinator in ("anyOf", "oneOf"):
+        if combinator in compiled:
+            options = compiled[combinator] if isinstance(compiled[combinator], list) else []
+            compiled[combinator] = [_compile(option) for option in options]
+            return compiled
+
+    schema_type = _normalize_type(compiled.get("type"))
+    if schema_type is None:
+        schema_type = _infer_type(compiled)
+    compiled["type"] = schema_type
+
+    if "enum" in compiled:
+        values = compiled["enum"] if isinstance(compiled["enum"], list) else [compiled["enum"]]
+        compiled["enum"] = list(dict.fromkeys(values))
+        if not compiled["enum"]:
+            del compiled["enum"]
+
+    types = schema_type if isinstance(schema_type, list) else [schema_type]
+    if "object" in types:
+        properties = compiled.get("properties")
+        compiled["properties"] = {
+            str(name): _compile(value) for name, value in properties.items()
+        } if isinstance(properties, dict) else {}
+        compiled["required"] = [name for name in compiled.get("required") or [] if name in compiled["properties"]]
+        if isinstance(compiled.get("additionalProperties"), dict):
+            compiled["additionalProperties"] = _compile(compiled["additionalProperties"])
+    else:
+        compiled.pop("properties", None)
+        compiled.pop("required", None)
+        compiled.pop("additionalProperties", None)
+    if "array" in types:
+        compiled["items"] = _compile(compiled.get("items", {"type": "string"}))
+    else:
+        compiled.pop("items", None)
+    return compiled
+
+
+def _normalize_type(value: Any) -> Any:
+    """A JSON schema type from the spellings found in stored schemas, or None"""
+    if isinstance(value, list):
+        types = [normalized for normalized in map(_normalize_type, value) if isinstance(normalized, str)]
+        types = list(dict.fromkeys(types))
+        return (types[0] if len(types) == 1 else types) or None
+    if not isinstance(value, str):
+        return None
+    if "|" in value or "," in value:
+        return _normalize_type([part.strip() for part in value.replace(",", "|").split("|")])
+    value = value.strip().lower()
+    value = _TYPE_ALIASES.get(value, value)
+    return value if value in _TYPES else None
+
+
+def _infer_type(schema: Dict[str, Any]) -> str:
+    if "properties" in schema:
+        return "object"
+    if "items" in schema:
+        return "array"
+    for value in [*(schema.get("enum") or []), schema.get("default")]:
+        if isinstance(value, bool):
+            return "boolean"
+        if isinstance(value, int):
+            return "integer"
+        if isinstance(value, float):
+            return "number"
+    if any(key in schema for key in ("minimum", "maximum", "multipleOf")):
+        return "number"
+    return "string"
+
+
+def schema_tool(name: str, description: str, json_schema: Optional[Dict[str, Any]], handler: ToolHandler) -> RawFunctionTool:
+    """
+    A function tool taking the parameters of ``json_schema``
+
+    ``handler`` gets the call's RunContext and the arguments the model passed,
+    without the optional ones it left empty.
+    """
+    async def schema_tool_func(raw_arguments: Dict[str, Any], context: RunContext):
+        params = {key: value for key, value in raw_arguments.items() if value is not None}
+        return await handler(context, params)
+
+    return function_tool(
+        schema_tool_func,
+        raw_schema={
+            "name": name,
+            "description": description,
+            "parameters": compile_parameters(json_schema),
+        },
+    )
@@ -0,0 +1,96 @@
+"""
+Per-turn conversational latency.
+
+Hooks into an AgentSession's events and records, for every turn, how long each
+step between the caller finishing and the agent answering took:
+
+- endpointing: end of the caller's speech until the turn is considered over
+- transcription: end of speech until the final transcript
+- llm_ttft: time to the first LLM (or realtime model) token
+- tts_ttfb: time to the first TTS audio byte
+- tool: end of the generation that called tools until their results are in
+- response: end of the caller's speech until the agent starts speaking
+
+plus interruptions. Everything is labelled with the agent, model and voice.
+Observations go through the metrics spool, as calls run in job processes.
+"""
+import logging
+from typing import Optional
+
+from livekit.agents import AgentSession, metrics as agent_metrics
+
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+
+logger = logging.getLogger(__name__)
+
+_endpointing = metrics.histogram("turn_endpointing_seconds", "End of caller speech to end of turn detected")
+_transcription = metrics.histogram("turn_transcription_seconds", "End of caller speech to final transcript")
+_llm_ttft = metrics.histogram("turn_llm_ttft_seconds", "LLM or realtime model time to first token")
+_tts_ttfb = metrics.histogram("turn_tts_ttfb_seconds", "TTS time to first audio byte")
+_tool = metrics.histogram("turn_tool_seconds", "Tool execution time within a turn")
+_response = metrics.histogram("turn_response_seconds", "End of caller speech to the agent starting to speak")
+_turns = metrics.counter("turns_total", "Agent turns answering the caller")
+_interruptions = metrics.counter("turn_interruptions_total", "Caller speech interrupting the agent")
+
+
+class TurnMetrics:
+    """Latency of each turn of one call"""
+
+    def __init__(self, session: AgentSession, agent_id: str, model: str, voice: str):
+        self.labels = {"agent": agent_id, "model": model, "voice": voice}
+        self.agent_state = "initializing"
+        self._user_stopped_at: Optional[float] = None
+        self._generation_ended_at: Optional[float] = None
+
+        session.on("metrics_collected", self._on_metrics_collected)
+        session.on("user_state_changed", self._on_user_state_changed)
+        session.on("agent_state_changed", self._on_agent_state_changed)
+        session.on("function_tools_executed", self._on_function_tools_executed)
+        session.on("close", self._on_close)
+
+    def _observe(self, histogram, value: float):
+        if value is not None and value >= 0:
+            metrics_spool.observe(histogram.name, value, **self.labels)
+
+    def _on_metrics_collected(self, event):
+        collected = event.metrics
+        if isinstance(collected, agent_metrics.EOUMetrics):
+            self._observe(_endpointing, collected.end_of_utterance_delay)
+            self._observe(_transcription, collected.transcription_delay)
+        elif isinstance(collected, agent_metrics.LLMMetrics):
+            if not collected.cancelled:
+                self._observe(_llm_ttft, collected.ttft)
+            # Emitted when the generation ends, which is when the tools it called start
+            self._generation_ended_at = collected.timestamp
+        elif isinstance(collected, agent_metrics.RealtimeModelMetrics):
+            if not collected.cancelled:
+                self._observe(_llm_ttft, collected.ttft)
+            # Stamped with the response's creation time
+            self._generation_ended_at = collected.timestamp + collected.duration
+        elif isinstance(collected, agent_metrics.TTSMetrics):
+            if not collected.cancelled:
+                self._observe(_tts_ttfb, collected.ttfb)
+
+    def _on_user_state_changed(self, event):
+        if event.new_state == "speaking":
+            if self.agent_state == "speaking":
+                metrics_spool.inc(_interruptions.name, **self.labels)
+            self._user_stopped_at = None
+        elif event.old_state == "speaking":
+            self._user_stopped_at = event.created_at
+
+    def _on_agent_state_changed(self, event):
+        self.agent_state = event.new_state
+        if event.new_state == "speaking" and self._user_stopped_at is not None:
+            self._observe(_response, event.created_at - self._user_stopped_at)
+            metrics_spool.inc(_turns.name, **self.labels)
+            self._user_stopped_at = None
+
+    def _on_function_tools_executed(self, event):
+        if self._generation_ended_at is not None:
+            self._observe(_tool, event.created_at - self._generation_ended_at)
+            self._generation_ended_at = None
+
+    def _on_close(self, event):
+        metrics_spool.flush_soon()
@@ -1,3 +1,3 @@
-from . import agents, tools, calls, webhooks, dispatch, files, test
+from . import agents, tools, calls, campaigns, webhooks, dispatch, files, test, metrics
 
-__all__ = ["agents", "tools", "calls", "webhooks", "dispatch", "files", "test"]
\ No newline at end of file
+__all__ = ["agents", "tools", "calls", "campaigns", "webhooks", "dispatch", "files", "test", "metrics"]
\ No newline at end of file
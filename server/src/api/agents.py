@@ -1,3 +1,4 @@
+import asyncio
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends, Header
 import logging
@@ -5,10 +6,13 @@ import logging
 from ..models import Agent, CreateAgentRequest, UpdateAgentRequest
 from ..services.database import get_db, FirebaseService
 from ..services.livekit_service import LiveKitService
+from ..services.greeting_cache import greeting_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+_background_tasks = set()
+
 
 async def get_current_user_id(
     authorization: str = Header(...),
@@ -27,6 +31,70 @@ async def get_current_user_id(
     return decoded_token["uid"]
 
 
+def _invalidate_greeting(agent_id: str, request: UpdateAgentRequest):
+    """Drop cached greeting and voicemail audio when anything it was synthesized from changes"""
+    if any(
+        value is not None
+        for value in (request.greeting, request.first_message, request.voicemail_message, request.voice, request.language)
+    ):
+        greeting_cache.invalidate_agent(agent_id)
+
+
+def _precompute_phrases(agent: Agent, db: FirebaseService):
+    """Synthesize the agent's static tool responses into the TTS phrase cache in the background"""
+    if not agent.tools:
+        return
+
+    async def run():
+        from ..agents.cached_tts import precompute_tool_phrases
+
+        try:
+            tools = await db.get_tools(agent.tools)
+            await precompute_tool_phrases(agent, [{'configuration': tool.configuration} for tool in tools.values()])
+        except Exception as e:
+            logger.warning(f"Could not precompute TTS phrases for agent {agent.id}: {e}")
+
+    task = asyncio.create_task(run(), name=f"tts-precompute-{agent.id}")
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _precompute_voicemail(agent: Agent):
+    """Synthesize the agent's voicemail message into the greeting audio cache in the background"""
+    if not agent.voicemail_message:
+        return
+
+    async def run():
+        import aiohttp
+        from ..agents.cached_tts import voicemail_audio
+
+        async with aiohttp.ClientSession() as http_session:
+            await voicemail_audio(agent, http_session=http_session)
+
+    task = asyncio.create_task(run(), name=f"voicemail-precompute-{agent.id}")
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _publish(agent_id: str, db: FirebaseService):
+    """
+    Compile and publish the agent's bundle after a change
+
+    Calls run from the published bundle, so when publishing fails the previous
+    one is withdrawn and calls load the agent's documents instead.
+    """
+    from ..agents.agent_bundle import publish_agent
+
+    try:
+        await publish_agent(agent_id, db)
+    except Exception as e:
+        logger.error(f"Error publishing agent {agent_id}: {str(e)}")
+        try:
+            await db.delete_agent_bundle(agent_id)
+        except Exception as e:
+            logger.error(f"Could not withdraw the published bundle of agent {agent_id}: {str(e)}")
+
+
 @router.post("/", response_model=Agent)
 async def create_agent(
     request: CreateAgentRequest,
@@ -36,6 +104,9 @@ async def create_agent(
     """Create a new agent"""
     try:
         agent = await db.create_agent(user_id, request)
+        await _publish(agent.id, db)
+        _precompute_phrases(agent, db)
+        _precompute_voicemail(agent)
         return agent
     except Exception as e:
         logger.error(f"Error creating agent: {str(e)}")
@@ -80,6 +151,12 @@ async def update_agent(
     agent = await db.update_agent(agent_id, request)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
+    _invalidate_greeting(agent_id, request)
+    await _publish(agent_id, db)
+    if any(value is not None for value in (request.tools, request.voice, request.language)):
+        _precompute_phrases(agent, db)
+    if any(value is not None for value in (request.voicemail_message, request.voice, request.language)):
+        _precompute_voicemail(agent)
     return agent
 
 
@@ -93,9 +170,38 @@ async def update_agent_put(
     agent = await db.update_agent(agent_id, request)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
+    _invalidate_greeting(agent_id, request)
+    await _publish(agent_id, db)
+    if any(value is not None for value in (request.tools, request.voice, request.language)):
+        _precompute_phrases(agent, db)
+    if any(value is not None for value in (request.voicemail_message, request.voice, request.language)):
+        _precompute_voicemail(agent)
     return agent
 
 
+@router.post("/{agent_id}/publish")
+async def publish_agent(
+    agent_id: str,
+    db: FirebaseService = Depends(get_db),
+):
+    """Compile the agent into a new published bundle"""
+    from ..agents.agent_bundle import publish_agent as publish
+
+    try:
+        bundle = await publish(agent_id, db)
+    except Exception as e:
+        logger.error(f"Error publishing agent {agent_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not bundle:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return {
+        "success": True,
+        "version": bundle.version,
+        "tools": len(bundle.tools),
+        "static_results": len(bundle.static_results),
+    }
+
+
 @router.delete("/{agent_id}")
 async def delete_agent(
     agent_id: str,
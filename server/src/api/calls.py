@@ -53,42 +53,22 @@ async def create_outbound_call(
         if agent.user_id != user_id:
             raise HTTPException(status_code=403, detail="Not authorized to use this agent")
         
-        # Create dispatch for outbound call
-        dispatch_result = await livekit_service.create_dispatch(
-            agent_name="phone-agent",
-            metadata={
-                "agent_id": request.agent_id,
-                "phone_number": request.to_number,
-                "from_number": request.from_number,
-                "customer_name": request.customer_name,
-                **(request.metadata or {}),
-            },
+        call = await livekit_service.start_outbound_call(
+            db,
+            agent,
+            user_id,
+            request.to_number,
+            from_number=request.from_number,
+            customer_name=request.customer_name,
+            metadata=request.metadata,
+            job_metadata={"amd": request.amd} if request.amd is not None else None,
         )
         
-        # Create call record in database
-        call_data = {
-            "id": dispatch_result.get("dispatch_id", str(uuid.uuid4())),
-            "agentId": request.agent_id,
-            "userId": user_id,
-            "roomName": dispatch_result.get("room_name"),
-            "direction": CallDirection.OUTBOUND,
-            "status": CallStatus.PENDING,
-            "fromNumber": request.from_number or agent.phone_number or "",
-            "toNumber": request.to_number,
-            "participants": [],
-            "startTime": datetime.utcnow(),
-            "metadata": request.metadata or {},
-            "createdAt": datetime.utcnow(),
-            "updatedAt": datetime.utcnow(),
-        }
-        
-        call = await db.create_call(call_data)
-        
         return {
             "success": True,
             "call": call.dict(),
-            "dispatch_id": dispatch_result.get("dispatch_id"),
-            "room_name": dispatch_result.get("room_name"),
+            "dispatch_id": call.id,
+            "room_name": call.room_name,
         }
     except Exception as e:
         logger.error(f"Error creating outbound call: {str(e)}")
@@ -0,0 +1,218 @@
+import csv
+import io
+import uuid
+from fastapi import APIRouter, HTTPException, Depends, Header, UploadFile, File
+import logging
+
+from ..models import (
+    Campaign,
+    CampaignContactInput,
+    CampaignProgress,
+    CampaignSettings,
+    CreateCampaignRequest,
+    ImportContactsRequest,
+)
+from ..services.campaign_service import campaign_engine, validate_calling_hours, valid_timezone
+from ..services.database import get_db, FirebaseService
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+# CSV header names accepted for the contact fields; other columns go into the contact's metadata
+_PHONE_COLUMNS = ("phone_number", "phone", "number", "phonenumber", "to_number")
+_NAME_COLUMNS = ("name", "customer_name", "full_name")
+_TIMEZONE_COLUMNS = ("timezone", "time_zone", "tz")
+
+
+async def get_current_user_id(
+    authorization: str = Header(...),
+    db: FirebaseService = Depends(get_db),
+) -> str:
+    """Extract user ID from Firebase auth token"""
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
+
+    token = authorization.split(" ")[1]
+    decoded_token = await db.verify_id_token(token)
+
+    if not decoded_token:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    return decoded_token["uid"]
+
+
+def _validate_settings(settings: CampaignSettings):
+    error = validate_calling_hours(settings.calling_hours)
+    if not error and not valid_timezone(settings.timezone):
+        error = f"Unknown timezone: {settings.timezone}"
+    if not error and (settings.max_concurrent_calls < 1 or settings.calls_per_second <= 0):
+        error = "max_concurrent_calls and calls_per_second must be positive"
+    if not error and settings.max_attempts < 1:
+        error = "max_attempts must be at least 1"
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+
+async def _owned_campaign(campaign_id: str, user_id: str) -> Campaign:
+    campaign = await campaign_engine.store.get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    if campaign.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this campaign")
+    return campaign
+
+
+def _csv_contacts(content: bytes) -> list:
+    """Contacts of an uploaded CSV file with a header row"""
+    text = content.decode("utf-8-sig", errors="replace")
+    reader = csv.DictReader(io.StringIO(text))
+    columns = {(name or "").strip().lower().replace(" ", "_"): name for name in reader.fieldnames or []}
+
+    def column(candidates):
+        return next((columns[name] for name in candidates if name in columns), None)
+
+    phone_column = column(_PHONE_COLUMNS)
+    if not phone_column:
+        raise HTTPException(status_code=400, detail="The CSV file needs a phone_number column")
+    name_column = column(_NAME_COLUMNS)
+    timezone_column = column(_TIMEZONE_COLUMNS)
+    known = {phone_column, name_column, timezone_column}
+
+    def value(row, name):
+        return (row.get(name) or "").strip() or None if name else None
+
+    contacts = []
+    for row in reader:
+        contacts.append(CampaignContactInput(
+            phone_number=value(row, phone_column) or "",
+            name=value(row, name_column),
+            timezone=value(row, timezone_column),
+            metadata={key: field for key, field in row.items() if key not in known and key and field},
+        ))
+    return contacts
+
+
+@router.post("/", response_model=Campaign)
+async def create_campaign(
+    request: CreateCampaignRequest,
+    user_id: str = Depends(get_current_user_id),
+    db: FirebaseService = Depends(get_db),
+):
+    """Create a campaign; it starts once contacts are imported and it is started"""
+    _validate_settings(request.settings)
+    agent = await db.get_agent(request.agent_id)
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    if agent.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to use this agent")
+
+    campaign = Campaign(
+        id=f"campaign_{uuid.uuid4().hex[:12]}",
+        user_id=user_id,
+        agent_id=request.agent_id,
+        name=request.name,
+        settings=request.settings,
+    )
+    try:
+        return await campaign_engine.create_campaign(campaign)
+    except Exception as e:
+        logger.error(f"Error creating campaign: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/")
+async def list_campaigns(
+    user_id: str = Depends(get_current_user_id),
+):
+    """List the user's campaigns with their progress"""
+    campaigns = await campaign_engine.store.list_campaigns(user_id=user_id)
+    return {
+        "campaigns": [
+            {**campaign.dict(), "progress": (await campaign_engine.progress(campaign.id)).dict()}
+            for campaign in campaigns
+        ]
+    }
+
+
+@router.get("/{campaign_id}")
+async def get_campaign(
+    campaign_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Get a campaign and its progress"""
+    campaign = await _owned_campaign(campaign_id, user_id)
+    progress = await campaign_engine.progress(campaign_id)
+    return {**campaign.dict(), "progress": progress.dict()}
+
+
+@router.get("/{campaign_id}/progress", response_model=CampaignProgress)
+async def get_campaign_progress(
+    campaign_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Contacts by status, attempts made and the outcomes of the calls"""
+    await _owned_campaign(campaign_id, user_id)
+    return await campaign_engine.progress(campaign_id)
+
+
+@router.post("/{campaign_id}/contacts")
+async def import_contacts(
+    campaign_id: str,
+    request: ImportContactsRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Add contacts to a campaign"""
+    campaign = await _owned_campaign(campaign_id, user_id)
+    return await campaign_engine.import_contacts(campaign, request.contacts)
+
+
+@router.post("/{campaign_id}/contacts/csv")
+async def import_contacts_csv(
+    campaign_id: str,
+    file: UploadFile = File(...),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Add contacts from a CSV file with phone_number and optional name and timezone columns"""
+    campaign = await _owned_campaign(campaign_id, user_id)
+    contacts = _csv_contacts(await file.read())
+    return await campaign_engine.import_contacts(campaign, contacts)
+
+
+@router.post("/{campaign_id}/start", response_model=Campaign)
+async def start_campaign(
+    campaign_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Start calling the campaign's contacts"""
+    await _owned_campaign(campaign_id, user_id)
+    return await campaign_engine.start_campaign(campaign_id)
+
+
+@router.post("/{campaign_id}/pause", response_model=Campaign)
+async def pause_campaign(
+    campaign_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Stop starting new calls; calls in progress finish"""
+    await _owned_campaign(campaign_id, user_id)
+    return await campaign_engine.pause_campaign(campaign_id)
+
+
+@router.post("/{campaign_id}/resume", response_model=Campaign)
+async def resume_campaign(
+    campaign_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Resume a paused campaign"""
+    await _owned_campaign(campaign_id, user_id)
+    return await campaign_engine.start_campaign(campaign_id)
+
+
+@router.post("/{campaign_id}/cancel", response_model=Campaign)
+async def cancel_campaign(
+    campaign_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Stop the campaign for good; contacts not called yet are skipped"""
+    await _owned_campaign(campaign_id, user_id)
+    return await campaign_engine.cancel_campaign(campaign_id)
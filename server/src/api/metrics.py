@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_metrics(format: str = "prometheus"):
+    """Process metrics in Prometheus text format, or as JSON with ``format=json``"""
+    # Pick up what agent job processes observed since the last scrape
+    await metrics_spool.drain_into(metrics)
+    if format == "json":
+        return JSONResponse(metrics.snapshot())
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,7 +1,10 @@
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import json
 import logging
+import time
 
 from ..models import (
     Tool,
@@ -9,8 +12,11 @@ from ..models import (
     UpdateToolRequest,
     ToolExecutionRequest,
     ToolExecutionResponse,
+    ToolExecutionBatchRequest,
+    ToolExecutionBatchResponse,
 )
-from ..services.tool_executor import ToolExecutor
+from ..core.config import settings
+from ..services.tool_executor import DEFAULT_MAX_CONCURRENCY, tool_executor
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -53,21 +59,66 @@ async def delete_tool(tool_id: str):
 @router.post("/execute", response_model=ToolExecutionResponse)
 async def execute_tool(request: ToolExecutionRequest):
     """Execute a tool"""
-    executor = ToolExecutor()
-    
     try:
-        result = await executor.execute(
+        return await tool_executor.execute(
             tool_id=request.tool_id,
             parameters=request.parameters,
             call_id=request.call_id,
             agent_id=request.agent_id,
         )
-        return result
     except Exception as e:
         logger.error(f"Error executing tool: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await executor.close()
+
+
+@router.post("/execute-batch", response_model=ToolExecutionBatchResponse)
+async def execute_tool_batch(request: ToolExecutionBatchRequest, stream: bool = False):
+    """
+    Execute many tools concurrently
+    
+    Results are returned in request order. With ``stream=true`` the response is
+    NDJSON instead: one ``{"index": ..., ...result}`` line per call as it
+    completes, followed by a summary line.
+    """
+    if len(request.requests) > settings.tool_batch_max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(request.requests)} requests, the limit is {settings.tool_batch_max_size}",
+        )
+    
+    max_concurrency = min(
+        request.max_concurrency or DEFAULT_MAX_CONCURRENCY,
+        settings.tool_batch_max_concurrency,
+    )
+    started = time.perf_counter()
+    
+    if stream:
+        async def lines():
+            succeeded = 0
+            async for index, result in tool_executor.execute_as_completed(
+                request.requests, max_concurrency=max_concurrency, timeout=request.timeout
+            ):
+                succeeded += result.success
+                yield json.dumps({"index": index, **result.dict()}, default=str) + "\n"
+            yield json.dumps({
+                "done": True,
+                "succeeded": succeeded,
+                "failed": len(request.requests) - succeeded,
+                "execution_time": time.perf_counter() - started,
+            }) + "\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+    results = await tool_executor.execute_many(
+        request.requests, max_concurrency=max_concurrency, timeout=request.timeout
+    )
+    succeeded = sum(1 for result in results if result.success)
+    return ToolExecutionBatchResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        execution_time=time.perf_counter() - started,
+    )
 
 
 class GenerateToolsRequest(BaseModel):
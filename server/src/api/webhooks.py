@@ -2,6 +2,9 @@ from fastapi import APIRouter, Request, HTTPException, Depends
 import logging
 from typing import Dict, Any
 from ..services.database import FirebaseService, get_db
+from ..services.campaign_service import campaign_engine
+from ..services.tool_executor import tool_executor
+from ..models import ToolExecutionRequest
 from ..dependencies import get_current_user_id
 from datetime import datetime
 import json
@@ -66,6 +69,10 @@ async def handle_livekit_room_webhook(
     room_name = room.get("name")
     logger.info(f"LiveKit room event: {event} - {room_name}")
     
+    if event == "room_finished":
+        # Campaign calls wait for their room to close
+        campaign_engine.call_ended(room_name)
+    
     try:
         # Find call by room name
         calls = await db.get_calls_by_room(room_name)
@@ -110,75 +117,22 @@ async def handle_tool_webhook(
     
     # Handle LiveKit agent tool calls
     if "tool_calls" in data:
-        # Process tool calls from LiveKit agent
-        results = []
+        # Run the whole batch concurrently; results keep the order of the calls
         agent_id = data.get("agent_id")
         call_id = data.get("call_id")
         
-        for tool_call in data["tool_calls"]:
-            tool_id = tool_call.get("tool_id")
-            parameters = tool_call.get("parameters", {})
-            
-            try:
-                # Get tool from database
-                tool = await db.get_tool(tool_id)
-                if not tool:
-                    logger.error(f"Tool {tool_id} not found")
-                    results.append({
-                        "success": False,
-                        "error": "Tool not found"
-                    })
-                    continue
-                
-                # Execute the tool
-                from ..services.tool_executor import ToolExecutor
-                executor = ToolExecutor(db)
-                
-                result = await executor.execute(
-                    tool_id=tool_id,
-                    parameters=parameters,
-                    call_id=call_id,
-                    agent_id=agent_id,
-                )
-                
-                # Track tool usage in database
-                await db.track_tool_usage(
-                    tool_id=tool_id,
-                    call_id=call_id,
-                    agent_id=agent_id,
-                    parameters=parameters,
-                    result=result.dict(),
-                    success=result.success,
-                )
-                
-                # Update tool usage count
-                await db.increment_tool_usage(tool_id)
-                
-                results.append(result.dict())
-                
-            except Exception as e:
-                logger.error(f"Error executing tool {tool_id}: {str(e)}")
-                
-                # Track failed tool usage
-                if tool_id and call_id:
-                    try:
-                        await db.track_tool_usage(
-                            tool_id=tool_id,
-                            call_id=call_id,
-                            agent_id=agent_id,
-                            parameters=parameters,
-                            result={"error": str(e)},
-                            success=False,
-                        )
-                    except Exception as track_error:
-                        logger.error(f"Error tracking failed tool usage: {str(track_error)}")
-                
-                results.append({
-                    "success": False,
-                    "error": str(e)
-                })
+        requests = [
+            ToolExecutionRequest(
+                tool_id=tool_call.get("tool_id") or "",
+                parameters=tool_call.get("parameters") or {},
+                call_id=call_id,
+                agent_id=agent_id,
+            )
+            for tool_call in data["tool_calls"]
+        ]
+        responses = await tool_executor.execute_many(requests, timeout=data.get("timeout"))
         
-        return {"results": results}
+        return {"results": [response.dict() for response in responses]}
     
     # Handle direct tool execution
     elif "tool_name" in data:
@@ -198,30 +152,14 @@ async def handle_tool_webhook(
                     "error": f"Tool {tool_name} not found for agent {agent_id}"
                 }
             
-            # Execute the tool
-            from ..services.tool_executor import ToolExecutor
-            executor = ToolExecutor(db)
-            
-            result = await executor.execute(
-                tool_id=tool.id,
-                parameters=parameters,
-                call_id=call_id,
-                agent_id=agent_id,
-            )
-            
-            # Track tool usage
-            await db.track_tool_usage(
-                tool_id=tool.id,
+            # Execute the tool; usage is recorded by the executor
+            result = await tool_executor.execute_tool(
+                tool,
+                parameters,
                 call_id=call_id,
                 agent_id=agent_id,
-                parameters=parameters,
-                result=result.dict(),
-                success=result.success,
             )
             
-            # Update tool usage count
-            await db.increment_tool_usage(tool.id)
-            
             return {
                 "success": True,
                 "result": result.dict(),
@@ -0,0 +1,111 @@
+"""
+Per-call setup latency trace.
+
+A call's setup crosses processes: the API creates the room and the dispatch,
+a worker picks up the job, connects, waits for the caller, loads the agent,
+starts the session and finally speaks. Each step is recorded as a span
+(offset from the start of the trace and duration). Spans recorded by the API
+reach the worker through the room metadata, so the trace the worker finishes
+covers the whole way from dispatch to the agent's first audio. Every stage is
+observed in the ``call_setup_stage_seconds`` histogram, through the metrics
+spool when recorded in a job process.
+"""
+import json
+import logging
+from contextlib import contextmanager
+from time import perf_counter, time
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import metrics
+from .metrics_spool import metrics_spool
+
+logger = logging.getLogger(__name__)
+
+ROOM_METADATA_KEY = "callSetup"
+
+_stage_seconds = metrics.histogram("call_setup_stage_seconds", "Duration of each call setup stage")
+_total_seconds = metrics.histogram("call_setup_seconds", "Time from dispatch (or job start) to the agent's first audio")
+
+
+class CallSetupTrace:
+    """Spans of one call's setup, timed with ``perf_counter`` and anchored to the wall clock"""
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at or time()
+        # perf_counter() value corresponding to started_at
+        self._origin = perf_counter() - (time() - self.started_at)
+        self.spans: List[Dict[str, Any]] = []
+        self.total_seconds: Optional[float] = None
+        self.on_finish: Optional[Callable[["CallSetupTrace"], None]] = None
+
+    def perf_at(self, wall_time: float) -> float:
+        """A wall-clock time (e.g. from another process) as a perf_counter value"""
+        return self._origin + (wall_time - self.started_at)
+
+    def record(self, stage: str, started: float, ended: Optional[float] = None):
+        """Record a stage between two perf_counter values; ``ended`` defaults to now"""
+        ended = perf_counter() if ended is None else ended
+        duration = max(0.0, ended - started)
+        self.spans.append({"stage": stage, "start": round(started - self._origin, 4), "duration": round(duration, 4)})
+        metrics_spool.record(_stage_seconds, duration, stage=stage)
+
+    @contextmanager
+    def span(self, stage: str):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, started)
+
+    def end(self) -> float:
+        """perf_counter value at which the last recorded span ended"""
+        if not self.spans:
+            return self._origin
+        return self._origin + max(span["start"] + span["duration"] for span in self.spans)
+
+    def elapsed(self) -> float:
+        return perf_counter() - self._origin
+
+    def finish(self):
+        """Close the trace once the agent is heard; later calls are ignored"""
+        if self.total_seconds is not None:
+            return
+        total = self.total_seconds = self.elapsed()
+        metrics_spool.record(_total_seconds, total)
+        logger.info(f"Call setup to first audio {total * 1000:.0f} ms: {self.summary()}")
+        if self.on_finish:
+            self.on_finish(self)
+
+    def summary(self) -> str:
+        return ", ".join(f"{span['stage']}={span['duration'] * 1000:.0f}ms" for span in self.spans)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "startedAt": self.started_at,
+            "totalSeconds": round(self.total_seconds, 4) if self.total_seconds is not None else None,
+            "spans": list(self.spans),
+        }
+
+    def to_metadata(self) -> str:
+        """Room metadata carrying the trace to the worker"""
+        return json.dumps({ROOM_METADATA_KEY: {"startedAt": self.started_at, "spans": self.spans}})
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[str]) -> "CallSetupTrace":
+        """
+        Continue a trace from room metadata, or start a new one when there is none
+
+        When continuing, the time from the trace's start until now is recorded as
+        the ``dispatch`` stage: room creation, dispatch and job assignment.
+        """
+        try:
+            data = json.loads(metadata)[ROOM_METADATA_KEY] if metadata else None
+        except (json.JSONDecodeError, TypeError, KeyError):
+            data = None
+        if not isinstance(data, dict) or not data.get("startedAt"):
+            return cls()
+        trace = cls(float(data["startedAt"]))
+        # Already observed by the process that recorded them
+        trace.spans = [span for span in data.get("spans") or [] if isinstance(span, dict)]
+        trace.record("dispatch", trace.end())
+        return trace
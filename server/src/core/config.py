@@ -22,6 +22,51 @@ class Settings(BaseSettings):
     twilio_account_sid: str = Field(default=os.getenv("TWILIO_ACCOUNT_SID", ""))
     twilio_auth_token: str = Field(default=os.getenv("TWILIO_AUTH_TOKEN", ""))
     twilio_phone_number: str = Field(default=os.getenv("TWILIO_PHONE_NUMBER", ""))
+    twilio_api_base_url: str = Field(default=os.getenv("TWILIO_API_BASE_URL", "https://api.twilio.com"))
+    
+    # SMS Delivery (match the sender's Twilio throughput: long code 1/s, toll-free 3/s, short code 100/s)
+    sms_messages_per_second: float = Field(default=float(os.getenv("SMS_MESSAGES_PER_SECOND", "1")))
+    sms_max_concurrency: int = Field(default=int(os.getenv("SMS_MAX_CONCURRENCY", "4")))
+    sms_max_retries: int = Field(default=int(os.getenv("SMS_MAX_RETRIES", "3")))
+    
+    # Email Delivery (SMTP)
+    smtp_host: str = Field(default=os.getenv("SMTP_HOST", ""))
+    smtp_port: int = Field(default=int(os.getenv("SMTP_PORT", "587")))
+    smtp_username: str = Field(default=os.getenv("SMTP_USERNAME", ""))
+    smtp_password: str = Field(default=os.getenv("SMTP_PASSWORD", ""))
+    smtp_use_tls: bool = Field(default=os.getenv("SMTP_USE_TLS", "true").lower() == "true")  # STARTTLS
+    smtp_use_ssl: bool = Field(default=os.getenv("SMTP_USE_SSL", "false").lower() == "true")  # Implicit TLS (port 465)
+    smtp_from_email: str = Field(default=os.getenv("SMTP_FROM_EMAIL", ""))
+    smtp_pool_size: int = Field(default=int(os.getenv("SMTP_POOL_SIZE", "4")))
+    email_messages_per_second_per_tenant: float = Field(default=float(os.getenv("EMAIL_MESSAGES_PER_SECOND_PER_TENANT", "2")))
+    
+    # Durable queue for background deliveries
+    outbox_db_path: str = Field(default=os.getenv("OUTBOX_DB_PATH", "data/outbox.sqlite3"))
+    
+    # Queued delivery for webhook tools in async delivery mode
+    webhook_delivery_max_connections_per_host: int = Field(default=int(os.getenv("WEBHOOK_DELIVERY_MAX_CONNECTIONS_PER_HOST", "4")))
+    webhook_delivery_max_attempts: int = Field(default=int(os.getenv("WEBHOOK_DELIVERY_MAX_ATTEMPTS", "8")))
+    
+    # Circuit breakers for customer endpoints
+    circuit_breaker_failure_threshold: int = Field(default=int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5")))
+    circuit_breaker_reset_seconds: float = Field(default=float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30")))
+    circuit_breaker_window_seconds: float = Field(default=float(os.getenv("CIRCUIT_BREAKER_WINDOW_SECONDS", "60")))
+    circuit_breaker_min_calls: int = Field(default=int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "10")))
+    circuit_breaker_error_rate: float = Field(default=float(os.getenv("CIRCUIT_BREAKER_ERROR_RATE", "0.5")))
+    circuit_breaker_slow_call_seconds: float = Field(default=float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "5")))  # 0 disables
+    circuit_breaker_slow_call_rate: float = Field(default=float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8")))
+    circuit_breaker_shared: bool = Field(default=os.getenv("CIRCUIT_BREAKER_SHARED", "true").lower() == "true")  # Via REDIS_URL
+    hedge_delay_seconds: float = Field(default=float(os.getenv("HEDGE_DELAY_SECONDS", "0.5")))
+    
+    # Default size limits for custom API and webhook results sent to the model
+    tool_response_max_bytes: int = Field(default=int(os.getenv("TOOL_RESPONSE_MAX_BYTES", "4000")))
+    tool_response_max_items: int = Field(default=int(os.getenv("TOOL_RESPONSE_MAX_ITEMS", "20")))
+    tool_response_max_string_length: int = Field(default=int(os.getenv("TOOL_RESPONSE_MAX_STRING_LENGTH", "1000")))
+    tool_response_max_read_bytes: int = Field(default=int(os.getenv("TOOL_RESPONSE_MAX_READ_BYTES", "1000000")))  # Larger responses fail the tool call
+    
+    # Batch tool execution limits
+    tool_batch_max_size: int = Field(default=int(os.getenv("TOOL_BATCH_MAX_SIZE", "1000")))
+    tool_batch_max_concurrency: int = Field(default=int(os.getenv("TOOL_BATCH_MAX_CONCURRENCY", "32")))
     
     # Server Configuration
     api_port: int = Field(default=int(os.getenv("API_PORT", "8000")))
@@ -52,6 +97,33 @@ class Settings(BaseSettings):
     # Agent Configuration
     agent_name: str = Field(default="phone-agent")
     max_call_duration: int = Field(default=600)  # 10 minutes
+    greeting_audio_ready_timeout: float = Field(default=float(os.getenv("GREETING_AUDIO_READY_TIMEOUT", "1.0")))  # Max wait for caller audio before greeting
+    greeting_cache_dir: str = Field(default=os.getenv("GREETING_CACHE_DIR", "data/greetings"))
+    greeting_cache_memory_mb: int = Field(default=int(os.getenv("GREETING_CACHE_MEMORY_MB", "64")))
+    tts_cache_enabled: bool = Field(default=os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true")
+    tts_cache_dir: str = Field(default=os.getenv("TTS_CACHE_DIR", "data/tts"))
+    tts_cache_memory_mb: int = Field(default=int(os.getenv("TTS_CACHE_MEMORY_MB", "32")))
+    tts_cache_disk_mb: int = Field(default=int(os.getenv("TTS_CACHE_DISK_MB", "512")))
+    tts_cache_max_chars: int = Field(default=int(os.getenv("TTS_CACHE_MAX_CHARS", "120")))  # Longer phrases are never cached
+    tts_cache_min_calls: int = Field(default=int(os.getenv("TTS_CACHE_MIN_CALLS", "3")))  # Calls a phrase is spoken in before it is cached
+    metrics_spool_path: str = Field(default=os.getenv("METRICS_SPOOL_PATH", "data/metrics.sqlite3"))  # Metrics from agent job processes
+    agent_prewarm: bool = Field(default=os.getenv("AGENT_PREWARM", "true").lower() == "true")  # Load the VAD model per process at startup
+    outbound_ring_timeout: float = Field(default=float(os.getenv("OUTBOUND_RING_TIMEOUT", "30")))  # Seconds an outbound call rings before it counts as not answered
+    outbound_early_media: str = Field(default=os.getenv("OUTBOUND_EARLY_MEDIA", "ring"))  # "answer" takes audio before the answer signal as the answer
+    amd_enabled: bool = Field(default=os.getenv("AMD_ENABLED", "false").lower() == "true")  # Default for outbound calls whose request or campaign doesn't set amd
+    amd_timeout: float = Field(default=float(os.getenv("AMD_TIMEOUT", "5")))  # Seconds of audio after which the callee counts as human
+    amd_transcript: bool = Field(default=os.getenv("AMD_TRANSCRIPT", "true").lower() == "true")  # Match the first transcript against voicemail phrases; only a match confirms a machine
+    amd_voicemail_wait: float = Field(default=float(os.getenv("AMD_VOICEMAIL_WAIT", "30")))  # Max wait for a machine's greeting to end before leaving the voicemail
+    
+    # Appointment Booking
+    appointments_db_path: str = Field(default=os.getenv("APPOINTMENTS_DB_PATH", "data/appointments.sqlite3"))
+    appointment_slot_minutes: int = Field(default=int(os.getenv("APPOINTMENT_SLOT_MINUTES", "30")))
+    appointment_timezone: str = Field(default=os.getenv("APPOINTMENT_TIMEZONE", "UTC"))  # For businesses that have not set business_data.timezone
+    
+    # Outbound Campaigns
+    campaign_db_path: str = Field(default=os.getenv("CAMPAIGN_DB_PATH", "data/campaigns.sqlite3"))
+    campaign_max_concurrent_calls: int = Field(default=int(os.getenv("CAMPAIGN_MAX_CONCURRENT_CALLS", "20")))  # Across all campaigns
+    campaign_calls_per_second: float = Field(default=float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "1")))  # The SIP trunk's CPS limit
     
     class Config:
         env_file = ".env"
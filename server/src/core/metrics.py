@@ -0,0 +1,166 @@
+"""
+In-process metrics.
+
+A small registry of labelled counters, gauges and latency histograms, exposed
+in Prometheus text format by the ``/metrics`` endpoint. Histograms keep a
+bounded window of recent observations so percentiles reflect current
+behaviour rather than the whole life of the process.
+"""
+import threading
+from collections import deque
+from typing import Dict, Any, Deque, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Recent observations kept per histogram series
+HISTOGRAM_WINDOW = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def percentile(values: List[float], quantile: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(quantile * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value per label set that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+
+class Histogram:
+    """Latency (or size) observations per label set, reported as a summary"""
+
+    kind = "summary"
+
+    def __init__(self, name: str, description: str = "", window: int = HISTOGRAM_WINDOW):
+        self.name = name
+        self.description = description
+        self.window = window
+        self._recent: Dict[LabelKey, Deque[float]] = {}
+        self._totals: Dict[LabelKey, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is None:
+                recent = self._recent[key] = deque(maxlen=self.window)
+            recent.append(value)
+            count, total = self._totals.get(key, (0, 0.0))
+            self._totals[key] = (count + 1, total + value)
+
+    def percentiles(self, **labels) -> Dict[float, Optional[float]]:
+        with self._lock:
+            values = list(self._recent.get(_label_key(labels), ()))
+        return {quantile: percentile(values, quantile) for quantile in QUANTILES}
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        samples = []
+        with self._lock:
+            series = [(key, list(recent), self._totals[key]) for key, recent in self._recent.items()]
+        for key, values, (count, total) in series:
+            for quantile in QUANTILES:
+                samples.append((self.name, key + (("quantile", str(quantile)),), percentile(values, quantile)))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+class MetricsRegistry:
+    """Named metrics, created on first use"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, description: str):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, description)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "") -> Histogram:
+        return self._get(Histogram, name, description)
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            if metric.description:
+                lines.append(f"# HELP {name} {metric.description}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample_name, key, value in metric.samples():
+                if value is None:
+                    continue
+                lines.append(f"{sample_name}{_format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Every sample as JSON-friendly dicts, keyed by metric name"""
+        result = {}
+        for name, metric in sorted(self._metrics.items()):
+            result[name] = [
+                {"name": sample_name, "labels": dict(key), "value": value}
+                for sample_name, key, value in metric.samples()
+            ]
+        return result
+
+
+metrics = MetricsRegistry()
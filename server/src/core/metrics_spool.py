@@ -0,0 +1,154 @@
+"""
+Metrics observed in agent job processes.
+
+LiveKit runs every call in its own job process, so observations made there
+never reach the registry behind the API's ``/metrics`` endpoint. Job processes
+append them to a local SQLite spool instead, and the endpoint drains the spool
+into its registry before rendering.
+
+Code that runs in both kinds of process (tool execution, for one) records
+through ``count``, ``record`` and ``measure``: they update this process's registry, which
+is what the API renders and what local decisions such as hedge delays read,
+and also spool the observation once the process is marked as a job process.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Observations buffered in the job process before they are written
+FLUSH_SIZE = 32
+# Oldest rows are dropped beyond this when nothing drains the spool (e.g. a standalone worker)
+MAX_ROWS = 100_000
+
+
+class MetricsSpool:
+    """SQLite table of counter increments, gauge values and histogram observations, shared by all processes on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._buffer: List[Tuple[str, str, str, float]] = []
+        self.enabled = False  # Set in job processes, whose own registry is never rendered
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS observations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    value REAL NOT NULL
+                )
+                """
+            )
+            self._connection = connection
+        return self._connection
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        self._add("counter", name, amount, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        self._add("histogram", name, value, labels)
+
+    def count(self, counter: Counter, amount: float = 1.0, **labels):
+        """Increment a counter of this process, spooling the increment in job processes"""
+        counter.inc(amount, **labels)
+        if self.enabled:
+            self.inc(counter.name, amount, **labels)
+
+    def record(self, histogram: Histogram, value: float, **labels):
+        """Observe a value in a histogram of this process, spooling it in job processes"""
+        histogram.observe(value, **labels)
+        if self.enabled:
+            self.observe(histogram.name, value, **labels)
+
+    def measure(self, gauge: Gauge, value: float, **labels):
+        """Set a gauge of this process, spooling the value in job processes (the latest value drained wins)"""
+        gauge.set(value, **labels)
+        if self.enabled:
+            self._add("gauge", gauge.name, value, labels)
+
+    def _add(self, kind: str, name: str, value: float, labels: Dict[str, Any]):
+        with self._buffer_lock:
+            self._buffer.append((kind, name, json.dumps({key: str(label) for key, label in labels.items()}), value))
+            full = len(self._buffer) >= FLUSH_SIZE
+        if full:
+            self.flush_soon()
+
+    def flush_soon(self):
+        """Write buffered observations from a worker thread"""
+        try:
+            asyncio.get_running_loop().run_in_executor(None, self._flush_sync)
+        except RuntimeError:
+            self._flush_sync()
+
+    async def flush(self):
+        await asyncio.to_thread(self._flush_sync)
+
+    def _flush_sync(self):
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.executemany("INSERT INTO observations (kind, name, labels, value) VALUES (?, ?, ?, ?)", rows)
+                connection.execute(
+                    "DELETE FROM observations WHERE id <= (SELECT MAX(id) FROM observations) - ?", (MAX_ROWS,)
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Dropped {len(rows)} spooled metric observations: {e}")
+
+    def _drain_sync(self) -> List[Tuple[str, str, str, float]]:
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute("SELECT id, kind, name, labels, value FROM observations ORDER BY id").fetchall()
+                if rows:
+                    connection.execute("DELETE FROM observations WHERE id <= ?", (rows[-1][0],))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return [row[1:] for row in rows]
+
+    async def drain_into(self, registry: MetricsRegistry):
+        """Move every spooled observation into ``registry``"""
+        try:
+            rows = await asyncio.to_thread(self._drain_sync)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read spooled metrics: {e}")
+            return
+        for kind, name, labels, value in rows:
+            try:
+                if kind == "counter":
+                    registry.counter(name).inc(value, **json.loads(labels))
+                elif kind == "gauge":
+                    registry.gauge(name).set(value, **json.loads(labels))
+                else:
+                    registry.histogram(name).observe(value, **json.loads(labels))
+            except ValueError as e:
+                logger.warning(f"Skipping spooled metric {name}: {e}")
+
+
+metrics_spool = MetricsSpool(settings.metrics_spool_path)
@@ -7,8 +7,14 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from .core.config import settings
-from .api import agents, tools, calls, webhooks, dispatch, files, test
+from .api import agents, tools, calls, campaigns, webhooks, dispatch, files, test, metrics
 from .services.agent_worker import agent_worker_service
+from .services.campaign_service import campaign_engine
+from .services.email_service import email_service
+from .services.sms_service import sms_service
+from .services.tool_executor import tool_executor
+from .services.usage_recorder import usage_recorder
+from .services.webhook_delivery import webhook_delivery
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,11 +31,24 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to start agent worker: {e}")
     
+    # Deliver emails, SMS and webhooks queued by tools, including ones left over from before a restart
+    email_service.start()
+    sms_service.start()
+    webhook_delivery.start()
+    # Resume campaigns that were running before a restart
+    campaign_engine.start()
+    
     yield
     
     # Stop the LiveKit agent worker
     logger.info("Shutting down phone agent server...")
     await agent_worker_service.stop()
+    await campaign_engine.stop()
+    await email_service.stop()
+    await sms_service.stop()
+    await webhook_delivery.stop()
+    await tool_executor.close()
+    await usage_recorder.stop()
 
 
 app = FastAPI(
@@ -52,10 +71,12 @@ app.add_middleware(
 app.include_router(agents.router, prefix="/api/agents", tags=["agents"])
 app.include_router(tools.router, prefix="/api/tools", tags=["tools"])
 app.include_router(calls.router, prefix="/api/calls", tags=["calls"])
+app.include_router(campaigns.router, prefix="/api/campaigns", tags=["campaigns"])
 app.include_router(files.router, prefix="/api/files", tags=["files"])
 app.include_router(webhooks.router, prefix="/api/webhooks", tags=["webhooks"])
 app.include_router(dispatch.router, prefix="/api/dispatch", tags=["dispatch"])
 app.include_router(test.router, prefix="/api/test", tags=["test"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 
 
 @app.get("/")
@@ -13,6 +13,8 @@ from .tool import (
     UpdateToolRequest,
     ToolExecutionRequest,
     ToolExecutionResponse,
+    ToolExecutionBatchRequest,
+    ToolExecutionBatchResponse,
     ToolType,
     ToolParameter,
     ParameterType,
@@ -28,6 +30,22 @@ from .call import (
     CallEvent,
     CallTranscriptEntry,
 )
+from .appointment import (
+    Appointment,
+    AppointmentStatus,
+)
+from .campaign import (
+    Campaign,
+    CampaignStatus,
+    CampaignSettings,
+    CallingHours,
+    CampaignContact,
+    ContactStatus,
+    CreateCampaignRequest,
+    CampaignContactInput,
+    ImportContactsRequest,
+    CampaignProgress,
+)
 
 __all__ = [
     # Agent models
@@ -44,6 +62,8 @@ __all__ = [
     "UpdateToolRequest",
     "ToolExecutionRequest",
     "ToolExecutionResponse",
+    "ToolExecutionBatchRequest",
+    "ToolExecutionBatchResponse",
     "ToolType",
     "ToolParameter",
     "ParameterType",
@@ -57,4 +77,18 @@ __all__ = [
     "CallParticipant",
     "CallEvent",
     "CallTranscriptEntry",
+    # Appointment models
+    "Appointment",
+    "AppointmentStatus",
+    # Campaign models
+    "Campaign",
+    "CampaignStatus",
+    "CampaignSettings",
+    "CallingHours",
+    "CampaignContact",
+    "ContactStatus",
+    "CreateCampaignRequest",
+    "CampaignContactInput",
+    "ImportContactsRequest",
+    "CampaignProgress",
 ]
\ No newline at end of file
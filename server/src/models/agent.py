@@ -35,6 +35,27 @@ class AgentSettings(BaseModel):
     voice_speed: float = Field(default=1.0, ge=0.5, le=2.0)
 
 
+class BusinessData(BaseModel):
+    """Business-specific data for agent creation"""
+    # Restaurant
+    menu: Optional[str] = None
+    menu_files: Optional[List[Dict[str, Any]]] = None
+    
+    # Salon
+    services: Optional[str] = None
+    service_files: Optional[List[Dict[str, Any]]] = None
+    stylists: Optional[str] = None
+    
+    # Medical
+    doctors: Optional[str] = None
+    insurance_accepted: Optional[str] = None
+    
+    # Common
+    hours: Optional[Dict[str, str]] = None
+    timezone: Optional[str] = None  # IANA name, e.g. "America/New_York"; hours and appointments are in this timezone
+    additional_info: Optional[str] = None
+
+
 class Agent(BaseModel):
     id: str
     user_id: str
@@ -48,11 +69,13 @@ class Agent(BaseModel):
     instructions: Optional[str] = None
     greeting: Optional[str] = None
     first_message: Optional[str] = None
+    voicemail_message: Optional[str] = None  # Left on answering machines of outbound calls
     voice: Optional[str] = None
     language: str = "en-US"
     tools: List[str] = Field(default_factory=list)  # Tool IDs
     workflows: List[str] = Field(default_factory=list)  # Workflow IDs
     settings: Optional[AgentSettings] = None
+    business_data: Optional[BusinessData] = None
     analytics: Optional[Dict[str, Any]] = None
     status: AgentStatus = AgentStatus.ACTIVE
     # Visual builder fields
@@ -63,26 +86,6 @@ class Agent(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
-class BusinessData(BaseModel):
-    """Business-specific data for agent creation"""
-    # Restaurant
-    menu: Optional[str] = None
-    menu_files: Optional[List[Dict[str, Any]]] = None
-    
-    # Salon
-    services: Optional[str] = None
-    service_files: Optional[List[Dict[str, Any]]] = None
-    stylists: Optional[str] = None
-    
-    # Medical
-    doctors: Optional[str] = None
-    insurance_accepted: Optional[str] = None
-    
-    # Common
-    hours: Optional[Dict[str, str]] = None
-    additional_info: Optional[str] = None
-
-
 class CreateAgentRequest(BaseModel):
     name: str
     business_name: Optional[str] = None
@@ -94,6 +97,7 @@ class CreateAgentRequest(BaseModel):
     phone_number: Optional[str] = None
     instructions: Optional[str] = None
     first_message: Optional[str] = None
+    voicemail_message: Optional[str] = None
     voice: Optional[str] = None  # Changed to string to match frontend
     language: str = "en-US"
     tools: List[Dict[str, Any]] = Field(default_factory=list)  # Changed to Dict for tool objects
@@ -115,10 +119,12 @@ class UpdateAgentRequest(BaseModel):
     instructions: Optional[str] = None
     greeting: Optional[str] = None
     first_message: Optional[str] = None
+    voicemail_message: Optional[str] = None
     voice: Optional[str] = None
     language: Optional[str] = None
     tools: Optional[List[Dict[str, Any]]] = None  # Changed to handle tool objects with configuration
     settings: Optional[AgentSettings] = None
+    business_data: Optional[BusinessData] = None
     status: Optional[AgentStatus] = None
     # Visual builder fields
     nodes: Optional[List[Dict[str, Any]]] = None
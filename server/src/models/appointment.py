@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+
+class AppointmentStatus(str, Enum):
+    CONFIRMED = "confirmed"
+    CANCELLED = "cancelled"
+
+
+class Appointment(BaseModel):
+    id: str
+    agent_id: str
+    resource: str  # Stylist, doctor or other bookable person/room
+    start: datetime
+    end: datetime
+    customer_name: Optional[str] = None
+    customer_phone: Optional[str] = None
+    status: AppointmentStatus = AppointmentStatus.CONFIRMED
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -56,6 +56,7 @@ class CreateOutboundCallRequest(BaseModel):
     customer_name: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
     max_duration: Optional[int] = None  # Override agent's max duration
+    amd: Optional[bool] = None  # Screen for answering machines before greeting; AMD_ENABLED when not set
 
 
 class CreateInboundCallRequest(BaseModel):
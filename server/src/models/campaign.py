@@ -0,0 +1,95 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+from enum import Enum
+
+
+class CampaignStatus(str, Enum):
+    DRAFT = "draft"
+    RUNNING = "running"
+    PAUSED = "paused"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class ContactStatus(str, Enum):
+    PENDING = "pending"  # Not called yet
+    DIALING = "dialing"
+    RETRY = "retry"  # Waiting for another attempt
+    COMPLETED = "completed"  # Reached
+    FAILED = "failed"  # Attempts used up, or an outcome that is not retried
+    SKIPPED = "skipped"  # Campaign cancelled first
+
+
+class CallingHours(BaseModel):
+    start: str = "09:00"  # Local time of the contact, 24-hour clock
+    end: str = "20:00"
+    days: List[int] = Field(default_factory=lambda: [0, 1, 2, 3, 4, 5, 6])  # Monday is 0
+
+
+class CampaignSettings(BaseModel):
+    max_concurrent_calls: int = 5
+    calls_per_second: float = 1.0
+    calling_hours: CallingHours = Field(default_factory=CallingHours)
+    timezone: str = "UTC"  # For contacts imported without one
+    max_attempts: int = 3
+    # Seconds before calling again after each outcome; other outcomes are not retried
+    retry_delays: Dict[str, int] = Field(default_factory=lambda: {"busy": 300, "no_answer": 1800})
+    ring_timeout: Optional[int] = None  # Seconds; the agent worker's default when not set
+    amd: Optional[bool] = None  # Screen for answering machines before greeting; AMD_ENABLED when not set
+    from_number: Optional[str] = None
+
+
+class Campaign(BaseModel):
+    id: str
+    user_id: str
+    agent_id: str
+    name: str
+    status: CampaignStatus = CampaignStatus.DRAFT
+    settings: CampaignSettings = Field(default_factory=CampaignSettings)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class CampaignContact(BaseModel):
+    id: str
+    campaign_id: str
+    phone_number: str
+    name: Optional[str] = None
+    timezone: str = "UTC"
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    status: ContactStatus = ContactStatus.PENDING
+    attempts: int = 0
+    last_outcome: Optional[str] = None
+    next_attempt_at: Optional[float] = None  # Unix time of the next retry
+    call_id: Optional[str] = None
+    room_name: Optional[str] = None
+
+
+class CreateCampaignRequest(BaseModel):
+    name: str
+    agent_id: str
+    settings: CampaignSettings = Field(default_factory=CampaignSettings)
+
+
+class CampaignContactInput(BaseModel):
+    phone_number: str
+    name: Optional[str] = None
+    timezone: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ImportContactsRequest(BaseModel):
+    contacts: List[CampaignContactInput]
+
+
+class CampaignProgress(BaseModel):
+    total: int = 0
+    pending: int = 0
+    dialing: int = 0
+    retry: int = 0
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    attempts: int = 0
+    outcomes: Dict[str, int] = Field(default_factory=dict)  # Last outcome of each contact called
@@ -51,6 +51,8 @@ class ToolConfig(BaseModel):
     parameters: Optional[List[ToolParameter]] = None
     method: Optional[str] = "POST"
     timeout: Optional[int] = 30
+    async_delivery: bool = False  # Queue outbound messages/webhooks and return to the agent immediately
+    hedge_requests: bool = False  # Send a second GET when the first is slower than the endpoint's usual latency
 
 
 class Tool(BaseModel):
@@ -65,7 +67,8 @@ class Tool(BaseModel):
     configuration: Optional[Dict[str, Any]] = None
     config: Optional[ToolConfig] = None
     json_schema: Optional[Dict[str, Any]] = None  # JSON Schema for parameters
-    usage_count: int = 0
+    usage_count: int = 0  # Successful executions
+    failure_count: int = 0  # Failed executions
     last_used: Optional[datetime] = None
     template_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -105,4 +108,17 @@ class ToolExecutionResponse(BaseModel):
     success: bool
     result: Optional[Any] = None
     error: Optional[str] = None
-    execution_time: Optional[float] = None
\ No newline at end of file
+    execution_time: Optional[float] = None
+
+
+class ToolExecutionBatchRequest(BaseModel):
+    requests: List[ToolExecutionRequest]
+    max_concurrency: Optional[int] = None
+    timeout: Optional[float] = None  # Per-call timeout in seconds, defaults to each tool's own
+
+
+class ToolExecutionBatchResponse(BaseModel):
+    results: List[ToolExecutionResponse]
+    succeeded: int
+    failed: int
+    execution_time: float
@@ -1,5 +1,18 @@
-from .database import db_service, get_db
-from .livekit_service import LiveKitService
-from .tool_executor import ToolExecutor
+import importlib
 
-__all__ = ["db_service", "get_db", "LiveKitService", "ToolExecutor"]
\ No newline at end of file
+__all__ = ["db_service", "get_db", "LiveKitService", "ToolExecutor"]
+
+# Resolved on first use: importing the database connects to Firebase, and
+# importing any one service (or testing it) should not require credentials
+_EXPORTS = {
+    "db_service": ".database",
+    "get_db": ".database",
+    "LiveKitService": ".livekit_service",
+    "ToolExecutor": ".tool_executor",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -7,9 +7,9 @@ import logging
 from typing import Optional
 
 from livekit import agents
-from livekit.agents import JobContext, WorkerOptions
+from livekit.agents import JobContext, JobExecutorType, WorkerOptions
 
-from ..agents.phone_agent import entrypoint as agent_entrypoint
+from ..agents.phone_agent import entrypoint as agent_entrypoint, prewarm as agent_prewarm
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -31,6 +31,13 @@ class AgentWorkerService:
             # Use automatic dispatch (no agent_name) so agent joins any room with participants
             worker_opts = WorkerOptions(
                 entrypoint_fnc=agent_entrypoint,
+                # Load the Silero VAD while the job process waits for its call instead of
+                # during call setup; the turn detector's model lives in the worker's shared
+                # inference process and needs no prewarming
+                prewarm_fnc=agent_prewarm,
+                # One process per call: the SMS, email and webhook senders, rate limiters
+                # and HTTP clients are bound to the event loop of the call that started them
+                job_executor_type=JobExecutorType.PROCESS,
                 # agent_name=getattr(settings, 'agent_name', 'phone-agent'),  # Commented out for auto dispatch
                 ws_url=settings.livekit_url,
                 api_key=settings.livekit_api_key,
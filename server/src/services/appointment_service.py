@@ -0,0 +1,774 @@
+"""
+Appointment availability and booking.
+
+Each bookable resource (stylist, doctor, ...) gets a schedule derived from the
+agent's business hours. Existing bookings for a resource and day are held in a
+sorted interval index, so checking a slot is a binary search and listing free
+slots only walks the bookings inside the opening window. Bookings are written
+through a storage backend that re-checks for conflicts in the same transaction,
+so concurrent callers (even in different worker processes) can never take the
+same slot.
+
+Dates and times are those of the business: "tomorrow" and "2:30 PM" are read
+in the agent's timezone (``business_data.timezone``, else APPOINTMENT_TIMEZONE),
+whatever timezone the server runs in. Appointments are stored in UTC.
+"""
+import abc
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from difflib import get_close_matches
+from time import monotonic
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ..core.config import settings
+from ..models import Agent, Appointment, AppointmentStatus
+
+logger = logging.getLogger(__name__)
+
+# Business types that take appointments even without named staff
+APPOINTMENT_BUSINESS_TYPES = {"salon", "medical"}
+
+# Used when an appointment business has not filled in its hours yet
+DEFAULT_BUSINESS_HOURS = {
+    "monday": "9:00 AM - 5:00 PM",
+    "tuesday": "9:00 AM - 5:00 PM",
+    "wednesday": "9:00 AM - 5:00 PM",
+    "thursday": "9:00 AM - 5:00 PM",
+    "friday": "9:00 AM - 5:00 PM",
+}
+
+# Resource used when the business does not list individual staff
+DEFAULT_RESOURCE = "default"
+
+# How long a loaded day calendar is trusted before re-reading it from storage
+CALENDAR_TTL_SECONDS = 5.0
+CALENDAR_CACHE_SIZE = 1024
+
+# Number of free times read back to the caller, and how far ahead to look for the next open day
+MAX_SPOKEN_SLOTS = 6
+SEARCH_AHEAD_DAYS = 14
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+_HOURS_RANGE = re.compile(
+    r"(\d{1,2})(?:[:.](\d{2}))?\s*([ap])?\.?m?\.?\s*(?:-|–|—|to|until)\s*(\d{1,2})(?:[:.](\d{2}))?\s*([ap])?\.?m?\.?",
+    re.IGNORECASE,
+)
+_SPOKEN_TIME = re.compile(r"^(\d{1,2})(?:[:.](\d{2}))?\s*(?:([ap])\.?\s*m?\.?)?$")
+_ORDINAL_SUFFIX = re.compile(r"(\d+)(st|nd|rd|th)\b")
+_RESOURCE_SEPARATORS = re.compile(r"\s*(?:,|;|\n|&|\band\b)\s*")
+_RESOURCE_DETAILS = re.compile(r"\s+[-–—:]\s+|\s*\(")
+
+_DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%B %d %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y"]
+_DATE_FORMATS_NO_YEAR = ["%m/%d", "%B %d", "%b %d", "%d %B", "%d %b"]
+
+
+def _clock_minutes(hour: int, minute: int, meridiem: Optional[str]) -> int:
+    if meridiem:
+        meridiem = meridiem.lower()
+        if meridiem == "p" and hour < 12:
+            hour += 12
+        elif meridiem == "a" and hour == 12:
+            hour = 0
+    return hour * 60 + minute
+
+
+def parse_hours(text: Optional[str]) -> List[Tuple[int, int]]:
+    """
+    Parse one day's opening hours into minute ranges
+
+    Args:
+        text: Hours as entered in the agent builder, e.g. "9:00 AM - 9:00 PM",
+            "9am-12pm, 1pm-5pm", "09:00-17:00" or "Closed"
+
+    Returns:
+        (open, close) pairs in minutes since midnight, empty when closed
+    """
+    if not text:
+        return []
+    value = text.lower().replace("noon", "12:00 pm").replace("midnight", "12:00 am")
+    if "closed" in value:
+        return []
+    if "24" in value and "hour" in value:
+        return [(0, 24 * 60)]
+
+    ranges = []
+    for match in _HOURS_RANGE.finditer(value):
+        start_hour, start_minute, start_meridiem, end_hour, end_minute, end_meridiem = match.groups()
+        end = _clock_minutes(int(end_hour), int(end_minute or 0), end_meridiem)
+        start = _clock_minutes(int(start_hour), int(start_minute or 0), start_meridiem or end_meridiem)
+        if not start_meridiem and end_meridiem and start >= end:
+            # "9-5pm" means 9 AM to 5 PM
+            start = _clock_minutes(int(start_hour), int(start_minute or 0), "a")
+        if not end_meridiem and end <= start and end + 12 * 60 > start:
+            # "9-5" in 12-hour form
+            end += 12 * 60
+        if end <= start:
+            # Closing at or after midnight
+            end = 24 * 60
+        ranges.append((start, min(end, 24 * 60)))
+
+    return sorted(ranges)
+
+
+class BusinessSchedule:
+    """Weekly opening hours of a business, in its timezone"""
+
+    def __init__(self, hours: Dict[str, str], zone: Optional[tzinfo] = None):
+        self.timezone = zone or timezone.utc
+        self._ranges: Dict[int, List[Tuple[int, int]]] = {
+            weekday: parse_hours((hours or {}).get(name))
+            for weekday, name in enumerate(_WEEKDAYS)
+        }
+
+    def now(self) -> datetime:
+        """Current time at the business"""
+        return datetime.now(self.timezone)
+
+    def midnight(self, day: date) -> datetime:
+        return datetime.combine(day, time.min, tzinfo=self.timezone)
+
+    def open_windows(self, day: date) -> List[Tuple[datetime, datetime]]:
+        """Opening windows on a given day"""
+        midnight = self.midnight(day)
+        return [
+            (midnight + timedelta(minutes=start), midnight + timedelta(minutes=end))
+            for start, end in self._ranges[day.weekday()]
+        ]
+
+    def is_open(self, start: datetime, end: datetime) -> bool:
+        """Whether the interval falls entirely inside one opening window"""
+        return any(
+            window_start <= start and end <= window_end
+            for window_start, window_end in self.open_windows(start.astimezone(self.timezone).date())
+        )
+
+    def describe(self, day: date) -> str:
+        """Spoken opening hours for a day, e.g. "9:00 AM to 5:00 PM" """
+        windows = self.open_windows(day)
+        if not windows:
+            return "closed"
+        return " and ".join(f"{spoken_time(start)} to {spoken_time(end)}" for start, end in windows)
+
+
+def parse_resources(text: Optional[str]) -> List[str]:
+    """
+    Extract bookable staff names from free text such as
+    "Sarah (color), Mia - cuts and Dr. Kim"
+    """
+    names: List[str] = []
+    for part in _RESOURCE_SEPARATORS.split(text or ""):
+        name = _RESOURCE_DETAILS.split(part.strip(" \t-•*"))[0].strip()
+        # Skip sentences ("we have three stylists") that are not a name
+        if name and len(name.split()) <= 4 and name not in names:
+            names.append(name)
+    return names
+
+
+def parse_date(text: str, today: date) -> Optional[date]:
+    """Parse a spoken or written date relative to today"""
+    value = _ORDINAL_SUFFIX.sub(r"\1", str(text or "").strip().lower().replace(",", " "))
+    value = " ".join(value.split())
+    if not value:
+        return None
+    if value in ("today", "tonight"):
+        return today
+    if value == "tomorrow":
+        return today + timedelta(days=1)
+    if value == "day after tomorrow":
+        return today + timedelta(days=2)
+
+    words = value.split()
+    for weekday, name in enumerate(_WEEKDAYS):
+        if name in words or name[:3] in words:
+            remaining = [word for word in words if word not in (name, name[:3], "next", "this", "on", "coming")]
+            if not remaining:
+                days_ahead = (weekday - today.weekday()) % 7
+                if days_ahead == 0 and "next" in words:
+                    days_ahead = 7
+                return today + timedelta(days=days_ahead)
+            # "friday july 5": drop the weekday and parse the rest
+            value = " ".join(remaining)
+            break
+
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    for date_format in _DATE_FORMATS_NO_YEAR:
+        try:
+            parsed = datetime.strptime(f"{value} {today.year}", f"{date_format} %Y").date()
+        except ValueError:
+            continue
+        # A date without a year that already passed means next year
+        return parsed if parsed >= today else parsed.replace(year=today.year + 1)
+    return None
+
+
+def parse_time(text: str) -> Optional[time]:
+    """Parse a spoken time such as "2pm", "2:30 PM", "14:00" or "noon" """
+    value = str(text or "").strip().lower().replace("o'clock", "").replace("oclock", "").strip()
+    if value == "noon":
+        return time(12, 0)
+    match = _SPOKEN_TIME.match(value)
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if hour > 23 or minute > 59 or (meridiem and hour > 12):
+        return None
+    if not meridiem and 1 <= hour <= 6:
+        # Nobody books a 3 AM haircut; "at 3" means the afternoon
+        meridiem = "p"
+    minutes = _clock_minutes(hour, minute, meridiem)
+    return time(minutes // 60, minutes % 60)
+
+
+def spoken_time(value: datetime) -> str:
+    return value.strftime("%I:%M %p").lstrip("0")
+
+
+def spoken_date(value: date) -> str:
+    return f"{value.strftime('%A, %B')} {value.day}"
+
+
+def _align(moment: datetime, origin: datetime, step: timedelta) -> datetime:
+    """Round a moment up onto the slot grid starting at origin"""
+    if moment <= origin:
+        return origin
+    steps = -((origin - moment) // step)
+    return origin + steps * step
+
+
+class BookingIndex:
+    """Sorted, non-overlapping bookings of one resource on one day"""
+
+    def __init__(self, intervals: Optional[List[Tuple[datetime, datetime]]] = None):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        for start, end in sorted(intervals or []):
+            self.add(start, end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def add(self, start: datetime, end: datetime):
+        position = bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._ends.insert(position, end)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        """Whether [start, end) overlaps no booking, in O(log n)"""
+        position = bisect_right(self._starts, start)
+        if position and self._ends[position - 1] > start:
+            return False
+        return position == len(self._starts) or self._starts[position] >= end
+
+    def free_slots(
+        self,
+        window_start: datetime,
+        window_end: datetime,
+        duration: timedelta,
+        step: timedelta,
+        origin: Optional[datetime] = None,
+    ) -> Iterator[datetime]:
+        """
+        Free slot starts inside a window
+
+        Finds the first relevant booking by binary search, then jumps over
+        bookings instead of testing every slot against them.
+        """
+        origin = origin or window_start
+        current = _align(window_start, origin, step)
+        # Bookings never overlap, so end times are sorted as well
+        position = bisect_right(self._ends, current)
+
+        while current + duration <= window_end:
+            while position < len(self._starts) and self._ends[position] <= current:
+                position += 1
+            if position < len(self._starts) and self._starts[position] < current + duration:
+                current = _align(self._ends[position], origin, step)
+                continue
+            yield current
+            current += step
+
+
+class AppointmentStore(abc.ABC):
+    """Storage backend for appointments"""
+
+    @abc.abstractmethod
+    async def list_appointments(
+        self, agent_id: str, resource: str, start: datetime, end: datetime
+    ) -> List[Appointment]:
+        """Confirmed appointments of a resource overlapping [start, end)"""
+
+    @abc.abstractmethod
+    async def book_if_free(self, appointment: Appointment) -> bool:
+        """Atomically insert an appointment unless it overlaps a confirmed one"""
+
+    @abc.abstractmethod
+    async def cancel(self, agent_id: str, appointment_id: str) -> Optional[Appointment]:
+        """Cancel an appointment, returning it when it existed"""
+
+
+class SQLiteAppointmentStore(AppointmentStore):
+    """
+    Appointment store backed by a local SQLite file
+
+    Bookings run in a ``BEGIN IMMEDIATE`` transaction, which takes the database
+    write lock before the conflict check, so checks and inserts from separate
+    agent worker processes are serialised.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS appointments (
+                    id TEXT PRIMARY KEY,
+                    agent_id TEXT NOT NULL,
+                    resource TEXT NOT NULL,
+                    start_at TEXT NOT NULL,
+                    end_at TEXT NOT NULL,
+                    customer_name TEXT,
+                    customer_phone TEXT,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_appointments_resource_start "
+                "ON appointments (agent_id, resource, status, start_at)"
+            )
+            self._connection = connection
+            logger.info(f"Opened appointment store at {self.path}")
+        return self._connection
+
+    @staticmethod
+    def _to_appointment(row: sqlite3.Row) -> Appointment:
+        return Appointment(
+            id=row["id"],
+            agent_id=row["agent_id"],
+            resource=row["resource"],
+            start=_from_timestamp(row["start_at"]),
+            end=_from_timestamp(row["end_at"]),
+            customer_name=row["customer_name"],
+            customer_phone=row["customer_phone"],
+            status=row["status"],
+            created_at=_from_timestamp(row["created_at"]),
+        )
+
+    def _list_sync(self, agent_id: str, resource: str, start: datetime, end: datetime) -> List[Appointment]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT * FROM appointments WHERE agent_id = ? AND resource = ? AND status = ? "
+                "AND start_at < ? AND end_at > ? ORDER BY start_at",
+                (agent_id, resource, AppointmentStatus.CONFIRMED.value, _timestamp(end), _timestamp(start)),
+            ).fetchall()
+        return [self._to_appointment(row) for row in rows]
+
+    def _book_sync(self, appointment: Appointment) -> bool:
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                conflict = connection.execute(
+                    "SELECT 1 FROM appointments WHERE agent_id = ? AND resource = ? AND status = ? "
+                    "AND start_at < ? AND end_at > ? LIMIT 1",
+                    (
+                        appointment.agent_id,
+                        appointment.resource,
+                        AppointmentStatus.CONFIRMED.value,
+                        _timestamp(appointment.end),
+                        _timestamp(appointment.start),
+                    ),
+                ).fetchone()
+                if conflict:
+                    connection.execute("ROLLBACK")
+                    return False
+                connection.execute(
+                    "INSERT INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        appointment.id,
+                        appointment.agent_id,
+                        appointment.resource,
+                        _timestamp(appointment.start),
+                        _timestamp(appointment.end),
+                        appointment.customer_name,
+                        appointment.customer_phone,
+                        appointment.status.value,
+                        _timestamp(appointment.created_at),
+                    ),
+                )
+                connection.execute("COMMIT")
+                return True
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def _cancel_sync(self, agent_id: str, appointment_id: str) -> Optional[Appointment]:
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT * FROM appointments WHERE id = ? AND agent_id = ?", (appointment_id, agent_id)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE appointments SET status = ? WHERE id = ?",
+                (AppointmentStatus.CANCELLED.value, appointment_id),
+            )
+        return self._to_appointment(row)
+
+    async def list_appointments(
+        self, agent_id: str, resource: str, start: datetime, end: datetime
+    ) -> List[Appointment]:
+        return await asyncio.to_thread(self._list_sync, agent_id, resource, start, end)
+
+    async def book_if_free(self, appointment: Appointment) -> bool:
+        return await asyncio.to_thread(self._book_sync, appointment)
+
+    async def cancel(self, agent_id: str, appointment_id: str) -> Optional[Appointment]:
+        return await asyncio.to_thread(self._cancel_sync, agent_id, appointment_id)
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width ISO text in UTC so SQLite string comparison orders like the datetimes
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def _from_timestamp(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class AppointmentEngine:
+    """Slot queries and conflict-checked bookings on top of an appointment store"""
+
+    def __init__(self, store: AppointmentStore, slot_minutes: int = 30):
+        self.store = store
+        self.slot = timedelta(minutes=slot_minutes)
+        self._calendars: "OrderedDict[Tuple[str, str, date], Tuple[float, BookingIndex]]" = OrderedDict()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    async def _calendar(
+        self, agent_id: str, resource: str, day: date, zone: tzinfo, refresh: bool = False
+    ) -> BookingIndex:
+        """Booking index of a resource for a day (in the business's timezone), re-read from storage once it is stale"""
+        key = (agent_id, resource, day)
+        cached = self._calendars.get(key)
+        if cached and not refresh and monotonic() - cached[0] < CALENDAR_TTL_SECONDS:
+            self._calendars.move_to_end(key)
+            return cached[1]
+
+        day_start = datetime.combine(day, time.min, tzinfo=zone)
+        appointments = await self.store.list_appointments(agent_id, resource, day_start, day_start + timedelta(days=1))
+        index = BookingIndex([(appointment.start, appointment.end) for appointment in appointments])
+
+        self._calendars[key] = (monotonic(), index)
+        self._calendars.move_to_end(key)
+        if len(self._calendars) > CALENDAR_CACHE_SIZE:
+            self._calendars.popitem(last=False)
+        return index
+
+    async def available_slots(
+        self,
+        agent_id: str,
+        schedule: BusinessSchedule,
+        resources: List[str],
+        day: date,
+        duration: Optional[timedelta] = None,
+        not_before: Optional[datetime] = None,
+    ) -> List[Tuple[datetime, List[str]]]:
+        """
+        Free slots on a day
+
+        Returns:
+            (slot start, resources free for the whole slot) pairs in time order
+        """
+        duration = duration or self.slot
+        windows = schedule.open_windows(day)
+        if not windows:
+            return []
+
+        indexes = await asyncio.gather(
+            *(self._calendar(agent_id, resource, day, schedule.timezone) for resource in resources)
+        )
+
+        slots: Dict[datetime, List[str]] = {}
+        for resource, index in zip(resources, indexes):
+            for window_start, window_end in windows:
+                start = window_start
+                if not_before and not_before > window_start:
+                    start = _align(not_before, window_start, self.slot)
+                for slot_start in index.free_slots(start, window_end, duration, self.slot, origin=window_start):
+                    slots.setdefault(slot_start, []).append(resource)
+
+        return sorted(slots.items())
+
+    async def book(
+        self,
+        agent_id: str,
+        resources: List[str],
+        start: datetime,
+        duration: Optional[timedelta] = None,
+        customer_name: Optional[str] = None,
+        customer_phone: Optional[str] = None,
+    ) -> Optional[Appointment]:
+        """
+        Book the first resource free for the slot; None when all of them are taken
+
+        ``start`` must be timezone-aware, in the business's timezone.
+        """
+        end = start + (duration or self.slot)
+
+        for resource in resources:
+            lock = self._locks.setdefault((agent_id, resource), asyncio.Lock())
+            async with lock:
+                index = await self._calendar(agent_id, resource, start.date(), start.tzinfo)
+                if not index.is_free(start, end):
+                    continue
+
+                appointment = Appointment(
+                    id=uuid.uuid4().hex,
+                    agent_id=agent_id,
+                    resource=resource,
+                    start=start,
+                    end=end,
+                    customer_name=customer_name,
+                    customer_phone=customer_phone,
+                )
+                if await self.store.book_if_free(appointment):
+                    index.add(start, end)
+                    logger.info(f"Booked appointment {appointment.id} for {agent_id}/{resource} at {start}")
+                    return appointment
+
+                # Taken by another process since the calendar was loaded
+                logger.info(f"Slot {start} for {agent_id}/{resource} was booked elsewhere, refreshing calendar")
+                await self._calendar(agent_id, resource, start.date(), start.tzinfo, refresh=True)
+
+        return None
+
+    async def cancel(self, agent_id: str, appointment_id: str) -> Optional[Appointment]:
+        appointment = await self.store.cancel(agent_id, appointment_id)
+        if appointment:
+            # Calendars are keyed by the business's local day, which the stored UTC start does not give
+            for key in [key for key in self._calendars if key[:2] == (agent_id, appointment.resource)]:
+                del self._calendars[key]
+        return appointment
+
+
+class AppointmentBook:
+    """Availability and booking for one agent, shaped as call tool responses"""
+
+    def __init__(
+        self,
+        agent_id: str,
+        schedule: BusinessSchedule,
+        resources: List[str],
+        engine: "AppointmentEngine",
+    ):
+        self.agent_id = agent_id
+        self.schedule = schedule
+        self.resources = resources or [DEFAULT_RESOURCE]
+        self.engine = engine
+
+    @property
+    def has_staff(self) -> bool:
+        return self.resources != [DEFAULT_RESOURCE]
+
+    def resolve_resources(self, text: Optional[str]) -> Optional[List[str]]:
+        """Resources matching a requested staff member; None when nobody matches"""
+        if not text or not self.has_staff or text.strip().lower() in ("any", "anyone", "no preference"):
+            return self.resources
+        wanted = text.strip().lower()
+        for resource in self.resources:
+            if wanted == resource.lower() or wanted in resource.lower().split():
+                return [resource]
+        lowered = {resource.lower(): resource for resource in self.resources}
+        matches = get_close_matches(wanted, list(lowered.keys()), n=1, cutoff=0.75)
+        return [lowered[matches[0]]] if matches else None
+
+    def _duration(self, duration_minutes: Any) -> timedelta:
+        try:
+            minutes = int(float(duration_minutes))
+        except (TypeError, ValueError):
+            return self.engine.slot
+        return timedelta(minutes=minutes) if minutes > 0 else self.engine.slot
+
+    def _unknown_staff(self, text: str) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "message": f"I couldn't find {text} on our team. We have {', '.join(self.resources)}.",
+            "staff": self.resources,
+        }
+
+    async def availability(
+        self,
+        date_text: str,
+        staff: Optional[str] = None,
+        duration_minutes: Any = None,
+    ) -> Dict[str, Any]:
+        """Free times on the requested day, or on the next open day when it is full"""
+        now = self.schedule.now()
+        day = parse_date(date_text, now.date())
+        if day is None:
+            return {"success": False, "message": f"I couldn't understand the date '{date_text}'."}
+        if day < now.date():
+            return {"success": False, "message": f"{spoken_date(day)} has already passed."}
+
+        resources = self.resolve_resources(staff)
+        if resources is None:
+            return self._unknown_staff(staff)
+
+        duration = self._duration(duration_minutes)
+        slots = await self.engine.available_slots(self.agent_id, self.schedule, resources, day, duration, now)
+        result = self._slot_result(day, slots)
+
+        if not slots:
+            result["message"] = (
+                f"We're closed on {spoken_date(day)}." if not self.schedule.open_windows(day)
+                else f"We're fully booked on {spoken_date(day)}."
+            )
+            for offset in range(1, SEARCH_AHEAD_DAYS + 1):
+                next_day = day + timedelta(days=offset)
+                next_slots = await self.engine.available_slots(
+                    self.agent_id, self.schedule, resources, next_day, duration, now
+                )
+                if next_slots:
+                    result["next_available"] = self._slot_result(next_day, next_slots)
+                    break
+
+        return result
+
+    def _slot_result(self, day: date, slots: List[Tuple[datetime, List[str]]]) -> Dict[str, Any]:
+        spoken = slots[:MAX_SPOKEN_SLOTS]
+        result: Dict[str, Any] = {
+            "success": True,
+            "date": day.isoformat(),
+            "day": spoken_date(day),
+            "available_times": [spoken_time(start) for start, _ in spoken],
+            "total_available": len(slots),
+        }
+        if self.has_staff:
+            result["staff_by_time"] = {spoken_time(start): resources for start, resources in spoken}
+        return result
+
+    async def book(
+        self,
+        date_text: str,
+        time_text: str,
+        customer_name: Optional[str] = None,
+        customer_phone: Optional[str] = None,
+        staff: Optional[str] = None,
+        duration_minutes: Any = None,
+    ) -> Dict[str, Any]:
+        """Book a slot, offering the remaining times that day when it is taken"""
+        now = self.schedule.now()
+        day = parse_date(date_text, now.date())
+        start_time = parse_time(time_text)
+        if day is None or start_time is None:
+            return {"success": False, "message": f"I couldn't understand '{date_text} at {time_text}'."}
+
+        resources = self.resolve_resources(staff)
+        if resources is None:
+            return self._unknown_staff(staff)
+
+        start = datetime.combine(day, start_time, tzinfo=self.schedule.timezone)
+        duration = self._duration(duration_minutes)
+        if start < now:
+            return {"success": False, "message": f"{spoken_date(day)} at {spoken_time(start)} has already passed."}
+
+        if not self.schedule.is_open(start, start + duration):
+            alternatives = await self.availability(date_text, staff, duration_minutes)
+            return {
+                **alternatives,
+                "success": False,
+                "message": f"We aren't open for appointments at {spoken_time(start)} on {spoken_date(day)}. "
+                           f"Our hours that day are {self.schedule.describe(day)}.",
+            }
+
+        appointment = await self.engine.book(
+            self.agent_id, resources, start, duration, customer_name, customer_phone
+        )
+        if appointment is None:
+            alternatives = await self.availability(date_text, staff, duration_minutes)
+            return {
+                **alternatives,
+                "success": False,
+                "message": f"Sorry, {spoken_time(start)} on {spoken_date(day)} is no longer available.",
+            }
+
+        message = f"Appointment confirmed for {spoken_date(day)} at {spoken_time(start)}"
+        if self.has_staff:
+            message += f" with {appointment.resource}"
+        result = {
+            "success": True,
+            "appointment_id": appointment.id,
+            "date": day.isoformat(),
+            "time": spoken_time(start),
+            "message": message + ".",
+        }
+        if self.has_staff:
+            result["staff"] = appointment.resource
+        return result
+
+
+appointment_engine = AppointmentEngine(
+    SQLiteAppointmentStore(settings.appointments_db_path),
+    slot_minutes=settings.appointment_slot_minutes,
+)
+
+
+def business_timezone(name: Optional[str]) -> tzinfo:
+    """Timezone of a business, falling back to APPOINTMENT_TIMEZONE and then UTC"""
+    for candidate in (name, settings.appointment_timezone):
+        if not candidate:
+            continue
+        try:
+            return ZoneInfo(candidate)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Unknown timezone '{candidate}' for appointments")
+    return timezone.utc
+
+
+def get_appointment_book(agent: Agent) -> Optional[AppointmentBook]:
+    """Appointment book for an agent, or None when the business does not take appointments"""
+    business_data = agent.business_data
+    staff_text = ", ".join(
+        value for value in [business_data.stylists, business_data.doctors] if value
+    ) if business_data else ""
+
+    if (agent.business_type or "").lower() not in APPOINTMENT_BUSINESS_TYPES and not staff_text:
+        return None
+
+    hours = business_data.hours if business_data and business_data.hours else DEFAULT_BUSINESS_HOURS
+    return AppointmentBook(
+        agent_id=agent.id,
+        schedule=BusinessSchedule(hours, business_timezone(business_data.timezone if business_data else None)),
+        resources=parse_resources(staff_text),
+        engine=appointment_engine,
+    )
@@ -0,0 +1,1012 @@
+"""
+Outbound call campaigns.
+
+A campaign calls every contact of an imported list with one agent. The engine
+paces dialing to the campaign's and the trunk's limits (concurrent calls and
+calls per second) and only calls contacts inside the campaign's calling hours
+in their own timezone: fresh contacts are read from the store for the
+timezones whose window is open, so contacts waiting for their morning cost
+nothing. Busy and unanswered calls are retried after the campaign's delay for
+that outcome; pending retries sit in a timing wheel, so thousands of them
+expire in O(1) per tick instead of being polled. Contacts and their state are
+kept in SQLite, so a restarted engine resumes where it stopped.
+
+Calls are placed through a ``CampaignDialer``: ``LiveKitCampaignDialer``
+starts them like ``POST /api/calls/outbound`` and learns how they ended from
+the LiveKit room webhook and the call record; tests and simulations pass a
+stand-in.
+"""
+import abc
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, time as clock_time, timedelta
+from time import time
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..models import (
+    Agent,
+    CallStatus,
+    CallingHours,
+    Campaign,
+    CampaignContact,
+    CampaignContactInput,
+    CampaignProgress,
+    CampaignStatus,
+    ContactStatus,
+)
+from ..utils.rate_limiter import TokenBucket
+from ..utils.timing_wheel import TimingWheel
+
+logger = logging.getLogger(__name__)
+
+# Outcome of a call the contact picked up
+OUTCOME_ANSWERED = "answered"
+
+# Retries further out than this wait a few extra turns of the wheel
+WHEEL_SLOTS = 3600
+
+# A contact left dialing by a stopped engine is called again after this long
+INTERRUPTED_RETRY_SECONDS = 60.0
+
+_PHONE_SEPARATORS = re.compile(r"[\s\-().]")
+_PHONE_NUMBER = re.compile(r"^\+?\d{7,15}$")
+
+_calls = metrics.counter("campaign_calls_total", "Campaign call attempts by outcome")
+_active_calls = metrics.gauge("campaign_active_calls", "Campaign calls in progress")
+
+
+def normalize_phone_number(value: str) -> Optional[str]:
+    """The number without separators, or None when it is not a phone number"""
+    number = _PHONE_SEPARATORS.sub("", value or "")
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    return number if _PHONE_NUMBER.match(number) else None
+
+
+def valid_timezone(name: Optional[str]) -> bool:
+    try:
+        ZoneInfo(name or "")
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def _clock(value: str) -> clock_time:
+    hour, _, minute = value.partition(":")
+    if int(hour) == 24 and int(minute or 0) == 0:
+        return clock_time.max
+    return clock_time(int(hour), int(minute or 0))
+
+
+def validate_calling_hours(hours: CallingHours) -> Optional[str]:
+    """An error message when the calling hours cannot be used, else None"""
+    try:
+        start, end = _clock(hours.start), _clock(hours.end)
+    except ValueError:
+        return "Calling hours must be HH:MM times"
+    if start >= end:
+        return "Calling hours must start before they end"
+    if not hours.days or any(day not in range(7) for day in hours.days):
+        return "Calling days must be weekdays 0 (Monday) to 6 (Sunday)"
+    return None
+
+
+def window_opens_in(hours: CallingHours, timezone: str, now: float) -> Optional[float]:
+    """
+    Seconds until the calling hours open in ``timezone``
+
+    Returns:
+        0 while they are open, None when they never open
+    """
+    zone = ZoneInfo(timezone)
+    local = datetime.fromtimestamp(now, zone)
+    start, end = _clock(hours.start), _clock(hours.end)
+    for day_offset in range(8):
+        day = local.date() + timedelta(days=day_offset)
+        if day.weekday() not in hours.days:
+            continue
+        # Compared as timestamps: aware datetimes of one zone subtract as wall time across DST changes
+        opens = datetime.combine(day, start, zone).timestamp()
+        closes = datetime.combine(day, end, zone).timestamp()
+        if now < opens:
+            return opens - now
+        if now < closes:
+            return 0.0
+    return None
+
+
+class DialResult:
+    """How one campaign call ended"""
+
+    def __init__(self, outcome: str, call_id: Optional[str] = None, room_name: Optional[str] = None):
+        self.outcome = outcome
+        self.call_id = call_id
+        self.room_name = room_name
+
+
+class CampaignDialer(abc.ABC):
+    """Places campaign calls"""
+
+    @abc.abstractmethod
+    async def dial(self, campaign: Campaign, contact: CampaignContact) -> DialResult:
+        """Call the contact and return once the call is over"""
+
+    def call_ended(self, room_name: str):
+        """A call's room closed"""
+
+    def campaign_loaded(self, campaign: Campaign):
+        """A campaign was started, resumed or recovered; its calls follow"""
+
+    def campaign_unloaded(self, campaign_id: str):
+        """The engine is done with a completed or cancelled campaign"""
+
+    async def close(self):
+        pass
+
+
+class LiveKitCampaignDialer(CampaignDialer):
+    """
+    Places calls through LiveKit, as ``POST /api/calls/outbound`` does
+
+    The agent worker dials the contact and writes the dial outcome to the call
+    record. A call is over when its room closes (reported by the room webhook
+    through ``call_ended``) or, failing that, after the longest a call can last.
+    The campaign's agent is looked up once each time the campaign is loaded, so
+    a resumed campaign calls with the agent as it is then.
+    """
+
+    def __init__(self, call_timeout: float):
+        self.call_timeout = call_timeout
+        self._livekit = None
+        self._ended: Dict[str, asyncio.Future] = {}
+        self._agents: Dict[str, Agent] = {}  # By campaign
+
+    async def dial(self, campaign: Campaign, contact: CampaignContact) -> DialResult:
+        from .database import db_service
+        from .livekit_service import LiveKitService
+
+        if self._livekit is None:
+            self._livekit = LiveKitService()
+        agent = self._agents.get(campaign.id)
+        if agent is None:
+            agent = await db_service.get_agent(campaign.agent_id)
+            if agent is None:
+                logger.error(f"Campaign {campaign.id}: agent {campaign.agent_id} not found")
+                return DialResult(CallStatus.FAILED.value)
+            self._agents[campaign.id] = agent
+
+        job_metadata = {"ring_timeout": campaign.settings.ring_timeout} if campaign.settings.ring_timeout else {}
+        if campaign.settings.amd is not None:
+            job_metadata["amd"] = campaign.settings.amd
+        call = await self._livekit.start_outbound_call(
+            db_service,
+            agent,
+            campaign.user_id,
+            contact.phone_number,
+            from_number=campaign.settings.from_number,
+            customer_name=contact.name,
+            metadata={**contact.metadata, "campaignId": campaign.id, "contactId": contact.id},
+            job_metadata=job_metadata,
+        )
+
+        ended = asyncio.get_running_loop().create_future()
+        self._ended[call.room_name] = ended
+        try:
+            await asyncio.wait_for(ended, timeout=self.call_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Campaign {campaign.id}: no end reported for call {call.id}, reading its record")
+        finally:
+            self._ended.pop(call.room_name, None)
+
+        return DialResult(await self._outcome(call.room_name), call.id, call.room_name)
+
+    def call_ended(self, room_name: str):
+        ended = self._ended.get(room_name)
+        if ended is not None and not ended.done():
+            ended.set_result(None)
+
+    def campaign_loaded(self, campaign: Campaign):
+        self._agents.pop(campaign.id, None)
+
+    def campaign_unloaded(self, campaign_id: str):
+        self._agents.pop(campaign_id, None)
+
+    @staticmethod
+    async def _outcome(room_name: str) -> str:
+        from .database import db_service
+
+        calls = await db_service.get_calls_by_room(room_name)
+        if not calls:
+            return CallStatus.FAILED.value
+        call = calls[0]
+        # The agent worker's answering machine detection, kept when the status is overwritten
+        if call.status == CallStatus.VOICEMAIL or (call.analytics.get("amd") or {}).get("verdict") == "machine":
+            return CallStatus.VOICEMAIL.value
+        # The room webhook marks every finished call completed; the dial outcome tells how it went
+        outcome = (call.analytics.get("dial") or {}).get("outcome")
+        if outcome:
+            return outcome
+        # The agent worker never dialed
+        return CallStatus.FAILED.value
+
+    async def close(self):
+        if self._livekit is not None:
+            await self._livekit.api.aclose()
+            self._livekit = None
+
+
+class CampaignStore(abc.ABC):
+    """Storage backend for campaigns and their contacts"""
+
+    @abc.abstractmethod
+    async def create_campaign(self, campaign: Campaign):
+        """Store a new campaign"""
+
+    @abc.abstractmethod
+    async def get_campaign(self, campaign_id: str) -> Optional[Campaign]:
+        """The campaign, or None when it does not exist"""
+
+    @abc.abstractmethod
+    async def list_campaigns(self, user_id: Optional[str] = None, statuses: Iterable[CampaignStatus] = ()) -> List[Campaign]:
+        """Campaigns, newest first, of one user and in the given statuses when set"""
+
+    @abc.abstractmethod
+    async def set_campaign_status(self, campaign_id: str, status: CampaignStatus):
+        """Change the status of a campaign"""
+
+    @abc.abstractmethod
+    async def add_contacts(self, campaign_id: str, contacts: List[CampaignContact]) -> int:
+        """Insert contacts, skipping numbers the campaign already has; returns how many were added"""
+
+    @abc.abstractmethod
+    async def get_contacts(self, contact_ids: List[str]) -> List[CampaignContact]:
+        """Contacts by id; unknown ids are left out"""
+
+    @abc.abstractmethod
+    async def timezones(self, campaign_id: str) -> List[str]:
+        """Timezones of the contacts still to be called for the first time"""
+
+    @abc.abstractmethod
+    async def next_pending(self, campaign_id: str, timezones: List[str], limit: int) -> List[CampaignContact]:
+        """Contacts not called yet in the given timezones, in import order"""
+
+    @abc.abstractmethod
+    async def claim(self, contact_id: str) -> bool:
+        """Mark a pending or retrying contact as being dialed, counting the attempt"""
+
+    @abc.abstractmethod
+    async def finish_attempt(
+        self,
+        contact_id: str,
+        status: ContactStatus,
+        outcome: str,
+        result: DialResult,
+        next_attempt_at: Optional[float] = None,
+    ):
+        """Record how an attempt ended and the contact's new status"""
+
+    @abc.abstractmethod
+    async def reschedule(self, contact_id: str, next_attempt_at: float):
+        """Move the due time of a retry"""
+
+    @abc.abstractmethod
+    async def retries(self, campaign_id: str) -> List[Tuple[str, float]]:
+        """(contact id, due time) of the contacts waiting for a retry"""
+
+    @abc.abstractmethod
+    async def dialing(self, campaign_id: str) -> List[CampaignContact]:
+        """Contacts being dialed"""
+
+    @abc.abstractmethod
+    async def skip_remaining(self, campaign_id: str):
+        """Skip contacts still waiting to be called"""
+
+    @abc.abstractmethod
+    async def remaining(self, campaign_id: str) -> int:
+        """Contacts pending, dialing or waiting for a retry"""
+
+    @abc.abstractmethod
+    async def progress(self, campaign_id: str) -> CampaignProgress:
+        """Contacts by status, attempts made and the last outcome of each contact called"""
+
+
+class SQLiteCampaignStore(CampaignStore):
+    """Campaign store backed by a local SQLite file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS campaigns (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    agent_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    settings TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS campaign_contacts (
+                    id TEXT PRIMARY KEY,
+                    campaign_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    phone_number TEXT NOT NULL,
+                    name TEXT,
+                    timezone TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_outcome TEXT,
+                    next_attempt_at REAL,
+                    call_id TEXT,
+                    room_name TEXT,
+                    updated_at REAL NOT NULL,
+                    UNIQUE (campaign_id, phone_number)
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_campaign_contacts_due "
+                "ON campaign_contacts (campaign_id, status, timezone, seq)"
+            )
+            self._connection = connection
+            logger.info(f"Opened campaign store at {self.path}")
+        return self._connection
+
+    @staticmethod
+    def _to_campaign(row: sqlite3.Row) -> Campaign:
+        return Campaign(
+            id=row["id"],
+            user_id=row["user_id"],
+            agent_id=row["agent_id"],
+            name=row["name"],
+            status=row["status"],
+            settings=json.loads(row["settings"]),
+            created_at=datetime.fromisoformat(row["created_at"]),
+            updated_at=datetime.fromisoformat(row["updated_at"]),
+        )
+
+    @staticmethod
+    def _to_contact(row: sqlite3.Row) -> CampaignContact:
+        return CampaignContact(
+            id=row["id"],
+            campaign_id=row["campaign_id"],
+            phone_number=row["phone_number"],
+            name=row["name"],
+            timezone=row["timezone"],
+            metadata=json.loads(row["metadata"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            last_outcome=row["last_outcome"],
+            next_attempt_at=row["next_attempt_at"],
+            call_id=row["call_id"],
+            room_name=row["room_name"],
+        )
+
+    def _write(self, sql: str, parameters: List[tuple]) -> int:
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                changed = connection.total_changes
+                connection.executemany(sql, parameters)
+                changed = connection.total_changes - changed
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return changed
+
+    def _read(self, sql: str, parameters: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connect().execute(sql, parameters).fetchall()
+
+    def _create_campaign_sync(self, campaign: Campaign):
+        self._write(
+            "INSERT INTO campaigns VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(
+                campaign.id,
+                campaign.user_id,
+                campaign.agent_id,
+                campaign.name,
+                campaign.status.value,
+                campaign.settings.model_dump_json(),
+                campaign.created_at.isoformat(),
+                campaign.updated_at.isoformat(),
+            )],
+        )
+
+    def _add_contacts_sync(self, campaign_id: str, contacts: List[CampaignContact]) -> int:
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                seq = connection.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM campaign_contacts WHERE campaign_id = ?", (campaign_id,)
+                ).fetchone()[0]
+                changed = connection.total_changes
+                now = time()
+                connection.executemany(
+                    "INSERT OR IGNORE INTO campaign_contacts "
+                    "(id, campaign_id, seq, phone_number, name, timezone, metadata, status, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            contact.id,
+                            campaign_id,
+                            seq + index,
+                            contact.phone_number,
+                            contact.name,
+                            contact.timezone,
+                            json.dumps(contact.metadata, default=str),
+                            ContactStatus.PENDING.value,
+                            now,
+                        )
+                        for index, contact in enumerate(contacts, start=1)
+                    ],
+                )
+                added = connection.total_changes - changed
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return added
+
+    def _get_contacts_sync(self, contact_ids: List[str]) -> List[CampaignContact]:
+        if not contact_ids:
+            return []
+        placeholders = ", ".join("?" for _ in contact_ids)
+        rows = self._read(f"SELECT * FROM campaign_contacts WHERE id IN ({placeholders})", tuple(contact_ids))
+        return [self._to_contact(row) for row in rows]
+
+    def _next_pending_sync(self, campaign_id: str, timezones: List[str], limit: int) -> List[CampaignContact]:
+        if not timezones or limit <= 0:
+            return []
+        placeholders = ", ".join("?" for _ in timezones)
+        rows = self._read(
+            f"SELECT * FROM campaign_contacts WHERE campaign_id = ? AND status = ? AND timezone IN ({placeholders}) "
+            "ORDER BY seq LIMIT ?",
+            (campaign_id, ContactStatus.PENDING.value, *timezones, limit),
+        )
+        return [self._to_contact(row) for row in rows]
+
+    def _progress_sync(self, campaign_id: str) -> CampaignProgress:
+        progress = CampaignProgress()
+        for row in self._read(
+            "SELECT status, COUNT(*) AS contacts, SUM(attempts) AS attempts FROM campaign_contacts "
+            "WHERE campaign_id = ? GROUP BY status",
+            (campaign_id,),
+        ):
+            setattr(progress, row["status"], row["contacts"])
+            progress.total += row["contacts"]
+            progress.attempts += row["attempts"] or 0
+        for row in self._read(
+            "SELECT last_outcome, COUNT(*) AS contacts FROM campaign_contacts "
+            "WHERE campaign_id = ? AND last_outcome IS NOT NULL GROUP BY last_outcome",
+            (campaign_id,),
+        ):
+            progress.outcomes[row["last_outcome"]] = row["contacts"]
+        return progress
+
+    async def create_campaign(self, campaign: Campaign):
+        await asyncio.to_thread(self._create_campaign_sync, campaign)
+
+    async def get_campaign(self, campaign_id: str) -> Optional[Campaign]:
+        rows = await asyncio.to_thread(self._read, "SELECT * FROM campaigns WHERE id = ?", (campaign_id,))
+        return self._to_campaign(rows[0]) if rows else None
+
+    async def list_campaigns(self, user_id: Optional[str] = None, statuses: Iterable[CampaignStatus] = ()) -> List[Campaign]:
+        conditions, parameters = [], []
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            parameters.append(user_id)
+        statuses = [status.value for status in statuses]
+        if statuses:
+            conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            parameters.extend(statuses)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = await asyncio.to_thread(
+            self._read, f"SELECT * FROM campaigns{where} ORDER BY created_at DESC", tuple(parameters)
+        )
+        return [self._to_campaign(row) for row in rows]
+
+    async def set_campaign_status(self, campaign_id: str, status: CampaignStatus):
+        await asyncio.to_thread(
+            self._write,
+            "UPDATE campaigns SET status = ?, updated_at = ? WHERE id = ?",
+            [(status.value, datetime.utcnow().isoformat(), campaign_id)],
+        )
+
+    async def add_contacts(self, campaign_id: str, contacts: List[CampaignContact]) -> int:
+        return await asyncio.to_thread(self._add_contacts_sync, campaign_id, contacts)
+
+    async def get_contacts(self, contact_ids: List[str]) -> List[CampaignContact]:
+        return await asyncio.to_thread(self._get_contacts_sync, contact_ids)
+
+    async def timezones(self, campaign_id: str) -> List[str]:
+        rows = await asyncio.to_thread(
+            self._read,
+            "SELECT DISTINCT timezone FROM campaign_contacts WHERE campaign_id = ? AND status = ?",
+            (campaign_id, ContactStatus.PENDING.value),
+        )
+        return [row["timezone"] for row in rows]
+
+    async def next_pending(self, campaign_id: str, timezones: List[str], limit: int) -> List[CampaignContact]:
+        return await asyncio.to_thread(self._next_pending_sync, campaign_id, timezones, limit)
+
+    async def claim(self, contact_id: str) -> bool:
+        # Conditional, so two engines sharing the file never dial the same contact
+        changed = await asyncio.to_thread(
+            self._write,
+            "UPDATE campaign_contacts SET status = ?, attempts = attempts + 1, next_attempt_at = NULL, updated_at = ? "
+            "WHERE id = ? AND status IN (?, ?)",
+            [(ContactStatus.DIALING.value, time(), contact_id, ContactStatus.PENDING.value, ContactStatus.RETRY.value)],
+        )
+        return changed == 1
+
+    async def finish_attempt(
+        self,
+        contact_id: str,
+        status: ContactStatus,
+        outcome: str,
+        result: DialResult,
+        next_attempt_at: Optional[float] = None,
+    ):
+        await asyncio.to_thread(
+            self._write,
+            "UPDATE campaign_contacts SET status = ?, last_outcome = ?, next_attempt_at = ?, "
+            "call_id = COALESCE(?, call_id), room_name = COALESCE(?, room_name), updated_at = ? WHERE id = ?",
+            [(status.value, outcome, next_attempt_at, result.call_id, result.room_name, time(), contact_id)],
+        )
+
+    async def reschedule(self, contact_id: str, next_attempt_at: float):
+        await asyncio.to_thread(
+            self._write,
+            "UPDATE campaign_contacts SET next_attempt_at = ?, updated_at = ? WHERE id = ?",
+            [(next_attempt_at, time(), contact_id)],
+        )
+
+    async def retries(self, campaign_id: str) -> List[Tuple[str, float]]:
+        rows = await asyncio.to_thread(
+            self._read,
+            "SELECT id, next_attempt_at FROM campaign_contacts WHERE campaign_id = ? AND status = ?",
+            (campaign_id, ContactStatus.RETRY.value),
+        )
+        return [(row["id"], row["next_attempt_at"] or 0.0) for row in rows]
+
+    async def dialing(self, campaign_id: str) -> List[CampaignContact]:
+        rows = await asyncio.to_thread(
+            self._read,
+            "SELECT * FROM campaign_contacts WHERE campaign_id = ? AND status = ?",
+            (campaign_id, ContactStatus.DIALING.value),
+        )
+        return [self._to_contact(row) for row in rows]
+
+    async def skip_remaining(self, campaign_id: str):
+        await asyncio.to_thread(
+            self._write,
+            "UPDATE campaign_contacts SET status = ?, next_attempt_at = NULL, updated_at = ? "
+            "WHERE campaign_id = ? AND status IN (?, ?)",
+            [(ContactStatus.SKIPPED.value, time(), campaign_id, ContactStatus.PENDING.value, ContactStatus.RETRY.value)],
+        )
+
+    async def remaining(self, campaign_id: str) -> int:
+        rows = await asyncio.to_thread(
+            self._read,
+            "SELECT COUNT(*) FROM campaign_contacts WHERE campaign_id = ? AND status IN (?, ?, ?)",
+            (campaign_id, ContactStatus.PENDING.value, ContactStatus.DIALING.value, ContactStatus.RETRY.value),
+        )
+        return rows[0][0]
+
+    async def progress(self, campaign_id: str) -> CampaignProgress:
+        return await asyncio.to_thread(self._progress_sync, campaign_id)
+
+
+class _RunningCampaign:
+    """Scheduling state of a campaign the engine has loaded"""
+
+    def __init__(self, campaign: Campaign):
+        self.campaign = campaign
+        # One token: a bucket holding a second's worth of calls would dial up to twice the rate in the first second
+        self.bucket = TokenBucket(campaign.settings.calls_per_second, burst=1.0)
+        self.active = 0
+        self.timezones: List[str] = []
+        self.timezones_loaded = False
+        # Retries that are due, and retries waiting in the wheel
+        self.due: List[str] = []
+        self.scheduled: Set[str] = set()
+
+    @property
+    def id(self) -> str:
+        return self.campaign.id
+
+    @property
+    def running(self) -> bool:
+        return self.campaign.status == CampaignStatus.RUNNING
+
+
+class CampaignEngine:
+    """
+    Runs campaigns: picks the contacts to call, paces the dials and schedules retries
+
+    One scheduling loop wakes every tick (or when a call ends, a campaign
+    changes or its calls per second allow the next call) and starts as many
+    calls as the limits allow; each call runs in its own task until the dialer
+    reports how it ended.
+    """
+
+    def __init__(
+        self,
+        store: CampaignStore,
+        dialer: CampaignDialer,
+        max_concurrent_calls: int = 20,
+        calls_per_second: float = 1.0,
+        tick_seconds: float = 1.0,
+    ):
+        self.store = store
+        self.dialer = dialer
+        self.max_concurrent_calls = max(1, max_concurrent_calls)
+        self.tick_seconds = tick_seconds
+        self._bucket = TokenBucket(calls_per_second, burst=1.0)
+        self._wheel = TimingWheel(tick_seconds, WHEEL_SLOTS, now=time())
+        self._campaigns: Dict[str, _RunningCampaign] = {}
+        self._active = 0
+        self._calls: Set[asyncio.Task] = set()
+        self._worker: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def active_calls(self) -> int:
+        return self._active
+
+    def start(self):
+        """Start the scheduling loop in the running event loop, resuming campaigns that were running"""
+        if self._worker and not self._worker.done():
+            return
+        self._wake = asyncio.Event()
+        self._worker = asyncio.create_task(self._run(), name="campaign-engine")
+
+    async def stop(self):
+        """Stop scheduling; calls in progress are abandoned and resumed as retries on the next start"""
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for task in list(self._calls):
+            task.cancel()
+        await asyncio.gather(*self._calls, return_exceptions=True)
+        self._campaigns.clear()
+        self._wheel = TimingWheel(self.tick_seconds, WHEEL_SLOTS, now=time())
+        self._active = 0
+        await self.dialer.close()
+
+    def _notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def create_campaign(self, campaign: Campaign) -> Campaign:
+        await self.store.create_campaign(campaign)
+        return campaign
+
+    async def import_contacts(
+        self, campaign: Campaign, contacts: List[CampaignContactInput]
+    ) -> Dict[str, Any]:
+        """Add contacts to a campaign; returns how many were imported, duplicates and invalid rows"""
+        valid: List[CampaignContact] = []
+        invalid = []
+        seen: Set[str] = set()
+        duplicates = 0
+        for index, contact in enumerate(contacts):
+            number = normalize_phone_number(contact.phone_number)
+            timezone = contact.timezone or campaign.settings.timezone
+            if not number:
+                invalid.append({"row": index, "error": f"Invalid phone number: {contact.phone_number}"})
+                continue
+            if not valid_timezone(timezone):
+                invalid.append({"row": index, "error": f"Unknown timezone: {timezone}"})
+                continue
+            if number in seen:
+                duplicates += 1
+                continue
+            seen.add(number)
+            valid.append(CampaignContact(
+                id=uuid.uuid4().hex,
+                campaign_id=campaign.id,
+                phone_number=number,
+                name=contact.name,
+                timezone=timezone,
+                metadata=contact.metadata,
+            ))
+
+        imported = await self.store.add_contacts(campaign.id, valid) if valid else 0
+        duplicates += len(valid) - imported
+        running = self._campaigns.get(campaign.id)
+        if running is not None:
+            running.timezones_loaded = False
+            self._notify()
+        logger.info(f"Campaign {campaign.id}: imported {imported} contacts, {duplicates} duplicates, {len(invalid)} invalid")
+        return {"imported": imported, "duplicates": duplicates, "invalid": invalid}
+
+    async def start_campaign(self, campaign_id: str) -> Optional[Campaign]:
+        """Start or resume a campaign"""
+        campaign = await self.store.get_campaign(campaign_id)
+        if campaign is None:
+            return None
+        if campaign.status in (CampaignStatus.DRAFT, CampaignStatus.PAUSED):
+            await self.store.set_campaign_status(campaign_id, CampaignStatus.RUNNING)
+            campaign.status = CampaignStatus.RUNNING
+            await self._load(campaign)
+            logger.info(f"Campaign {campaign_id} running")
+            self.start()
+            self._notify()
+        return campaign
+
+    async def pause_campaign(self, campaign_id: str) -> Optional[Campaign]:
+        """Stop starting calls; calls in progress finish, and their retries wait for the resume"""
+        campaign = await self.store.get_campaign(campaign_id)
+        if campaign is None:
+            return None
+        if campaign.status == CampaignStatus.RUNNING:
+            await self.store.set_campaign_status(campaign_id, CampaignStatus.PAUSED)
+            campaign.status = CampaignStatus.PAUSED
+            running = self._campaigns.get(campaign_id)
+            if running is not None:
+                running.campaign.status = CampaignStatus.PAUSED
+            logger.info(f"Campaign {campaign_id} paused")
+        return campaign
+
+    async def cancel_campaign(self, campaign_id: str) -> Optional[Campaign]:
+        """Stop the campaign for good, skipping the contacts not called yet"""
+        campaign = await self.store.get_campaign(campaign_id)
+        if campaign is None:
+            return None
+        if campaign.status not in (CampaignStatus.COMPLETED, CampaignStatus.CANCELLED):
+            await self.store.set_campaign_status(campaign_id, CampaignStatus.CANCELLED)
+            await self.store.skip_remaining(campaign_id)
+            campaign.status = CampaignStatus.CANCELLED
+            running = self._campaigns.get(campaign_id)
+            if running is not None:
+                running.campaign.status = CampaignStatus.CANCELLED
+                self._unschedule(running)
+            logger.info(f"Campaign {campaign_id} cancelled")
+        return campaign
+
+    async def progress(self, campaign_id: str) -> CampaignProgress:
+        return await self.store.progress(campaign_id)
+
+    def call_ended(self, room_name: str):
+        """A LiveKit room closed; passed on to the dialer waiting for it"""
+        self.dialer.call_ended(room_name)
+
+    async def _load(self, campaign: Campaign):
+        """Take a running campaign into scheduling, its pending retries into the wheel"""
+        running = self._campaigns.get(campaign.id)
+        if running is None:
+            running = self._campaigns[campaign.id] = _RunningCampaign(campaign)
+        running.campaign = campaign
+        running.timezones_loaded = False
+        running.due.clear()
+        self.dialer.campaign_loaded(campaign)
+        for contact_id, due_at in await self.store.retries(campaign.id):
+            self._schedule(running, contact_id, due_at)
+
+    async def _recover(self):
+        """Load the campaigns that were running or paused when the engine last stopped"""
+        for campaign in await self.store.list_campaigns(statuses=[CampaignStatus.RUNNING, CampaignStatus.PAUSED]):
+            # The outcome of calls cut off by the stop is unknown: call those contacts again
+            for contact in await self.store.dialing(campaign.id):
+                status = ContactStatus.RETRY if contact.attempts < campaign.settings.max_attempts else ContactStatus.FAILED
+                due_at = time() + INTERRUPTED_RETRY_SECONDS if status == ContactStatus.RETRY else None
+                await self.store.finish_attempt(contact.id, status, "interrupted", DialResult("interrupted"), due_at)
+            await self._load(campaign)
+        if self._campaigns:
+            logger.info(f"Resumed {len(self._campaigns)} campaigns")
+
+    def _schedule(self, running: _RunningCampaign, contact_id: str, due_at: float):
+        running.scheduled.add(contact_id)
+        self._wheel.schedule((running.id, contact_id), due_at)
+
+    def _unschedule(self, running: _RunningCampaign):
+        for contact_id in running.scheduled:
+            self._wheel.cancel((running.id, contact_id))
+        running.scheduled.clear()
+        running.due.clear()
+
+    async def _run(self):
+        logger.info("Campaign engine started")
+        try:
+            await self._recover()
+        except Exception as e:
+            logger.error(f"Could not resume campaigns: {e}")
+        while True:
+            wait = self.tick_seconds
+            try:
+                await self._expire_retries()
+                wait = await self._dispatch()
+            except Exception as e:
+                logger.error(f"Campaign scheduling round failed: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _expire_retries(self):
+        """Move the retries the wheel expired to their campaign's due list, or later if outside calling hours"""
+        expired = self._wheel.advance(time())
+        if not expired:
+            return
+        by_campaign: Dict[str, List[str]] = {}
+        for campaign_id, contact_id in expired:
+            by_campaign.setdefault(campaign_id, []).append(contact_id)
+
+        now = time()
+        for campaign_id, contact_ids in by_campaign.items():
+            running = self._campaigns.get(campaign_id)
+            if running is None:
+                continue
+            running.scheduled.difference_update(contact_ids)
+            if not running.running:
+                # Reloaded from the store when the campaign resumes
+                continue
+            hours = running.campaign.settings.calling_hours
+            for contact in await self.store.get_contacts(contact_ids):
+                if contact.status != ContactStatus.RETRY:
+                    continue
+                opens_in = window_opens_in(hours, contact.timezone, now)
+                if opens_in is None:
+                    continue
+                if opens_in > 0:
+                    due_at = now + opens_in
+                    await self.store.reschedule(contact.id, due_at)
+                    self._schedule(running, contact.id, due_at)
+                else:
+                    running.due.append(contact.id)
+
+    async def _dispatch(self) -> float:
+        """
+        Start the calls the limits allow, campaign by campaign
+
+        Returns:
+            Seconds until the next round: a tick, or sooner when a campaign's
+            calls per second held back calls
+        """
+        now = time()
+        wait = self.tick_seconds
+        for running in list(self._campaigns.values()):
+            if running.campaign.status in (CampaignStatus.CANCELLED, CampaignStatus.COMPLETED) and running.active == 0:
+                del self._campaigns[running.id]
+                self.dialer.campaign_unloaded(running.id)
+                continue
+            if not running.running:
+                continue
+
+            free = min(running.campaign.settings.max_concurrent_calls - running.active, self.max_concurrent_calls - self._active)
+            if free <= 0:
+                continue
+
+            contacts = await self._next_contacts(running, free, now)
+            if not contacts:
+                if running.active == 0 and not running.scheduled and not running.due:
+                    await self._complete_if_done(running)
+                continue
+
+            for index, contact in enumerate(contacts):
+                if not running.running or not running.bucket.try_acquire():
+                    # Retries stay due; pending contacts are simply read again
+                    running.due[:0] = [c.id for c in contacts[index:] if c.status == ContactStatus.RETRY]
+                    if running.running:
+                        wait = min(wait, running.bucket.wait_seconds())
+                    break
+                await self._bucket.acquire()
+                if not await self.store.claim(contact.id):
+                    continue
+                contact.attempts += 1
+                self._launch(running, contact)
+        return wait
+
+    async def _next_contacts(self, running: _RunningCampaign, limit: int, now: float) -> List[CampaignContact]:
+        """Due retries first, then contacts not called yet in timezones inside calling hours"""
+        contacts: List[CampaignContact] = []
+        if running.due:
+            contact_ids, running.due = running.due[:limit], running.due[limit:]
+            contacts = [contact for contact in await self.store.get_contacts(contact_ids) if contact.status == ContactStatus.RETRY]
+        if len(contacts) < limit:
+            if not running.timezones_loaded:
+                running.timezones = await self.store.timezones(running.id)
+                running.timezones_loaded = True
+            hours = running.campaign.settings.calling_hours
+            open_timezones = [zone for zone in running.timezones if window_opens_in(hours, zone, now) == 0]
+            contacts += await self.store.next_pending(running.id, open_timezones, limit - len(contacts))
+        return contacts
+
+    async def _complete_if_done(self, running: _RunningCampaign):
+        if await self.store.remaining(running.id):
+            return
+        await self.store.set_campaign_status(running.id, CampaignStatus.COMPLETED)
+        running.campaign.status = CampaignStatus.COMPLETED
+        del self._campaigns[running.id]
+        self.dialer.campaign_unloaded(running.id)
+        progress = await self.store.progress(running.id)
+        logger.info(f"Campaign {running.id} completed: {progress.outcomes}")
+
+    def _launch(self, running: _RunningCampaign, contact: CampaignContact):
+        running.active += 1
+        self._active += 1
+        _active_calls.set(self._active)
+        task = asyncio.create_task(self._call(running, contact), name=f"campaign-call-{contact.id}")
+        self._calls.add(task)
+        task.add_done_callback(self._calls.discard)
+
+    async def _call(self, running: _RunningCampaign, contact: CampaignContact):
+        try:
+            try:
+                result = await self.dialer.dial(running.campaign, contact)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Campaign {running.id}: calling {contact.phone_number} failed: {e}")
+                result = DialResult(CallStatus.FAILED.value)
+            await self._record(running, contact, result)
+        finally:
+            running.active -= 1
+            self._active -= 1
+            _active_calls.set(self._active)
+            self._notify()
+
+    async def _record(self, running: _RunningCampaign, contact: CampaignContact, result: DialResult):
+        """Store how an attempt went and schedule the retry, if any"""
+        campaign = running.campaign
+        outcome = result.outcome
+        if outcome in (CallStatus.ACTIVE.value, CallStatus.COMPLETED.value):
+            outcome = OUTCOME_ANSWERED
+        _calls.inc(outcome=outcome)
+
+        retry_delay = campaign.settings.retry_delays.get(outcome)
+        due_at = None
+        if outcome in (OUTCOME_ANSWERED, CallStatus.VOICEMAIL.value):
+            status = ContactStatus.COMPLETED
+        elif retry_delay is None or contact.attempts >= campaign.settings.max_attempts:
+            status = ContactStatus.FAILED
+        elif campaign.status == CampaignStatus.CANCELLED:
+            status = ContactStatus.SKIPPED
+        else:
+            status = ContactStatus.RETRY
+            due_at = time() + retry_delay
+
+        await self.store.finish_attempt(contact.id, status, outcome, result, due_at)
+        if due_at is not None:
+            self._schedule(running, contact.id, due_at)
+
+
+campaign_engine = CampaignEngine(
+    SQLiteCampaignStore(settings.campaign_db_path),
+    LiveKitCampaignDialer(call_timeout=settings.max_call_duration + settings.outbound_ring_timeout + 60),
+    max_concurrent_calls=settings.campaign_max_concurrent_calls,
+    calls_per_second=settings.campaign_calls_per_second,
+)
@@ -10,17 +10,25 @@ from ..models import (
     Agent, 
     Tool, 
     Call,
+    CallDirection,
+    CallStatus,
     CreateAgentRequest,
     UpdateAgentRequest,
     CreateToolRequest,
     UpdateToolRequest,
 )
+from .menu_compiler import compile_tool_configuration
 
 logger = logging.getLogger(__name__)
 
 
 class FirebaseService:
-    """Service for interacting with Firebase/Firestore"""
+    """
+    Service for interacting with Firebase/Firestore
+
+    The Firestore client blocks. Reads and writes made during calls also have
+    ``*_sync`` variants, which agent jobs run in worker threads.
+    """
     
     def __init__(self):
         # Initialize Firebase Admin SDK
@@ -61,7 +69,7 @@ class FirebaseService:
                     'description': tool_data.get('description'),
                     'type': tool_data.get('type', 'function'),
                     'enabled': tool_data.get('enabled', True),
-                    'configuration': tool_data.get('configuration'),
+                    'configuration': compile_tool_configuration(tool_data.get('configuration')),
                     'jsonSchema': tool_data.get('json_schema'),
                     'usageCount': 0,
                     'lastUsed': None,
@@ -85,6 +93,7 @@ class FirebaseService:
             'systemPrompt': data.instructions,
             'greeting': data.first_message,
             'firstMessage': data.first_message,
+            'voicemailMessage': data.voicemail_message,
             'voice': data.voice,
             'language': data.language,
             'tools': tool_ids,  # Store tool IDs
@@ -117,6 +126,7 @@ class FirebaseService:
             'instructions': agent_data.get('systemPrompt'),
             'greeting': agent_data.get('greeting'),
             'first_message': agent_data.get('firstMessage'),
+            'voicemail_message': agent_data.get('voicemailMessage'),
             'voice': agent_data.get('voice'),
             'language': agent_data.get('language', 'en-US'),
             'tools': agent_data.get('tools', []),
@@ -124,12 +134,17 @@ class FirebaseService:
             'edges': agent_data.get('edges'),
             'integrations': agent_data.get('integrations'),
             'settings': agent_data.get('settings'),
+            'business_data': agent_data.get('businessData'),
             'status': agent_data.get('status', 'active'),
             'created_at': agent_data['createdAt'],
             'updated_at': agent_data['updatedAt'],
         })
     
     async def get_agent(self, agent_id: str) -> Optional[Agent]:
+        """Get an agent by ID"""
+        return self.get_agent_sync(agent_id)
+    
+    def get_agent_sync(self, agent_id: str) -> Optional[Agent]:
         """Get an agent by ID"""
         doc = self.db.collection('agents').document(agent_id).get()
         
@@ -151,10 +166,12 @@ class FirebaseService:
             'instructions': data.get('systemPrompt'),
             'greeting': data.get('greeting'),
             'first_message': data.get('firstMessage'),
+            'voicemail_message': data.get('voicemailMessage'),
             'voice': data.get('voice'),
             'language': data.get('language', 'en-US'),
             'tools': data.get('tools', []),
             'settings': data.get('settings'),
+            'business_data': data.get('businessData'),
             'nodes': data.get('nodes'),
             'edges': data.get('edges'),
             'integrations': data.get('integrations'),
@@ -195,6 +212,8 @@ class FirebaseService:
             update_data['greeting'] = data.greeting
         if data.first_message is not None:
             update_data['firstMessage'] = data.first_message
+        if data.voicemail_message is not None:
+            update_data['voicemailMessage'] = data.voicemail_message
         if data.voice is not None:
             update_data['voice'] = data.voice
         if data.language is not None:
@@ -216,6 +235,8 @@ class FirebaseService:
             update_data['tools'] = tool_ids
         if data.settings is not None:
             update_data['settings'] = data.settings.dict() if hasattr(data.settings, 'dict') else data.settings
+        if data.business_data is not None:
+            update_data['businessData'] = data.business_data.dict()
         if data.status is not None:
             update_data['status'] = data.status
         if data.nodes is not None:
@@ -265,6 +286,8 @@ class FirebaseService:
         if 'menuItems' in tool_data:
             tool_config['configuration'] = tool_config.get('configuration', {})
             tool_config['configuration']['menuItems'] = tool_data['menuItems']
+            # Pre-render the menu once here instead of on every menu tool call
+            tool_config['configuration'] = compile_tool_configuration(tool_config['configuration'])
         
         # Handle AI-generated tools
         if 'generatedTools' in tool_data and tool_data.get('aiEnhanced'):
@@ -285,7 +308,7 @@ class FirebaseService:
                     'description': generated_tool.get('description'),
                     'type': generated_tool.get('type', 'function'),
                     'enabled': generated_tool.get('enabled', True),
-                    'configuration': generated_tool.get('configuration', {}),
+                    'configuration': compile_tool_configuration(generated_tool.get('configuration', {})),
                     'json_schema': generated_tool.get('json_schema', {}),
                     'aiGenerated': True,
                     'updatedAt': firestore.SERVER_TIMESTAMP
@@ -311,11 +334,54 @@ class FirebaseService:
         """Delete an agent"""
         try:
             self.db.collection('agents').document(agent_id).delete()
+            await self.delete_agent_bundle(agent_id)
             return True
         except Exception as e:
             logger.error(f"Error deleting agent: {str(e)}")
             return False
     
+    async def save_agent_bundle(self, agent_id: str, version: str, bundle: str) -> None:
+        """
+        Publish a compiled agent bundle
+        
+        The bundle becomes the agent's current one and is also kept, immutable,
+        under its version.
+        """
+        return self.save_agent_bundle_sync(agent_id, version, bundle)
+    
+    def save_agent_bundle_sync(self, agent_id: str, version: str, bundle: str) -> None:
+        """Publish a compiled agent bundle"""
+        document = {
+            'agentId': agent_id,
+            'version': version,
+            'bundle': bundle,
+            'publishedAt': firestore.SERVER_TIMESTAMP,
+        }
+        bundle_ref = self.db.collection('agentBundles').document(agent_id)
+        batch = self.db.batch()
+        batch.set(bundle_ref.collection('versions').document(version), document)
+        batch.set(bundle_ref, document)
+        batch.commit()
+    
+    async def get_agent_bundle(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Get the agent's current compiled bundle document (``version`` and the ``bundle`` JSON)"""
+        return self.get_agent_bundle_sync(agent_id)
+    
+    def get_agent_bundle_sync(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Get the agent's current compiled bundle document (``version`` and the ``bundle`` JSON)"""
+        doc = self.db.collection('agentBundles').document(agent_id).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict()
+    
+    async def delete_agent_bundle(self, agent_id: str) -> None:
+        """Withdraw the agent's published bundle; past versions are kept"""
+        return self.delete_agent_bundle_sync(agent_id)
+    
+    def delete_agent_bundle_sync(self, agent_id: str) -> None:
+        """Withdraw the agent's published bundle; past versions are kept"""
+        self.db.collection('agentBundles').document(agent_id).delete()
+    
     async def list_agents(
         self, 
         user_id: Optional[str] = None,
@@ -350,10 +416,12 @@ class FirebaseService:
                 'instructions': data.get('systemPrompt'),
                 'greeting': data.get('greeting'),
                 'first_message': data.get('firstMessage'),
+                'voicemail_message': data.get('voicemailMessage'),
                 'voice': data.get('voice'),
                 'language': data.get('language', 'en-US'),
                 'tools': data.get('tools', []),
                 'settings': data.get('settings'),
+                'business_data': data.get('businessData'),
                 'nodes': data.get('nodes'),
                 'edges': data.get('edges'),
                 'integrations': data.get('integrations'),
@@ -378,7 +446,7 @@ class FirebaseService:
             'description': data.description,
             'type': data.type,
             'enabled': data.enabled,
-            'configuration': data.configuration,
+            'configuration': compile_tool_configuration(data.configuration),
             'config': data.config.dict() if data.config else None,
             'schema': data.schema,
             'usageCount': 0,
@@ -407,6 +475,7 @@ class FirebaseService:
             'config': tool_data.get('config'),
             'schema': tool_data.get('schema'),
             'usage_count': tool_data.get('usageCount', 0),
+            'failure_count': tool_data.get('failureCount', 0),
             'last_used': tool_data.get('lastUsed'),
             'created_at': tool_data['createdAt'],
             'updated_at': tool_data['updatedAt'],
@@ -435,12 +504,56 @@ class FirebaseService:
             'config': data.get('config'),
             'schema': data.get('schema'),
             'usage_count': data.get('usageCount', 0),
+            'failure_count': data.get('failureCount', 0),
             'last_used': data.get('lastUsed'),
             'created_at': data.get('createdAt', datetime.utcnow()),
             'updated_at': data.get('updatedAt', datetime.utcnow()),
         })
     
+    async def get_tools(self, tool_ids: List[str]) -> Dict[str, Tool]:
+        """Get several tools by ID in one round trip"""
+        return self.get_tools_sync(tool_ids)
+    
+    def get_tools_sync(self, tool_ids: List[str]) -> Dict[str, Tool]:
+        """Get several tools by ID in one round trip"""
+        refs = [self.db.collection('tools').document(tool_id) for tool_id in dict.fromkeys(tool_ids) if tool_id]
+        if not refs:
+            return {}
+        
+        tools = {}
+        for doc in self.db.get_all(refs):
+            if not doc.exists:
+                continue
+            
+            data = doc.to_dict()
+            data['id'] = doc.id
+            
+            tools[doc.id] = Tool(**{
+                'id': data['id'],
+                'user_id': data.get('userId') or '',
+                'agent_id': data.get('agentId'),
+                'name': data.get('name') or data['id'],
+                'display_name': data.get('displayName'),
+                'description': data.get('description') or '',
+                'type': data.get('type', 'function'),
+                'enabled': data.get('enabled', True),
+                'configuration': data.get('configuration'),
+                'config': data.get('config'),
+                'json_schema': data.get('jsonSchema'),
+                'usage_count': data.get('usageCount', 0),
+                'failure_count': data.get('failureCount', 0),
+                'last_used': data.get('lastUsed'),
+                'created_at': data.get('createdAt', datetime.utcnow()),
+                'updated_at': data.get('updatedAt', datetime.utcnow()),
+            })
+        
+        return tools
+    
     async def get_tools_by_agent(self, agent_id: str) -> List[Tool]:
+        """Get all tools for a specific agent"""
+        return self.get_tools_by_agent_sync(agent_id)
+    
+    def get_tools_by_agent_sync(self, agent_id: str) -> List[Tool]:
         """Get all tools for a specific agent"""
         query = self.db.collection('tools').where('agentId', '==', agent_id)
         docs = query.stream()
@@ -469,6 +582,7 @@ class FirebaseService:
                 'schema': data.get('schema'),
                 'json_schema': data.get('jsonSchema'),  # Also check for jsonSchema field
                 'usage_count': data.get('usageCount', 0),
+                'failure_count': data.get('failureCount', 0),
                 'last_used': data.get('lastUsed'),
                 'created_at': data.get('createdAt', datetime.utcnow()),
                 'updated_at': data.get('updatedAt', datetime.utcnow()),
@@ -554,7 +668,34 @@ class FirebaseService:
         call_data['createdAt'] = datetime.utcnow()
         call_data['updatedAt'] = datetime.utcnow()
         
-        return Call(**call_data)
+        return self._to_call(call_data)
+    
+    @staticmethod
+    def _to_call(data: Dict[str, Any]) -> Call:
+        """Call model of a call document"""
+        status = data.get('status', CallStatus.PENDING)
+        if status == 'in-progress':
+            # Set by the LiveKit room webhook
+            status = CallStatus.ACTIVE
+        return Call(**{
+            'id': data['id'],
+            'agent_id': data.get('agentId', ''),
+            'room_name': data.get('roomName', ''),
+            'direction': data.get('direction', CallDirection.INBOUND),
+            'status': status,
+            'from_number': data.get('fromNumber', ''),
+            'to_number': data.get('toNumber', ''),
+            'participants': data.get('participants', []),
+            'start_time': data.get('startTime', datetime.utcnow()),
+            'end_time': data.get('endTime'),
+            'duration': data.get('duration'),
+            'recording_url': data.get('recordingUrl'),
+            'transcript': data.get('transcript'),
+            'metadata': data.get('metadata', {}),
+            'analytics': data.get('analytics', {}),
+            'created_at': data.get('createdAt', datetime.utcnow()),
+            'updated_at': data.get('updatedAt', datetime.utcnow()),
+        })
     
     async def get_call(self, call_id: str) -> Optional[Call]:
         """Get a call by ID"""
@@ -567,9 +708,13 @@ class FirebaseService:
         data = doc.to_dict()
         data['id'] = doc.id
         
-        return Call(**data)
+        return self._to_call(data)
     
     async def update_call(self, call_id: str, update_data: Dict[str, Any]) -> Optional[Call]:
+        """Update a call record"""
+        return self.update_call_sync(call_id, update_data)
+    
+    def update_call_sync(self, call_id: str, update_data: Dict[str, Any]) -> Optional[Call]:
         """Update a call record"""
         call_ref = self.db.collection('calls').document(call_id)
         
@@ -584,7 +729,7 @@ class FirebaseService:
         data = doc.to_dict()
         data['id'] = doc.id
         
-        return Call(**data)
+        return self._to_call(data)
     
     # Auth Methods
     async def verify_id_token(self, id_token: str) -> Optional[Dict[str, Any]]:
@@ -607,6 +752,10 @@ class FirebaseService:
     
     # Additional methods for webhooks
     async def get_calls_by_room(self, room_name: str) -> List[Call]:
+        """Get calls by room name"""
+        return self.get_calls_by_room_sync(room_name)
+    
+    def get_calls_by_room_sync(self, room_name: str) -> List[Call]:
         """Get calls by room name"""
         calls_ref = self.db.collection('calls')
         query = calls_ref.where('roomName', '==', room_name)
@@ -616,7 +765,7 @@ class FirebaseService:
         for doc in docs:
             data = doc.to_dict()
             data['id'] = doc.id
-            calls.append(Call(**data))
+            calls.append(self._to_call(data))
         
         return calls
     
@@ -670,6 +819,50 @@ class FirebaseService:
             'lastUsed': firestore.SERVER_TIMESTAMP,
             'updatedAt': firestore.SERVER_TIMESTAMP
         })
+    
+    def write_tool_usage_batch(self, records: List[Dict[str, Any]]):
+        """
+        Write tool usage records in a single Firestore batch
+        
+        Blocking; called from the usage recorder's worker thread.
+        """
+        batch = self.db.batch()
+        increments: Dict[str, Dict[str, int]] = {}
+        
+        for record in records:
+            if record.get('call_id'):
+                usage_ref = self.db.collection('toolUsage').document()
+                batch.set(usage_ref, {
+                    'id': usage_ref.id,
+                    'toolId': record['tool_id'],
+                    'callId': record['call_id'],
+                    'agentId': record.get('agent_id'),
+                    'parameters': record.get('parameters', {}),
+                    'result': record.get('result', {}),
+                    'success': record['success'],
+                    'timestamp': firestore.SERVER_TIMESTAMP,
+                    'createdAt': firestore.SERVER_TIMESTAMP,
+                })
+            # usageCount counts successful executions, failureCount the failed ones
+            counts = increments.setdefault(record['tool_id'], {})
+            field = 'usageCount' if record['success'] else 'failureCount'
+            counts[field] = counts.get(field, 0) + 1
+        
+        # One update of a deleted tool would fail the whole batch, audit entries included
+        tool_refs = [self.db.collection('tools').document(tool_id) for tool_id in increments]
+        existing = {snapshot.id for snapshot in self.db.get_all(tool_refs, field_paths=['id']) if snapshot.exists} if tool_refs else set()
+        
+        for tool_id, counts in increments.items():
+            if tool_id not in existing:
+                logger.info(f"Not counting usage of tool {tool_id}, it no longer exists")
+                continue
+            batch.update(self.db.collection('tools').document(tool_id), {
+                **{field: firestore.Increment(count) for field, count in counts.items()},
+                'lastUsed': firestore.SERVER_TIMESTAMP,
+                'updatedAt': firestore.SERVER_TIMESTAMP,
+            })
+        
+        batch.commit()
 
 
 # Singleton instance
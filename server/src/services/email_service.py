@@ -0,0 +1,471 @@
+"""
+Email delivery for email-send tools.
+
+A tool call only renders the tool's templates (compiled once per tool) and
+writes the message to the durable outbox, so the agent gets its answer as soon
+as the email is safely queued. A background worker, started only by the API's
+lifespan so every tenant has one send rate across all agent job processes,
+drains the outbox over a small pool of persistent SMTP connections, sending
+several messages per connection and retrying transient failures.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import smtplib
+from collections import OrderedDict
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from time import monotonic
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..core.config import settings
+from ..models import Tool
+from ..utils.rate_limiter import TokenBucket
+from .outbox import Outbox, OutboxEntry, outbox
+
+logger = logging.getLogger(__name__)
+
+EMAIL_TOPIC = "email"
+
+# Outbox entries claimed per delivery round, and how long a claim is held
+BATCH_SIZE = 20
+LEASE_SECONDS = 120.0
+IDLE_POLL_SECONDS = 5.0
+
+MAX_ATTEMPTS = 5
+BASE_RETRY_SECONDS = 30.0
+MAX_RETRY_SECONDS = 3600.0
+
+# Idle SMTP connections are probed with NOOP after a while and dropped after longer
+CONNECTION_CHECK_SECONDS = 15.0
+CONNECTION_MAX_IDLE_SECONDS = 120.0
+
+TEMPLATE_CACHE_SIZE = 256
+
+DEFAULT_SUBJECT_TEMPLATE = "{{subject}}"
+DEFAULT_BODY_TEMPLATE = "{{message}}"
+
+_PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_.]*)\s*\}\}")
+_ADDRESS_SEPARATORS = re.compile(r"[,;\s]+")
+
+
+class EmailTemplate:
+    """Text with ``{{ field }}`` placeholders, split once into literal and field parts"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parts: List[Tuple[str, str]] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            self._parts.append((source[position:match.start()], match.group(1)))
+            position = match.end()
+        self._tail = source[position:]
+
+    @property
+    def fields(self) -> List[str]:
+        return [field for _, field in self._parts]
+
+    def render(self, values: Dict[str, Any]) -> str:
+        rendered = []
+        for literal, field in self._parts:
+            rendered.append(literal)
+            rendered.append(_lookup(values, field))
+        rendered.append(self._tail)
+        return "".join(rendered)
+
+
+def _lookup(values: Dict[str, Any], path: str) -> str:
+    value: Any = values
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return ""
+        value = value[key]
+    return "" if value is None else str(value)
+
+
+class EmailToolTemplate:
+    """Compiled templates and sender settings of one email-send tool"""
+
+    def __init__(self, configuration: Dict[str, Any]):
+        self.subject = EmailTemplate(configuration.get('subjectTemplate') or DEFAULT_SUBJECT_TEMPLATE)
+        self.body = EmailTemplate(configuration.get('bodyTemplate') or DEFAULT_BODY_TEMPLATE)
+        html = configuration.get('htmlTemplate')
+        self.html = EmailTemplate(html) if html else None
+        self.from_email = configuration.get('fromEmail')
+        self.from_name = configuration.get('fromName')
+        self.reply_to = configuration.get('replyTo')
+        self.default_to = configuration.get('toEmail')
+        self.defaults = configuration.get('templateDefaults') or {}
+
+    def render(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Render an outbox payload from tool call parameters"""
+        values = {**self.defaults, **parameters}
+        recipients = parameters.get('to_email') or parameters.get('to') or self.default_to or []
+        if isinstance(recipients, str):
+            recipients = [address for address in _ADDRESS_SEPARATORS.split(recipients) if address]
+
+        return {
+            "to": list(recipients),
+            "subject": self.subject.render(values),
+            "text": self.body.render(values),
+            "html": self.html.render(values) if self.html else None,
+            "from_email": self.from_email,
+            "from_name": self.from_name,
+            "reply_to": self.reply_to,
+        }
+
+
+_template_cache: "OrderedDict[Tuple[str, str], EmailToolTemplate]" = OrderedDict()
+
+
+def get_email_template(tool: Tool) -> EmailToolTemplate:
+    """Return the (process-wide cached) compiled templates of a tool"""
+    configuration = tool.configuration or {}
+    key = (tool.id, hashlib.sha256(json.dumps(configuration, sort_keys=True, default=str).encode()).hexdigest())
+
+    template = _template_cache.get(key)
+    if template is not None:
+        _template_cache.move_to_end(key)
+        return template
+
+    template = EmailToolTemplate(configuration)
+    _template_cache[key] = template
+    if len(_template_cache) > TEMPLATE_CACHE_SIZE:
+        _template_cache.popitem(last=False)
+    return template
+
+
+class SmtpConnectionPool:
+    """Persistent SMTP connections, used from worker threads"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = True,
+        use_ssl: bool = False,
+        size: int = 4,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        return connection
+
+    async def acquire(self) -> smtplib.SMTP:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        await self._semaphore.acquire()
+        try:
+            while self._idle:
+                connection, idle_since = self._idle.pop()
+                idle = monotonic() - idle_since
+                if idle < CONNECTION_CHECK_SECONDS:
+                    return connection
+                if idle < CONNECTION_MAX_IDLE_SECONDS and await asyncio.to_thread(_is_alive, connection):
+                    return connection
+                await asyncio.to_thread(_quit, connection)
+
+            connection = await asyncio.to_thread(self._connect)
+            self.connections_opened += 1
+            return connection
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def release(self, connection: smtplib.SMTP, healthy: bool = True):
+        if healthy:
+            self._idle.append((connection, monotonic()))
+        else:
+            await asyncio.to_thread(_quit, connection)
+        self._semaphore.release()
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            await asyncio.to_thread(_quit, connection)
+
+
+def _is_alive(connection: smtplib.SMTP) -> bool:
+    try:
+        return connection.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def _quit(connection: smtplib.SMTP):
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+
+
+# (error, permanent, connection broken, recipients to retry); error is None when sent
+SendOutcome = Tuple[Optional[str], bool, bool, Optional[List[str]]]
+
+
+def _send_many(
+    connection: smtplib.SMTP, messages: List[Tuple[EmailMessage, Optional[List[str]]]]
+) -> List[SendOutcome]:
+    """
+    Send messages over one connection
+
+    Args:
+        messages: (message, envelope recipients) pairs; None sends to the message's headers
+
+    Returns:
+        One outcome per message. When only some recipients were refused the
+        message counts as sent, and the temporarily refused ones are returned
+        to be retried on their own.
+    """
+    outcomes: List[SendOutcome] = []
+    for position, (message, recipients) in enumerate(messages):
+        try:
+            refused = connection.send_message(message, to_addrs=recipients)
+            retry = [address for address, (code, _) in refused.items() if 400 <= code < 500]
+            if retry:
+                outcomes.append((f"Recipients deferred: {', '.join(retry)}", False, False, retry))
+            else:
+                if refused:
+                    logger.warning(f"Email {message['Message-ID']} refused for {', '.join(refused)}")
+                outcomes.append((None, False, False, None))
+        except smtplib.SMTPRecipientsRefused as e:
+            permanent = all(code >= 500 for code, _ in e.recipients.values())
+            outcomes.append((f"Recipients refused: {', '.join(e.recipients)}", permanent, False, None))
+        except smtplib.SMTPResponseException as e:
+            outcomes.append((f"SMTP {e.smtp_code}: {e.smtp_error!r}", e.smtp_code >= 500, False, None))
+        except (smtplib.SMTPException, OSError) as e:
+            # The connection is gone; everything not sent yet goes back for a retry
+            error = f"SMTP connection lost: {e}"
+            outcomes.extend((error, False, True, None) for _ in messages[position:])
+            break
+    return outcomes
+
+
+class EmailService:
+    """Durable, rate-limited background email sender"""
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        pool: SmtpConnectionPool,
+        from_email: str = "",
+        messages_per_second_per_tenant: float = 2.0,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.outbox = outbox
+        self.pool = pool
+        self.from_email = from_email
+        self.messages_per_second_per_tenant = messages_per_second_per_tenant
+        self.batch_size = batch_size
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._worker: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._warned = False
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.pool.host)
+
+    def start(self):
+        """Start the delivery worker in the running event loop, if SMTP is configured"""
+        if self._worker and not self._worker.done():
+            return
+        if not self.configured:
+            if not self._warned:
+                logger.warning("SMTP is not configured, queued emails will be delivered once SMTP_HOST is set")
+                self._warned = True
+            return
+        self._wake = asyncio.Event()
+        self._worker = asyncio.create_task(self._run(), name="email-delivery")
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        await self.pool.close()
+
+    async def enqueue(self, tenant_id: str, message: Dict[str, Any]) -> str:
+        """
+        Durably queue a rendered message and return its outbox id
+
+        The message is sent by the worker of the process that started one: right
+        away in that process, within ``IDLE_POLL_SECONDS`` from any other.
+        """
+        entry_id = await self.outbox.put(EMAIL_TOPIC, message, tenant_id=tenant_id)
+        if self._wake:
+            self._wake.set()
+        return entry_id
+
+    def _bucket(self, tenant_id: str) -> TokenBucket:
+        bucket = self._buckets.get(tenant_id)
+        if bucket is None:
+            rate = self.messages_per_second_per_tenant
+            bucket = self._buckets[tenant_id] = TokenBucket(rate, burst=max(1.0, rate))
+        return bucket
+
+    async def _run(self):
+        logger.info("Email delivery worker started")
+        idle_wait = IDLE_POLL_SECONDS
+        while True:
+            try:
+                entries = await self.outbox.claim(EMAIL_TOPIC, self.batch_size, LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Failed to claim queued emails: {e}")
+                entries = []
+
+            if not entries:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=idle_wait)
+                except asyncio.TimeoutError:
+                    pass
+                idle_wait = IDLE_POLL_SECONDS
+                continue
+
+            try:
+                deferred_for = await self._deliver(entries)
+                if deferred_for is not None:
+                    idle_wait = min(IDLE_POLL_SECONDS, deferred_for)
+            except Exception as e:
+                # Claims expire after the lease, so the batch is retried later
+                logger.error(f"Email delivery round failed: {e}")
+
+    async def _deliver(self, entries: List[OutboxEntry]) -> Optional[float]:
+        """
+        Deliver one claimed batch
+
+        Returns:
+            The shortest delay a rate-limited tenant was deferred by, if any
+        """
+        ready: List[OutboxEntry] = []
+        deferred: Dict[str, int] = {}
+        deferred_for: Optional[float] = None
+        for entry in entries:
+            bucket = self._bucket(entry.tenant_id)
+            if bucket.try_acquire():
+                ready.append(entry)
+                continue
+            # Space a tenant's backlog out at its rate instead of re-claiming all of it every round
+            deferred[entry.tenant_id] = deferred.get(entry.tenant_id, 0) + 1
+            delay = deferred[entry.tenant_id] / bucket.rate
+            await self.outbox.defer(entry.id, delay)
+            deferred_for = delay if deferred_for is None else min(deferred_for, delay)
+
+        # Spread the batch over the pool; each connection sends its share back to back
+        chunks = [ready[offset::self.pool.size] for offset in range(self.pool.size)]
+        await asyncio.gather(*(self._deliver_chunk(chunk) for chunk in chunks if chunk))
+        return deferred_for
+
+    async def _deliver_chunk(self, entries: List[OutboxEntry]):
+        # A message that cannot be built fails on its own, without holding back the rest
+        messages: List[Tuple[EmailMessage, Optional[List[str]]]] = []
+        buildable: List[OutboxEntry] = []
+        for entry in entries:
+            try:
+                messages.append((self._build(entry), entry.payload.get("retry_to")))
+            except Exception as e:
+                logger.error(f"Email {entry.id} could not be built: {e}")
+                await self.outbox.fail(entry.id, f"Invalid email: {e}")
+                continue
+            buildable.append(entry)
+        entries = buildable
+        if not entries:
+            return
+
+        try:
+            connection = await self.pool.acquire()
+        except Exception as e:
+            logger.warning(f"Could not connect to SMTP server {self.pool.host}:{self.pool.port}: {e}")
+            for entry in entries:
+                await self._retry(entry, f"SMTP connection failed: {e}")
+            return
+
+        healthy = True
+        try:
+            outcomes = await asyncio.to_thread(_send_many, connection, messages)
+        except Exception as e:
+            healthy = False
+            outcomes = [(f"Email delivery failed: {e}", False, True, None)] * len(entries)
+
+        delivered = []
+        for entry, (error, permanent, broken, retry_to) in zip(entries, outcomes):
+            healthy = healthy and not broken
+            if error is None:
+                delivered.append(entry.id)
+            elif permanent:
+                logger.error(f"Email {entry.id} rejected: {error}")
+                await self.outbox.fail(entry.id, error)
+            else:
+                await self._retry(entry, error, retry_to)
+
+        await self.outbox.complete(delivered)
+        await self.pool.release(connection, healthy)
+        if delivered:
+            logger.info(f"Delivered {len(delivered)} queued emails")
+
+    async def _retry(self, entry: OutboxEntry, error: str, retry_to: Optional[List[str]] = None):
+        """Schedule another attempt; ``retry_to`` limits it to the recipients that did not get the message"""
+        if entry.attempts + 1 >= MAX_ATTEMPTS:
+            logger.error(f"Giving up on email {entry.id} after {entry.attempts + 1} attempts: {error}")
+            await self.outbox.fail(entry.id, error)
+            return
+        delay = min(MAX_RETRY_SECONDS, BASE_RETRY_SECONDS * (2 ** entry.attempts))
+        logger.warning(f"Email {entry.id} failed ({error}), retrying in {delay:.0f}s")
+        payload = {**entry.payload, "retry_to": retry_to} if retry_to else None
+        await self.outbox.retry(entry.id, delay, error, payload)
+
+    def _build(self, entry: OutboxEntry) -> EmailMessage:
+        payload = entry.payload
+        message = EmailMessage()
+        sender = payload.get("from_email") or self.from_email
+        message["From"] = formataddr((payload["from_name"], sender)) if payload.get("from_name") else sender
+        message["To"] = ", ".join(payload["to"])
+        message["Subject"] = payload.get("subject") or ""
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid(idstring=entry.id)
+        if payload.get("reply_to"):
+            message["Reply-To"] = payload["reply_to"]
+        message.set_content(payload.get("text") or "")
+        if payload.get("html"):
+            message.add_alternative(payload["html"], subtype="html")
+        return message
+
+
+email_service = EmailService(
+    outbox,
+    SmtpConnectionPool(
+        host=settings.smtp_host,
+        port=settings.smtp_port,
+        username=settings.smtp_username,
+        password=settings.smtp_password,
+        use_tls=settings.smtp_use_tls,
+        use_ssl=settings.smtp_use_ssl,
+        size=settings.smtp_pool_size,
+    ),
+    from_email=settings.smtp_from_email,
+    messages_per_second_per_tenant=settings.email_messages_per_second_per_tenant,
+)
@@ -0,0 +1,182 @@
+"""
+Guarded requests to customer endpoints.
+
+Custom API and webhook tools call endpoints we do not control. Each endpoint
+gets a circuit breaker (shared between workers through Redis when configured),
+so once it is failing or slow, calls fail fast instead of every caller waiting
+out the full timeout. Idempotent requests can be hedged: if the first attempt
+is slower than the endpoint usually is, a second one is sent and whichever
+answers first wins. Response bodies can be read up to a byte limit, so an
+endpoint answering with an enormous payload costs a bounded download.
+"""
+import asyncio
+import logging
+from time import perf_counter
+from typing import Optional
+
+import httpx
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+from ..utils.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError, RedisBreakerStore, endpoint_key
+
+logger = logging.getLogger(__name__)
+
+HEDGE_METHODS = {"GET", "HEAD"}
+MIN_HEDGE_DELAY_SECONDS = 0.05
+
+_latency = metrics.histogram("endpoint_request_seconds", "Latency of tool requests to customer endpoints")
+_requests = metrics.counter("endpoint_requests_total", "Tool requests to customer endpoints by outcome")
+_hedges = metrics.counter("endpoint_hedged_requests_total", "Hedge requests sent to slow customer endpoints")
+
+
+class ResponseTooLargeError(Exception):
+    """Raised when an endpoint's response body is larger than the caller reads"""
+
+    def __init__(self, url: str, max_bytes: int):
+        super().__init__(f"Response from {url} is larger than {max_bytes} bytes")
+        self.url = url
+        self.max_bytes = max_bytes
+
+
+def _breaker_store() -> Optional[RedisBreakerStore]:
+    if not (settings.redis_url and settings.circuit_breaker_shared):
+        return None
+    try:
+        return RedisBreakerStore(settings.redis_url)
+    except Exception as e:
+        logger.warning(f"Circuit breakers will not be shared between workers: {e}")
+        return None
+
+
+def hedge_delay(endpoint: str) -> float:
+    """How long to wait before hedging: the endpoint's recent p90 latency, or the configured default"""
+    p90 = _latency.percentiles(endpoint=endpoint)[0.9]
+    return max(MIN_HEDGE_DELAY_SECONDS, p90 if p90 is not None else settings.hedge_delay_seconds)
+
+
+async def request(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    hedge: bool = False,
+    breakers: Optional[CircuitBreakerRegistry] = None,
+    max_bytes: Optional[int] = None,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Send a request through the endpoint's circuit breaker
+
+    Args:
+        client: Pooled HTTP client to send with
+        method: HTTP method
+        url: Endpoint URL
+        hedge: Allow a hedge request; only applies to GET and HEAD
+        breakers: Breaker registry, defaults to the shared one
+        max_bytes: Stop reading the body beyond this many bytes
+        **kwargs: Passed to ``client.build_request``
+
+    Raises:
+        CircuitOpenError: The endpoint's breaker is open, no request was sent
+        ResponseTooLargeError: The body is larger than ``max_bytes``
+    """
+    endpoint = endpoint_key(url)
+    try:
+        breaker = await (breakers or endpoint_breakers).acquire(endpoint)
+    except CircuitOpenError:
+        metrics_spool.count(_requests, endpoint=endpoint, outcome="fast_fail")
+        raise
+
+    started = perf_counter()
+    try:
+        if hedge and method.upper() in HEDGE_METHODS:
+            response = await _hedged(client, endpoint, method, url, max_bytes, **kwargs)
+        else:
+            response = await _send(client, method, url, max_bytes, **kwargs)
+    except httpx.HTTPError:
+        breaker.record_failure(perf_counter() - started)
+        metrics_spool.count(_requests, endpoint=endpoint, outcome="error")
+        raise
+    except ResponseTooLargeError:
+        # The endpoint answered; the answer is just more than the tool can use
+        breaker.record_success(perf_counter() - started)
+        metrics_spool.count(_requests, endpoint=endpoint, outcome="too_large")
+        raise
+    except BaseException:
+        # Cancelled or interrupted: no verdict on the endpoint
+        breaker.release()
+        raise
+
+    latency = perf_counter() - started
+    metrics_spool.record(_latency, latency, endpoint=endpoint)
+    if response.status_code >= 500 or response.status_code == 429:
+        breaker.record_failure(latency)
+        metrics_spool.count(_requests, endpoint=endpoint, outcome="error")
+    else:
+        breaker.record_success(latency)
+        metrics_spool.count(_requests, endpoint=endpoint, outcome="ok")
+    return response
+
+
+async def _send(client: httpx.AsyncClient, method: str, url: str, max_bytes: Optional[int], **kwargs) -> httpx.Response:
+    """Send a request, reading at most ``max_bytes`` of its body"""
+    if max_bytes is None:
+        return await client.request(method, url, **kwargs)
+
+    response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+    try:
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > max_bytes and "content-encoding" not in response.headers:
+            raise ResponseTooLargeError(url, max_bytes)
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) > max_bytes:
+                raise ResponseTooLargeError(url, max_bytes)
+    finally:
+        await response.aclose()
+
+    # The body is decoded already, so the new response must not decode it again
+    headers = [
+        (name, value) for name, value in response.headers.multi_items()
+        if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+    ]
+    return httpx.Response(response.status_code, headers=headers, content=bytes(body), request=response.request)
+
+
+async def _hedged(
+    client: httpx.AsyncClient, endpoint: str, method: str, url: str, max_bytes: Optional[int], **kwargs
+) -> httpx.Response:
+    tasks = [asyncio.create_task(_send(client, method, url, max_bytes, **kwargs))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_delay(endpoint))
+        if not done:
+            metrics_spool.count(_hedges, endpoint=endpoint)
+            tasks.append(asyncio.create_task(_send(client, method, url, max_bytes, **kwargs)))
+
+        # First successful answer wins; fail only when every attempt failed
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+endpoint_breakers = CircuitBreakerRegistry(
+    failure_threshold=settings.circuit_breaker_failure_threshold,
+    reset_timeout=settings.circuit_breaker_reset_seconds,
+    store=_breaker_store(),
+    window_seconds=settings.circuit_breaker_window_seconds,
+    min_calls=settings.circuit_breaker_min_calls,
+    error_rate_threshold=settings.circuit_breaker_error_rate,
+    slow_call_seconds=settings.circuit_breaker_slow_call_seconds or None,
+    slow_call_rate_threshold=settings.circuit_breaker_slow_call_rate,
+)
@@ -0,0 +1,212 @@
+"""
+Cache of synthesized greeting audio.
+
+An agent's first message is fixed, so there is no reason to run it through the
+LLM and TTS at the start of every call. The greeting is synthesized once per
+(agent, voice, language, text) and kept as 16-bit PCM, in memory (LRU, bounded
+by size) and on disk so every worker process on the host can reuse it. Calls
+play the cached audio directly; on a miss the call greets the usual way and
+the audio is synthesized in the background for the next one.
+
+Only STT-LLM-TTS agents use the cache. Realtime agents speak with the model's
+own voice and keep their conversation on the server, so they greet through the
+model.
+"""
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import wave
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional
+
+from livekit import rtc
+from livekit.agents import tts as agents_tts
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 20
+# Pruning makes room for more than the one new file, so it does not run on every write
+PRUNE_TO = 0.9
+
+
+class GreetingAudio:
+    """Mono or multi-channel 16-bit PCM"""
+
+    def __init__(self, pcm: bytes, sample_rate: int, num_channels: int = 1):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (2 * self.num_channels * self.sample_rate)
+
+    async def frames(self) -> AsyncIterator[rtc.AudioFrame]:
+        """The audio as 20 ms frames, for ``AgentSession.say(audio=...)``"""
+        samples_per_frame = self.sample_rate * FRAME_MS // 1000
+        frame_bytes = samples_per_frame * self.num_channels * 2
+        for offset in range(0, len(self.pcm), frame_bytes):
+            chunk = self.pcm[offset:offset + frame_bytes]
+            yield rtc.AudioFrame(
+                data=chunk,
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(chunk) // (2 * self.num_channels),
+            )
+
+
+async def synthesize(tts: agents_tts.TTS, text: str) -> GreetingAudio:
+    """Run text through a TTS and collect the whole result"""
+    chunks = []
+    sample_rate, num_channels = tts.sample_rate, tts.num_channels
+    async with tts.synthesize(text) as stream:
+        async for event in stream:
+            chunks.append(bytes(event.frame.data))
+            sample_rate, num_channels = event.frame.sample_rate, event.frame.num_channels
+    return GreetingAudio(b"".join(chunks), sample_rate, num_channels)
+
+
+class GreetingCache:
+    """Greeting audio in an in-memory LRU backed by WAV files"""
+
+    def __init__(self, directory: str, max_memory_bytes: int, max_disk_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, GreetingAudio]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None  # Running total, counted once then kept up to date
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def key(agent_id: str, voice: str, language: str, text: str) -> str:
+        digest = hashlib.sha256(f"{voice}\0{language}\0{text}".encode()).hexdigest()[:32]
+        return f"{agent_id}-{digest}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def _remember(self, key: str, audio: GreetingAudio):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous.pcm)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio.pcm)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.pcm)
+
+    def _read(self, key: str) -> Optional[GreetingAudio]:
+        try:
+            with wave.open(self._path(key), "rb") as wav:
+                audio = GreetingAudio(wav.readframes(wav.getnframes()), wav.getframerate(), wav.getnchannels())
+            if self.max_disk_bytes:
+                # Files are pruned least recently used first
+                os.utime(self._path(key))
+            return audio
+        except FileNotFoundError:
+            return None
+        except (wave.Error, EOFError) as e:
+            logger.warning(f"Discarding unreadable greeting audio {key}: {e}")
+            os.remove(self._path(key))
+            return None
+
+    def _write(self, key: str, audio: GreetingAudio):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{self._path(key)}.{os.getpid()}.tmp"
+        with wave.open(temporary, "wb") as wav:
+            wav.setnchannels(audio.num_channels)
+            wav.setsampwidth(2)
+            wav.setframerate(audio.sample_rate)
+            wav.writeframes(audio.pcm)
+        added = os.path.getsize(temporary)
+        try:
+            added -= os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            pass
+        os.replace(temporary, self._path(key))
+        if self.max_disk_bytes:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._files())
+            else:
+                self._disk_bytes += added
+            # Other processes write too, so the total is recounted whenever it looks too big
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune()
+
+    def _files(self):
+        """(modified time, size, path) of the cached audio files"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".wav"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _prune(self):
+        """Remove the least recently used files until the directory is back under ``max_disk_bytes``"""
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        limit = self.max_disk_bytes * PRUNE_TO if total > self.max_disk_bytes else total
+        for _, size, path in sorted(files):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_bytes = total
+
+    async def get(self, key: str) -> Optional[GreetingAudio]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            return audio
+        audio = await asyncio.to_thread(self._read, key)
+        if audio is not None:
+            self._remember(key, audio)
+        return audio
+
+    async def put(self, key: str, audio: GreetingAudio):
+        self._remember(key, audio)
+        await asyncio.to_thread(self._write, key, audio)
+
+    def warm(self, key: str, tts: agents_tts.TTS, text: str):
+        """Synthesize a missing greeting in the background, once per key"""
+        if key in self._pending:
+            return
+
+        async def run():
+            try:
+                audio = await synthesize(tts, text)
+                if audio.pcm:
+                    await self.put(key, audio)
+                    logger.info(f"Cached greeting audio {key} ({audio.duration:.1f}s)")
+            except Exception as e:
+                logger.warning(f"Could not synthesize greeting audio {key}: {e}")
+            finally:
+                self._pending.pop(key, None)
+
+        self._pending[key] = asyncio.create_task(run(), name=f"greeting-{key}")
+
+    def invalidate_agent(self, agent_id: str):
+        """Drop every cached greeting of an agent, e.g. after its greeting or voice changed"""
+        prefix = f"{agent_id}-"
+        for key in [key for key in self._memory if key.startswith(prefix)]:
+            self._memory_bytes -= len(self._memory.pop(key).pcm)
+        for path in glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(prefix)}*.wav")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+greeting_cache = GreetingCache(settings.greeting_cache_dir, settings.greeting_cache_memory_mb * 1024 * 1024)
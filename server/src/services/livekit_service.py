@@ -8,6 +8,8 @@ from livekit import api
 from livekit.api import LiveKitAPI
 
 from ..core.config import settings
+from ..core.call_setup import CallSetupTrace
+from ..models import Agent, Call, CallDirection, CallStatus
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +25,7 @@ class LiveKitService:
         )
         self.ws_url = settings.livekit_url.replace('http', 'ws')
     
-    async def create_room(self, room_name: str) -> Dict[str, Any]:
+    async def create_room(self, room_name: str, metadata: Optional[str] = None) -> Dict[str, Any]:
         """Create a new LiveKit room"""
         try:
             room_info = await self.api.room.create_room(
@@ -31,6 +33,7 @@ class LiveKitService:
                     name=room_name,
                     empty_timeout=300,  # 5 minutes
                     max_participants=10,
+                    metadata=metadata or "",
                 )
             )
             
@@ -102,6 +105,9 @@ class LiveKitService:
     ) -> Dict[str, Any]:
         """Create a new agent dispatch"""
         
+        # The agent worker continues this trace from the room metadata
+        setup_trace = CallSetupTrace()
+        
         if not room_name:
             room_name = f"room_{uuid.uuid4().hex[:8]}"
         
@@ -109,7 +115,8 @@ class LiveKitService:
         
         try:
             # Create room first
-            await self.create_room(room_name)
+            with setup_trace.span("room_create"):
+                await self.create_room(room_name, metadata=setup_trace.to_metadata())
             
             # Agent worker will automatically join when participants connect to the room
             logger.info(f"Created dispatch {dispatch_id} for room {room_name} - agent will auto-join when participant connects")
@@ -217,4 +224,46 @@ class LiveKitService:
             )
         except Exception as e:
             logger.error(f"Error updating participant metadata: {str(e)}")
-            raise
\ No newline at end of file
+            raise    
+    async def start_outbound_call(
+        self,
+        db,
+        agent: Agent,
+        user_id: str,
+        to_number: str,
+        from_number: Optional[str] = None,
+        customer_name: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        job_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Call:
+        """Create the room and dispatch of an outbound call and its call record; the agent worker dials"""
+        
+        dispatch_result = await self.create_dispatch(
+            agent_name="phone-agent",
+            metadata={
+                "agent_id": agent.id,
+                "phone_number": to_number,
+                "from_number": from_number,
+                "customer_name": customer_name,
+                **(metadata or {}),
+                **(job_metadata or {}),
+            },
+        )
+        
+        call_data = {
+            "id": dispatch_result.get("dispatch_id", str(uuid.uuid4())),
+            "agentId": agent.id,
+            "userId": user_id,
+            "roomName": dispatch_result.get("room_name"),
+            "direction": CallDirection.OUTBOUND,
+            "status": CallStatus.PENDING,
+            "fromNumber": from_number or agent.phone_number or "",
+            "toNumber": to_number,
+            "participants": [],
+            "startTime": datetime.utcnow(),
+            "metadata": metadata or {},
+            "createdAt": datetime.utcnow(),
+            "updatedAt": datetime.utcnow(),
+        }
+        
+        return await db.create_call(call_data)
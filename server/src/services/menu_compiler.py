@@ -0,0 +1,178 @@
+"""
+Menu compilation for AI-generated menu tools.
+
+Menus are static between edits, so everything the menu tool needs at call time
+(normalised prices, category grouping and the spoken response) is computed once
+when the tool is saved and stored next to the configuration as ``compiledMenu``.
+"""
+import hashlib
+import json
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the compiled layout or response wording changes so stored menus get rebuilt
+MENU_COMPILER_VERSION = 2
+
+DEFAULT_CATEGORY = "Main Items"
+
+EMPTY_MENU_RESPONSE = "I'm sorry, but our menu is currently not available. Please call back later or visit our location for more information."
+
+# Amounts like "12.99", "$12" or "1,299.00" (thousands separators are kept for speech)
+_PRICE_PATTERN = re.compile(r'\$?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?')
+
+CHECKED_MENU_CACHE_SIZE = 64
+
+# Menus already checked against their items, keyed by the identity of the items list:
+# (items, stored compiled menu, menu to use)
+_checked_menus: "OrderedDict[int, Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], Dict[str, Any]]]" = OrderedDict()
+
+
+def normalize_price(price: Any) -> Optional[str]:
+    """
+    Extract a spoken price like "$12.99" from free-form price data
+
+    Args:
+        price: Raw price value from the menu item (number or text such as "12.99 USD")
+
+    Returns:
+        Normalised price text, or None when no price can be found
+    """
+    if price is None or price == '':
+        return None
+
+    price_match = _PRICE_PATTERN.search(str(price))
+    if not price_match:
+        return None
+
+    clean_price = price_match.group()
+    if not clean_price.startswith('$'):
+        clean_price = f"${clean_price}"
+    return clean_price
+
+
+def price_value(price_text: Optional[str]) -> Optional[float]:
+    """Convert normalised price text back to a number for comparisons and totals"""
+    if not price_text:
+        return None
+    try:
+        return float(price_text.lstrip('$').replace(',', ''))
+    except ValueError:
+        return None
+
+
+def compute_menu_hash(menu_items: List[Dict[str, Any]]) -> str:
+    """Content hash of the raw menu items, used to detect stale compiled menus"""
+    payload = json.dumps(
+        {"version": MENU_COMPILER_VERSION, "items": menu_items},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compile_menu(menu_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalise, group and pre-render a list of menu items"""
+
+    if not menu_items:
+        return {
+            "version": MENU_COMPILER_VERSION,
+            "contentHash": compute_menu_hash([]),
+            "itemCount": 0,
+            "categories": [],
+            "response": EMPTY_MENU_RESPONSE,
+        }
+
+    # Group items by category, keeping the order categories first appear in
+    categories: Dict[str, List[Dict[str, Any]]] = {}
+    for item in menu_items:
+        category = item.get('category') or DEFAULT_CATEGORY
+        price = normalize_price(item.get('price'))
+        categories.setdefault(category, []).append({
+            "name": item.get('name') or 'Unknown Item',
+            "price": price,
+            "priceValue": price_value(price),
+            "description": item.get('description') or '',
+        })
+
+    # Build response text
+    response_parts = ["I'd be happy to tell you about our menu! Here's what we have:"]
+
+    for category, items in categories.items():
+        if len(categories) > 1:
+            response_parts.append(f"\n{category}:")
+
+        for item in items:
+            item_text = f"• {item['name']}"
+            if item['price']:
+                item_text += f" - {item['price']}"
+            if item['description']:
+                item_text += f" - {item['description']}"
+            response_parts.append(item_text)
+
+    response_parts.append("\nWhat sounds good to you today?")
+
+    return {
+        "version": MENU_COMPILER_VERSION,
+        "contentHash": compute_menu_hash(menu_items),
+        "itemCount": len(menu_items),
+        "categories": [
+            {"name": category, "items": items}
+            for category, items in categories.items()
+        ],
+        "response": "\n".join(response_parts),
+    }
+
+
+def compile_tool_configuration(configuration: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Attach a compiled menu to a tool configuration before it is saved
+
+    Configurations without ``menuItems`` are returned unchanged. An existing
+    compiled menu is reused when its content hash still matches the items.
+    """
+    if not configuration or 'menuItems' not in configuration:
+        return configuration
+
+    menu_items = configuration.get('menuItems') or []
+    existing = configuration.get('compiledMenu')
+    if existing and existing.get('contentHash') == compute_menu_hash(menu_items):
+        return configuration
+
+    compiled = compile_menu(menu_items)
+    logger.info(f"Compiled menu with {compiled['itemCount']} items in {len(compiled['categories'])} categories")
+    return {**configuration, 'compiledMenu': compiled}
+
+
+def get_compiled_menu(configuration: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the compiled menu stored with a tool configuration
+
+    Tools saved before menus were compiled at save time, and menus whose items
+    were edited without going through the save path, are compiled on the fly.
+    The check is done once per loaded configuration: an edit arrives as a new
+    items list, so the same list with the same compiled menu needs no rehashing.
+    """
+    menu_items = configuration.get('menuItems') or []
+    compiled = configuration.get('compiledMenu')
+
+    checked = _checked_menus.get(id(menu_items))
+    if checked is not None and checked[0] is menu_items and checked[1] is compiled:
+        _checked_menus.move_to_end(id(menu_items))
+        return checked[2]
+
+    if compiled and compiled.get('version') == MENU_COMPILER_VERSION \
+            and compiled.get('contentHash') == compute_menu_hash(menu_items):
+        menu = compiled
+    else:
+        logger.info("Menu tool has no up-to-date compiled menu, compiling at runtime")
+        menu = compile_menu(menu_items)
+
+    # The entry holds the items list, so its id is not reused while cached
+    _checked_menus[id(menu_items)] = (menu_items, compiled, menu)
+    if len(_checked_menus) > CHECKED_MENU_CACHE_SIZE:
+        _checked_menus.popitem(last=False)
+    return menu
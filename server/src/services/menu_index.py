@@ -0,0 +1,349 @@
+"""
+Indexed menu queries for menu tools.
+
+Instead of dumping the whole menu into the LLM context on every call, the menu
+tool answers targeted questions ("do you have vegan pizzas?") from an in-memory
+index built once per compiled menu.
+"""
+import logging
+import re
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from difflib import get_close_matches
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from .menu_compiler import get_compiled_menu
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_LIMIT = 5
+MAX_RESULT_LIMIT = 20
+
+# Menus up to this size are still read out in full when no filter is given
+FULL_MENU_MAX_ITEMS = 30
+
+# Number of menu indexes kept per process, keyed by menu content hash
+INDEX_CACHE_SIZE = 128
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+_STOP_WORDS = {
+    "a", "an", "and", "any", "are", "can", "do", "does", "for", "get", "have",
+    "i", "is", "me", "menu", "of", "on", "or", "some", "the", "what", "with",
+    "you", "your", "got", "like", "want", "would",
+}
+
+# Relative weight of a token match depending on where it was found
+_NAME_WEIGHT = 3.0
+_CATEGORY_WEIGHT = 2.0
+_DESCRIPTION_WEIGHT = 1.0
+_FUZZY_PENALTY = 0.8
+
+
+def _stem(token: str) -> str:
+    """Very small plural stemmer so "pizzas" matches "pizza" and "berries" matches "berry" """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split and stem free text into index tokens"""
+    return [
+        _stem(token)
+        for token in _TOKEN_PATTERN.findall(str(text).lower())
+        if token not in _STOP_WORDS
+    ]
+
+
+class MenuIndex:
+    """Read-only search index over a compiled menu"""
+
+    def __init__(self, compiled_menu: Dict[str, Any]):
+        self.content_hash = compiled_menu.get("contentHash")
+        self.response = compiled_menu.get("response", "")
+        self.items: List[Dict[str, Any]] = []
+        self.categories: List[str] = []
+
+        self._by_category: Dict[str, List[int]] = {}
+        self._token_weights: Dict[str, Dict[int, float]] = {}
+        self._names: Dict[str, int] = {}
+        self._by_price: List[Tuple[float, int]] = []
+
+        for category in compiled_menu.get("categories", []):
+            category_name = category["name"]
+            self.categories.append(category_name)
+            category_tokens = tokenize(category_name)
+
+            for item in category["items"]:
+                index = len(self.items)
+                self.items.append({**item, "category": category_name})
+                self._by_category.setdefault(category_name.lower(), []).append(index)
+                self._names.setdefault(" ".join(tokenize(item["name"])), index)
+
+                self._add_tokens(index, tokenize(item["name"]), _NAME_WEIGHT)
+                self._add_tokens(index, category_tokens, _CATEGORY_WEIGHT)
+                self._add_tokens(index, tokenize(item.get("description", "")), _DESCRIPTION_WEIGHT)
+
+                if item.get("priceValue") is not None:
+                    self._by_price.append((item["priceValue"], index))
+
+        self._by_price.sort()
+        self._prices = [price for price, _ in self._by_price]
+        self._vocabulary = list(self._token_weights.keys())
+
+    def _add_tokens(self, index: int, tokens: List[str], weight: float):
+        for token in tokens:
+            postings = self._token_weights.setdefault(token, {})
+            # Keep the strongest place a token appears for an item
+            if postings.get(index, 0) < weight:
+                postings[index] = weight
+
+    def _expand_token(self, token: str) -> List[Tuple[str, float]]:
+        """Return index tokens matching a query token, with fuzzy matches penalised"""
+        if token in self._token_weights:
+            return [(token, 1.0)]
+        return [
+            (match, _FUZZY_PENALTY)
+            for match in get_close_matches(token, self._vocabulary, n=3, cutoff=0.8)
+        ]
+
+    def match(self, text: str) -> List[Tuple[int, float, int]]:
+        """
+        Score items against free text
+
+        Returns:
+            (item index, score, number of query tokens matched) sorted best first
+        """
+        tokens = list(dict.fromkeys(tokenize(text)))
+        if not tokens:
+            return []
+
+        exact = self._names.get(" ".join(tokens))
+
+        scores: Dict[int, float] = {}
+        matched: Dict[int, Set[str]] = {}
+        for token in tokens:
+            for index_token, factor in self._expand_token(token):
+                for index, weight in self._token_weights[index_token].items():
+                    scores[index] = scores.get(index, 0.0) + weight * factor
+                    matched.setdefault(index, set()).add(token)
+
+        if exact is not None:
+            scores[exact] = scores.get(exact, 0.0) + _NAME_WEIGHT * len(tokens)
+            matched[exact] = set(tokens)
+
+        ranked = [(index, score, len(matched[index])) for index, score in scores.items()]
+        ranked.sort(key=lambda entry: (-entry[2], -entry[1], entry[0]))
+        return ranked
+
+    def _price_filter(self, min_price: Optional[float], max_price: Optional[float]) -> Optional[Set[int]]:
+        if min_price is None and max_price is None:
+            return None
+        low = bisect_left(self._prices, min_price) if min_price is not None else 0
+        high = bisect_right(self._prices, max_price) if max_price is not None else len(self._prices)
+        return {index for _, index in self._by_price[low:high]}
+
+    def resolve_category(self, category: Optional[str]) -> Optional[str]:
+        """Map a spoken category name onto one of the menu's categories"""
+        if not category:
+            return None
+        key = category.strip().lower()
+        if key in self._by_category:
+            return key
+        stemmed = " ".join(tokenize(key))
+        for name in self._by_category:
+            if " ".join(tokenize(name)) == stemmed:
+                return name
+        matches = get_close_matches(key, list(self._by_category.keys()), n=1, cutoff=0.7)
+        return matches[0] if matches else None
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = DEFAULT_RESULT_LIMIT,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Find menu items matching the given filters
+
+        Returns:
+            The top ``limit`` items and the total number of matches
+        """
+        limit = max(1, min(int(limit or DEFAULT_RESULT_LIMIT), MAX_RESULT_LIMIT))
+
+        candidates: Optional[Set[int]] = None
+        if category:
+            category_key = self.resolve_category(category)
+            candidates = set(self._by_category.get(category_key, [])) if category_key else set()
+
+        price_matches = self._price_filter(min_price, max_price)
+        if price_matches is not None:
+            candidates = price_matches if candidates is None else candidates & price_matches
+
+        if query and tokenize(query):
+            ranked = [entry for entry in self.match(query) if candidates is None or entry[0] in candidates]
+            if ranked:
+                # Items that match every query token beat partial matches outright
+                best = ranked[0][2]
+                ranked = [entry for entry in ranked if entry[2] == best]
+            ordered = [index for index, _, _ in ranked]
+        elif candidates is not None:
+            ordered = sorted(candidates)
+        else:
+            ordered = list(range(len(self.items)))
+
+        return [self.items[index] for index in ordered[:limit]], len(ordered)
+
+    def query(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a menu tool call, returning only the items the caller asked about"""
+        query = parameters.get("query") or None
+        category = parameters.get("category") or None
+        min_price = _as_float(parameters.get("min_price"))
+        max_price = _as_float(parameters.get("max_price"))
+        limit = _as_int(parameters.get("limit")) or DEFAULT_RESULT_LIMIT
+
+        if not any([query, category, min_price is not None, max_price is not None]):
+            return self.overview()
+
+        items, total = self.search(query, category, min_price, max_price, limit)
+
+        if not items:
+            return {
+                "response": "I couldn't find anything matching that on our menu. "
+                            f"We have {self._category_summary()}. Would you like to hear about any of those?",
+                "items": [],
+                "totalMatches": 0,
+                "categories": self.categories,
+                "success": True,
+            }
+
+        response_parts = ["Here's what I found on our menu:"]
+        response_parts.extend(_render_item(item) for item in items)
+        if total > len(items):
+            response_parts.append(f"There are {total - len(items)} more options like these if you'd like to hear them.")
+
+        return {
+            "response": "\n".join(response_parts),
+            "items": [_public_item(item) for item in items],
+            "totalMatches": total,
+            "success": True,
+        }
+
+    def overview(self) -> Dict[str, Any]:
+        """Unfiltered menu response: the full menu for small menus, a category summary otherwise"""
+        if len(self.items) <= FULL_MENU_MAX_ITEMS:
+            return {"response": self.response, "success": True}
+
+        return {
+            "response": f"We have {len(self.items)} items on our menu, including {self._category_summary()}. "
+                        "Which would you like to hear about?",
+            "categories": [
+                {"name": name, "itemCount": len(self._by_category[name.lower()])}
+                for name in self.categories
+            ],
+            "success": True,
+        }
+
+    def _category_summary(self) -> str:
+        if len(self.categories) <= 1:
+            return "a range of dishes"
+        return ", ".join(self.categories[:-1]) + f" and {self.categories[-1]}"
+
+    def json_schema(self) -> Dict[str, Any]:
+        """JSON schema for the menu tool's parameters, derived from this menu"""
+        properties: Dict[str, Any] = {
+            "query": {
+                "type": "string",
+                "description": "Dish name, ingredient or dietary keyword the customer asked about "
+                               "(e.g. 'vegan pizza', 'gluten free'). Leave empty to browse.",
+            },
+        }
+        if self.categories:
+            properties["category"] = {
+                "type": "string",
+                "description": "Only return items from this menu category",
+                "enum": self.categories,
+            }
+        properties.update({
+            "min_price": {
+                "type": "number",
+                "description": "Only return items costing at least this much",
+            },
+            "max_price": {
+                "type": "number",
+                "description": "Only return items costing at most this much",
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of items to return",
+                "minimum": 1,
+                "maximum": MAX_RESULT_LIMIT,
+            },
+        })
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": [],
+            "additionalProperties": False,
+        }
+
+
+def _render_item(item: Dict[str, Any]) -> str:
+    item_text = f"• {item['name']}"
+    if item.get("price"):
+        item_text += f" - {item['price']}"
+    if item.get("description"):
+        item_text += f" - {item['description']}"
+    return item_text
+
+
+def _public_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": item["name"],
+        "price": item.get("price"),
+        "category": item["category"],
+        "description": item.get("description", ""),
+    }
+
+
+def _as_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(str(value).lstrip("$").replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _as_int(value: Any) -> Optional[int]:
+    number = _as_float(value)
+    return int(number) if number is not None else None
+
+
+_index_cache: "OrderedDict[str, MenuIndex]" = OrderedDict()
+
+
+def get_menu_index(configuration: Dict[str, Any]) -> MenuIndex:
+    """Return the (process-wide cached) index for a menu tool configuration"""
+    compiled_menu = get_compiled_menu(configuration)
+    content_hash = compiled_menu.get("contentHash")
+
+    index = _index_cache.get(content_hash)
+    if index is not None:
+        _index_cache.move_to_end(content_hash)
+        return index
+
+    index = MenuIndex(compiled_menu)
+    _index_cache[content_hash] = index
+    if len(_index_cache) > INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+
+    logger.info(f"Built menu index for {len(index.items)} items ({len(index._vocabulary)} tokens)")
+    return index
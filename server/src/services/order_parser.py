@@ -0,0 +1,407 @@
+"""
+Deterministic order parsing against a menu index.
+
+Turns free-text order lines such as "2 large pepperoni passion pizzas, no
+onions, and a caesar salad" into structured line items with locally computed
+totals, or returns the candidates the customer has to choose between when a
+phrase is ambiguous. Sizes and modifiers ("no onions", "with extra cheese") are
+carried on the line rather than matched against item names, and the text
+``format_order_lines`` writes parses back into the same lines.
+"""
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from .menu_index import MenuIndex, get_menu_index, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Number of order parsers kept per process, keyed by menu content hash
+PARSER_CACHE_SIZE = 128
+
+MAX_CANDIDATES = 3
+
+# A fuzzy match is accepted without asking when it beats the runner-up by this factor
+_CONFIDENT_SCORE_RATIO = 1.5
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "single": 1,
+    "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12,
+}
+
+# Words that multiply the quantity before them ("two dozen", "a couple")
+_MULTIPLIER_WORDS = {"dozen": 12, "couple": 2, "pair": 2}
+
+# Punctuation always separates items; joining words only do when they are not part of an item name ("mac and cheese")
+_HARD_SEPARATORS = re.compile(r"\s*(?:,|;|\n)\s*")
+_SOFT_SEPARATORS = re.compile(r"\s*(?:&|\+|\band\b|\bplus\b|\balso\b|\bwith a\b)\s*")
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+_QUANTITY_SUFFIX = re.compile(r"^x?(\d+)x?$")
+
+_FILLER_WORDS = {"of", "the", "order", "orders", "piece", "pieces", "please", "some"}
+
+# "2 x Margherita" and "margherita x 2": the multiplication sign is not part of the item
+_QUANTITY_MARKERS = {"x", "times"}
+
+# Prices written next to items, as format_order_lines does; they never name an item
+_PRICE_TEXT = re.compile(r"\(\s*\$?\s*\d[\d,]*(?:\.\d+)?\s*\)|\$\s*\d[\d,]*(?:\.\d+)?")
+_PARENTHESES = re.compile(r"\(([^()]*)\)")
+
+_SIZE_WORDS = {
+    "small", "medium", "large", "regular", "jumbo", "mini", "personal", "family", "xl",
+    "extra large", "x large", "extra small", "family size", "kids size",
+}
+
+# Words that start a modifier of the item before them
+_MODIFIER_WORDS = {"no", "without", "with", "extra", "add", "hold", "light", "easy", "less", "double", "sub", "substitute"}
+
+_TERMINAL = "$"
+
+
+class OrderParser:
+    """Parses order text into priced line items for one menu"""
+
+    def __init__(self, menu_index: MenuIndex):
+        self.menu_index = menu_index
+        self._trie: Dict[str, Any] = {}
+        self._item_tokens: List[Set[str]] = []
+
+        for index, item in enumerate(menu_index.items):
+            name_tokens = tokenize(item["name"])
+            self._insert(name_tokens, index)
+            self._item_tokens.append(
+                set(name_tokens) | set(tokenize(item["category"])) | set(tokenize(item.get("description", "")))
+            )
+
+    def _insert(self, tokens: List[str], index: int):
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_TERMINAL, []).append(index)
+
+    def _trie_match(self, tokens: List[str]) -> Tuple[List[int], int]:
+        """Longest menu item name that prefixes the token list"""
+        node = self._trie
+        best: Tuple[List[int], int] = ([], 0)
+        for position, token in enumerate(tokens):
+            node = node.get(token)
+            if node is None:
+                break
+            if _TERMINAL in node:
+                best = (node[_TERMINAL], position + 1)
+        return best
+
+    def parse(self, text: str) -> Dict[str, Any]:
+        """
+        Parse an order into line items
+
+        Returns:
+            Dict with priced ``lines``, ``ambiguous`` phrases with candidates,
+            ``unmatched`` phrases with their quantities, the order ``total`` and
+            whether it is ``complete``
+        """
+        lines: List[Dict[str, Any]] = []
+        ambiguous: List[Dict[str, Any]] = []
+        unmatched: List[Dict[str, Any]] = []
+        previous: Optional[Dict[str, Any]] = None
+
+        for quantity, phrase in self._split_order(text):
+            resolved, candidates, size, modifiers = self._resolve(phrase)
+            if resolved is None and previous is not None and _is_modifier_only(phrase):
+                # "margherita, extra cheese": the modifier belongs to the item before it
+                if phrase in _SIZE_WORDS:
+                    previous["size"] = previous["size"] or phrase
+                else:
+                    previous["modifiers"].extend(_split_modifiers(phrase)[2])
+                continue
+
+            if resolved is not None:
+                previous = self._line(resolved, quantity, phrase, size, modifiers)
+                lines.append(previous)
+            elif candidates:
+                previous = {
+                    "phrase": phrase,
+                    "quantity": quantity,
+                    "size": size,
+                    "modifiers": modifiers,
+                    "candidates": [self._candidate(index) for index in candidates],
+                }
+                ambiguous.append(previous)
+            else:
+                previous = None
+                unmatched.append({"phrase": phrase, "quantity": quantity})
+
+        lines = _merge_lines(lines)
+        total = round(sum(line["lineTotal"] for line in lines if line["lineTotal"] is not None), 2)
+
+        return {
+            "lines": lines,
+            "ambiguous": ambiguous,
+            "unmatched": unmatched,
+            "total": total,
+            "unpricedItems": [line["name"] for line in lines if line["unitPrice"] is None],
+            "complete": bool(lines) and not ambiguous and not unmatched,
+        }
+
+    def _split_order(self, text: str) -> List[Tuple[int, str]]:
+        """Split order text into (quantity, item phrase) pairs"""
+        segments: List[Tuple[int, str]] = []
+
+        text = _PRICE_TEXT.sub(" ", str(text or "").lower())
+        # Parentheses hold sizes and modifiers of the item before them, never separators
+        text = _PARENTHESES.sub(lambda match: " " + _HARD_SEPARATORS.sub(" ", match.group(1)) + " ", text)
+
+        for chunk in _HARD_SEPARATORS.split(text):
+            pieces: List[str] = []
+            for piece in _SOFT_SEPARATORS.split(chunk):
+                if not piece.strip():
+                    continue
+                if pieces and self._continues_item_name(pieces[-1], piece):
+                    pieces[-1] = f"{pieces[-1]} and {piece}"
+                else:
+                    pieces.append(piece)
+
+            for piece in pieces:
+                segments.extend(self._quantity_segments(piece))
+
+        return segments
+
+    def _starts_item_name(self, words: List[str]) -> bool:
+        """Whether the words start with a whole menu item name ("7 up", "3 cheese pizza")"""
+        _, consumed = self._trie_match(tokenize(" ".join(words)))
+        return consumed > 0
+
+    def _quantity_segments(self, text: str) -> List[Tuple[int, str]]:
+        """
+        Split one order piece into (quantity, item phrase) pairs
+
+        A number is a quantity unless an item name starts with it: "3 7 up" is
+        three 7 Up and "two 3 cheese pizzas" two 3 Cheese Pizzas. A number right
+        after a quantity is kept with the item words rather than multiplied, so
+        an unknown "2 liter coke" is asked about instead of priced as two cokes.
+        """
+        segments: List[Tuple[int, str]] = []
+        quantity: Optional[int] = None
+        words: List[str] = []
+        last_had_quantity = True
+
+        all_words = _WORD_PATTERN.findall(text)
+        for position, word in enumerate(all_words):
+            if word in _QUANTITY_MARKERS:
+                continue
+            if word in _MULTIPLIER_WORDS and not words:
+                quantity = (quantity or 1) * _MULTIPLIER_WORDS[word]
+                continue
+            word_quantity = _parse_quantity(word)
+            if word_quantity is None or self._starts_item_name(all_words[position:]):
+                words.append(word)
+                continue
+            # A quantity after some item words starts the next item ("2 cokes 1 salad")
+            if words:
+                segments.append((quantity or 1, " ".join(words)))
+                last_had_quantity = quantity is not None
+                words = []
+                quantity = None
+            if quantity is None:
+                quantity = word_quantity
+            else:
+                words.append(word)
+
+        if words:
+            segments.append((quantity or 1, " ".join(words)))
+        elif quantity is not None and segments and not last_had_quantity:
+            # Trailing quantity belongs to the item before it ("pepperoni passion x2")
+            segments[-1] = (quantity, segments[-1][1])
+
+        return segments
+
+    def _continues_item_name(self, previous: str, piece: str) -> bool:
+        """Whether a joining word sits inside an item name rather than between two items"""
+        words = _WORD_PATTERN.findall(previous)
+        for position in range(len(words) - 1, -1, -1):
+            if _parse_quantity(words[position]) is not None and not self._starts_item_name(words[position:]):
+                words = words[position + 1:]
+                break
+        head = tokenize(" ".join(words))
+        if not head:
+            return False
+        _, consumed = self._trie_match(head + tokenize(piece))
+        return consumed > len(head)
+
+    def _resolve(self, phrase: str) -> Tuple[Optional[int], List[int], Optional[str], List[str]]:
+        """
+        Resolve a phrase to one menu item, or to the candidates it could mean
+
+        Returns:
+            (item index, candidates, size, modifiers); sizes and modifiers are only
+            split off when the phrase is not an item name as a whole ("Large Fries")
+        """
+        exact = self._exact_match(phrase)
+        if exact is not None:
+            return exact, [], None, []
+
+        item_phrase, size, modifiers = _split_modifiers(phrase)
+        if item_phrase != phrase:
+            resolved, candidates = self._resolve_item(item_phrase)
+            if resolved is not None or candidates:
+                return resolved, candidates, size, modifiers
+
+        resolved, candidates = self._resolve_item(phrase)
+        return resolved, candidates, None, []
+
+    def _exact_match(self, phrase: str) -> Optional[int]:
+        """Exact item name, optionally followed by words describing that same item ("... pizza")"""
+        tokens = tokenize(phrase)
+        # Filler words can be part of the name ("2 Piece Chicken") or not ("an order of fries")
+        for candidate in (tokens, [token for token in tokens if token not in _FILLER_WORDS]):
+            matches, consumed = self._trie_match(candidate)
+            if len(matches) == 1 and set(candidate[consumed:]) - _FILLER_WORDS <= self._item_tokens[matches[0]]:
+                return matches[0]
+        return None
+
+    def _resolve_item(self, phrase: str) -> Tuple[Optional[int], List[int]]:
+        tokens = [token for token in tokenize(phrase) if token not in _FILLER_WORDS]
+        if not tokens:
+            return None, []
+
+        exact = self._exact_match(phrase)
+        if exact is not None:
+            return exact, []
+
+        ranked = self.menu_index.match(" ".join(tokens))
+        if not ranked:
+            return None, []
+
+        full_matches = [entry for entry in ranked if entry[2] == len(tokens)]
+        if len(full_matches) == 1:
+            return full_matches[0][0], []
+        if len(full_matches) > 1 and full_matches[0][1] >= full_matches[1][1] * _CONFIDENT_SCORE_RATIO:
+            return full_matches[0][0], []
+
+        candidates = full_matches or ranked
+        return None, [index for index, _, _ in candidates[:MAX_CANDIDATES]]
+
+    def _line(self, index: int, quantity: int, phrase: str, size: Optional[str], modifiers: List[str]) -> Dict[str, Any]:
+        item = self.menu_index.items[index]
+        unit_price = item.get("priceValue")
+        return {
+            "name": item["name"],
+            "quantity": quantity,
+            "size": size,
+            "modifiers": list(modifiers),
+            "unitPrice": unit_price,
+            "lineTotal": round(unit_price * quantity, 2) if unit_price is not None else None,
+            "phrase": phrase,
+        }
+
+    def _candidate(self, index: int) -> Dict[str, Any]:
+        item = self.menu_index.items[index]
+        return {"name": item["name"], "price": item.get("price")}
+
+
+def _parse_quantity(word: str) -> Optional[int]:
+    if word in _NUMBER_WORDS:
+        return _NUMBER_WORDS[word]
+    match = _QUANTITY_SUFFIX.match(word)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def _split_modifiers(phrase: str) -> Tuple[str, Optional[str], List[str]]:
+    """
+    Split a phrase into the item it names, its size and its modifiers
+
+    "large pepperoni with no onions extra cheese" gives
+    ("pepperoni", "large", ["no onions", "extra cheese"]).
+    """
+    words = phrase.split()
+    size: Optional[str] = None
+    item_words: List[str] = []
+    modifiers: List[List[str]] = []
+
+    position = 0
+    while position < len(words):
+        pair = " ".join(words[position:position + 2])
+        if size is None and pair in _SIZE_WORDS:
+            size = pair
+            position += 2
+            continue
+        word = words[position]
+        position += 1
+        if size is None and word in _SIZE_WORDS:
+            size = word
+        elif word in _MODIFIER_WORDS:
+            # "with extra cheese" is one modifier, and "with" alone only introduces it
+            if modifiers and modifiers[-1] == ["with"]:
+                modifiers[-1] = [word]
+            else:
+                modifiers.append([word])
+        elif modifiers:
+            modifiers[-1].append(word)
+        else:
+            item_words.append(word)
+
+    return " ".join(item_words), size, [" ".join(modifier) for modifier in modifiers if modifier != ["with"]]
+
+
+def _is_modifier_only(phrase: str) -> bool:
+    words = phrase.split()
+    return bool(words) and (words[0] in _MODIFIER_WORDS or phrase in _SIZE_WORDS)
+
+
+def _merge_lines(lines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Combine repeated mentions of the same item, size and modifiers into one line"""
+    merged: Dict[Tuple[str, Optional[str], Tuple[str, ...]], Dict[str, Any]] = {}
+    for line in lines:
+        key = (line["name"], line["size"], tuple(line["modifiers"]))
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = dict(line)
+            continue
+        existing["quantity"] += line["quantity"]
+        if existing["unitPrice"] is not None:
+            existing["lineTotal"] = round(existing["unitPrice"] * existing["quantity"], 2)
+    return list(merged.values())
+
+
+def format_order_lines(lines: List[Dict[str, Any]]) -> str:
+    """
+    Render parsed line items the way orders are written to sheets
+
+    E.g. '2 x Margherita (large, no basil) ($25.98), 1 x Coke ($2.50)', which parses back into the same lines.
+    """
+    parts = []
+    for line in lines:
+        text = f"{line['quantity']} x {line['name']}"
+        details = ([line["size"]] if line.get("size") else []) + list(line.get("modifiers") or [])
+        if details:
+            text += f" ({', '.join(details)})"
+        if line["lineTotal"] is not None:
+            text += f" (${line['lineTotal']:.2f})"
+        parts.append(text)
+    return ", ".join(parts)
+
+
+_parser_cache: "OrderedDict[str, OrderParser]" = OrderedDict()
+
+
+def get_order_parser(configuration: Dict[str, Any]) -> OrderParser:
+    """Return the (process-wide cached) order parser for a menu tool configuration"""
+    menu_index = get_menu_index(configuration)
+
+    parser = _parser_cache.get(menu_index.content_hash)
+    if parser is not None:
+        _parser_cache.move_to_end(menu_index.content_hash)
+        return parser
+
+    parser = OrderParser(menu_index)
+    _parser_cache[menu_index.content_hash] = parser
+    if len(_parser_cache) > PARSER_CACHE_SIZE:
+        _parser_cache.popitem(last=False)
+    return parser
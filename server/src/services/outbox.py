@@ -0,0 +1,189 @@
+"""
+Durable outbox for background deliveries.
+
+Work that has to outlive the request or call that produced it (confirmation
+emails, notifications, ...) is written to a local SQLite table first. Delivery
+workers claim due entries under a lease, then either complete them or schedule
+a retry, so entries survive restarts and a crashed worker's claims expire and
+are picked up again.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from time import time
+from typing import Dict, Any, List, Optional
+
+from pydantic import BaseModel
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_FAILED = "failed"
+
+
+class OutboxEntry(BaseModel):
+    id: str
+    topic: str
+    tenant_id: str
+    payload: Dict[str, Any]
+    attempts: int = 0
+    created_at: float
+
+
+class Outbox:
+    """SQLite-backed queue of pending deliveries, shared by all processes on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    tenant_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    lease_until REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (topic, status, next_attempt_at)"
+            )
+            self._connection = connection
+            logger.info(f"Opened outbox at {self.path}")
+        return self._connection
+
+    def _put_sync(self, topic: str, tenant_id: str, payload: Dict[str, Any]) -> str:
+        entry_id = uuid.uuid4().hex
+        now = time()
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO outbox (id, topic, tenant_id, payload, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry_id, topic, tenant_id, json.dumps(payload, default=str), STATUS_PENDING, now, now),
+            )
+        return entry_id
+
+    def _claim_sync(self, topic: str, limit: int, lease_seconds: float) -> List[OutboxEntry]:
+        now = time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute(
+                    "SELECT * FROM outbox WHERE topic = ? AND status = ? AND next_attempt_at <= ? "
+                    "AND (lease_until IS NULL OR lease_until < ?) ORDER BY next_attempt_at LIMIT ?",
+                    (topic, STATUS_PENDING, now, now, limit),
+                ).fetchall()
+                connection.executemany(
+                    "UPDATE outbox SET lease_until = ? WHERE id = ?",
+                    [(now + lease_seconds, row["id"]) for row in rows],
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return [
+            OutboxEntry(
+                id=row["id"],
+                topic=row["topic"],
+                tenant_id=row["tenant_id"],
+                payload=json.loads(row["payload"]),
+                attempts=row["attempts"],
+                created_at=row["created_at"],
+            )
+            for row in rows
+        ]
+
+    def _execute_sync(self, sql: str, parameters: List[tuple]):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(sql, parameters)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def _count_sync(self, topic: str, status: str) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM outbox WHERE topic = ? AND status = ?", (topic, status)
+            ).fetchone()[0]
+
+    async def put(self, topic: str, payload: Dict[str, Any], tenant_id: str = "") -> str:
+        """Durably queue a payload, returning its entry id once it is committed"""
+        return await asyncio.to_thread(self._put_sync, topic, tenant_id or "", payload)
+
+    async def claim(self, topic: str, limit: int, lease_seconds: float = 60.0) -> List[OutboxEntry]:
+        """Lease up to ``limit`` due entries of a topic for delivery"""
+        return await asyncio.to_thread(self._claim_sync, topic, limit, lease_seconds)
+
+    async def complete(self, entry_ids: List[str]):
+        """Remove delivered entries"""
+        if entry_ids:
+            await asyncio.to_thread(
+                self._execute_sync, "DELETE FROM outbox WHERE id = ?", [(entry_id,) for entry_id in entry_ids]
+            )
+
+    async def retry(self, entry_id: str, delay_seconds: float, error: str, payload: Optional[Dict[str, Any]] = None):
+        """Release an entry for another attempt after a delay, optionally replacing its payload"""
+        if payload is None:
+            await asyncio.to_thread(
+                self._execute_sync,
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, lease_until = NULL, last_error = ? "
+                "WHERE id = ?",
+                [(time() + delay_seconds, error[:1000], entry_id)],
+            )
+            return
+        await asyncio.to_thread(
+            self._execute_sync,
+            "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, lease_until = NULL, last_error = ?, "
+            "payload = ? WHERE id = ?",
+            [(time() + delay_seconds, error[:1000], json.dumps(payload, default=str), entry_id)],
+        )
+
+    async def defer(self, entry_id: str, delay_seconds: float):
+        """Push an entry back without counting an attempt, e.g. when its tenant is over its rate"""
+        await asyncio.to_thread(
+            self._execute_sync,
+            "UPDATE outbox SET next_attempt_at = ?, lease_until = NULL WHERE id = ?",
+            [(time() + delay_seconds, entry_id)],
+        )
+
+    async def fail(self, entry_id: str, error: str):
+        """Give up on an entry; failed entries are kept for inspection"""
+        await asyncio.to_thread(
+            self._execute_sync,
+            "UPDATE outbox SET attempts = attempts + 1, status = ?, lease_until = NULL, last_error = ? WHERE id = ?",
+            [(STATUS_FAILED, error[:1000], entry_id)],
+        )
+
+    async def pending_count(self, topic: str) -> int:
+        return await asyncio.to_thread(self._count_sync, topic, STATUS_PENDING)
+
+
+outbox = Outbox(settings.outbox_db_path)
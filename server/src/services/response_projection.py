@@ -0,0 +1,221 @@
+"""
+Projection of custom API and webhook responses before they reach the model.
+
+Customer APIs tend to answer with far more than the agent needs. A tool's
+``responseProjection`` configuration keeps only the fields it lists, caps
+arrays and long strings, and holds the whole result to a byte budget:
+
+    "responseProjection": {
+        "fields": ["order.status", "order.items[*].name", "$.eta"],
+        "maxItems": 5,
+        "maxStringLength": 300,
+        "maxBytes": 2000
+    }
+
+Field paths are a small JSONPath subset: dotted keys, ``[n]`` indexes and ``*``
+/ ``[*]`` wildcards, with an optional leading ``$``. Paths are compiled once per
+tool into a tree and the decoded response is projected in a single pass that
+stops copying once the budget is spent. Projection bounds what the model sees,
+not what is downloaded and decoded: the executor reads bodies only up to
+``TOOL_RESPONSE_MAX_READ_BYTES`` and fails the call beyond it. Tools without a
+projection still get the default array, string and byte limits.
+"""
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..core.config import settings
+from ..models import Tool
+
+PROJECTION_CACHE_SIZE = 256
+
+TRUNCATED_KEY = "_truncated"
+ELLIPSIS = "…"
+
+_PATH_TOKEN = re.compile(r"\.?([^.\[\]]+)|\[(\*|\d+)\]")
+
+
+class _PathNode:
+    """One step of the compiled field paths; ``keep`` means the whole value below is kept"""
+
+    def __init__(self):
+        self.keep = False
+        self.keys: Dict[str, "_PathNode"] = {}
+        self.indexes: Dict[int, "_PathNode"] = {}
+        self.any: Optional["_PathNode"] = None
+
+    def child(self, token) -> "_PathNode":
+        if token == "*":
+            self.any = self.any or _PathNode()
+            return self.any
+        table = self.indexes if isinstance(token, int) else self.keys
+        return table.setdefault(token, _PathNode())
+
+
+def parse_path(path: str) -> List[Any]:
+    """Split a field path into keys, integer indexes and ``*`` wildcards"""
+    text = path.strip()
+    if text.startswith("$"):
+        text = text[1:]
+    tokens: List[Any] = []
+    position = 0
+    while position < len(text):
+        match = _PATH_TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"Invalid response field path: {path!r}")
+        key, index = match.groups()
+        if key is not None:
+            tokens.append(key)
+        else:
+            tokens.append("*" if index == "*" else int(index))
+        position = match.end()
+    if not tokens:
+        raise ValueError(f"Empty response field path: {path!r}")
+    return tokens
+
+
+class _Budget:
+    def __init__(self, max_bytes: int):
+        self.remaining = max_bytes
+        self.truncated = False
+
+    def spend(self, size: int) -> bool:
+        if size > self.remaining:
+            self.truncated = True
+            return False
+        self.remaining -= size
+        return True
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+class ResponseProjection:
+    """Compiled response projection of one tool"""
+
+    def __init__(
+        self,
+        fields: Optional[List[str]] = None,
+        max_items: Optional[int] = None,
+        max_string_length: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.max_items = max_items or settings.tool_response_max_items
+        self.max_string_length = max_string_length or settings.tool_response_max_string_length
+        self.max_bytes = max_bytes or settings.tool_response_max_bytes
+        self._root: Optional[_PathNode] = None
+        if fields:
+            self._root = _PathNode()
+            for field in fields:
+                node = self._root
+                for token in parse_path(field):
+                    node = node.child(token)
+                node.keep = True
+
+    @classmethod
+    def from_configuration(cls, configuration: Dict[str, Any]) -> "ResponseProjection":
+        projection = configuration.get('responseProjection') or {}
+        fields = projection.get('fields')
+        if isinstance(fields, str):
+            fields = [field for field in fields.split(",") if field.strip()]
+        return cls(
+            fields=fields,
+            max_items=projection.get('maxItems'),
+            max_string_length=projection.get('maxStringLength'),
+            max_bytes=projection.get('maxBytes'),
+        )
+
+    def apply(self, data: Any) -> Any:
+        """Project a decoded JSON response"""
+        budget = _Budget(self.max_bytes)
+        found, result = self._copy(data, self._root, budget)
+        if not found:
+            return {} if isinstance(data, dict) else None
+        if budget.truncated:
+            if isinstance(result, dict):
+                result[TRUNCATED_KEY] = True
+            elif isinstance(result, list):
+                result = {"items": result, TRUNCATED_KEY: True}
+        return result
+
+    def apply_text(self, text: str) -> str:
+        """Cut a non-JSON response down to the byte budget"""
+        encoded = text.encode()
+        if len(encoded) <= self.max_bytes:
+            return text
+        return encoded[:self.max_bytes].decode(errors="ignore") + ELLIPSIS
+
+    def _copy(self, value: Any, node: Optional[_PathNode], budget: _Budget) -> Tuple[bool, Any]:
+        """Copy the parts of ``value`` selected by ``node`` within the budget; returns (found, copy)"""
+        if node is not None and node.keep:
+            node = None
+
+        if isinstance(value, dict):
+            if node is not None and not node.keys and node.any is None:
+                return False, None
+            if not budget.spend(2):
+                return False, None
+            result = {}
+            for key, item in value.items():
+                child = node if node is None else node.keys.get(key, node.any)
+                if node is not None and child is None:
+                    continue
+                if not budget.spend(_size(key) + 4):
+                    break
+                found, copied = self._copy(item, child, budget)
+                if found:
+                    result[key] = copied
+            return bool(result) or (node is None and not value), result
+
+        if isinstance(value, list):
+            if node is not None and not node.indexes and node.any is None:
+                return False, None
+            if not budget.spend(2):
+                return False, None
+            result = []
+            for index, item in enumerate(value):
+                child = node if node is None else node.indexes.get(index, node.any)
+                if node is not None and child is None:
+                    continue
+                if len(result) >= self.max_items:
+                    budget.truncated = True
+                    break
+                if not budget.spend(2):
+                    break
+                found, copied = self._copy(item, child, budget)
+                if found:
+                    result.append(copied)
+            return bool(result) or (node is None and not value), result
+
+        if node is not None:
+            # The path goes deeper than the response does
+            return False, None
+        if isinstance(value, str) and len(value) > self.max_string_length:
+            value = value[:self.max_string_length] + ELLIPSIS
+            budget.truncated = True
+        if not budget.spend(_size(value)):
+            return False, None
+        return True, value
+
+
+_projection_cache: "OrderedDict[Tuple[str, str], ResponseProjection]" = OrderedDict()
+
+
+def get_response_projection(tool: Tool) -> ResponseProjection:
+    """Return the (process-wide cached) compiled response projection of a tool"""
+    projection = (tool.configuration or {}).get('responseProjection') or {}
+    key = (tool.id, hashlib.sha256(json.dumps(projection, sort_keys=True, default=str).encode()).hexdigest())
+
+    compiled = _projection_cache.get(key)
+    if compiled is not None:
+        _projection_cache.move_to_end(key)
+        return compiled
+
+    compiled = ResponseProjection.from_configuration(tool.configuration or {})
+    _projection_cache[key] = compiled
+    if len(_projection_cache) > PROJECTION_CACHE_SIZE:
+        _projection_cache.popitem(last=False)
+    return compiled
@@ -0,0 +1,340 @@
+"""
+Asynchronous SMS delivery through the Twilio REST API.
+
+Every message goes through one pooled HTTP client, so connections (and TLS
+sessions) are reused. Sends are queued and drained by a few workers at the
+sender's allowed throughput, and 429/5xx answers are retried with backoff,
+honouring Retry-After.
+
+Messages nobody waits for are written to the durable outbox instead and sent
+by the delivery worker the API's lifespan starts, so they survive the agent job
+process that queued them and share one send rate across all calls.
+"""
+import asyncio
+import logging
+import random
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+from ..core.config import settings
+from ..utils.rate_limiter import TokenBucket
+from .outbox import Outbox, OutboxEntry, outbox as shared_outbox
+
+logger = logging.getLogger(__name__)
+
+TWILIO_API_VERSION = "2010-04-01"
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+BASE_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30.0
+
+# Messages waiting for a worker; senders wait when it is full
+QUEUE_SIZE = 1000
+
+SMS_TOPIC = "sms"
+
+# Outbox entries claimed per delivery round, and how long a claim is held
+BATCH_SIZE = 20
+LEASE_SECONDS = 120.0
+IDLE_POLL_SECONDS = 5.0
+
+# Attempts of a queued message, each retried in-process as above before it counts
+MAX_ATTEMPTS = 5
+BASE_RETRY_SECONDS = 30.0
+MAX_RETRY_SECONDS = 3600.0
+
+
+class SmsError(Exception):
+    """Raised when Twilio rejects a message or retries are exhausted"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+class SmsService:
+    """Queued, rate-limited SMS sender sharing one HTTP connection pool"""
+
+    def __init__(
+        self,
+        account_sid: Optional[str] = None,
+        auth_token: Optional[str] = None,
+        from_number: Optional[str] = None,
+        base_url: Optional[str] = None,
+        messages_per_second: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        outbox: Optional[Outbox] = None,
+    ):
+        self.account_sid = account_sid or settings.twilio_account_sid
+        self.auth_token = auth_token or settings.twilio_auth_token
+        self.from_number = from_number or settings.twilio_phone_number
+        self.base_url = (base_url or settings.twilio_api_base_url).rstrip("/")
+        self.max_concurrency = max(1, max_concurrency or settings.sms_max_concurrency)
+        self.max_retries = settings.sms_max_retries if max_retries is None else max_retries
+        self.outbox = outbox or shared_outbox
+
+        rate = messages_per_second or settings.sms_messages_per_second
+        self._bucket = TokenBucket(rate, burst=max(1.0, rate))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queue: Optional["asyncio.Queue[Tuple[Dict[str, str], asyncio.Future]]"] = None
+        self._workers: List[asyncio.Task] = []
+        self._delivery: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=(self.account_sid, self.auth_token),
+                timeout=httpx.Timeout(15.0, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    @property
+    def _messages_path(self) -> str:
+        return f"/{TWILIO_API_VERSION}/Accounts/{self.account_sid}/Messages.json"
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_concurrency:
+            self._workers.append(asyncio.create_task(self._worker(), name=f"sms-worker-{len(self._workers)}"))
+
+    async def _worker(self):
+        while True:
+            payload, future = await self._queue.get()
+            try:
+                if future.done():
+                    continue
+                result = await self._deliver(payload)
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, payload: Dict[str, str]) -> Dict[str, Any]:
+        """POST one message, retrying throttling, server errors and dropped connections"""
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            delay: Optional[float] = None
+            response: Optional[httpx.Response] = None
+            try:
+                response = await self.client.post(self._messages_path, data=payload)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise SmsError(f"SMS request to {payload['To']} failed: {e}") from e
+                error_text = str(e) or type(e).__name__
+            else:
+                if response.status_code < 400:
+                    return _message_result(response.json())
+
+                error = _twilio_error(response)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    raise error
+                error_text = str(error)
+                delay = _retry_after(response)
+
+            if delay is None:
+                delay = _backoff(attempt)
+            attempt += 1
+            logger.warning(f"SMS to {payload['To']} failed ({error_text}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            if delay and response is not None and response.status_code == 429:
+                # Throttling applies to the whole account, so slow every worker down
+                self._bucket.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+
+    def start(self):
+        """Start the worker delivering messages queued in the outbox, in the running event loop"""
+        if self._delivery and not self._delivery.done():
+            return
+        self._wake = asyncio.Event()
+        self._delivery = asyncio.create_task(self._run(), name="sms-delivery")
+
+    async def stop(self):
+        """Stop the outbox worker, then the send workers"""
+        if self._delivery:
+            self._delivery.cancel()
+            await asyncio.gather(self._delivery, return_exceptions=True)
+            self._delivery = None
+        await self.close()
+
+    async def _run(self):
+        logger.info("SMS delivery worker started")
+        while True:
+            try:
+                entries = await self.outbox.claim(SMS_TOPIC, BATCH_SIZE, LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Failed to claim queued SMS: {e}")
+                entries = []
+
+            if not entries:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await asyncio.gather(*(self._deliver_entry(entry) for entry in entries))
+
+    async def _deliver_entry(self, entry: OutboxEntry):
+        """Send one queued message through the send workers, then complete, retry or fail its entry"""
+        try:
+            result = await (await self._enqueue(entry.payload))
+        except SmsError as e:
+            if e.status_code is not None and e.status_code not in RETRY_STATUS_CODES:
+                logger.error(f"Queued SMS {entry.id} rejected: {e}")
+                await self.outbox.fail(entry.id, str(e))
+                return
+            await self._retry(entry, str(e))
+            return
+        except Exception as e:
+            await self._retry(entry, str(e) or type(e).__name__)
+            return
+        await self.outbox.complete([entry.id])
+        logger.info(f"Queued SMS sent: {result.get('message_sid')}")
+
+    async def _retry(self, entry: OutboxEntry, error: str):
+        if entry.attempts + 1 >= MAX_ATTEMPTS:
+            logger.error(f"Giving up on SMS {entry.id} after {entry.attempts + 1} attempts: {error}")
+            await self.outbox.fail(entry.id, error)
+            return
+        delay = min(MAX_RETRY_SECONDS, BASE_RETRY_SECONDS * (2 ** entry.attempts))
+        logger.warning(f"Queued SMS {entry.id} failed ({error}), retrying in {delay:.0f}s")
+        await self.outbox.retry(entry.id, delay, error)
+
+    async def _queue_durably(self, payload: Dict[str, str]) -> Dict[str, Any]:
+        """Write a message to the outbox for the delivery worker; wakes it when it runs in this process"""
+        message_id = await self.outbox.put(SMS_TOPIC, payload, tenant_id=payload["From"] or "")
+        if self._wake:
+            self._wake.set()
+        return {"status": "queued", "to": payload["To"], "message_id": message_id}
+
+    async def _enqueue(self, payload: Dict[str, str]) -> asyncio.Future:
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((payload, future))
+        return future
+
+    def _payload(self, to: str, body: str, from_number: Optional[str] = None) -> Dict[str, str]:
+        if not to:
+            raise ValueError("Recipient phone number is required")
+        return {"To": to, "From": from_number or self.from_number, "Body": body or ""}
+
+    async def send(
+        self,
+        to: str,
+        body: str,
+        from_number: Optional[str] = None,
+        wait: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Send one SMS
+
+        Args:
+            to: Recipient number in E.164 format
+            body: Message text
+            from_number: Sender number, defaults to the configured Twilio number
+            wait: When False the message is queued in the outbox and the call returns
+                once it is stored
+
+        Returns:
+            Twilio message details, or ``{"status": "queued"}`` with the outbox id when not waiting
+        """
+        payload = self._payload(to, body, from_number)
+        if not wait:
+            return await self._queue_durably(payload)
+        return await (await self._enqueue(payload))
+
+    async def send_batch(self, messages: List[Dict[str, Any]], wait: bool = True) -> List[Dict[str, Any]]:
+        """
+        Send many messages through the queue
+
+        Args:
+            messages: Dicts with ``to``, ``body`` and optional ``from_number``
+            wait: When False every message is queued in the outbox and the call
+                returns once they are stored
+
+        Returns:
+            One result per message, in order; failures are reported with ``success: False``
+        """
+        payloads = [
+            self._payload(message.get("to", ""), message.get("body", ""), message.get("from_number"))
+            for message in messages
+        ]
+        if not wait:
+            return [await self._queue_durably(payload) for payload in payloads]
+
+        futures = [await self._enqueue(payload) for payload in payloads]
+        results = []
+        for message, outcome in zip(messages, await asyncio.gather(*futures, return_exceptions=True)):
+            if isinstance(outcome, BaseException):
+                results.append({"success": False, "to": message.get("to"), "error": str(outcome)})
+            else:
+                results.append({"success": True, **outcome})
+        return results
+
+    async def close(self):
+        """Stop the workers and close the HTTP client"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _backoff(attempt: int) -> float:
+    delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(MAX_BACKOFF_SECONDS, max(0.0, float(value)))
+    except ValueError:
+        return None
+
+
+def _twilio_error(response: httpx.Response) -> SmsError:
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    message = data.get("message") or response.text or response.reason_phrase
+    return SmsError(f"Twilio error {response.status_code}: {message}", response.status_code, data.get("code"))
+
+
+def _message_result(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "message_sid": data.get("sid"),
+        "status": data.get("status"),
+        "to": data.get("to"),
+        "from": data.get("from"),
+    }
+
+
+sms_service = SmsService()
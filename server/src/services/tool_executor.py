@@ -1,15 +1,28 @@
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime
 import httpx
 from pydantic import ValidationError
 
+from ..core.config import settings
 from ..models import Tool, ToolExecutionRequest, ToolExecutionResponse, ToolType
+from ..utils.circuit_breaker import CircuitOpenError
+from . import endpoint_client
+from .menu_index import get_menu_index
+from .response_projection import get_response_projection
+from .sms_service import sms_service
+from .email_service import email_service, get_email_template
+from .usage_recorder import usage_recorder
+from .webhook_delivery import webhook_delivery
 
 logger = logging.getLogger(__name__)
 
+# Limits for batches of tool calls
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TOOL_TIMEOUT = 30.0
+
 
 class ToolExecutor:
     """Service for executing agent tools"""
@@ -26,6 +39,11 @@ class ToolExecutor:
         from .database import db_service
         return await db_service.get_tool(tool_id)
     
+    async def get_tools(self, tool_ids: List[str]) -> Dict[str, Tool]:
+        """Get several tools from database in one lookup"""
+        from .database import db_service
+        return await db_service.get_tools(tool_ids)
+    
     async def execute(
         self,
         tool_id: str,
@@ -35,22 +53,39 @@ class ToolExecutor:
     ) -> ToolExecutionResponse:
         """Execute a tool with given parameters"""
         
+        try:
+            tool = await self.get_tool(tool_id)
+        except Exception as e:
+            logger.error(f"Error loading tool {tool_id}: {str(e)}")
+            return ToolExecutionResponse(success=False, error=str(e))
+        
+        if not tool:
+            return ToolExecutionResponse(
+                success=False,
+                error=f"Tool {tool_id} not found",
+            )
+        
+        return await self.execute_tool(tool, parameters, call_id=call_id, agent_id=agent_id)
+    
+    async def execute_tool(
+        self,
+        tool: Tool,
+        parameters: Dict[str, Any],
+        call_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> ToolExecutionResponse:
+        """Execute an already loaded tool, optionally bounded by a timeout in seconds"""
+        
         start_time = datetime.utcnow()
         
+        if not tool.enabled:
+            return ToolExecutionResponse(
+                success=False,
+                error=f"Tool {tool.name} is disabled",
+            )
+        
         try:
-            tool = await self.get_tool(tool_id)
-            if not tool:
-                return ToolExecutionResponse(
-                    success=False,
-                    error=f"Tool {tool_id} not found",
-                )
-            
-            if not tool.enabled:
-                return ToolExecutionResponse(
-                    success=False,
-                    error=f"Tool {tool.name} is disabled",
-                )
-            
             # Validate parameters against schema
             if tool.json_schema:
                 try:
@@ -62,26 +97,143 @@ class ToolExecutor:
                     # Continue execution even if validation fails, but log the issue
             
             # Execute based on tool type
-            result = await self._execute_tool(tool, parameters)
-            
-            # Update usage statistics
-            await self._update_tool_usage(tool_id)
-            
-            execution_time = (datetime.utcnow() - start_time).total_seconds()
+            if timeout:
+                result = await asyncio.wait_for(self._execute_tool(tool, parameters), timeout=timeout)
+            else:
+                result = await self._execute_tool(tool, parameters)
             
-            return ToolExecutionResponse(
+            response = ToolExecutionResponse(
                 success=True,
                 result=result,
-                execution_time=execution_time,
+                execution_time=(datetime.utcnow() - start_time).total_seconds(),
             )
             
+        except CircuitOpenError as e:
+            # Fail fast with something the agent can pass on to the caller
+            logger.warning(f"🔧 Tool {tool.name} skipped: {e}")
+            response = ToolExecutionResponse(
+                success=False,
+                error=(
+                    f"{tool.display_name or tool.name} is temporarily unavailable. Let the caller know "
+                    f"you can't do that right now and offer to help with something else or follow up later."
+                ),
+                execution_time=(datetime.utcnow() - start_time).total_seconds(),
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Tool {tool.id} timed out after {timeout}s")
+            response = ToolExecutionResponse(
+                success=False,
+                error=f"Tool {tool.name} timed out after {timeout:g}s",
+                execution_time=(datetime.utcnow() - start_time).total_seconds(),
+            )
         except Exception as e:
-            logger.error(f"Error executing tool {tool_id}: {str(e)}")
-            return ToolExecutionResponse(
+            logger.error(f"Error executing tool {tool.id}: {str(e)}")
+            response = ToolExecutionResponse(
                 success=False,
                 error=str(e),
                 execution_time=(datetime.utcnow() - start_time).total_seconds(),
             )
+        
+        # Usage statistics are written in the background
+        usage_recorder.record(
+            tool_id=tool.id,
+            success=response.success,
+            call_id=call_id,
+            agent_id=agent_id,
+            parameters=parameters,
+            result=response.dict(),
+        )
+        
+        return response
+    
+    def is_static(self, tool: Tool) -> bool:
+        """Whether executing the tool returns its stored configuration, whatever the parameters"""
+        if tool.type == ToolType.FUNCTION:
+            return True
+        if tool.type == ToolType.AI_GENERATED:
+            configuration = tool.configuration or {}
+            if tool.name.lower() == 'menu' and 'menuItems' in configuration:
+                return False
+            if tool.name.lower() == 'order' and configuration.get('googleSheetId'):
+                return False
+            return True
+        return False
+
+    async def render_static(self, tool: Tool) -> Any:
+        """The result of a static tool, as ``execute`` would return it, without recording usage"""
+        if not self.is_static(tool):
+            raise ValueError(f"Tool {tool.name} is not static")
+        return await self._execute_tool(tool, {})
+
+    async def execute_many(
+        self,
+        requests: List[ToolExecutionRequest],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: Optional[float] = None,
+    ) -> List[ToolExecutionResponse]:
+        """
+        Execute several tool calls concurrently
+        
+        Args:
+            requests: Tool calls to run
+            max_concurrency: Maximum number of tools running at once
+            timeout: Per-call timeout in seconds; defaults to each tool's configured timeout
+        
+        Returns:
+            One response per request, in request order
+        """
+        responses: List[Optional[ToolExecutionResponse]] = [None] * len(requests)
+        async for index, response in self.execute_as_completed(requests, max_concurrency, timeout):
+            responses[index] = response
+        return responses
+    
+    async def execute_as_completed(
+        self,
+        requests: List[ToolExecutionRequest],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[int, ToolExecutionResponse]]:
+        """
+        Execute several tool calls concurrently, yielding ``(index, response)`` as each finishes
+        
+        Tools are looked up once for the whole batch. Calls still running when the
+        consumer stops iterating are cancelled.
+        """
+        if not requests:
+            return
+        
+        try:
+            tools = await self.get_tools([request.tool_id for request in requests])
+        except Exception as e:
+            logger.error(f"Error loading tools for batch: {str(e)}")
+            for index in range(len(requests)):
+                yield index, ToolExecutionResponse(success=False, error=str(e))
+            return
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run(index: int, request: ToolExecutionRequest) -> Tuple[int, ToolExecutionResponse]:
+            tool = tools.get(request.tool_id)
+            if not tool:
+                return index, ToolExecutionResponse(success=False, error=f"Tool {request.tool_id} not found")
+            
+            call_timeout = timeout or (tool.config.timeout if tool.config else None) or DEFAULT_TOOL_TIMEOUT
+            async with semaphore:
+                return index, await self.execute_tool(
+                    tool,
+                    request.parameters,
+                    call_id=request.call_id,
+                    agent_id=request.agent_id,
+                    timeout=call_timeout,
+                )
+        
+        tasks = [asyncio.create_task(run(index, request)) for index, request in enumerate(requests)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
     
     async def _execute_tool(self, tool: Tool, parameters: Dict[str, Any]) -> Any:
         """Execute the tool based on its type"""
@@ -118,12 +270,28 @@ class ToolExecutor:
         if not config or not config.webhook_url:
             raise ValueError("Webhook URL not configured")
         
-        headers = config.headers or {}
+        headers = dict(config.headers or {})
         headers["Content-Type"] = "application/json"
         
-        response = await self.client.request(
-            method=config.method or "POST",
-            url=config.webhook_url,
+        if _async_delivery(tool):
+            # Notification webhooks: queue durably and let the agent carry on
+            delivery_id = await webhook_delivery.enqueue(
+                config.webhook_url,
+                parameters,
+                method=config.method or "POST",
+                headers=headers,
+                timeout=config.timeout,
+                tool_id=tool.id,
+            )
+            logger.info(f"🔧 Queued webhook {delivery_id} for tool {tool.name}")
+            return {"status": "queued", "delivery_id": delivery_id}
+        
+        response = await endpoint_client.request(
+            self.client,
+            config.method or "POST",
+            config.webhook_url,
+            hedge=_hedge_requests(tool),
+            max_bytes=settings.tool_response_max_read_bytes,
             json=parameters,
             headers=headers,
             timeout=config.timeout or 30,
@@ -131,10 +299,7 @@ class ToolExecutor:
         
         response.raise_for_status()
         
-        if response.headers.get("content-type", "").startswith("application/json"):
-            return response.json()
-        else:
-            return response.text
+        return _project_response(tool, response)
     
     async def _execute_custom_api(self, tool: Tool, parameters: Dict[str, Any]) -> Any:
         """Execute a custom API tool"""
@@ -145,9 +310,12 @@ class ToolExecutor:
         
         headers = config.headers or {}
         
-        response = await self.client.request(
-            method=config.method or "POST",
-            url=config.api_endpoint,
+        response = await endpoint_client.request(
+            self.client,
+            config.method or "POST",
+            config.api_endpoint,
+            hedge=_hedge_requests(tool),
+            max_bytes=settings.tool_response_max_read_bytes,
             json=parameters,
             headers=headers,
             timeout=config.timeout or 30,
@@ -155,10 +323,7 @@ class ToolExecutor:
         
         response.raise_for_status()
         
-        if response.headers.get("content-type", "").startswith("application/json"):
-            return response.json()
-        else:
-            return response.text
+        return _project_response(tool, response)
     
     async def _execute_sheet_append(self, tool: Tool, parameters: Dict[str, Any]) -> Any:
         """Execute Google Sheets append operation"""
@@ -300,29 +465,43 @@ class ToolExecutor:
             return {"error": str(e)}
     
     async def _execute_sms_send(self, tool: Tool, parameters: Dict[str, Any]) -> Any:
-        """Send SMS using Twilio"""
-        from twilio.rest import Client
-        from ..core.config import settings
-        
-        client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
+        """Send SMS through the shared, rate-limited Twilio sender"""
+        wait = not _async_delivery(tool)
+        body = parameters.get("message", "")
+        from_number = parameters.get("from_number")
+        
+        # Several recipients go out as one batch through the send queue
+        to_numbers = parameters.get("to_numbers")
+        if isinstance(to_numbers, list) and to_numbers:
+            results = await sms_service.send_batch(
+                [{"to": to, "body": body, "from_number": from_number} for to in to_numbers],
+                wait=wait,
+            )
+            return {"messages": results}
         
-        message = client.messages.create(
-            body=parameters.get("message", ""),
-            from_=parameters.get("from_number", settings.twilio_phone_number),
+        return await sms_service.send(
             to=parameters.get("to_number", ""),
+            body=body,
+            from_number=from_number,
+            wait=wait,
         )
+    
+    async def _execute_email_send(self, tool: Tool, parameters: Dict[str, Any]) -> Any:
+        """Render the tool's email template and queue it for background delivery"""
+        message = get_email_template(tool).render(parameters)
+        if not message["to"]:
+            raise ValueError("Recipient email address is required")
         
+        message_id = await email_service.enqueue(tool.user_id, message)
+        logger.info(f"🔧 Queued email {message_id} to {message['to']} for tool {tool.name}")
         return {
-            "message_sid": message.sid,
-            "status": message.status,
-            "to": message.to,
-            "from": message.from_,
+            "success": True,
+            "status": "queued",
+            "message_id": message_id,
+            "to": message["to"],
+            "message": "The email has been queued and will be delivered shortly.",
         }
     
-    async def _execute_email_send(self, tool: Tool, parameters: Dict[str, Any]) -> Any:
-        """Send email"""
-        raise NotImplementedError("Email sending not implemented yet")
-    
     async def _execute_calendar_create(self, tool: Tool, parameters: Dict[str, Any]) -> Any:
         """Create calendar event"""
         raise NotImplementedError("Calendar creation not implemented yet")
@@ -351,66 +530,11 @@ class ToolExecutor:
             logger.info(f"🔧 Executing AI-generated tool: {tool.name}")
             logger.info(f"🔧 Configuration keys: {list(tool.configuration.keys())}")
             
-            # Handle menu tools specifically
+            # Handle menu tools specifically - answer from the menu index instead of dumping every item
             if tool.name.lower() == 'menu' and 'menuItems' in tool.configuration:
-                menu_items = tool.configuration.get('menuItems', [])
-                logger.info(f"🔧 Found {len(menu_items)} menu items")
-                
-                # Format menu response
-                if not menu_items:
-                    return {
-                        "response": "I'm sorry, but our menu is currently not available. Please call back later or visit our location for more information.",
-                        "success": True
-                    }
-                
-                # Group items by category
-                categories = {}
-                for item in menu_items:
-                    category = item.get('category', 'Main Items')
-                    if category not in categories:
-                        categories[category] = []
-                    categories[category].append(item)
-                
-                # Build response text
-                response_parts = ["I'd be happy to tell you about our menu! Here's what we have:"]
-                
-                for category, items in categories.items():
-                    if len(categories) > 1:
-                        response_parts.append(f"\n{category}:")
-                    
-                    for item in items:
-                        name = item.get('name', 'Unknown Item')
-                        price = item.get('price', '')
-                        description = item.get('description', '')
-                        
-                        # Clean up price data - extract only the price part
-                        if price:
-                            # Look for price patterns like $X.XX or just numbers
-                            import re
-                            price_match = re.search(r'\$?\d+\.?\d*', str(price))
-                            if price_match:
-                                clean_price = price_match.group()
-                                if not clean_price.startswith('$'):
-                                    clean_price = f"${clean_price}"
-                                price = clean_price
-                            else:
-                                price = ''  # Invalid price format
-                        
-                        item_text = f"• {name}"
-                        if price:
-                            item_text += f" - {price}"
-                        if description:
-                            item_text += f" - {description}"
-                        
-                        response_parts.append(item_text)
-                
-                response_parts.append("\nWhat sounds good to you today?")
-                
-                return {
-                    "response": "\n".join(response_parts),
-                    "menuItems": menu_items,
-                    "success": True
-                }
+                menu_index = get_menu_index(tool.configuration)
+                logger.info(f"🔧 Querying menu index ({len(menu_index.items)} items) with: {parameters}")
+                return menu_index.query(parameters)
             
             # Handle order tools with Google Sheets integration
             if tool.name.lower() == 'order' and tool.configuration.get('googleSheetId'):
@@ -626,8 +750,30 @@ class ToolExecutor:
         except Exception as e:
             logger.error(f"🔧 Error retrieving Google tokens: {e}")
             return None
-    
-    async def _update_tool_usage(self, tool_id: str):
-        """Update tool usage statistics"""
-        from .database import db_service
-        await db_service.update_tool_usage(tool_id)
\ No newline at end of file
+
+
+def _async_delivery(tool: Tool) -> bool:
+    """Whether a messaging or webhook tool is configured to queue sends instead of waiting for delivery"""
+    if tool.config and tool.config.async_delivery:
+        return True
+    return bool((tool.configuration or {}).get('asyncDelivery'))
+
+
+
+def _project_response(tool: Tool, response: httpx.Response) -> Any:
+    """Decode an endpoint's response and trim it to what the tool's projection keeps"""
+    projection = get_response_projection(tool)
+    if response.headers.get("content-type", "").startswith("application/json"):
+        return projection.apply(response.json())
+    return projection.apply_text(response.text)
+
+
+def _hedge_requests(tool: Tool) -> bool:
+    """Whether slow idempotent requests of a tool may be hedged with a second request"""
+    if tool.config and tool.config.hedge_requests:
+        return True
+    return bool((tool.configuration or {}).get('hedgeRequests'))
+
+
+# Shared executor, so API requests reuse one HTTP connection pool
+tool_executor = ToolExecutor()
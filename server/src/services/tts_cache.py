@@ -0,0 +1,149 @@
+"""
+Cache of synthesized audio for phrases agents say over and over.
+
+Hold messages, confirmations and the static ``response`` strings of
+AI-generated tools are spoken hundreds of times a day with the same voice.
+Short phrases are looked up by exact match on their normalised text, voice and
+language; the audio is kept in the same memory and disk store as greetings,
+bounded in both. Phrases from tool configurations are synthesized ahead of
+time when an agent is saved. Anything else the agent says is only admitted
+once it was spoken in ``TTS_CACHE_MIN_CALLS`` different calls, so sentences
+meant for one caller (their name, their order) are not stored. Sightings are
+counted by phrase key, never by text.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from time import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from livekit.agents import tokenize
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+from .greeting_cache import GreetingCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# How long a phrase's sightings count towards admitting it
+SIGHTING_TTL_SECONDS = 7 * 24 * 3600
+# Expired sightings are removed every this many recorded ones
+SIGHTING_CLEANUP_EVERY = 1000
+
+# The hit ratio is hit / (hit + miss), summed over the worker processes
+_lookups = metrics.counter("tts_cache_lookups_total", "TTS phrase cache lookups by result (hit, miss, skip)")
+
+
+def normalize_phrase(text: str) -> str:
+    """Text as compared by the cache: Unicode-normalised, case-folded, whitespace collapsed"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def is_cacheable(text: str) -> bool:
+    phrase = normalize_phrase(text)
+    return bool(phrase) and len(phrase) <= settings.tts_cache_max_chars
+
+
+def phrase_key(voice: str, language: str, text: str) -> str:
+    digest = hashlib.sha256(f"{voice}\0{language}\0{normalize_phrase(text)}".encode()).hexdigest()[:40]
+    return f"phrase-{digest}"
+
+
+def record_lookup(result: str):
+    """Count a lookup; ``result`` is hit, miss or skip (not cacheable)"""
+    metrics_spool.count(_lookups, result=result)
+
+
+class PhraseSightings:
+    """SQLite table of the calls each phrase key was spoken in, shared by all processes on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._recorded = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sightings (
+                    phrase_key TEXT NOT NULL,
+                    call_id TEXT NOT NULL,
+                    seen_at REAL NOT NULL,
+                    PRIMARY KEY (phrase_key, call_id)
+                )
+                """
+            )
+            self._connection = connection
+        return self._connection
+
+    def _record_sync(self, key: str, call_id: str) -> int:
+        now = time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO sightings (phrase_key, call_id, seen_at) VALUES (?, ?, ?)", (key, call_id, now)
+            )
+            self._recorded += 1
+            if self._recorded % SIGHTING_CLEANUP_EVERY == 0:
+                connection.execute("DELETE FROM sightings WHERE seen_at < ?", (now - SIGHTING_TTL_SECONDS,))
+            return connection.execute(
+                "SELECT COUNT(*) FROM sightings WHERE phrase_key = ? AND seen_at >= ?", (key, now - SIGHTING_TTL_SECONDS)
+            ).fetchone()[0]
+
+    async def record(self, key: str, call_id: str) -> int:
+        """Record that a phrase was spoken in a call; returns how many calls recently spoke it"""
+        return await asyncio.to_thread(self._record_sync, key, call_id)
+
+
+async def admit_phrase(key: str, call_id: str) -> bool:
+    """Whether a phrase synthesized during a call has been spoken in enough calls to be cached"""
+    if not call_id:
+        return False
+    try:
+        return await phrase_sightings.record(key, call_id) >= settings.tts_cache_min_calls
+    except sqlite3.Error as e:
+        logger.warning(f"Could not count TTS phrase sightings: {e}")
+        return False
+
+
+def split_phrases(text: str) -> List[str]:
+    """Split text the way the agent session hands it to a non-streaming TTS, one sentence group at a time"""
+    sentences = tokenize.blingfire.SentenceTokenizer(retain_format=True).tokenize(text)
+    return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+
+def tool_phrases(tools: Iterable[Dict[str, Any]]) -> List[str]:
+    """Cacheable phrases of the static ``response`` strings in tool configurations"""
+    phrases: Dict[str, str] = {}
+    for tool in tools:
+        response = (tool.get('configuration') or {}).get('response')
+        if not isinstance(response, str):
+            continue
+        for phrase in split_phrases(response):
+            if is_cacheable(phrase):
+                phrases.setdefault(normalize_phrase(phrase), phrase)
+    return list(phrases.values())
+
+
+phrase_sightings = PhraseSightings(os.path.join(settings.tts_cache_dir, "sightings.sqlite3"))
+
+tts_cache = GreetingCache(
+    settings.tts_cache_dir,
+    settings.tts_cache_memory_mb * 1024 * 1024,
+    max_disk_bytes=settings.tts_cache_disk_mb * 1024 * 1024,
+)
@@ -0,0 +1,99 @@
+"""
+Background recording of tool usage.
+
+Usage counters and the per-call audit trail are not worth making a caller wait
+for. Executions enqueue a record and return; a worker drains the queue and
+commits whatever has accumulated as one Firestore batch, off the event loop.
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Each record is at most two writes and a Firestore batch takes up to 500
+FLUSH_BATCH_SIZE = 200
+QUEUE_SIZE = 10000
+STOP_TIMEOUT_SECONDS = 5.0
+
+
+class UsageRecorder:
+    """Queue of tool usage records written to Firestore in the background"""
+
+    def __init__(self):
+        self._queue: Optional["asyncio.Queue[Dict[str, Any]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def record(
+        self,
+        tool_id: str,
+        success: bool,
+        call_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        parameters: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Queue a usage record without waiting for it to be written
+
+        Successful executions bump the tool's usage count and failed ones its
+        failure count; executions that belong to a call also get a ``toolUsage``
+        audit entry, successful or not.
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            # Queues are bound to the loop they are used on
+            self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+            self._loop = loop
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="tool-usage-recorder")
+
+        try:
+            self._queue.put_nowait({
+                "tool_id": tool_id,
+                "success": success,
+                "call_id": call_id,
+                "agent_id": agent_id,
+                "parameters": parameters or {},
+                "result": result or {},
+            })
+        except asyncio.QueueFull:
+            logger.warning(f"Tool usage queue is full, dropping usage record for {tool_id}")
+
+    async def _run(self):
+        from .database import db_service
+
+        while True:
+            records: List[Dict[str, Any]] = [await self._queue.get()]
+            while len(records) < FLUSH_BATCH_SIZE and not self._queue.empty():
+                records.append(self._queue.get_nowait())
+
+            try:
+                await asyncio.to_thread(db_service.write_tool_usage_batch, records)
+            except Exception as e:
+                logger.error(f"Failed to write {len(records)} tool usage records: {e}")
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+
+    async def flush(self):
+        """Wait until every queued record has been written"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        """Flush pending records (bounded) and stop the worker"""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout=STOP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopped with {self._queue.qsize()} tool usage records unwritten")
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+
+usage_recorder = UsageRecorder()
@@ -0,0 +1,259 @@
+"""
+Background delivery for notification webhooks.
+
+Webhook tools configured for async delivery do not make the agent wait for the
+customer's endpoint: the request is written to the durable outbox and the tool
+call returns at once. A background worker, started only by the API's lifespan
+so per-host limits and circuit breakers hold across all agent job processes,
+drains the outbox, grouping claimed requests by destination host so each host gets a bounded number of pooled
+keep-alive connections, retries failures with exponential backoff and skips
+endpoints whose circuit breaker is open until they recover.
+"""
+import asyncio
+import logging
+import random
+from time import perf_counter, time
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+from ..utils.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError, endpoint_key
+from .endpoint_client import endpoint_breakers
+from .outbox import Outbox, OutboxEntry, outbox
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_TOPIC = "webhook"
+
+# Outbox entries claimed per delivery round, and how long a claim is held
+BATCH_SIZE = 50
+LEASE_SECONDS = 120.0
+IDLE_POLL_SECONDS = 5.0
+
+BASE_RETRY_SECONDS = 5.0
+MAX_RETRY_SECONDS = 1800.0
+
+# Client errors worth another attempt; other 4xx answers will not change
+RETRY_CLIENT_STATUS_CODES = {408, 409, 425, 429}
+
+_deliveries = metrics.counter("webhook_deliveries_total", "Queued webhook delivery attempts by outcome")
+_latency = metrics.histogram("webhook_delivery_seconds", "Queued webhook request latency")
+_lag = metrics.histogram("webhook_delivery_lag_seconds", "Time from enqueue to successful delivery")
+_pending = metrics.gauge("webhook_outbox_pending", "Webhooks waiting in the outbox")
+
+
+class WebhookDeliveryService:
+    """Durable background sender for webhook tools in async delivery mode"""
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        breakers: CircuitBreakerRegistry,
+        max_connections_per_host: int = 4,
+        max_attempts: int = 8,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.outbox = outbox
+        self.breakers = breakers
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.max_attempts = max(1, max_attempts)
+        self.batch_size = batch_size
+        self._client: Optional[httpx.AsyncClient] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._next_due: Optional[float] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(max_keepalive_connections=self.batch_size),
+            )
+        return self._client
+
+    def start(self):
+        """Start the delivery worker in the running event loop"""
+        if self._worker and not self._worker.done():
+            return
+        self._wake = asyncio.Event()
+        self._worker = asyncio.create_task(self._run(), name="webhook-delivery")
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def enqueue(
+        self,
+        url: str,
+        body: Any,
+        method: str = "POST",
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        tool_id: Optional[str] = None,
+    ) -> str:
+        """
+        Durably queue a webhook request and return its outbox id
+
+        The request is sent by the worker of the process that started one: right
+        away in that process, within ``IDLE_POLL_SECONDS`` from any other.
+        """
+        host = urlsplit(url).netloc
+        if not host:
+            raise ValueError(f"Invalid webhook URL: {url}")
+        entry_id = await self.outbox.put(WEBHOOK_TOPIC, {
+            "url": url,
+            "method": method or "POST",
+            "headers": headers or {},
+            "body": body,
+            "timeout": timeout or 30,
+            "tool_id": tool_id,
+        }, tenant_id=host)
+        metrics_spool.count(_deliveries, host=host, outcome="queued")
+        if self._wake:
+            self._wake.set()
+        return entry_id
+
+    async def _run(self):
+        logger.info("Webhook delivery worker started")
+        idle_wait = IDLE_POLL_SECONDS
+        while True:
+            try:
+                entries = await self.outbox.claim(WEBHOOK_TOPIC, self.batch_size, LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Failed to claim queued webhooks: {e}")
+                entries = []
+
+            if not entries:
+                await self._update_pending()
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=idle_wait)
+                except asyncio.TimeoutError:
+                    pass
+                idle_wait = IDLE_POLL_SECONDS
+                continue
+
+            self._next_due = None
+            try:
+                await self._deliver(entries)
+            except Exception as e:
+                # Claims expire after the lease, so the batch is retried later
+                logger.error(f"Webhook delivery round failed: {e}")
+            if self._next_due is not None:
+                # Come back for retries and deferred entries that are due before the next poll
+                idle_wait = min(IDLE_POLL_SECONDS, self._next_due)
+
+    async def _update_pending(self):
+        try:
+            _pending.set(await self.outbox.pending_count(WEBHOOK_TOPIC))
+        except Exception as e:
+            logger.debug(f"Could not count queued webhooks: {e}")
+
+    async def _deliver(self, entries: List[OutboxEntry]):
+        """Deliver one claimed batch, host by host, over the shared connection pool"""
+        by_host: Dict[str, List[OutboxEntry]] = {}
+        for entry in entries:
+            by_host.setdefault(entry.tenant_id, []).append(entry)
+        await asyncio.gather(*(self._deliver_host(host, host_entries) for host, host_entries in by_host.items()))
+
+    async def _deliver_host(self, host: str, entries: List[OutboxEntry]):
+        semaphore = asyncio.Semaphore(self.max_connections_per_host)
+
+        async def deliver(entry: OutboxEntry) -> Optional[str]:
+            async with semaphore:
+                return await self._deliver_one(host, entry)
+
+        delivered = await asyncio.gather(*(deliver(entry) for entry in entries))
+        await self.outbox.complete([entry_id for entry_id in delivered if entry_id])
+
+    async def _deliver_one(self, host: str, entry: OutboxEntry) -> Optional[str]:
+        """Send one request; returns the entry id when it is done with"""
+        payload = entry.payload
+        try:
+            breaker = await self.breakers.acquire(endpoint_key(payload["url"]))
+        except CircuitOpenError as e:
+            # Not an attempt: wait for the breaker to let a probe through
+            await self.outbox.defer(entry.id, e.retry_after)
+            self._due_in(e.retry_after)
+            metrics_spool.count(_deliveries, host=host, outcome="circuit_open")
+            return None
+
+        started = perf_counter()
+        try:
+            response = await self.client.request(
+                payload["method"],
+                payload["url"],
+                json=payload["body"],
+                headers=payload["headers"],
+                timeout=payload["timeout"],
+            )
+        except httpx.HTTPError as e:
+            breaker.record_failure(perf_counter() - started)
+            await self._retry(host, entry, str(e) or type(e).__name__)
+            return None
+        latency = perf_counter() - started
+        metrics_spool.record(_latency, latency, host=host)
+
+        if response.status_code < 400:
+            breaker.record_success(latency)
+            metrics_spool.count(_deliveries, host=host, outcome="delivered")
+            metrics_spool.record(_lag, time() - entry.created_at, host=host)
+            return entry.id
+
+        error = f"HTTP {response.status_code}: {response.text[:200]}"
+        if response.status_code >= 500 or response.status_code in RETRY_CLIENT_STATUS_CODES:
+            breaker.record_failure(latency)
+            await self._retry(host, entry, error, _retry_after(response))
+            return None
+
+        # The endpoint answered, so it is healthy; the request itself is bad
+        breaker.record_success(latency)
+        logger.error(f"Webhook {entry.id} to {payload['url']} rejected: {error}")
+        metrics_spool.count(_deliveries, host=host, outcome="rejected")
+        await self.outbox.fail(entry.id, error)
+        return None
+
+    async def _retry(self, host: str, entry: OutboxEntry, error: str, delay: Optional[float] = None):
+        if entry.attempts + 1 >= self.max_attempts:
+            logger.error(f"Giving up on webhook {entry.id} after {entry.attempts + 1} attempts: {error}")
+            metrics_spool.count(_deliveries, host=host, outcome="failed")
+            await self.outbox.fail(entry.id, error)
+            return
+        if delay is None:
+            delay = min(MAX_RETRY_SECONDS, BASE_RETRY_SECONDS * (2 ** entry.attempts))
+            delay *= 0.5 + random.random() / 2
+        logger.warning(f"Webhook {entry.id} to {host} failed ({error}), retrying in {delay:.1f}s")
+        metrics_spool.count(_deliveries, host=host, outcome="retried")
+        await self.outbox.retry(entry.id, delay, error)
+        self._due_in(delay)
+
+    def _due_in(self, delay: float):
+        self._next_due = delay if self._next_due is None else min(self._next_due, delay)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(MAX_RETRY_SECONDS, max(0.0, float(value)))
+    except ValueError:
+        return None
+
+
+webhook_delivery = WebhookDeliveryService(
+    outbox,
+    endpoint_breakers,
+    max_connections_per_host=settings.webhook_delivery_max_connections_per_host,
+    max_attempts=settings.webhook_delivery_max_attempts,
+)
@@ -0,0 +1,256 @@
+"""
+Circuit breakers for outbound endpoints (customer webhooks, custom APIs, ...)
+
+Breakers live in each process. When a Redis store is configured, a breaker that
+opens publishes its open-until time so every worker stops calling the endpoint,
+not just the one that saw the failures.
+"""
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from time import monotonic, time
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ..core.metrics import metrics
+from ..core.metrics_spool import metrics_spool
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Breakers kept per registry, least recently used are dropped first
+MAX_BREAKERS = 1000
+
+_transitions = metrics.counter("circuit_breaker_transitions_total", "Circuit breaker state changes")
+_state = metrics.gauge("circuit_breaker_open", "1 while a circuit breaker is open or half open")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over recent call outcomes
+
+    The breaker opens after ``failure_threshold`` failures in a row, or when at
+    least ``min_calls`` calls in the last ``window_seconds`` include more than
+    ``error_rate_threshold`` failures or ``slow_call_rate_threshold`` calls slower
+    than ``slow_call_seconds``. Open breakers refuse calls for ``reset_timeout``
+    seconds, then let a single probe through: success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.8,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.state = CLOSED
+        self.open_until = 0.0  # Wall clock, so it can be shared between processes
+        self.on_open = None  # Called with the breaker whenever it opens
+        self._failures = 0
+        self._probe_started: Optional[float] = None
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()  # (monotonic time, failed, slow)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        metrics_spool.count(_transitions, endpoint=self.name, state=state)
+        metrics_spool.measure(_state, 0 if state == CLOSED else 1, endpoint=self.name)
+
+    def _open(self, until: float, notify: bool = True):
+        self.open_until = until
+        self._probe_started = None
+        self._calls.clear()
+        self._transition(OPEN)
+        if notify and self.on_open:
+            self.on_open(self)
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_until - time())
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; half-open breakers admit one probe at a time"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            # A probe that never reported back does not block the endpoint forever
+            if self._probe_started is not None and monotonic() - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_started = monotonic()
+        return True
+
+    def check(self):
+        """Like ``allow`` but raises ``CircuitOpenError`` when the call may not go ahead"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after() or self.reset_timeout)
+
+    def force_open(self, until: float):
+        """Open the breaker until a wall-clock time reported by another worker"""
+        if until > time() and (self.state != OPEN or until > self.open_until):
+            self._open(until, notify=False)
+
+    def release(self):
+        """Give up a half-open probe without a verdict, e.g. when the call was cancelled"""
+        self._probe_started = None
+
+    def record_success(self, latency: Optional[float] = None):
+        self._failures = 0
+        if self.state == HALF_OPEN:
+            self._probe_started = None
+            self._calls.clear()
+            self._transition(CLOSED)
+            return
+        self._record(False, latency)
+
+    def record_failure(self, latency: Optional[float] = None):
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open(time() + self.reset_timeout)
+            return
+        self._record(True, latency)
+
+    def _record(self, failed: bool, latency: Optional[float]):
+        now = monotonic()
+        slow = bool(self.slow_call_seconds and latency is not None and latency >= self.slow_call_seconds)
+        self._calls.append((now, failed, slow))
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+        if self.state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for _, call_failed, _ in self._calls if call_failed)
+        slow_calls = sum(1 for _, _, call_slow in self._calls if call_slow)
+        if failures / len(self._calls) >= self.error_rate_threshold:
+            logger.warning(f"{self.name}: {failures}/{len(self._calls)} recent calls failed")
+            self._open(time() + self.reset_timeout)
+        elif self.slow_call_seconds and slow_calls / len(self._calls) >= self.slow_call_rate_threshold:
+            logger.warning(f"{self.name}: {slow_calls}/{len(self._calls)} recent calls took over {self.slow_call_seconds}s")
+            self._open(time() + self.reset_timeout)
+
+
+class RedisBreakerStore:
+    """Shares open breakers between workers through Redis keys that expire when the breaker would reset"""
+
+    def __init__(self, url: str, prefix: str = "circuit:", refresh_seconds: float = 1.0):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self.refresh_seconds = refresh_seconds
+        self._checked: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._tasks = set()
+
+    async def open_until(self, name: str) -> Optional[float]:
+        """Open-until time published for an endpoint, read from Redis at most once per refresh interval"""
+        checked = self._checked.get(name)
+        if checked and monotonic() - checked[0] < self.refresh_seconds:
+            return checked[1]
+        try:
+            value = await self.client.get(self.prefix + name)
+        except Exception as e:
+            logger.warning(f"Could not read circuit breaker state for {name}: {e}")
+            value = None
+        until = float(value) if value else None
+        self._checked[name] = (monotonic(), until)
+        if len(self._checked) > MAX_BREAKERS:
+            self._checked.clear()
+        return until
+
+    def publish(self, breaker: CircuitBreaker):
+        """Publish an opened breaker in the background"""
+        task = asyncio.get_running_loop().create_task(self._publish(breaker.name, breaker.open_until))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, name: str, until: float):
+        ttl_ms = int((until - time()) * 1000)
+        if ttl_ms <= 0:
+            return
+        try:
+            await self.client.set(self.prefix + name, repr(until), px=ttl_ms)
+            self._checked[name] = (monotonic(), until)
+        except Exception as e:
+            logger.warning(f"Could not publish circuit breaker state for {name}: {e}")
+
+
+class CircuitBreakerRegistry:
+    """One breaker per endpoint name, optionally shared through a Redis store"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        store: Optional[RedisBreakerStore] = None,
+        **breaker_options,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.store = store
+        self.breaker_options = breaker_options
+        self._breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(
+                name, self.failure_threshold, self.reset_timeout, **self.breaker_options
+            )
+            if self.store:
+                breaker.on_open = self.store.publish
+            if len(self._breakers) > MAX_BREAKERS:
+                self._breakers.popitem(last=False)
+        else:
+            self._breakers.move_to_end(name)
+        return breaker
+
+    async def acquire(self, name: str) -> CircuitBreaker:
+        """
+        Get an endpoint's breaker, admitting the call
+
+        Raises:
+            CircuitOpenError: The endpoint's breaker is open here or on another worker
+        """
+        breaker = self.get(name)
+        if self.store and breaker.state == CLOSED:
+            until = await self.store.open_until(name)
+            if until:
+                breaker.force_open(until)
+        breaker.check()
+        return breaker
+
+
+def endpoint_key(url: str) -> str:
+    """Breaker and metrics name for a URL: scheme, host and path, without the query"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
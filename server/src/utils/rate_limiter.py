@@ -0,0 +1,54 @@
+"""
+Token bucket rate limiting for outbound providers (SMS, email, ...)
+"""
+import asyncio
+from time import monotonic
+
+
+class TokenBucket:
+    """
+    Async token bucket
+
+    Tokens refill continuously at ``rate`` per second up to ``burst``. ``acquire``
+    waits until a token is available, so callers are spread out to the provider's
+    allowed throughput instead of being rejected.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self._tokens = self.burst
+        self._updated = monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if they are available right now"""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def wait_seconds(self, tokens: float = 1.0) -> float:
+        """Seconds until tokens are available"""
+        self._refill()
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until tokens are available and take them"""
+        # The lock keeps waiters in arrival order
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Empty the bucket for a while, e.g. after the provider answered 429"""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
@@ -0,0 +1,78 @@
+"""
+Hashed timing wheel for large numbers of coarse timers (campaign retries, ...)
+
+Timers are hashed by their due tick into a fixed ring of slots, so scheduling
+and cancelling are O(1) and advancing the clock only visits the slots of the
+ticks that elapsed, however many timers are pending. Timers more than one turn
+of the wheel away stay in their slot until the turn they are due in.
+"""
+import math
+from typing import Dict, Hashable, List
+
+
+class TimingWheel:
+    """
+    Timers keyed by any hashable, expiring at a resolution of ``tick_seconds``
+
+    The wheel has no clock of its own: ``schedule`` takes due times and
+    ``advance`` the current time, in the same unit (e.g. ``time.time()``).
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 3600, now: float = 0.0):
+        if tick_seconds <= 0 or slots <= 0:
+            raise ValueError("tick_seconds and slots must be positive")
+        self.tick_seconds = float(tick_seconds)
+        self.slots = slots
+        # slot -> {key: due tick}
+        self._slots: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[Hashable, int] = {}
+        self._tick = self._tick_of(now)
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slot_of
+
+    def _tick_of(self, moment: float) -> int:
+        return math.floor(moment / self.tick_seconds)
+
+    def schedule(self, key: Hashable, due_at: float):
+        """Set (or move) the timer ``key`` to expire at ``due_at``; times already past expire on the next tick"""
+        self.cancel(key)
+        tick = max(self._tick + 1, math.ceil(due_at / self.tick_seconds))
+        slot = tick % self.slots
+        self._slots[slot][key] = tick
+        self._slot_of[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move the wheel to ``now`` and return the keys of the timers that expired, earliest tick first"""
+        target = self._tick_of(now)
+        expired: List[Hashable] = []
+        if target - self._tick >= self.slots:
+            # A whole turn or more elapsed: every slot is due at once
+            self._tick = target
+            for slot in self._slots:
+                expired.extend(self._expire(slot, target))
+            return expired
+
+        while self._tick < target:
+            self._tick += 1
+            slot = self._slots[self._tick % self.slots]
+            if slot:
+                expired.extend(self._expire(slot, self._tick))
+        return expired
+
+    def _expire(self, slot: Dict[Hashable, int], tick: int) -> List[Hashable]:
+        due = [key for key, due_tick in slot.items() if due_tick <= tick]
+        for key in due:
+            del slot[key]
+            del self._slot_of[key]
+        return due
@@ -0,0 +1,155 @@
+import itertools
+import os
+from typing import Any, Dict, Optional
+
+import firebase_admin
+import pytest
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+
+from src.core.metrics import MetricsRegistry
+
+# The API modules create their OpenAI clients at import
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocument", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def get(self) -> FakeSnapshot:
+        return FakeSnapshot(self, self._client.documents.get(self.path))
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._client._set(self.path, data, merge)
+
+    def update(self, data: Dict[str, Any]):
+        self._client._update(self.path, data)
+
+    def delete(self):
+        self._client.documents.pop(self.path, None)
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self._client, f"{self.path}/{name}")
+
+
+class FakeCollection:
+    def __init__(self, client: "FakeFirestore", name: str):
+        self._client = client
+        self.name = name
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocument:
+        return FakeDocument(self._client, f"{self.name}/{document_id or next(self._client._ids)}")
+
+
+class FakeBatch:
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference: FakeDocument, data: Dict[str, Any], merge: bool = False):
+        self._writes.append(lambda: self._client._set(reference.path, data, merge))
+
+    def update(self, reference: FakeDocument, data: Dict[str, Any]):
+        self._writes.append(lambda: self._client._update(reference.path, data))
+
+    def commit(self):
+        # Firestore batches are atomic: a missing document fails every write
+        snapshot = dict(self._client.documents)
+        try:
+            for write in self._writes:
+                write()
+        except NotFound:
+            self._client.documents = snapshot
+            raise
+        self._client.commits += 1
+
+
+class FakeFirestore:
+    """In-memory stand-in for the Firestore client: documents, batches and get_all"""
+
+    def __init__(self):
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.commits = 0
+        self._ids = (f"doc{n}" for n in itertools.count(1))
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def get_all(self, references, field_paths=None):
+        return [reference.get() for reference in references]
+
+    def _set(self, path: str, data: Dict[str, Any], merge: bool):
+        current = self.documents.get(path, {}) if merge else {}
+        self.documents[path] = {**current, **_resolve(current, data)}
+
+    def _update(self, path: str, data: Dict[str, Any]):
+        if path not in self.documents:
+            raise NotFound(f"No document to update: {path}")
+        self.documents[path] = {**self.documents[path], **_resolve(self.documents[path], data)}
+
+
+def _resolve(current: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    resolved = {}
+    for key, value in data.items():
+        if isinstance(value, firestore.Increment):
+            value = (current.get(key) or 0) + value.value
+        resolved[key] = value
+    return resolved
+
+
+@pytest.fixture
+def fake_firestore(monkeypatch) -> FakeFirestore:
+    """
+    The database service, backed by an in-memory Firestore
+
+    Importing ``src.services.database`` connects to Firebase; the fake client
+    lets it import without credentials.
+    """
+    client = FakeFirestore()
+    monkeypatch.setitem(firebase_admin._apps, "[DEFAULT]", object())
+    monkeypatch.setattr(firestore, "client", lambda: client)
+
+    from src.services.database import db_service
+    monkeypatch.setattr(db_service, "db", client)
+    return client
+
+
+@pytest.fixture
+def spooled_metrics(tmp_path, monkeypatch) -> MetricsRegistry:
+    """
+    Registry receiving what the code under test spools, as the API would drain it
+
+    The code under test runs as if in a job process.
+    """
+    from src.core.metrics_spool import metrics_spool
+
+    monkeypatch.setattr(metrics_spool, "path", str(tmp_path / "metrics.sqlite3"))
+    monkeypatch.setattr(metrics_spool, "_connection", None)
+    monkeypatch.setattr(metrics_spool, "_buffer", [])
+    monkeypatch.setattr(metrics_spool, "enabled", True)
+    registry = MetricsRegistry()
+    registry.drain = lambda: _drain(metrics_spool, registry)
+    return registry
+
+
+async def _drain(spool, registry: MetricsRegistry) -> MetricsRegistry:
+    await spool.flush()
+    await spool.drain_into(registry)
+    return registry
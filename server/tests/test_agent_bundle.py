@@ -0,0 +1,77 @@
+import pytest
+
+from src.agents import agent_bundle
+from src.agents.agent_bundle import compile_bundle, load_bundle, store_bundle
+from src.models import Agent, Tool
+
+
+def make_agent(**kwargs) -> Agent:
+    return Agent(id="agent-1", user_id="user-1", name="Pizzeria", tools=["faq"], **kwargs)
+
+
+TOOLS = {
+    "faq": Tool(id="faq", user_id="user-1", name="faq", description="", type="function",
+                json_schema={"properties": {"question": {"type": "str"}}}),
+}
+
+
+async def test_unchanged_agents_compile_to_the_same_version():
+    first = await compile_bundle(make_agent(instructions="Sell pizza."), TOOLS)
+    again = await compile_bundle(make_agent(instructions="Sell pizza."), TOOLS)
+    edited = await compile_bundle(make_agent(instructions="Sell pasta."), TOOLS)
+
+    assert first.version == again.version != edited.version
+    assert first.prompts["pipeline"].startswith("Sell pizza.")
+    assert first.tools["faq"].json_schema["properties"]["question"] == {"type": "string"}
+    assert first.tools["faq"].description == "Answer frequently asked questions about the business. USE THIS TOOL ONLY WHEN: customer asks common questions about hours, location, policies, services, etc."
+
+
+async def test_published_bundles_load_from_one_document(fake_firestore):
+    from src.services.database import db_service
+
+    bundle = await compile_bundle(make_agent(), TOOLS)
+    assert await store_bundle("agent-1", bundle, db_service)
+
+    document = await db_service.get_agent_bundle("agent-1")
+    loaded = load_bundle(document)
+
+    assert loaded.version == bundle.version
+    assert loaded.greeting == bundle.greeting
+    assert f"agentBundles/agent-1/versions/{bundle.version}" in fake_firestore.documents
+
+
+async def test_calls_load_the_published_bundle_in_a_worker_thread(fake_firestore):
+    from src.agents.phone_agent import load_agent_bundle
+    from src.core.call_setup import CallSetupTrace
+    from src.services.database import db_service
+
+    bundle = await compile_bundle(make_agent(), TOOLS)
+    await store_bundle("agent-1", bundle, db_service)
+    setup_trace = CallSetupTrace()
+
+    loaded = await load_agent_bundle("agent-1", setup_trace)
+
+    assert loaded.version == bundle.version
+    assert [span["stage"] for span in setup_trace.spans] == ["agent_bundle"]
+
+
+async def test_oversized_bundles_withdraw_the_published_one(fake_firestore, monkeypatch):
+    from src.services.database import db_service
+
+    await store_bundle("agent-1", await compile_bundle(make_agent(), TOOLS), db_service)
+    monkeypatch.setattr(agent_bundle, "MAX_BUNDLE_BYTES", 100)
+
+    assert not await store_bundle("agent-1", await compile_bundle(make_agent(instructions="x"), TOOLS), db_service)
+    assert await db_service.get_agent_bundle("agent-1") is None
+
+
+def test_bundles_of_another_format_are_not_loaded():
+    assert load_bundle({"version": "old", "bundle": '{"format": 0}'}) is None
+
+
+@pytest.mark.parametrize("language, pipeline_suffix", [("en-US", "Always respond in English only."), ("es-ES", "Always respond in Spanish only.")])
+async def test_prompts_carry_the_agent_language(language, pipeline_suffix):
+    bundle = await compile_bundle(make_agent(language=language), TOOLS)
+
+    assert bundle.prompts["pipeline"].endswith(pipeline_suffix)
+    assert bundle.prompts["realtime"].endswith("Always respond in English only. Do not use any other language.")
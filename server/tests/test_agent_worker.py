@@ -0,0 +1,21 @@
+from livekit.agents import JobExecutorType
+
+
+async def test_worker_runs_each_call_in_its_own_process(fake_firestore, monkeypatch):
+    from src.services import agent_worker
+
+    options = []
+
+    class Worker:
+        def __init__(self, worker_options):
+            options.append(worker_options)
+
+        async def run(self):
+            pass
+
+    monkeypatch.setattr(agent_worker.agents, "Worker", Worker)
+    service = agent_worker.AgentWorkerService()
+    await service.start()
+    await service.worker_task
+
+    assert options[0].job_executor_type == JobExecutorType.PROCESS
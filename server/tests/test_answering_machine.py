@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from src.agents.answering_machine import (
+    HUMAN,
+    LIKELY_MACHINE,
+    MACHINE,
+    UNKNOWN,
+    AmdResult,
+    AnsweringMachineDetector,
+    AnsweringMachineListener,
+    CadenceDetector,
+    is_tone,
+    machine_phrase,
+    transcript_language,
+)
+
+SAMPLE_RATE = 8000
+FRAME = SAMPLE_RATE // 100
+
+
+def speech(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * 140 * harmonic * t) / harmonic for harmonic in range(1, 8))
+    return (voice * 3000).astype(np.int16)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+
+
+def push(detector, *parts, transcript=None, transcript_at=None):
+    """Feed audio frame by frame, the transcript once ``transcript_at`` seconds were pushed"""
+    audio = np.concatenate(parts)
+    for offset in range(0, len(audio), FRAME):
+        if transcript and detector.elapsed >= transcript_at and detector.push_transcript(transcript):
+            break
+        if detector.push_audio(audio[offset:offset + FRAME], SAMPLE_RATE):
+            break
+    return detector.result
+
+
+@pytest.mark.parametrize("transcript, language, phrase", [
+    ("Hi, you've reached Sam, please leave a message after the tone", "en", "leave a message"),
+    ("Sorry, I can't take your call right now", "en", "can't take your call"),
+    ("Hello? Who's this?", "en", None),
+    ("Hola, deje su mensaje después de la señal", "es", "deje su mensaje"),
+    ("Bonjour, laissez un message après le bip", "fr", "laissez un message"),
+    ("Bitte hinterlassen Sie eine Nachricht nach dem Signalton", "de", "hinterlassen Sie"),
+])
+def test_machine_phrase(transcript, language, phrase):
+    assert machine_phrase(transcript, language) == phrase
+
+
+def test_transcript_language_of_the_agent():
+    assert transcript_language("en-US") == "en"
+    assert transcript_language("es-ES") == "es"
+    # No voicemail phrases: only the cadence is screened
+    assert transcript_language("ja-JP") is None
+    assert transcript_language(None) is None
+
+
+def test_cadence_of_a_person_answering():
+    cadence = CadenceDetector()
+    audio = np.concatenate([silence(0.5), speech(0.4), silence(2.1)])
+    verdict = None
+    for offset in range(0, len(audio), FRAME):
+        verdict = cadence.push(audio[offset:offset + FRAME], SAMPLE_RATE)
+        if verdict:
+            break
+
+    assert (verdict, cadence.reason) == (HUMAN, "after_greeting_silence")
+    assert cadence.words == 1
+
+
+@pytest.mark.parametrize("audio, reason", [
+    ([silence(0.3), speech(2.0)], "long_greeting"),
+    ([silence(3.0)], "initial_silence"),
+])
+def test_cadence_of_a_machine(audio, reason):
+    result = push(AnsweringMachineDetector(transcribed=False), *audio)
+
+    # A machine's cadence alone is greeted
+    assert (result.verdict, result.reason) == (LIKELY_MACHINE, reason)
+    assert not result.machine
+
+
+def test_transcript_confirms_a_machine():
+    detector = AnsweringMachineDetector(timeout=5.0)
+
+    result = push(detector, silence(0.3), speech(4.0), transcript="Please leave a message after the beep", transcript_at=1.5)
+
+    assert (result.verdict, result.reason) == (MACHINE, "transcript")
+    assert result.machine
+    assert 1.5 <= result.decision_seconds < 1.6
+
+
+def test_long_greeting_without_a_voicemail_phrase_is_greeted():
+    detector = AnsweringMachineDetector(timeout=3.0)
+
+    result = push(detector, silence(0.3), speech(4.0), transcript="Hello, this is Dana speaking, how can I help you", transcript_at=1.5)
+
+    # Waited for the transcript until the timeout
+    assert (result.verdict, result.reason) == (LIKELY_MACHINE, "long_greeting")
+    assert result.decision_seconds == pytest.approx(3.0, abs=0.02)
+    assert result.transcript.startswith("Hello, this is Dana")
+
+
+def test_phrases_are_matched_in_the_agents_language():
+    english = push(AnsweringMachineDetector(timeout=2.0), speech(2.5), transcript="deje su mensaje", transcript_at=1.0)
+    spanish = push(AnsweringMachineDetector(timeout=2.0, language="es"), speech(2.5), transcript="deje su mensaje", transcript_at=1.0)
+
+    assert english.verdict == LIKELY_MACHINE
+    assert spanish.verdict == MACHINE
+
+
+def test_undecided_within_the_timeout():
+    audio = [speech(0.3), silence(0.2)] * 2 + [speech(0.3), silence(0.2)]
+    result = push(AnsweringMachineDetector(timeout=1.0, greeting=5.0, maximum_words=10), *audio, silence(1.0))
+
+    assert result.verdict == UNKNOWN
+
+
+def test_tone_is_told_from_speech():
+    t = np.arange(SAMPLE_RATE // 10) / SAMPLE_RATE
+    beep = (6000 * np.sin(2 * np.pi * 1000 * t)).astype(np.int16)
+
+    assert is_tone(beep, SAMPLE_RATE, 300.0)
+    assert not is_tone(speech(0.1), SAMPLE_RATE, 300.0)
+    assert not is_tone(silence(0.1), SAMPLE_RATE, 300.0)
+
+
+async def test_verdicts_are_spooled(spooled_metrics, monkeypatch):
+    listener = AnsweringMachineListener(room=None, participant=None, timeout=1.0)
+
+    async def screen():
+        return AmdResult(MACHINE, "transcript", 1.2, "leave a message")
+
+    monkeypatch.setattr(listener, "_screen", screen)
+    result = await listener.detect()
+
+    assert result.machine
+    registry = await spooled_metrics.drain()
+    assert registry.counter("amd_verdicts_total").value(verdict=MACHINE, reason="transcript") == 1
+    assert registry.histogram("amd_decision_seconds").percentiles(verdict=MACHINE)[0.5] is not None
+
+
+def test_listener_without_transcription_does_not_wait_for_one():
+    cadence_only = AnsweringMachineListener(room=None, participant=None, timeout=5.0)
+    transcribed = AnsweringMachineListener(room=None, participant=None, timeout=5.0, stt=object(), language="es")
+
+    assert cadence_only.detector.transcribed is False
+    assert transcribed.detector.transcribed is True
+    assert transcribed.detector.language == "es"
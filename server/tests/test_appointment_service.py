@@ -0,0 +1,159 @@
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.services.appointment_service import (
+    AppointmentBook,
+    AppointmentEngine,
+    AppointmentStore,
+    BookingIndex,
+    BusinessSchedule,
+    SQLiteAppointmentStore,
+    business_timezone,
+    parse_date,
+    parse_hours,
+    parse_resources,
+    parse_time,
+)
+
+NEW_YORK = ZoneInfo("America/New_York")
+HOURS = {day: "9:00 AM - 5:00 PM" for day in ["monday", "tuesday", "wednesday", "thursday", "friday"]}
+
+
+@pytest.mark.parametrize("text, ranges", [
+    ("9:00 AM - 5:00 PM", [(540, 1020)]),
+    ("9am-12pm, 1pm-5pm", [(540, 720), (780, 1020)]),
+    ("09:00-17:00", [(540, 1020)]),
+    ("9-5", [(540, 1020)]),
+    ("6pm - midnight", [(1080, 1440)]),
+    ("Closed", []),
+    ("Open 24 hours", [(0, 1440)]),
+])
+def test_parse_hours(text, ranges):
+    assert parse_hours(text) == ranges
+
+
+def test_parse_date_relative_to_today():
+    today = date(2026, 10, 19)  # Monday
+    assert parse_date("tomorrow", today) == date(2026, 10, 20)
+    assert parse_date("Friday", today) == date(2026, 10, 23)
+    assert parse_date("next monday", today) == date(2026, 10, 26)
+    assert parse_date("July 5th", today) == date(2027, 7, 5)
+    assert parse_date("2026-11-02", today) == date(2026, 11, 2)
+    assert parse_date("someday", today) is None
+
+
+def test_parse_time():
+    assert parse_time("2:30 PM") == time(14, 30)
+    assert parse_time("at 3") is None
+    assert parse_time("3") == time(15, 0)
+    assert parse_time("noon") == time(12, 0)
+    assert parse_time("14:00") == time(14, 0)
+
+
+def test_parse_resources():
+    assert parse_resources("Sarah (color), Mia - cuts and Dr. Kim") == ["Sarah", "Mia", "Dr. Kim"]
+
+
+def test_booking_index_skips_booked_intervals():
+    day = datetime(2026, 10, 20, tzinfo=timezone.utc)
+
+    def at(hour, minute=0):
+        return day + timedelta(hours=hour, minutes=minute)
+
+    index = BookingIndex([(at(10), at(11)), (at(9), at(9, 30))])
+
+    assert not index.is_free(at(10, 30), at(11))
+    assert index.is_free(at(11), at(11, 30))
+    slots = list(index.free_slots(at(9), at(12), timedelta(minutes=30), timedelta(minutes=30)))
+    assert slots == [at(9, 30), at(11), at(11, 30)]
+
+
+class MemoryStore(AppointmentStore):
+    def __init__(self):
+        self.appointments = []
+
+    async def list_appointments(self, agent_id, resource, start, end):
+        return [a for a in self.appointments if a.agent_id == agent_id and a.resource == resource and a.start < end and a.end > start]
+
+    async def book_if_free(self, appointment):
+        if await self.list_appointments(appointment.agent_id, appointment.resource, appointment.start, appointment.end):
+            return False
+        self.appointments.append(appointment)
+        return True
+
+    async def cancel(self, agent_id, appointment_id):
+        return None
+
+
+def test_store_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        AppointmentStore()
+
+
+def make_book(store, now, zone=NEW_YORK, resources=("Sarah", "Mia")):
+    schedule = BusinessSchedule(HOURS, zone)
+    schedule.now = lambda: now.astimezone(zone)
+    return AppointmentBook("agent-1", schedule, list(resources), AppointmentEngine(store, slot_minutes=30))
+
+
+async def test_dates_and_times_are_read_in_the_business_timezone():
+    store = MemoryStore()
+    # Monday 23:30 in New York is already Tuesday in UTC
+    book = make_book(store, datetime(2026, 10, 20, 3, 30, tzinfo=timezone.utc))
+
+    result = await book.book("tomorrow", "2:30 PM", customer_name="Ana")
+
+    assert result["success"] is True
+    assert result["date"] == "2026-10-20"
+    assert result["time"] == "2:30 PM"
+    assert store.appointments[0].start == datetime(2026, 10, 20, 18, 30, tzinfo=timezone.utc)
+
+
+async def test_availability_starts_after_the_current_local_time():
+    book = make_book(MemoryStore(), datetime(2026, 10, 20, 19, 10, tzinfo=timezone.utc))  # 3:10 PM in New York
+
+    result = await book.availability("today")
+
+    assert result["available_times"][:2] == ["3:30 PM", "4:00 PM"]
+    assert result["total_available"] == 3
+
+
+async def test_taken_slot_goes_to_the_next_free_staff_member_then_fails():
+    book = make_book(MemoryStore(), datetime(2026, 10, 19, 12, tzinfo=timezone.utc))
+
+    first, second, third = [await book.book("tuesday", "10am") for _ in range(3)]
+
+    assert (first["staff"], second["staff"]) == ("Sarah", "Mia")
+    assert third["success"] is False
+    assert "10:30 AM" in third["available_times"]
+
+
+async def test_closed_days_offer_the_next_open_day():
+    book = make_book(MemoryStore(), datetime(2026, 10, 19, 12, tzinfo=timezone.utc))
+
+    result = await book.availability("saturday")
+
+    assert result["message"] == "We're closed on Saturday, October 24."
+    assert result["next_available"]["date"] == "2026-10-26"
+
+
+async def test_sqlite_store_rejects_overlapping_bookings_from_separate_engines(tmp_path):
+    path = str(tmp_path / "appointments.sqlite3")
+    start = datetime(2026, 10, 20, 10, tzinfo=NEW_YORK)
+    engines = [AppointmentEngine(SQLiteAppointmentStore(path)) for _ in range(2)]
+
+    results = await asyncio.gather(*(engine.book("agent-1", ["Sarah"], start) for engine in engines))
+
+    assert sum(result is not None for result in results) == 1
+    stored = await SQLiteAppointmentStore(path).list_appointments("agent-1", "Sarah", start, start + timedelta(hours=1))
+    assert [appointment.start for appointment in stored] == [start]
+
+
+def test_business_timezone_falls_back_to_settings(monkeypatch):
+    monkeypatch.setattr("src.services.appointment_service.settings.appointment_timezone", "Europe/Paris")
+    assert business_timezone("America/New_York") == NEW_YORK
+    assert business_timezone("Mars/Olympus") == ZoneInfo("Europe/Paris")
+    assert business_timezone(None) == ZoneInfo("Europe/Paris")
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from livekit import rtc
+
+from src.agents import audio_readiness
+
+
+class FakeRoom:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def off(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, *args):
+        for handler in list(self.handlers.get(event, [])):
+            handler(*args)
+
+
+def audio_publication(subscribed=True):
+    return SimpleNamespace(kind=rtc.TrackKind.KIND_AUDIO, subscribed=subscribed, track=SimpleNamespace(kind=rtc.TrackKind.KIND_AUDIO) if subscribed else None)
+
+
+@pytest.fixture
+def frames(monkeypatch):
+    """Tracks whose first frame has arrived"""
+    arrived = []
+
+    async def first_frame(track):
+        while track not in arrived:
+            await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(audio_readiness, "_first_frame", first_frame)
+    return arrived
+
+
+async def test_ready_once_the_subscribed_track_delivers_a_frame(frames, spooled_metrics):
+    publication = audio_publication()
+    participant = SimpleNamespace(identity="caller", track_publications={"TR_1": publication})
+    frames.append(publication.track)
+
+    assert await audio_readiness.wait_for_audio_ready(FakeRoom(), participant, timeout=1)
+
+    registry = await spooled_metrics.drain()
+    assert registry.histogram("call_audio_ready_seconds").percentiles(ready="true")[0.5] is not None
+
+
+async def test_waits_for_the_track_to_be_subscribed(frames):
+    room = FakeRoom()
+    participant = SimpleNamespace(identity="caller", track_publications={})
+    track = SimpleNamespace(kind=rtc.TrackKind.KIND_AUDIO)
+    frames.append(track)
+
+    waiting = asyncio.create_task(audio_readiness.wait_for_audio_ready(room, participant, timeout=1))
+    await asyncio.sleep(0.02)
+    room.emit("track_subscribed", track, None, SimpleNamespace(identity="someone-else"))
+    assert not waiting.done()
+    room.emit("track_subscribed", track, None, participant)
+
+    assert await waiting
+    assert room.handlers["track_subscribed"] == []
+
+
+async def test_silent_lines_time_out(frames, spooled_metrics):
+    participant = SimpleNamespace(identity="caller", track_publications={"TR_1": audio_publication()})
+
+    assert not await audio_readiness.wait_for_audio_ready(FakeRoom(), participant, timeout=0.05)
+
+    registry = await spooled_metrics.drain()
+    assert registry.histogram("call_audio_ready_seconds").percentiles(ready="false")[0.5] >= 0.05
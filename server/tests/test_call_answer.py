@@ -0,0 +1,110 @@
+import asyncio
+from types import SimpleNamespace
+
+from livekit import rtc
+
+from src.agents.call_answer import EARLY_MEDIA_ANSWER, AnswerDetector, DialOutcome
+from src.models import CallStatus
+
+
+class FakeRoom:
+    def __init__(self):
+        self.handlers = {}
+        self.remote_participants = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def off(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, *args):
+        for handler in list(self.handlers.get(event, [])):
+            handler(*args)
+
+
+def sip_participant(call_status="dialing", disconnect_reason=None, tracks=()):
+    return SimpleNamespace(
+        identity="sip-callee",
+        attributes={"sip.callStatus": call_status},
+        disconnect_reason=disconnect_reason,
+        track_publications={f"TR_{n}": track for n, track in enumerate(tracks)},
+    )
+
+
+def audio_publication():
+    return SimpleNamespace(kind=rtc.TrackKind.KIND_AUDIO)
+
+
+async def dial(room, *events, early_media="ring", ring_timeout=1.0) -> DialOutcome:
+    detector = AnswerDetector(room, "sip-callee", early_media=early_media)
+    waiting = asyncio.create_task(detector.wait(ring_timeout))
+    await asyncio.sleep(0)
+    for event in events:
+        room.emit(*event)
+    return await waiting
+
+
+async def test_answered_once_the_call_status_turns_active(spooled_metrics):
+    room = FakeRoom()
+    participant = sip_participant("ringing")
+
+    outcome = await dial(
+        room,
+        ("participant_connected", participant),
+        ("participant_attributes_changed", {"sip.callStatus": "active"}, participant),
+    )
+
+    assert outcome.answered
+    assert room.handlers == {event: [] for event in room.handlers}
+    registry = await spooled_metrics.drain()
+    assert registry.histogram("outbound_ring_seconds").percentiles(outcome="active")[0.5] is not None
+
+
+async def test_participant_answered_before_waiting():
+    room = FakeRoom()
+    room.remote_participants["sip-callee"] = sip_participant("active")
+
+    assert (await dial(room)).answered
+
+
+async def test_disconnect_reason_tells_busy_from_unanswered():
+    busy = sip_participant(disconnect_reason=rtc.DisconnectReason.USER_REJECTED)
+    unanswered = sip_participant(disconnect_reason=rtc.DisconnectReason.USER_UNAVAILABLE)
+    hung_up = sip_participant(disconnect_reason=rtc.DisconnectReason.CLIENT_INITIATED)
+
+    assert (await dial(FakeRoom(), ("participant_disconnected", busy))).status == CallStatus.BUSY
+    assert (await dial(FakeRoom(), ("participant_disconnected", unanswered))).status == CallStatus.NO_ANSWER
+    assert (await dial(FakeRoom(), ("participant_disconnected", hung_up))).status == CallStatus.HANGUP
+
+
+async def test_early_media_rings_unless_configured_to_answer():
+    participant = sip_participant("ringing")
+    ringing = await dial(FakeRoom(), ("track_published", audio_publication(), participant), ring_timeout=0.05)
+    assert ringing.status == CallStatus.NO_ANSWER
+    assert ringing.early_media
+
+    answered = await dial(FakeRoom(), ("track_published", audio_publication(), participant), early_media=EARLY_MEDIA_ANSWER)
+    assert answered.answered
+    assert answered.early_media
+
+
+async def test_unanswered_within_the_ring_timeout():
+    outcome = await dial(FakeRoom(), ring_timeout=0.05)
+
+    assert outcome.status == CallStatus.NO_ANSWER
+    assert outcome.ring_seconds >= 0.05
+
+
+async def test_rejected_dial_request_maps_the_sip_status(spooled_metrics):
+    detector = AnswerDetector(FakeRoom(), "sip-callee")
+    error = Exception("dial failed")
+    error.metadata = {"sip_status_code": 486}
+
+    outcome = detector.cancelled(error)
+
+    assert outcome.to_dict()["outcome"] == "busy"
+    assert outcome.sip_status == "486"
+    assert DialOutcome.dial_failed(Exception("unknown"), 0.0).status == CallStatus.FAILED
+    registry = await spooled_metrics.drain()
+    assert registry.histogram("outbound_ring_seconds").percentiles(outcome="busy")[0.5] is not None
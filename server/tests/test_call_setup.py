@@ -0,0 +1,38 @@
+import json
+from time import perf_counter, time
+
+from src.core.call_setup import ROOM_METADATA_KEY, CallSetupTrace
+
+
+def test_trace_continues_from_room_metadata_with_a_dispatch_stage():
+    api_trace = CallSetupTrace(started_at=time() - 1.0)
+    api_trace.record("room_create", api_trace.perf_at(api_trace.started_at), api_trace.perf_at(api_trace.started_at + 0.2))
+
+    trace = CallSetupTrace.from_metadata(api_trace.to_metadata())
+
+    assert [span["stage"] for span in trace.spans] == ["room_create", "dispatch"]
+    dispatch = trace.spans[1]
+    assert abs(dispatch["start"] - 0.2) < 0.01
+    assert abs(dispatch["duration"] - 0.8) < 0.05
+
+
+def test_missing_or_foreign_metadata_starts_a_new_trace():
+    for metadata in (None, "", "not json", json.dumps({"other": 1}), json.dumps({ROOM_METADATA_KEY: {}})):
+        assert CallSetupTrace.from_metadata(metadata).spans == []
+
+
+async def test_job_process_stages_reach_the_api_registry(spooled_metrics):
+    finished = []
+    trace = CallSetupTrace()
+    trace.on_finish = finished.append
+    with trace.span("connect"):
+        pass
+    trace.record("first_audio", trace.end(), perf_counter())
+    trace.finish()
+    trace.finish()
+
+    assert finished == [trace]
+    assert trace.to_dict()["totalSeconds"] is not None
+    registry = await spooled_metrics.drain()
+    assert registry.histogram("call_setup_stage_seconds").percentiles(stage="connect")[0.5] is not None
+    assert registry.histogram("call_setup_seconds").percentiles()[0.5] is not None
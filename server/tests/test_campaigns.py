@@ -0,0 +1,339 @@
+import asyncio
+import random
+import time as clock
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytest
+
+from src.models import (
+    CallStatus,
+    CallingHours,
+    Campaign,
+    CampaignContact,
+    CampaignContactInput,
+    CampaignProgress,
+    CampaignSettings,
+    CampaignStatus,
+    ContactStatus,
+)
+from src.services import campaign_service
+from src.services.campaign_service import (
+    CampaignDialer,
+    CampaignEngine,
+    CampaignStore,
+    DialResult,
+    SQLiteCampaignStore,
+    window_opens_in,
+)
+
+OPEN_TIMEZONE = "UTC"
+# Twelve hours ahead of UTC: at midnight while the calling hours are open around noon UTC
+CLOSED_TIMEZONE = "Etc/GMT-12"
+CALLING_HOURS = CallingHours(start="11:00", end="13:00")
+RETRY_DELAYS = {"busy": 1, "no_answer": 1}
+
+
+class MemoryCampaignStore(CampaignStore):
+    """Campaign store kept in dictionaries"""
+
+    def __init__(self):
+        self.campaigns: Dict[str, Campaign] = {}
+        self.contacts: Dict[str, CampaignContact] = {}
+
+    def _of(self, campaign_id: str, *statuses: ContactStatus) -> List[CampaignContact]:
+        return [
+            contact for contact in self.contacts.values()
+            if contact.campaign_id == campaign_id and (not statuses or contact.status in statuses)
+        ]
+
+    async def create_campaign(self, campaign: Campaign):
+        self.campaigns[campaign.id] = campaign.model_copy(deep=True)
+
+    async def get_campaign(self, campaign_id: str) -> Optional[Campaign]:
+        campaign = self.campaigns.get(campaign_id)
+        return campaign.model_copy(deep=True) if campaign else None
+
+    async def list_campaigns(self, user_id: Optional[str] = None, statuses: Iterable[CampaignStatus] = ()) -> List[Campaign]:
+        statuses = set(statuses)
+        return [
+            campaign.model_copy(deep=True)
+            for campaign in sorted(self.campaigns.values(), key=lambda campaign: campaign.created_at, reverse=True)
+            if (user_id is None or campaign.user_id == user_id) and (not statuses or campaign.status in statuses)
+        ]
+
+    async def set_campaign_status(self, campaign_id: str, status: CampaignStatus):
+        self.campaigns[campaign_id].status = status
+
+    async def add_contacts(self, campaign_id: str, contacts: List[CampaignContact]) -> int:
+        numbers = {contact.phone_number for contact in self._of(campaign_id)}
+        added = 0
+        for contact in contacts:
+            if contact.phone_number not in numbers:
+                numbers.add(contact.phone_number)
+                self.contacts[contact.id] = contact.model_copy(update={"status": ContactStatus.PENDING})
+                added += 1
+        return added
+
+    async def get_contacts(self, contact_ids: List[str]) -> List[CampaignContact]:
+        return [self.contacts[contact_id].model_copy() for contact_id in contact_ids if contact_id in self.contacts]
+
+    async def timezones(self, campaign_id: str) -> List[str]:
+        return list({contact.timezone for contact in self._of(campaign_id, ContactStatus.PENDING)})
+
+    async def next_pending(self, campaign_id: str, timezones: List[str], limit: int) -> List[CampaignContact]:
+        pending = [contact for contact in self._of(campaign_id, ContactStatus.PENDING) if contact.timezone in timezones]
+        return [contact.model_copy() for contact in pending[:max(limit, 0)]]
+
+    async def claim(self, contact_id: str) -> bool:
+        contact = self.contacts[contact_id]
+        if contact.status not in (ContactStatus.PENDING, ContactStatus.RETRY):
+            return False
+        contact.status = ContactStatus.DIALING
+        contact.attempts += 1
+        contact.next_attempt_at = None
+        return True
+
+    async def finish_attempt(
+        self,
+        contact_id: str,
+        status: ContactStatus,
+        outcome: str,
+        result: DialResult,
+        next_attempt_at: Optional[float] = None,
+    ):
+        contact = self.contacts[contact_id]
+        contact.status = status
+        contact.last_outcome = outcome
+        contact.next_attempt_at = next_attempt_at
+        contact.call_id = result.call_id or contact.call_id
+        contact.room_name = result.room_name or contact.room_name
+
+    async def reschedule(self, contact_id: str, next_attempt_at: float):
+        self.contacts[contact_id].next_attempt_at = next_attempt_at
+
+    async def retries(self, campaign_id: str) -> List[Tuple[str, float]]:
+        return [(contact.id, contact.next_attempt_at or 0.0) for contact in self._of(campaign_id, ContactStatus.RETRY)]
+
+    async def dialing(self, campaign_id: str) -> List[CampaignContact]:
+        return [contact.model_copy() for contact in self._of(campaign_id, ContactStatus.DIALING)]
+
+    async def skip_remaining(self, campaign_id: str):
+        for contact in self._of(campaign_id, ContactStatus.PENDING, ContactStatus.RETRY):
+            contact.status = ContactStatus.SKIPPED
+            contact.next_attempt_at = None
+
+    async def remaining(self, campaign_id: str) -> int:
+        return len(self._of(campaign_id, ContactStatus.PENDING, ContactStatus.DIALING, ContactStatus.RETRY))
+
+    async def progress(self, campaign_id: str) -> CampaignProgress:
+        progress = CampaignProgress()
+        for contact in self._of(campaign_id):
+            setattr(progress, contact.status.value, getattr(progress, contact.status.value) + 1)
+            progress.total += 1
+            progress.attempts += contact.attempts
+            if contact.last_outcome:
+                progress.outcomes[contact.last_outcome] = progress.outcomes.get(contact.last_outcome, 0) + 1
+        return progress
+
+
+class FakeSipDialer(CampaignDialer):
+    """Stand-in for LiveKit's SIP leg: rings, then answers, is busy or goes unanswered at the given rates"""
+
+    def __init__(self, answer_rate: float = 0.6, busy_rate: float = 0.2, ring=(0.01, 0.05), talk=(0.05, 0.2), seed: int = 7):
+        self.answer_rate = answer_rate
+        self.busy_rate = busy_rate
+        self.ring = ring
+        self.talk = talk
+        self.random = random.Random(seed)
+        self.active = 0
+        self.max_active = 0
+        self.dials: List[Tuple[float, str]] = []  # (started, phone number)
+        self.loaded: List[str] = []
+
+    async def dial(self, campaign: Campaign, contact: CampaignContact) -> DialResult:
+        self.dials.append((clock.monotonic(), contact.phone_number))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.random.uniform(*self.ring))
+            draw = self.random.random()
+            if draw < self.answer_rate:
+                await asyncio.sleep(self.random.uniform(*self.talk))
+                outcome = CallStatus.ACTIVE.value
+            elif draw < self.answer_rate + self.busy_rate:
+                outcome = CallStatus.BUSY.value
+            else:
+                outcome = CallStatus.NO_ANSWER.value
+            return DialResult(outcome, call_id=f"fake-{len(self.dials)}", room_name=f"fake-room-{len(self.dials)}")
+        finally:
+            self.active -= 1
+
+    def campaign_loaded(self, campaign: Campaign):
+        self.loaded.append(campaign.id)
+
+    def dialed_at(self, number_filter=lambda number: True) -> List[float]:
+        return sorted(started for started, number in self.dials if number_filter(number))
+
+
+def most_dials_within(moments: List[float], seconds: float) -> int:
+    """The most dials started within any span shorter than ``seconds``"""
+    best, first = 0, 0
+    for last, moment in enumerate(moments):
+        while moment - moments[first] >= seconds:
+            first += 1
+        best = max(best, last - first + 1)
+    return best
+
+
+@pytest.fixture(autouse=True)
+def noon_utc(monkeypatch):
+    """The engine's clock, moved to noon UTC today so the calling hours are open in UTC only"""
+    now = datetime.now(timezone.utc)
+    offset = now.replace(hour=12, minute=0, second=0, microsecond=0).timestamp() - now.timestamp()
+    monkeypatch.setattr(campaign_service, "time", lambda: clock.time() + offset)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path) -> CampaignStore:
+    if request.param == "memory":
+        return MemoryCampaignStore()
+    return SQLiteCampaignStore(str(tmp_path / "campaigns.sqlite3"))
+
+
+async def create_campaign(engine: CampaignEngine, contacts: int, **settings) -> Campaign:
+    campaign = await engine.create_campaign(Campaign(
+        id="campaign_fake_sip",
+        user_id="test",
+        agent_id="test-agent",
+        name="Fake SIP campaign",
+        settings=CampaignSettings(calling_hours=CALLING_HOURS, retry_delays=RETRY_DELAYS, **settings),
+    ))
+    await engine.import_contacts(campaign, [
+        CampaignContactInput(
+            phone_number=f"+1 (555) {index:03d}-{index:04d}",
+            timezone=OPEN_TIMEZONE if index % 2 == 0 else CLOSED_TIMEZONE,
+        )
+        for index in range(contacts)
+    ])
+    return campaign
+
+
+async def open_contacts_done(engine: CampaignEngine, campaign: Campaign, closed: int) -> CampaignProgress:
+    """Wait until every contact inside its calling hours is done"""
+    async def done():
+        while True:
+            progress = await engine.progress(campaign.id)
+            if progress.dialing == 0 and progress.retry == 0 and progress.pending == closed:
+                return progress
+            await asyncio.sleep(0.05)
+
+    return await asyncio.wait_for(done(), timeout=30)
+
+
+def is_closed(number: str) -> bool:
+    return int(number[-4:]) % 2 == 1
+
+
+async def test_campaign_keeps_to_its_limits(store):
+    dialer = FakeSipDialer()
+    engine = CampaignEngine(store, dialer, max_concurrent_calls=10, calls_per_second=20, tick_seconds=0.05)
+    campaign = await create_campaign(engine, 40, max_concurrent_calls=4, calls_per_second=10, max_attempts=3)
+
+    await engine.start_campaign(campaign.id)
+    try:
+        progress = await open_contacts_done(engine, campaign, closed=20)
+    finally:
+        await engine.stop()
+
+    assert dialer.max_active <= 4
+    assert not [number for _, number in dialer.dials if is_closed(number)]
+
+    attempts: Dict[str, List[float]] = {}
+    for moment, number in dialer.dials:
+        attempts.setdefault(number, []).append(moment)
+    assert len(attempts) == 20
+    assert max(len(moments) for moments in attempts.values()) <= 3
+    # Less one scheduler tick
+    assert all(after - before >= 1 - 0.05 for moments in attempts.values() for before, after in zip(moments, moments[1:]))
+
+    counted = progress.pending + progress.dialing + progress.retry + progress.completed + progress.failed + progress.skipped
+    assert counted == progress.total == 40
+    assert progress.attempts == len(dialer.dials)
+
+
+async def test_dials_are_paced_to_calls_per_second(store):
+    dialer = FakeSipDialer(answer_rate=1.0, ring=(0.0, 0.0), talk=(0.0, 0.0))
+    engine = CampaignEngine(store, dialer, max_concurrent_calls=50, calls_per_second=100, tick_seconds=0.05)
+    campaign = await create_campaign(engine, 40, max_concurrent_calls=50, calls_per_second=10)
+
+    started = clock.monotonic()
+    await engine.start_campaign(campaign.id)
+    try:
+        await open_contacts_done(engine, campaign, closed=20)
+    finally:
+        await engine.stop()
+
+    moments = dialer.dialed_at()
+    assert len(moments) == 20
+    # Not even the first second, which starts with the bucket full, goes over the rate
+    assert most_dials_within(moments, 1.0 - 0.02) <= 10
+    # Nor is the campaign held much below it
+    assert moments[-1] - started < 19 / 10 + 0.5
+
+
+async def test_paused_campaign_dials_nothing_until_resumed(store):
+    dialer = FakeSipDialer(answer_rate=1.0)
+    engine = CampaignEngine(store, dialer, max_concurrent_calls=10, calls_per_second=50, tick_seconds=0.05)
+    campaign = await create_campaign(engine, 20, max_concurrent_calls=2, calls_per_second=20)
+
+    await engine.start_campaign(campaign.id)
+    try:
+        while len(dialer.dials) < 3:
+            await asyncio.sleep(0.01)
+        await engine.pause_campaign(campaign.id)
+        paused_at = clock.monotonic()
+        loads = len(dialer.loaded)
+        await asyncio.sleep(0.5)
+        resumed_at = clock.monotonic()
+        await engine.start_campaign(campaign.id)
+        progress = await open_contacts_done(engine, campaign, closed=10)
+    finally:
+        await engine.stop()
+
+    assert not [moment for moment in dialer.dialed_at() if paused_at + 0.1 < moment < resumed_at]
+    assert progress.completed == 10
+    # The dialer looks the campaign's agent up again on resume
+    assert dialer.loaded[loads:] == [campaign.id]
+
+
+async def test_import_skips_invalid_and_duplicate_contacts(store):
+    engine = CampaignEngine(store, FakeSipDialer())
+    campaign = await engine.create_campaign(Campaign(id="campaign_import", user_id="test", agent_id="test-agent", name="Import"))
+
+    imported = await engine.import_contacts(campaign, [
+        CampaignContactInput(phone_number="+1 (555) 000-0001"),
+        CampaignContactInput(phone_number="+15550000001"),
+        CampaignContactInput(phone_number="not a number"),
+        CampaignContactInput(phone_number="+15550000002", timezone="Mars/Olympus"),
+        CampaignContactInput(phone_number="0044 20 7946 0000", timezone="Europe/London"),
+    ])
+    again = await engine.import_contacts(campaign, [CampaignContactInput(phone_number="+15550000001")])
+
+    assert imported["imported"] == 2
+    assert imported["duplicates"] == 1
+    assert [row["row"] for row in imported["invalid"]] == [2, 3]
+    assert again == {"imported": 0, "duplicates": 1, "invalid": []}
+    assert sorted(await store.timezones(campaign.id)) == ["Europe/London", "UTC"]
+
+
+def test_window_opens_in_the_contacts_timezone():
+    noon = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc).timestamp()
+    weekdays = CallingHours(start="09:00", end="17:00", days=[0, 1, 2, 3, 4])
+
+    assert window_opens_in(weekdays, "UTC", noon) == 0
+    # 08:00 in New York
+    assert window_opens_in(weekdays, "America/New_York", noon) == 3600
+    # Midnight to Tuesday 09:00 in UTC+12
+    assert window_opens_in(weekdays, CLOSED_TIMEZONE, noon) == 9 * 3600
+    assert window_opens_in(CallingHours(days=[]), "UTC", noon) is None
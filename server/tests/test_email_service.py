@@ -0,0 +1,165 @@
+import smtplib
+
+import pytest
+
+from src.models import Tool
+from src.services import email_service as email_module
+from src.services.email_service import EMAIL_TOPIC, EmailService, SmtpConnectionPool, get_email_template
+from src.services.outbox import STATUS_FAILED, Outbox
+
+
+class FakeSmtp:
+    """Records messages; ``refuse`` maps addresses to the SMTP code they are refused with"""
+
+    def __init__(self, refuse=None):
+        self.refuse = refuse or {}
+        self.sent = []
+
+    def send_message(self, message, to_addrs=None):
+        recipients = to_addrs or [address.strip() for address in message["To"].split(",")]
+        refused = {address: (self.refuse[address], b"refused") for address in recipients if address in self.refuse}
+        if len(refused) == len(recipients):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        self.sent.append((message, [address for address in recipients if address not in refused]))
+        return refused
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def smtp():
+    return FakeSmtp()
+
+
+@pytest.fixture
+def service(tmp_path, smtp, monkeypatch):
+    monkeypatch.setattr(email_module, "BASE_RETRY_SECONDS", 0.0)
+    pool = SmtpConnectionPool(host="smtp.test", port=25, size=1)
+    pool._connect = lambda: smtp
+    return EmailService(Outbox(str(tmp_path / "outbox.sqlite3")), pool, from_email="shop@example.com")
+
+
+def message(to, subject="Order confirmed"):
+    return {"to": to, "subject": subject, "text": "Thanks!", "html": None, "from_email": None, "from_name": "Shop", "reply_to": None}
+
+
+async def deliver_due(service):
+    entries = await service.outbox.claim(EMAIL_TOPIC, 20)
+    await service._deliver(entries)
+    return entries
+
+
+async def test_messages_are_sent_over_a_pooled_connection(service, smtp):
+    for index in range(3):
+        await service.outbox.put(EMAIL_TOPIC, message([f"customer{index}@example.com"]), tenant_id=f"tenant-{index}")
+
+    await deliver_due(service)
+
+    assert [recipients for _, recipients in smtp.sent] == [[f"customer{index}@example.com"] for index in range(3)]
+    assert smtp.sent[0][0]["From"] == "Shop <shop@example.com>"
+    assert service.pool.connections_opened == 1
+    assert await service.outbox.pending_count(EMAIL_TOPIC) == 0
+
+
+async def test_a_message_that_cannot_be_built_fails_alone(service, smtp):
+    await service.outbox.put(EMAIL_TOPIC, {"subject": "no recipients"}, tenant_id="a")
+    await service.outbox.put(EMAIL_TOPIC, message(["ok@example.com"]), tenant_id="b")
+
+    await deliver_due(service)
+
+    assert [recipients for _, recipients in smtp.sent] == [["ok@example.com"]]
+    assert service.outbox._count_sync(EMAIL_TOPIC, STATUS_FAILED) == 1
+    assert await service.outbox.pending_count(EMAIL_TOPIC) == 0
+
+
+async def test_partly_deferred_recipients_are_retried_on_their_own(service, smtp):
+    smtp.refuse = {"busy@example.com": 451}
+    await service.outbox.put(EMAIL_TOPIC, message(["ok@example.com", "busy@example.com"]), tenant_id="a")
+
+    await deliver_due(service)
+    smtp.refuse = {}
+    retried = await deliver_due(service)
+
+    assert retried[0].payload["retry_to"] == ["busy@example.com"]
+    assert [recipients for _, recipients in smtp.sent] == [["ok@example.com"], ["busy@example.com"]]
+    assert await service.outbox.pending_count(EMAIL_TOPIC) == 0
+
+
+async def test_partly_rejected_recipients_count_as_delivered(service, smtp):
+    smtp.refuse = {"unknown@example.com": 550}
+    await service.outbox.put(EMAIL_TOPIC, message(["ok@example.com", "unknown@example.com"]), tenant_id="a")
+
+    await deliver_due(service)
+
+    assert [recipients for _, recipients in smtp.sent] == [["ok@example.com"]]
+    assert await service.outbox.pending_count(EMAIL_TOPIC) == 0
+    assert service.outbox._count_sync(EMAIL_TOPIC, STATUS_FAILED) == 0
+
+
+async def test_fully_rejected_messages_fail_without_retry(service, smtp):
+    smtp.refuse = {"unknown@example.com": 550}
+    await service.outbox.put(EMAIL_TOPIC, message(["unknown@example.com"]), tenant_id="a")
+
+    await deliver_due(service)
+
+    assert service.outbox._count_sync(EMAIL_TOPIC, STATUS_FAILED) == 1
+
+
+async def test_lost_connections_retry_every_unsent_message(service, smtp):
+    def drop(message, to_addrs=None):
+        raise smtplib.SMTPServerDisconnected("gone")
+
+    smtp.send_message = drop
+    await service.outbox.put(EMAIL_TOPIC, message(["a@example.com"]), tenant_id="a")
+    await service.outbox.put(EMAIL_TOPIC, message(["b@example.com"]), tenant_id="b")
+
+    await deliver_due(service)
+    retried = await service.outbox.claim(EMAIL_TOPIC, 20)
+
+    assert [entry.attempts for entry in retried] == [1, 1]
+
+
+async def test_tenants_over_their_rate_are_deferred(service, smtp):
+    for _ in range(3):
+        await service.outbox.put(EMAIL_TOPIC, message(["a@example.com"]), tenant_id="busy-tenant")
+
+    deferred_for = await service._deliver(await service.outbox.claim(EMAIL_TOPIC, 20))
+
+    assert len(smtp.sent) == 2  # The tenant bucket holds 2 messages per second
+    assert deferred_for == pytest.approx(0.5)
+    assert await service.outbox.pending_count(EMAIL_TOPIC) == 1
+
+
+def test_templates_render_tool_parameters():
+    tool = Tool(
+        id="email-1",
+        user_id="user-1",
+        name="send_confirmation",
+        description="Send a confirmation",
+        type="email_send",
+        configuration={
+            "subjectTemplate": "Order {{ order.id }} for {{customer_name}}",
+            "bodyTemplate": "Hi {{customer_name}}, {{missing}}thanks!",
+            "toEmail": "orders@example.com",
+        },
+    )
+    template = get_email_template(tool)
+
+    rendered = template.render({"customer_name": "Ana", "order": {"id": 42}, "to_email": "ana@example.com; bo@example.com"})
+
+    assert rendered["subject"] == "Order 42 for Ana"
+    assert rendered["text"] == "Hi Ana, thanks!"
+    assert rendered["to"] == ["ana@example.com", "bo@example.com"]
+    assert get_email_template(tool) is template
+
+
+async def test_queueing_leaves_delivery_to_the_started_worker(service):
+    await service.enqueue("tenant-1", message(["customer@example.com"]))
+
+    # Job processes only write to the outbox; the API's lifespan runs the worker
+    assert service._worker is None
+    assert await service.outbox.pending_count(EMAIL_TOPIC) == 1
@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.services import endpoint_client
+from src.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+
+URL = "https://api.example.com/orders?id=1"
+ENDPOINT = "https://api.example.com/orders"
+
+
+def make_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.utils.circuit_breaker.time", lambda: now[0])
+    breaker = CircuitBreaker("endpoint", failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_on_error_rate_and_slow_calls():
+    failing = CircuitBreaker("failing", failure_threshold=100, min_calls=4, error_rate_threshold=0.5)
+    for failed in (True, False, True, False):
+        failing.record_failure() if failed else failing.record_success()
+    assert failing.state == OPEN
+
+    slow = CircuitBreaker("slow", min_calls=3, slow_call_seconds=1.0, slow_call_rate_threshold=0.6)
+    for latency in (2.0, 0.1, 3.0):
+        slow.record_success(latency)
+    assert slow.state == OPEN
+
+
+async def test_open_breakers_fail_fast_without_a_request(spooled_metrics):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503)
+
+    breakers = CircuitBreakerRegistry(failure_threshold=2, reset_timeout=60)
+    async with make_client(handler) as client:
+        for _ in range(2):
+            assert (await endpoint_client.request(client, "GET", URL, breakers=breakers)).status_code == 503
+        with pytest.raises(CircuitOpenError):
+            await endpoint_client.request(client, "GET", URL, breakers=breakers)
+
+    assert len(requests) == 2
+    registry = await spooled_metrics.drain()
+    requests_total = registry.counter("endpoint_requests_total")
+    assert requests_total.value(endpoint=ENDPOINT, outcome="error") == 2
+    assert requests_total.value(endpoint=ENDPOINT, outcome="fast_fail") == 1
+    assert registry.gauge("circuit_breaker_open").value(endpoint=ENDPOINT) == 1
+    assert registry.counter("circuit_breaker_transitions_total").value(endpoint=ENDPOINT, state=OPEN) == 1
+
+
+async def test_slow_gets_are_hedged(monkeypatch, spooled_metrics):
+    monkeypatch.setattr(endpoint_client, "hedge_delay", lambda endpoint: 0.05)
+    attempts = []
+
+    async def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"attempt": len(attempts)})
+
+    async with make_client(handler) as client:
+        response = await endpoint_client.request(
+            client, "GET", URL, hedge=True, breakers=CircuitBreakerRegistry()
+        )
+
+    assert response.json() == {"attempt": 2}
+    registry = await spooled_metrics.drain()
+    assert registry.counter("endpoint_hedged_requests_total").value(endpoint=ENDPOINT) == 1
+
+
+async def test_posts_are_never_hedged(monkeypatch):
+    monkeypatch.setattr(endpoint_client, "hedge_delay", lambda endpoint: 0.01)
+    attempts = []
+
+    async def handler(request):
+        attempts.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(201)
+
+    async with make_client(handler) as client:
+        await endpoint_client.request(client, "POST", URL, hedge=True, breakers=CircuitBreakerRegistry())
+
+    assert len(attempts) == 1
@@ -0,0 +1,150 @@
+import asyncio
+import json
+from time import perf_counter
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents.answering_machine import LIKELY_MACHINE, MACHINE, AmdResult
+from src.agents.call_answer import DialOutcome
+from src.models import CallStatus
+
+
+def make_ctx(job_metadata, participant_metadata="", delay=0.1):
+    async def connect(**kwargs):
+        await asyncio.sleep(delay)
+
+    async def wait_for_participant():
+        await asyncio.sleep(delay)
+        return SimpleNamespace(identity="caller", metadata=participant_metadata)
+
+    return SimpleNamespace(
+        proc=SimpleNamespace(userdata={"vad": object()}),
+        job=SimpleNamespace(room=SimpleNamespace(metadata=""), metadata=json.dumps(job_metadata)),
+        room=SimpleNamespace(name="room-1", remote_participants={}),
+        api=None,
+        connect=connect,
+        wait_for_participant=wait_for_participant,
+        add_shutdown_callback=lambda callback: None,
+        shutdown=lambda: None,
+    )
+
+
+@pytest.fixture
+def phone_agent(fake_firestore, spooled_metrics, monkeypatch):
+    from src.agents import phone_agent
+
+    loads, runs = [], []
+
+    async def load_agent_bundle(agent_id, setup_trace):
+        loads.append(agent_id)
+        await asyncio.sleep(0.15)
+        return SimpleNamespace(agent_id=agent_id)
+
+    async def run_realtime_agent(ctx, participant, bundle, tool_executor, answered_at=None, setup_trace=None):
+        runs.append(bundle.agent_id)
+
+    monkeypatch.setattr(phone_agent, "load_agent_bundle", load_agent_bundle)
+    monkeypatch.setattr(phone_agent, "run_realtime_agent", run_realtime_agent)
+    monkeypatch.setattr(phone_agent, "ToolExecutor", lambda: None)
+    phone_agent.loads, phone_agent.runs = loads, runs
+    return phone_agent
+
+
+async def test_agent_loads_while_the_room_connects_and_the_caller_joins(phone_agent):
+    started = perf_counter()
+    await phone_agent.entrypoint(make_ctx({"agent_id": "agent-1"}))
+
+    # connect (0.1s) and wait for the caller (0.1s) overlap the 0.15s load
+    assert perf_counter() - started < 0.3
+    assert phone_agent.loads == ["agent-1"]
+    assert phone_agent.runs == ["agent-1"]
+
+
+async def test_participant_metadata_overrides_the_job_agent(phone_agent):
+    ctx = make_ctx({"agent_id": "agent-1"}, participant_metadata=json.dumps({"agent_id": "agent-2"}))
+
+    await phone_agent.entrypoint(ctx)
+
+    assert phone_agent.loads == ["agent-1", "agent-2"]
+    assert phone_agent.runs == ["agent-2"]
+
+
+async def test_calls_without_an_agent_are_not_started(phone_agent):
+    await phone_agent.entrypoint(make_ctx({}))
+
+    assert phone_agent.loads == []
+    assert phone_agent.runs == []
+
+
+@pytest.fixture
+def outbound(phone_agent, monkeypatch):
+    """Outbound calls answered at once, screened with the verdict in ``outbound.verdict``"""
+    state = SimpleNamespace(verdict=LIKELY_MACHINE, screened=0, handled=[])
+
+    async def dial_outbound(ctx, phone_number, job_metadata):
+        ctx.room.remote_participants[phone_agent.OUTBOUND_IDENTITY] = SimpleNamespace(identity=phone_agent.OUTBOUND_IDENTITY, metadata="")
+        return DialOutcome(CallStatus.ACTIVE, 1.0)
+
+    class Listener:
+        async def detect(self):
+            state.screened += 1
+            return AmdResult(state.verdict, "long_greeting" if state.verdict == LIKELY_MACHINE else "transcript", 2.0)
+
+        async def aclose(self):
+            pass
+
+    async def handle_answering_machine(ctx, listener, result, setup_task):
+        state.handled.append(result.verdict)
+
+    async def report(*args):
+        pass
+
+    monkeypatch.setattr(phone_agent, "dial_outbound", dial_outbound)
+    monkeypatch.setattr(phone_agent, "answering_machine_listener", lambda ctx, participant, setup_task: Listener())
+    monkeypatch.setattr(phone_agent, "handle_answering_machine", handle_answering_machine)
+    monkeypatch.setattr(phone_agent, "_report_dial_outcome", report)
+    monkeypatch.setattr(phone_agent, "_report_amd", report)
+    return state
+
+
+async def test_outbound_calls_are_not_screened_unless_asked(phone_agent, outbound):
+    await phone_agent.entrypoint(make_ctx({"agent_id": "agent-1", "phone_number": "+15551234567"}))
+
+    assert outbound.screened == 0
+    assert phone_agent.runs == ["agent-1"]
+
+
+async def test_machine_cadence_alone_is_greeted(phone_agent, outbound):
+    await phone_agent.entrypoint(make_ctx({"agent_id": "agent-1", "phone_number": "+15551234567", "amd": True}))
+
+    assert outbound.screened == 1
+    assert outbound.handled == []
+    assert phone_agent.runs == ["agent-1"]
+
+
+async def test_confirmed_machine_is_not_greeted(phone_agent, outbound):
+    outbound.verdict = MACHINE
+
+    await phone_agent.entrypoint(make_ctx({"agent_id": "agent-1", "phone_number": "+15551234567", "amd": True}))
+
+    assert outbound.handled == [MACHINE]
+    assert phone_agent.runs == []
+
+
+async def test_listener_transcribes_in_the_agents_language(phone_agent, monkeypatch):
+    monkeypatch.setattr(phone_agent.settings, "deepgram_api_key", "test-key")
+    monkeypatch.setenv("DEEPGRAM_API_KEY", "test-key")
+    ctx = make_ctx({})
+
+    def listener_for(language):
+        setup_task = asyncio.get_running_loop().create_future()
+        setup_task.set_result(SimpleNamespace(agent=SimpleNamespace(language=language)))
+        return phone_agent.answering_machine_listener(ctx, None, setup_task)
+
+    spanish = listener_for("es-ES")
+    assert spanish.detector.language == "es"
+    assert spanish.stt is not None
+    # No voicemail phrases, or no agent yet: the cadence is screened and the callee greeted
+    assert listener_for("ja-JP").stt is None
+    assert phone_agent.answering_machine_listener(ctx, None, None).stt is None
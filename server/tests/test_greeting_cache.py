@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import pytest
+
+from src.services import greeting_cache as greeting_module
+from src.services.greeting_cache import GreetingAudio, GreetingCache
+
+
+def audio(seconds: float = 0.1, sample_rate: int = 8000) -> GreetingAudio:
+    return GreetingAudio(b"\x01\x00" * int(seconds * sample_rate), sample_rate)
+
+
+@pytest.fixture
+def cache(tmp_path) -> GreetingCache:
+    return GreetingCache(str(tmp_path), max_memory_bytes=10_000)
+
+
+async def test_audio_is_shared_through_disk(cache, tmp_path):
+    key = GreetingCache.key("agent-1", "cartesia:voice", "en", "Hi, thanks for calling!")
+    await cache.put(key, audio())
+
+    other_process = GreetingCache(str(tmp_path), max_memory_bytes=10_000)
+    loaded = await other_process.get(key)
+
+    assert loaded.pcm == audio().pcm and loaded.sample_rate == 8000
+    assert await other_process.get(GreetingCache.key("agent-1", "cartesia:voice", "es", "Hi, thanks for calling!")) is None
+
+
+async def test_frames_cover_the_audio_in_20ms_chunks():
+    frames = [frame async for frame in audio(0.05).frames()]
+
+    assert [frame.samples_per_channel for frame in frames] == [160, 160, 80]
+
+
+async def test_memory_is_bounded_least_recently_used_first(cache):
+    for name in ("a", "b", "c"):
+        await cache.put(name, audio(0.3))  # 4800 bytes each
+    assert list(cache._memory) == ["b", "c"]
+
+
+async def test_disk_is_pruned_least_recently_used_first(tmp_path):
+    cache = GreetingCache(str(tmp_path), max_memory_bytes=10_000, max_disk_bytes=4000)
+    await cache.put("old", audio(0.2))
+    os.utime(tmp_path / "old.wav", (1, 1))
+    await cache.put("new", audio(0.2))
+
+    assert sorted(os.listdir(tmp_path)) == ["new.wav"]
+
+
+async def test_invalidate_drops_every_greeting_of_an_agent(cache, tmp_path):
+    await cache.put("agent-1-aaa", audio())
+    await cache.put("agent-12-bbb", audio())
+
+    cache.invalidate_agent("agent-1")
+
+    assert await cache.get("agent-1-aaa") is None
+    assert await cache.get("agent-12-bbb") is not None
+
+
+async def test_misses_are_synthesized_once_in_the_background(cache, monkeypatch):
+    calls = []
+
+    async def synthesize(tts, text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return audio()
+
+    monkeypatch.setattr(greeting_module, "synthesize", synthesize)
+    cache.warm("agent-1-aaa", tts=None, text="Hello")
+    cache.warm("agent-1-aaa", tts=None, text="Hello")
+    await asyncio.gather(*cache._pending.values())
+
+    assert calls == ["Hello"]
+    assert await cache.get("agent-1-aaa") is not None
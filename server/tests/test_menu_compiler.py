@@ -0,0 +1,76 @@
+import pytest
+
+from src.services import menu_compiler
+from src.services.menu_compiler import (
+    EMPTY_MENU_RESPONSE,
+    compile_menu,
+    compile_tool_configuration,
+    get_compiled_menu,
+    normalize_price,
+    price_value,
+)
+
+MENU_ITEMS = [
+    {"name": "Margherita", "price": "12.99", "category": "Pizza", "description": "Tomato and basil"},
+    {"name": "Pepperoni Passion", "price": 15.5, "category": "Pizza"},
+    {"name": "Coke", "price": "$2 USD", "category": "Drinks"},
+]
+
+
+@pytest.mark.parametrize("raw, text, value", [
+    ("12.99", "$12.99", 12.99),
+    (15.5, "$15.5", 15.5),
+    ("$2 USD", "$2", 2.0),
+    ("1,299.00", "$1,299.00", 1299.0),
+    ("Catering tray $1,250", "$1,250", 1250.0),
+    ("market price", None, None),
+    (None, None, None),
+])
+def test_normalize_price(raw, text, value):
+    assert normalize_price(raw) == text
+    assert price_value(text) == value
+
+
+def test_compile_menu_groups_items_by_category():
+    compiled = compile_menu(MENU_ITEMS)
+
+    assert compiled["itemCount"] == 3
+    assert [category["name"] for category in compiled["categories"]] == ["Pizza", "Drinks"]
+    assert compiled["categories"][0]["items"][0]["priceValue"] == 12.99
+    assert "• Margherita - $12.99 - Tomato and basil" in compiled["response"]
+
+
+def test_compile_empty_menu():
+    assert compile_menu([])["response"] == EMPTY_MENU_RESPONSE
+
+
+def test_compile_tool_configuration_reuses_up_to_date_menu():
+    configuration = compile_tool_configuration({"menuItems": MENU_ITEMS})
+    assert compile_tool_configuration(configuration) is configuration
+    assert compile_tool_configuration({"greeting": "hi"}) == {"greeting": "hi"}
+
+
+def test_get_compiled_menu_recompiles_when_items_changed_outside_save_path():
+    configuration = compile_tool_configuration({"menuItems": MENU_ITEMS})
+    assert get_compiled_menu(configuration) is configuration["compiledMenu"]
+
+    edited = {**configuration, "menuItems": MENU_ITEMS + [{"name": "Tiramisu", "price": "7"}]}
+    compiled = get_compiled_menu(edited)
+
+    assert compiled["itemCount"] == 4
+    assert "Tiramisu" in compiled["response"]
+
+
+def test_get_compiled_menu_hashes_a_loaded_configuration_once(monkeypatch):
+    configuration = compile_tool_configuration({"menuItems": list(MENU_ITEMS)})
+    hashes = []
+    compute_menu_hash = menu_compiler.compute_menu_hash
+    monkeypatch.setattr(menu_compiler, "compute_menu_hash", lambda items: hashes.append(items) or compute_menu_hash(items))
+
+    for _ in range(3):
+        assert get_compiled_menu(configuration) is configuration["compiledMenu"]
+    assert len(hashes) == 1
+
+    # A reloaded configuration is checked again
+    get_compiled_menu({**configuration, "menuItems": list(MENU_ITEMS)})
+    assert len(hashes) == 2
@@ -0,0 +1,72 @@
+from src.services.menu_compiler import compile_tool_configuration
+from src.services.menu_index import FULL_MENU_MAX_ITEMS, MenuIndex, get_menu_index, tokenize
+
+MENU_ITEMS = [
+    {"name": "Margherita", "price": "12.99", "category": "Pizza", "description": "Tomato, mozzarella and basil"},
+    {"name": "Vegan Garden Pizza", "price": "14.50", "category": "Pizza", "description": "Vegan cheese and vegetables"},
+    {"name": "Pepperoni Passion", "price": "15.50", "category": "Pizza"},
+    {"name": "Caesar Salad", "price": "9", "category": "Salads", "description": "Romaine and parmesan"},
+    {"name": "Coke", "price": "2.50", "category": "Drinks"},
+    {"name": "Catering Tray", "price": "1,250.00", "category": "Catering"},
+]
+
+
+def make_index(items=MENU_ITEMS) -> MenuIndex:
+    return get_menu_index(compile_tool_configuration({"menuItems": items}))
+
+
+def test_tokenize_stems_plurals_and_drops_stop_words():
+    assert tokenize("Do you have any pizzas with berries?") == ["pizza", "berry"]
+
+
+def test_search_ranks_items_matching_every_token_first():
+    items, total = make_index().search("vegan pizza")
+    assert [item["name"] for item in items] == ["Vegan Garden Pizza"]
+    assert total == 1
+
+
+def test_search_tolerates_misspellings():
+    items, _ = make_index().search("peperoni")
+    assert items[0]["name"] == "Pepperoni Passion"
+
+
+def test_search_filters_by_category_and_price():
+    index = make_index()
+
+    items, _ = index.search(category="pizzas", max_price=14.5)
+    assert [item["name"] for item in items] == ["Margherita", "Vegan Garden Pizza"]
+
+    items, _ = index.search(min_price=1000)
+    assert [item["name"] for item in items] == ["Catering Tray"]
+
+
+def test_query_limits_results_and_reports_the_rest():
+    result = make_index().query({"category": "Pizza", "limit": 2})
+    assert len(result["items"]) == 2
+    assert result["totalMatches"] == 3
+    assert "1 more options" in result["response"]
+
+
+def test_query_without_matches_lists_categories():
+    result = make_index().query({"query": "sushi"})
+    assert result["items"] == []
+    assert result["totalMatches"] == 0
+    assert "Pizza, Salads, Drinks and Catering" in result["response"]
+
+
+def test_unfiltered_query_reads_small_menus_in_full():
+    index = make_index()
+    assert index.query({})["response"] == index.response
+
+    large = make_index([{"name": f"Dish {n}", "price": n, "category": "Mains"} for n in range(FULL_MENU_MAX_ITEMS + 1)])
+    overview = large.query({})
+    assert overview["categories"] == [{"name": "Mains", "itemCount": FULL_MENU_MAX_ITEMS + 1}]
+
+
+def test_indexes_are_cached_per_menu_content():
+    assert make_index() is make_index()
+
+
+def test_json_schema_lists_categories():
+    schema = make_index().json_schema()
+    assert schema["properties"]["category"]["enum"] == ["Pizza", "Salads", "Drinks", "Catering"]
@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents.phone_agent import CallActions
+from src.services.menu_compiler import compile_tool_configuration
+from src.services.order_parser import format_order_lines, get_order_parser
+
+MENU_ITEMS = [
+    {"name": "Pepperoni Passion", "price": "15.50", "category": "Pizza", "description": "Pepperoni, mozzarella and onions"},
+    {"name": "Margherita", "price": "12.99", "category": "Pizza", "description": "Tomato, mozzarella and basil"},
+    {"name": "Caesar Salad", "price": "9", "category": "Salads"},
+    {"name": "Coke", "price": "2.50", "category": "Drinks"},
+    {"name": "Mac and Cheese", "price": "8", "category": "Sides"},
+    {"name": "Large Fries", "price": "4", "category": "Sides"},
+]
+
+
+@pytest.fixture
+def parser():
+    return get_order_parser(compile_tool_configuration({"menuItems": MENU_ITEMS}))
+
+
+def summary(parsed):
+    return [(line["quantity"], line["name"], line["size"], line["modifiers"]) for line in parsed["lines"]]
+
+
+def test_quantities_and_joined_item_names(parser):
+    parsed = parser.parse("2 pepperoni passion pizzas, mac and cheese and coke x3")
+
+    assert summary(parsed) == [
+        (2, "Pepperoni Passion", None, []),
+        (1, "Mac and Cheese", None, []),
+        (3, "Coke", None, []),
+    ]
+    assert parsed["total"] == 46.5
+    assert parsed["complete"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("7 up", [(1, "7 Up", None, [])]),
+    ("3 7 up", [(3, "7 Up", None, [])]),
+    ("two 3 cheese pizzas", [(2, "3 Cheese Pizza", None, [])]),
+    ("one 2 piece chicken and a 7 up", [(1, "2 Piece Chicken", None, []), (1, "7 Up", None, [])]),
+    ("two dozen cokes", [(24, "Coke", None, [])]),
+])
+def test_numbers_that_start_item_names_are_not_quantities(text, expected):
+    parser = get_order_parser(compile_tool_configuration({"menuItems": MENU_ITEMS + [
+        {"name": "7 Up", "price": "2", "category": "Drinks"},
+        {"name": "3 Cheese Pizza", "price": "13", "category": "Pizza"},
+        {"name": "2 Piece Chicken", "price": "6", "category": "Mains"},
+    ]}))
+
+    parsed = parser.parse(text)
+
+    assert summary(parsed) == expected
+    assert parsed["complete"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("large pepperoni", (1, "Pepperoni Passion", "large", [])),
+    ("pepperoni pizza no onions", (1, "Pepperoni Passion", None, ["no onions"])),
+    ("margherita with extra cheese", (1, "Margherita", None, ["extra cheese"])),
+    ("3 large cokes", (3, "Coke", "large", [])),
+    ("an extra large margherita without basil", (1, "Margherita", "extra large", ["without basil"])),
+    ("margherita, extra cheese", (1, "Margherita", None, ["extra cheese"])),
+    ("large fries", (1, "Large Fries", None, [])),
+])
+def test_sizes_and_modifiers_are_carried_on_the_line(parser, text, expected):
+    parsed = parser.parse(text)
+    assert summary(parsed) == [expected]
+    assert parsed["complete"]
+
+
+def test_formatted_lines_parse_back_into_the_same_lines(parser):
+    parsed = parser.parse("2 large pepperoni no onions extra cheese, a margherita and 3 cokes")
+    text = format_order_lines(parsed["lines"])
+
+    assert text == "2 x Pepperoni Passion (large, no onions, extra cheese) ($31.00), 1 x Margherita ($12.99), 3 x Coke ($7.50)"
+    reparsed = parser.parse(text)
+    assert summary(reparsed) == summary(parsed)
+    assert reparsed["total"] == parsed["total"] == 51.49
+
+
+def test_same_item_with_different_sizes_stays_separate(parser):
+    parsed = parser.parse("a margherita, a margherita and a large margherita")
+    assert summary(parsed) == [(2, "Margherita", None, []), (1, "Margherita", "large", [])]
+
+
+def test_unknown_items_are_reported(parser):
+    parsed = parser.parse("2 sushi rolls and a coke")
+    assert summary(parsed) == [(1, "Coke", None, [])]
+    assert parsed["unmatched"] == [{"phrase": "sushi rolls", "quantity": 2}]
+    assert not parsed["complete"]
+
+
+def test_ambiguous_phrases_list_candidates(parser):
+    parsed = parser.parse("a pizza")
+    assert parsed["lines"] == []
+    assert [candidate["name"] for candidate in parsed["ambiguous"][0]["candidates"]] == ["Pepperoni Passion", "Margherita"]
+
+
+def price_order(parser, items):
+    params = {"items": items}
+    warning = CallActions._price_order(SimpleNamespace(order_parser=parser), params)
+    return params, warning
+
+
+def test_price_order_rewrites_complete_orders(parser):
+    params, warning = price_order(parser, "2 large pepperoni and a coke")
+    assert warning is None
+    assert params["items"] == "2 x Pepperoni Passion (large) ($31.00), 1 x Coke ($2.50)"
+    assert params["total_amount"] == "$33.50"
+
+
+def test_price_order_places_partly_recognised_orders_with_a_warning(parser):
+    params, warning = price_order(parser, "2 large pepperoni and a bottle of wine")
+    assert params["items"] == "2 x Pepperoni Passion (large) ($31.00), 1 x bottle of wine"
+    assert params["total_amount"] == "$31.00 plus unconfirmed items"
+    assert "'bottle of wine' is not on the menu" in warning
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.config import settings
+
+
+@pytest.fixture
+def phone_agent(fake_firestore, monkeypatch):
+    from src.agents import phone_agent
+
+    loads = []
+    monkeypatch.setattr(phone_agent.silero.VAD, "load", lambda: loads.append("vad") or object())
+    phone_agent.vad_loads = loads
+    return phone_agent
+
+
+def test_prewarm_loads_the_vad_once_per_process(phone_agent, monkeypatch):
+    monkeypatch.setattr(settings, "agent_prewarm", True)
+    proc = SimpleNamespace(userdata={})
+
+    phone_agent.prewarm(proc)
+    first = phone_agent.get_vad(SimpleNamespace(proc=proc))
+    second = phone_agent.get_vad(SimpleNamespace(proc=proc))
+
+    assert phone_agent.vad_loads == ["vad"]
+    assert first is second is proc.userdata["vad"]
+
+
+def test_unprewarmed_processes_load_the_vad_on_their_first_call(phone_agent, monkeypatch):
+    monkeypatch.setattr(settings, "agent_prewarm", False)
+    proc = SimpleNamespace(userdata={})
+
+    phone_agent.prewarm(proc)
+    assert phone_agent.vad_loads == []
+
+    ctx = SimpleNamespace(proc=proc)
+    assert phone_agent.get_vad(ctx) is phone_agent.get_vad(ctx)
+    assert phone_agent.vad_loads == ["vad"]
@@ -0,0 +1,78 @@
+import gzip
+import json
+
+import httpx
+import pytest
+
+from src.models import Tool
+from src.services import endpoint_client
+from src.services.response_projection import TRUNCATED_KEY, ResponseProjection, get_response_projection, parse_path
+from src.utils.circuit_breaker import CircuitBreakerRegistry
+
+ORDER = {
+    "order": {
+        "id": "A1",
+        "status": "shipped",
+        "items": [{"name": "Lamp", "sku": "L-1"}, {"name": "Desk", "sku": "D-2"}],
+        "internal": {"warehouse": "north"},
+    },
+    "eta": "Tuesday",
+}
+
+
+def test_parse_path():
+    assert parse_path("$.order.items[*].name") == ["order", "items", "*", "name"]
+    assert parse_path("order.items[1]") == ["order", "items", 1]
+    with pytest.raises(ValueError):
+        parse_path("$")
+
+
+def test_projection_keeps_only_listed_fields():
+    projection = ResponseProjection(fields=["order.status", "order.items[*].name", "$.eta"])
+
+    assert projection.apply(ORDER) == {
+        "order": {"status": "shipped", "items": [{"name": "Lamp"}, {"name": "Desk"}]},
+        "eta": "Tuesday",
+    }
+
+
+def test_projection_caps_items_strings_and_bytes():
+    projection = ResponseProjection(max_items=2, max_string_length=5, max_bytes=10_000)
+    assert projection.apply({"list": [1, 2, 3], "note": "abcdefgh"}) == {
+        "list": [1, 2], "note": "abcde…", TRUNCATED_KEY: True,
+    }
+
+    small = ResponseProjection(max_bytes=60)
+    result = small.apply({"rows": [{"n": index, "text": "x" * 10} for index in range(20)]})
+    assert result[TRUNCATED_KEY] is True
+    assert len(json.dumps(result)) < 100
+
+
+def test_projections_are_compiled_once_per_configuration():
+    tool = Tool(id="api", user_id="u", name="api", description="", type="custom_api",
+                configuration={"responseProjection": {"fields": ["eta"]}})
+
+    assert get_response_projection(tool) is get_response_projection(tool)
+    edited = tool.model_copy(update={"configuration": {"responseProjection": {"fields": ["order.id"]}}})
+    assert get_response_projection(edited).apply(ORDER) == {"order": {"id": "A1"}}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+async def test_bodies_are_read_only_up_to_the_limit(compress):
+    body = json.dumps({"rows": ["x" * 100] * 100}).encode()
+
+    def handler(request):
+        if compress:
+            return httpx.Response(200, content=gzip.compress(body), headers={"Content-Encoding": "gzip"})
+        return httpx.Response(200, content=body)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(endpoint_client.ResponseTooLargeError):
+            await endpoint_client.request(
+                client, "GET", "https://api.example.com/rows", breakers=CircuitBreakerRegistry(), max_bytes=1000
+            )
+        response = await endpoint_client.request(
+            client, "GET", "https://api.example.com/rows", breakers=CircuitBreakerRegistry(), max_bytes=len(body)
+        )
+
+    assert response.json()["rows"][0] == "x" * 100
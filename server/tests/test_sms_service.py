@@ -0,0 +1,181 @@
+import httpx
+import pytest
+
+from src.services import sms_service as sms_module
+from src.services.outbox import STATUS_FAILED, Outbox
+from src.services.sms_service import SMS_TOPIC, SmsError, SmsService
+from src.utils.rate_limiter import TokenBucket
+
+
+def make_service(handler, **kwargs) -> SmsService:
+    service = SmsService(
+        account_sid="ACtest",
+        auth_token="secret",
+        from_number="+15550000000",
+        base_url="https://twilio.test",
+        messages_per_second=kwargs.pop("messages_per_second", 1000),
+        max_concurrency=kwargs.pop("max_concurrency", 2),
+        **kwargs,
+    )
+    service._client = httpx.AsyncClient(base_url=service.base_url, transport=httpx.MockTransport(handler))
+    return service
+
+
+def accepted(request: httpx.Request, sid: str = "SM1") -> httpx.Response:
+    form = dict(item.split("=", 1) for item in request.content.decode().split("&"))
+    return httpx.Response(201, json={"sid": sid, "status": "queued", "to": form["To"].replace("%2B", "+"), "from": "+15550000000"})
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(sms_module, "BASE_BACKOFF_SECONDS", 0.0)
+
+
+async def test_send_posts_to_messages_endpoint():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return accepted(request)
+
+    service = make_service(handler)
+    try:
+        result = await service.send("+15551234567", "Hello")
+    finally:
+        await service.close()
+
+    assert result == {"message_sid": "SM1", "status": "queued", "to": "+15551234567", "from": "+15550000000"}
+    assert requests[0].url.path == "/2010-04-01/Accounts/ACtest/Messages.json"
+
+
+async def test_throttled_and_server_errors_are_retried():
+    answers = iter([
+        httpx.Response(429, headers={"Retry-After": "0"}, json={"code": 20429, "message": "Too Many Requests"}),
+        httpx.Response(503, json={"message": "Service Unavailable"}),
+    ])
+
+    def handler(request):
+        return next(answers, None) or accepted(request)
+
+    service = make_service(handler, max_retries=3)
+    try:
+        result = await service.send("+15551234567", "Hello")
+    finally:
+        await service.close()
+
+    assert result["message_sid"] == "SM1"
+
+
+async def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"code": 21211, "message": "Invalid 'To' Phone Number"})
+
+    service = make_service(handler, max_retries=3)
+    try:
+        with pytest.raises(SmsError) as error:
+            await service.send("+1", "Hello")
+    finally:
+        await service.close()
+
+    assert len(calls) == 1
+    assert error.value.status_code == 400
+    assert error.value.code == 21211
+
+
+async def test_send_batch_reports_each_message():
+    def handler(request):
+        if b"%2B1000" in request.content:
+            return httpx.Response(400, json={"message": "Invalid number"})
+        return accepted(request)
+
+    service = make_service(handler)
+    try:
+        results = await service.send_batch([
+            {"to": "+15551234567", "body": "One"},
+            {"to": "+1000", "body": "Two"},
+        ])
+    finally:
+        await service.close()
+
+    assert results[0]["success"] is True
+    assert results[1]["success"] is False
+    assert results[1]["to"] == "+1000"
+
+
+async def deliver_due(service):
+    for entry in await service.outbox.claim(SMS_TOPIC, 20):
+        await service._deliver_entry(entry)
+
+
+async def test_send_without_waiting_queues_in_the_outbox(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return accepted(request)
+
+    service = make_service(handler, outbox=Outbox(str(tmp_path / "outbox.sqlite3")))
+    try:
+        result = await service.send("+15551234567", "Hello", wait=False)
+        assert result["status"] == "queued"
+        # Stored for the API's delivery worker, not sent by the process that queued it
+        assert not requests
+        assert await service.outbox.pending_count(SMS_TOPIC) == 1
+
+        await deliver_due(service)
+    finally:
+        await service.close()
+
+    assert len(requests) == 1
+    assert await service.outbox.pending_count(SMS_TOPIC) == 0
+
+
+async def test_queued_messages_are_retried_or_failed(tmp_path):
+    def handler(request):
+        if "%2B1000" in request.content.decode():
+            return httpx.Response(400, json={"code": 21211, "message": "Invalid 'To' Phone Number"})
+        return httpx.Response(503)
+
+    service = make_service(handler, max_retries=0, outbox=Outbox(str(tmp_path / "outbox.sqlite3")))
+    try:
+        await service.send_batch([{"to": "+1000", "body": "a"}, {"to": "+15551234567", "body": "b"}], wait=False)
+        await deliver_due(service)
+    finally:
+        await service.close()
+
+    assert service.outbox._count_sync(SMS_TOPIC, STATUS_FAILED) == 1
+    # The server error is retried later
+    assert await service.outbox.pending_count(SMS_TOPIC) == 1
+    assert await service.outbox.claim(SMS_TOPIC, 20) == []
+
+
+async def test_token_bucket_spreads_acquisitions(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.utils.rate_limiter.monotonic", lambda: now[0])
+    bucket = TokenBucket(2, burst=1)
+
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    now[0] += 0.5
+    assert bucket.try_acquire()
+
+    bucket.pause(1.0)
+    now[0] += 0.5
+    assert not bucket.try_acquire()
+    now[0] += 1.0
+    assert bucket.try_acquire()
+
+
+def test_token_bucket_tells_when_the_next_token_is_due(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.utils.rate_limiter.monotonic", lambda: now[0])
+    bucket = TokenBucket(4, burst=1)
+
+    assert bucket.wait_seconds() == 0.0
+    assert bucket.try_acquire()
+    assert bucket.wait_seconds() == 0.25
+    now[0] += 0.1
+    assert abs(bucket.wait_seconds() - 0.15) < 1e-9
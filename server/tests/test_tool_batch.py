@@ -0,0 +1,99 @@
+import asyncio
+
+from src.models import Tool, ToolExecutionRequest
+from src.services.tool_executor import ToolExecutor
+from src.services.usage_recorder import UsageRecorder
+
+
+def make_tool(tool_id: str, **kwargs) -> Tool:
+    return Tool(id=tool_id, user_id="user-1", name=tool_id, description="", type="function", **kwargs)
+
+
+class StubExecutor(ToolExecutor):
+    """Runs each tool as a sleep named by its id, e.g. "sleep-0.2" or "fail" """
+
+    def __init__(self, tools):
+        super().__init__()
+        self.tools = {tool.id: tool for tool in tools}
+        self.running = 0
+        self.peak = 0
+
+    async def get_tools(self, tool_ids):
+        return {tool_id: self.tools[tool_id] for tool_id in tool_ids if tool_id in self.tools}
+
+    async def _execute_tool(self, tool, parameters):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            if tool.id == "fail":
+                raise RuntimeError("upstream error")
+            await asyncio.sleep(float(tool.id.split("-")[1]))
+            return {"tool": tool.id, **parameters}
+        finally:
+            self.running -= 1
+
+
+def requests(*tool_ids):
+    return [ToolExecutionRequest(tool_id=tool_id, parameters={"n": index}) for index, tool_id in enumerate(tool_ids)]
+
+
+async def test_batches_run_concurrently_and_keep_request_order(fake_firestore):
+    executor = StubExecutor([make_tool("sleep-0.2"), make_tool("sleep-0.1"), make_tool("fail")])
+
+    started = asyncio.get_running_loop().time()
+    responses = await executor.execute_many(requests("sleep-0.2", "sleep-0.1", "fail", "missing"))
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert elapsed < 0.3
+    assert [response.success for response in responses] == [True, True, False, False]
+    assert responses[0].result == {"tool": "sleep-0.2", "n": 0}
+    assert responses[2].error == "upstream error"
+    assert responses[3].error == "Tool missing not found"
+
+
+async def test_concurrency_is_bounded(fake_firestore):
+    executor = StubExecutor([make_tool("sleep-0.05")])
+
+    await executor.execute_many(requests(*["sleep-0.05"] * 10), max_concurrency=3)
+
+    assert executor.peak == 3
+
+
+async def test_slow_tools_only_fail_their_own_entry(fake_firestore):
+    executor = StubExecutor([make_tool("sleep-5"), make_tool("sleep-0")])
+
+    responses = await executor.execute_many(requests("sleep-5", "sleep-0"), timeout=0.1)
+
+    assert responses[0].error == "Tool sleep-5 timed out after 0.1s"
+    assert responses[1].success
+
+
+async def test_usage_is_written_in_batches(fake_firestore):
+    fake_firestore.collection("tools").document("menu").set({"usageCount": 1})
+    recorder = UsageRecorder()
+
+    recorder.record("menu", success=True, call_id="call-1", agent_id="agent-1")
+    recorder.record("menu", success=True)
+    recorder.record("menu", success=False, call_id="call-1")
+    await recorder.flush()
+    await recorder.stop()
+
+    assert fake_firestore.commits == 1
+    assert fake_firestore.documents["tools/menu"]["usageCount"] == 3
+    assert fake_firestore.documents["tools/menu"]["failureCount"] == 1
+    audit = [document for path, document in fake_firestore.documents.items() if path.startswith("toolUsage/")]
+    assert sorted(document["success"] for document in audit) == [False, True]
+
+
+def test_usage_of_deleted_tools_does_not_fail_the_batch(fake_firestore):
+    from src.services.database import db_service
+
+    fake_firestore.collection("tools").document("menu").set({"usageCount": 0})
+    db_service.write_tool_usage_batch([
+        {"tool_id": "deleted", "success": True, "call_id": "call-1"},
+        {"tool_id": "menu", "success": True, "call_id": "call-1"},
+    ])
+
+    assert "tools/deleted" not in fake_firestore.documents
+    assert fake_firestore.documents["tools/menu"]["usageCount"] == 1
+    assert len([path for path in fake_firestore.documents if path.startswith("toolUsage/")]) == 2
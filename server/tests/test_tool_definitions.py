@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from livekit.agents.llm import tool_context
+
+from src.agents.tool_definitions import compile_tool, compile_tools
+from src.models import Agent, Tool
+from src.services.menu_compiler import compile_tool_configuration
+
+MENU = compile_tool_configuration({"menuItems": [
+    {"name": "Margherita", "price": "12.99", "category": "Pizza"},
+    {"name": "Coke", "price": "2.50", "category": "Drinks"},
+]})
+
+
+def make_tool(tool_id, name, type="function", **kwargs) -> Tool:
+    return Tool(id=tool_id, user_id="user-1", name=name, description=kwargs.pop("description", ""), type=type, **kwargs)
+
+
+class FakeActions:
+    """The ``CallActions`` a compiled tool reaches through ``RunContext.userdata``"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def execute_custom_tool(self, name, params):
+        self.calls.append((name, params))
+        return {"ok": True}
+
+    def _price_order(self, params):
+        return None
+
+
+def test_menu_tools_get_a_query_schema_of_the_menu_categories():
+    compiled = compile_tool("menu", make_tool("menu", "menu", configuration=MENU))
+
+    info = tool_context.get_raw_function_info(compiled)
+    assert info.name == "menu"
+    assert "Searches the restaurant menu" in info.raw_schema["description"]
+    assert "Pizza" in str(info.raw_schema["parameters"])
+
+
+def test_order_tools_take_typed_parameters():
+    compiled = compile_tool("order", make_tool("order", "order", type="ai_generated"))
+
+    info = tool_context.get_function_info(compiled)
+    assert info.name == "order"
+    assert "Processes a customer's order" in info.description
+
+
+async def test_schema_tools_pass_their_arguments_to_the_call():
+    schema = {"type": "object", "properties": {"date": {"type": "string"}}, "required": ["date"]}
+    compiled = compile_tool("slots-1", make_tool("slots-1", "check_slots", json_schema=schema))
+    actions = FakeActions()
+
+    info = tool_context.get_raw_function_info(compiled)
+    assert info.raw_schema["parameters"]["required"] == ["date"]
+    assert await compiled({"date": "2026-10-20"}, SimpleNamespace(userdata=actions)) == {"ok": True}
+    assert actions.calls == [("check_slots", {"date": "2026-10-20"})]
+
+
+def test_tools_missing_from_the_database_still_get_a_definition():
+    agent = Agent(id="agent-1", user_id="user-1", name="Pizzeria", tools=["menu-1", "unknown"])
+
+    compiled = compile_tools(agent, {"menu-1": make_tool("menu-1", "menu", configuration=MENU)})
+
+    assert len(compiled) == 2
+    assert tool_context.get_function_info(compiled[1]).name == "tool_unknown"
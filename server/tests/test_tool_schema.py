@@ -0,0 +1,48 @@
+from src.agents.tool_schema import compile_parameters
+
+
+def test_loose_types_are_normalised():
+    compiled = compile_parameters({
+        "type": "object",
+        "properties": {
+            "count": {"type": "int"},
+            "when": {"type": "datetime", "title": "When", "x-ui": "picker"},
+            "amount": {"type": "string|number"},
+            "tags": {"type": "list"},
+            "size": {"enum": ["S", "M", "M"]},
+            "guests": {"minimum": 1},
+        },
+        "required": ["count", "missing"],
+    })
+
+    properties = compiled["properties"]
+    assert properties["count"] == {"type": "integer"}
+    assert properties["when"] == {"type": "string"}
+    assert properties["amount"] == {"type": ["string", "number"]}
+    assert properties["tags"] == {"type": "array", "items": {"type": "string"}}
+    assert properties["size"] == {"type": "string", "enum": ["S", "M"]}
+    assert properties["guests"] == {"type": "number", "minimum": 1}
+    assert compiled["required"] == ["count"]
+    assert compiled["additionalProperties"] is False
+
+
+def test_nested_objects_and_arrays_keep_their_structure():
+    compiled = compile_parameters({
+        "properties": {
+            "items": {"type": "array", "items": {"properties": {"name": {"type": "str"}, "qty": {"type": "int"}}, "required": ["name"]}},
+            "choice": {"anyOf": [{"type": "int"}, {"type": "text"}]},
+        },
+    })
+
+    item = compiled["properties"]["items"]["items"]
+    assert item["type"] == "object"
+    assert item["properties"] == {"name": {"type": "string"}, "qty": {"type": "integer"}}
+    assert item["required"] == ["name"]
+    assert compiled["properties"]["choice"] == {"anyOf": [{"type": "integer"}, {"type": "string"}]}
+
+
+def test_schemas_are_compiled_once_by_content():
+    schema = {"properties": {"date": {"type": "date"}}}
+
+    assert compile_parameters(schema) is compile_parameters(dict(schema))
+    assert compile_parameters(None) == {"type": "object", "properties": {}, "required": [], "additionalProperties": False}
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.core.config import settings
+from src.models import Tool
+
+
+@pytest.fixture
+async def client(fake_firestore, monkeypatch):
+    from src.api import tools
+    from src.services.tool_executor import tool_executor
+
+    stored = {tool_id: Tool(id=tool_id, user_id="user-1", name=tool_id, description="", type="function")
+              for tool_id in ("slow", "fast", "fail")}
+
+    async def get_tools(tool_ids):
+        return {tool_id: stored[tool_id] for tool_id in tool_ids if tool_id in stored}
+
+    async def execute_tool(tool, parameters):
+        if tool.id == "fail":
+            raise RuntimeError("upstream error")
+        await asyncio.sleep(0.1 if tool.id == "slow" else 0)
+        return {"tool": tool.id}
+
+    monkeypatch.setattr(tool_executor, "get_tools", get_tools)
+    monkeypatch.setattr(tool_executor, "_execute_tool", execute_tool)
+
+    app = FastAPI()
+    app.include_router(tools.router, prefix="/api/tools")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def batch(*tool_ids, **options):
+    return {"requests": [{"tool_id": tool_id, "parameters": {}} for tool_id in tool_ids], **options}
+
+
+async def test_batch_results_keep_request_order(client):
+    response = await client.post("/api/tools/execute-batch", json=batch("slow", "fast", "fail", "missing"))
+
+    body = response.json()
+    assert response.status_code == 200
+    assert [result["result"] for result in body["results"]] == [{"tool": "slow"}, {"tool": "fast"}, None, None]
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+
+
+async def test_streamed_batch_yields_results_as_they_complete(client):
+    response = await client.post("/api/tools/execute-batch?stream=true", json=batch("slow", "fast"))
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line.get("index") for line in lines[:2]] == [1, 0]
+    assert lines[-1]["done"] and lines[-1]["succeeded"] == 2
+
+
+async def test_oversized_batches_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "tool_batch_max_size", 2)
+
+    response = await client.post("/api/tools/execute-batch", json=batch("fast", "fast", "fast"))
+
+    assert response.status_code == 413
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+import pytest
+from livekit import rtc
+
+from src.agents.cached_tts import CachedTTS
+from src.core.config import settings
+from src.services import tts_cache as tts_cache_module
+from src.services.greeting_cache import GreetingAudio, GreetingCache
+from src.services.tts_cache import PhraseSightings, is_cacheable, normalize_phrase, phrase_key, tool_phrases
+
+SAMPLE_RATE = 8000
+
+
+class FakeStream:
+    """The wrapped TTS's stream: one 10 ms frame per pushed text"""
+
+    def __init__(self, tts):
+        self.tts = tts
+        self.texts = []
+
+    def push_text(self, text):
+        self.texts.append(text)
+
+    def end_input(self):
+        self.tts.spoken.extend(self.texts)
+
+    def __aiter__(self):
+        return self._frames()
+
+    async def _frames(self):
+        for _ in self.texts:
+            yield SimpleNamespace(frame=rtc.AudioFrame(b"\x01\x00" * 80, SAMPLE_RATE, 1, 80))
+
+    async def aclose(self):
+        pass
+
+
+class FakeTTS:
+    sample_rate = SAMPLE_RATE
+    num_channels = 1
+
+    def __init__(self):
+        self.capabilities = SimpleNamespace(streaming=True)
+        self.spoken = []
+
+    def on(self, event):
+        return lambda handler: handler
+
+    def stream(self, conn_options=None):
+        return FakeStream(self)
+
+
+@pytest.fixture
+def phrase_cache(tmp_path, monkeypatch):
+    cache = GreetingCache(str(tmp_path / "audio"), max_memory_bytes=100_000, max_disk_bytes=1_000_000)
+    monkeypatch.setattr("src.agents.cached_tts.tts_cache", cache)
+    monkeypatch.setattr(tts_cache_module, "phrase_sightings", PhraseSightings(str(tmp_path / "sightings.sqlite3")))
+    monkeypatch.setattr(settings, "tts_cache_min_calls", 2)
+    return cache
+
+
+async def speak(tts: CachedTTS, text: str) -> bytes:
+    pushed = []
+    await tts.speak(text, pushed.append, conn_options=None)
+    return b"".join(pushed)
+
+
+def test_phrases_are_normalised():
+    assert normalize_phrase("  Your ORDER\n is ready ") == "your order is ready"
+    assert phrase_key("v", "en", "Your order is ready") == phrase_key("v", "en", "your order  is ready")
+    assert not is_cacheable("x" * (settings.tts_cache_max_chars + 1))
+
+
+def test_tool_phrases_are_split_into_sentences():
+    tools = [
+        {"configuration": {"response": "We are open from nine to five. Parking is free behind the shop."}},
+        {"configuration": {"response": "We are open from nine to five."}},
+        {"configuration": {"hours": "9-5"}},
+    ]
+
+    assert tool_phrases(tools) == ["We are open from nine to five.", "Parking is free behind the shop."]
+
+
+async def test_phrases_are_cached_once_spoken_in_enough_calls(phrase_cache, spooled_metrics):
+    wrapped = FakeTTS()
+    first_call = CachedTTS(wrapped, "cartesia:voice", "en", call_id="call-1")
+    second_call = CachedTTS(wrapped, "cartesia:voice", "en", call_id="call-2")
+
+    await speak(first_call, "One moment please.")
+    await speak(first_call, "One moment please.")
+    assert await phrase_cache.get(phrase_key("cartesia:voice", "en", "One moment please.")) is None
+
+    await speak(second_call, "One moment please.")
+    audio = await speak(CachedTTS(wrapped, "cartesia:voice", "en", call_id="call-3"), "One moment please.")
+
+    assert len(wrapped.spoken) == 3
+    assert len(audio) == 160
+    registry = await spooled_metrics.drain()
+    assert registry.counter("tts_cache_lookups_total").value(result="hit") == 1
+
+
+async def test_precomputed_phrases_are_served_without_synthesis(phrase_cache):
+    wrapped = FakeTTS()
+    await phrase_cache.put(phrase_key("cartesia:voice", "en", "We open at 9."), GreetingAudio(b"\x02\x00" * 400, SAMPLE_RATE))
+
+    audio = await speak(CachedTTS(wrapped, "cartesia:voice", "en"), "we open at 9.")
+
+    assert audio == b"\x02\x00" * 400
+    assert wrapped.spoken == []
+
+
+async def test_streamed_text_is_spoken_sentence_by_sentence(phrase_cache):
+    wrapped = FakeTTS()
+    tts = CachedTTS(wrapped, "cartesia:voice", "en", call_id="call-1")
+    assert tts.capabilities.streaming
+
+    stream = tts.stream()
+    for token in ["Your order ", "is ready. ", "It will be ", "there at six."]:
+        stream.push_text(token)
+    stream.end_input()
+    frames = [event.frame async for event in stream]
+
+    assert wrapped.spoken == ["Your order is ready.", "It will be there at six."]
+    assert sum(frame.duration for frame in frames) >= 0.02
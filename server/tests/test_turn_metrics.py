@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from livekit.agents import metrics as agent_metrics
+
+from src.agents.turn_metrics import TurnMetrics
+from src.core.metrics import MetricsRegistry
+from src.core.metrics_spool import MetricsSpool
+
+LABELS = {"agent": "agent-1", "model": "gpt-4o-mini", "voice": "cartesia:voice"}
+
+
+class FakeSession:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def emit(self, event, **fields):
+        self.handlers[event](SimpleNamespace(**fields))
+
+
+def state(new_state, old_state, at):
+    return {"new_state": new_state, "old_state": old_state, "created_at": at}
+
+
+async def test_turn_latencies_are_spooled(spooled_metrics):
+    session = FakeSession()
+    TurnMetrics(session, "agent-1", model="gpt-4o-mini", voice="cartesia:voice")
+
+    session.emit("user_state_changed", **state("speaking", "listening", 100.0))
+    session.emit("user_state_changed", **state("listening", "speaking", 101.0))
+    session.emit("metrics_collected", metrics=agent_metrics.EOUMetrics(
+        timestamp=101.5, end_of_utterance_delay=0.4, transcription_delay=0.2, on_user_turn_completed_delay=0.0, last_speaking_time=101.0,
+    ))
+    session.emit("metrics_collected", metrics=agent_metrics.LLMMetrics(
+        label="llm", request_id="r1", timestamp=101.9, duration=0.5, ttft=0.3, cancelled=False,
+        completion_tokens=1, prompt_tokens=1, prompt_cached_tokens=0, total_tokens=2, tokens_per_second=1.0,
+    ))
+    session.emit("function_tools_executed", created_at=102.4)
+    session.emit("agent_state_changed", **state("speaking", "thinking", 102.6))
+    # The caller talks over the agent
+    session.emit("user_state_changed", **state("speaking", "listening", 103.0))
+
+    registry = await spooled_metrics.drain()
+    assert registry.histogram("turn_endpointing_seconds").percentiles(**LABELS)[0.5] == 0.4
+    assert registry.histogram("turn_llm_ttft_seconds").percentiles(**LABELS)[0.5] == 0.3
+    assert abs(registry.histogram("turn_tool_seconds").percentiles(**LABELS)[0.5] - 0.5) < 1e-9
+    assert abs(registry.histogram("turn_response_seconds").percentiles(**LABELS)[0.5] - 1.6) < 1e-9
+    assert registry.counter("turns_total").value(**LABELS) == 1
+    assert registry.counter("turn_interruptions_total").value(**LABELS) == 1
+
+
+async def test_spool_moves_observations_between_processes(tmp_path):
+    job_process = MetricsSpool(str(tmp_path / "metrics.sqlite3"))
+    job_process.inc("calls_total", 2, agent="a")
+    job_process.observe("call_seconds", 1.5, agent="a")
+    await job_process.flush()
+
+    api = MetricsRegistry()
+    await MetricsSpool(str(tmp_path / "metrics.sqlite3")).drain_into(api)
+    await MetricsSpool(str(tmp_path / "metrics.sqlite3")).drain_into(api)
+
+    assert api.counter("calls_total").value(agent="a") == 2
+    assert api.histogram("call_seconds").percentiles(agent="a")[0.5] == 1.5
+
+
+def test_count_and_record_only_spool_in_job_processes(tmp_path):
+    spool = MetricsSpool(str(tmp_path / "metrics.sqlite3"))
+    local = MetricsRegistry()
+
+    spool.count(local.counter("requests_total"), outcome="ok")
+    assert spool._buffer == []
+
+    spool.enabled = True
+    spool.count(local.counter("requests_total"), outcome="ok")
+    spool.record(local.histogram("request_seconds"), 0.2)
+
+    assert local.counter("requests_total").value(outcome="ok") == 2
+    assert [row[:2] for row in spool._buffer] == [("counter", "requests_total"), ("histogram", "request_seconds")]
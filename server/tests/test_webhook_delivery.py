@@ -0,0 +1,99 @@
+import httpx
+import pytest
+
+from src.services import webhook_delivery as delivery_module
+from src.services.outbox import STATUS_FAILED, Outbox
+from src.services.webhook_delivery import WEBHOOK_TOPIC, WebhookDeliveryService
+from src.utils.circuit_breaker import OPEN, CircuitBreakerRegistry
+
+
+@pytest.fixture
+def answers():
+    """Status code each URL path answers with, 200 when not listed"""
+    return {}
+
+
+@pytest.fixture
+async def service(tmp_path, answers, monkeypatch):
+    monkeypatch.setattr(delivery_module, "BASE_RETRY_SECONDS", 0.0)
+    received = []
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(answers.get(request.url.path, 200))
+
+    service = WebhookDeliveryService(
+        Outbox(str(tmp_path / "outbox.sqlite3")),
+        CircuitBreakerRegistry(failure_threshold=2, reset_timeout=60),
+        max_attempts=3,
+    )
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service.received = received
+    yield service
+    await service._client.aclose()
+
+
+async def enqueue(service, path, body=None):
+    # enqueue starts no worker, the tests deliver by hand
+    return await service.enqueue(f"https://hooks.example.com{path}", body or {}, timeout=5)
+
+
+async def deliver_due(service):
+    await service._deliver(await service.outbox.claim(WEBHOOK_TOPIC, 50))
+
+
+async def test_delivered_webhooks_leave_the_outbox(service, spooled_metrics):
+    await enqueue(service, "/orders", {"order": 1})
+
+    await deliver_due(service)
+
+    assert service.received[0].content == b'{"order":1}'
+    assert await service.outbox.pending_count(WEBHOOK_TOPIC) == 0
+    registry = await spooled_metrics.drain()
+    assert registry.counter("webhook_deliveries_total").value(host="hooks.example.com", outcome="delivered") == 1
+
+
+async def test_server_errors_are_retried_until_attempts_run_out(service, answers):
+    answers["/flaky"] = 503
+    service.breakers.failure_threshold = 10
+    await enqueue(service, "/flaky")
+
+    for _ in range(3):
+        await deliver_due(service)
+
+    assert len(service.received) == 3
+    assert await service.outbox.pending_count(WEBHOOK_TOPIC) == 0
+    assert service.outbox._count_sync(WEBHOOK_TOPIC, STATUS_FAILED) == 1
+
+
+async def test_rejected_webhooks_are_not_retried(service, answers):
+    answers["/bad"] = 400
+    await enqueue(service, "/bad")
+
+    await deliver_due(service)
+    await deliver_due(service)
+
+    assert len(service.received) == 1
+    assert service.outbox._count_sync(WEBHOOK_TOPIC, STATUS_FAILED) == 1
+
+
+async def test_open_circuits_defer_without_spending_attempts(service, answers):
+    answers["/down"] = 500
+    for _ in range(3):
+        await enqueue(service, "/down")
+
+    await deliver_due(service)
+
+    breaker = service.breakers.get("https://hooks.example.com/down")
+    assert breaker.state == OPEN
+    assert len(service.received) == 2
+    entries = service.outbox._connect().execute("SELECT attempts, next_attempt_at FROM outbox").fetchall()
+    assert sorted(row["attempts"] for row in entries) == [0, 1, 1]
+
+
+async def test_queueing_leaves_delivery_to_the_started_worker(service):
+    await enqueue(service, "/orders")
+
+    # Job processes only write to the outbox; the API's lifespan runs the worker
+    assert service._worker is None
+    assert await service.outbox.pending_count(WEBHOOK_TOPIC) == 1